@@ -1,5 +1,5 @@
 """Agent utilities for RISKI backend."""
 
-from .builder import build_agent
+from .builder import build_agent, create_prompt_manager
 
-__all__ = ["build_agent"]
+__all__ = ["build_agent", "create_prompt_manager"]
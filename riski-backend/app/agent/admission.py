@@ -0,0 +1,225 @@
+"""Process-wide admission control and fair queuing of LLM calls.
+
+``check_document_max_concurrency`` only bounds the fan-out of one run; with
+many concurrent users the backend could still send hundreds of LLM requests
+at once, run into provider rate limits and slow every run down.  All calls
+of ``ResilientChatOpenAI`` therefore pass an ``LLMAdmissionController``
+first, which holds
+
+* a budget of concurrent calls per pool – ``chat`` (first pass and
+  generation), ``relevance`` (relevance checks) and ``suggestions`` (search
+  suggestions of the guard) – and optionally one for all pools together,
+* one queue of waiting calls.  A freed slot goes to the waiting call with
+  the highest priority (generation before suggestions before relevance
+  checks); among equal priorities to the run with the fewest calls in
+  flight, then the fewest calls admitted so far (round robin between
+  runs), then first come, first served.  A run checking twenty documents
+  thus cannot starve a run that only needs its answer generated.
+
+With Redis, every admitted call additionally holds a lease in a sorted set
+per pool, so the pool budgets apply to all backend replicas together.
+Leases expire after ``lease_seconds`` in case a replica dies.  Redis errors
+are logged and the call proceeds with the local budget only.
+
+Calls are attributed to runs by ``with_admission_run``, which the AG-UI
+router applies to the config of every request.
+"""
+
+import asyncio
+import itertools
+import time
+import uuid
+from collections import Counter
+from collections.abc import AsyncIterator, Awaitable, Mapping
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from logging import Logger
+from typing import Any, Literal, cast
+
+from app.core.metrics import metrics
+from app.utils.logging import getLogger
+from redis.asyncio import Redis as AsyncRedis
+
+logger: Logger = getLogger()
+
+ADMISSION_RUN_METADATA_KEY = "riski_run_id"
+
+LLMPool = Literal["chat", "relevance", "suggestions"]
+
+# Lower value = admitted first
+PRIORITIES: dict[LLMPool, int] = {"chat": 0, "suggestions": 1, "relevance": 2}
+
+# Graph nodes whose chat model calls belong to another pool than the model's own.
+# Both nodes only call the chat model for search suggestions.
+_NODE_POOLS: dict[str, LLMPool] = {"guard": "suggestions", "collect_results": "suggestions"}
+
+# Drop expired leases, then add one if the pool has room (ARGV: lease ms, limit, token)
+_ACQUIRE_LEASE_SCRIPT = """
+local now = redis.call('TIME')
+local now_ms = now[1] * 1000 + math.floor(now[2] / 1000)
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now_ms - tonumber(ARGV[1]))
+if redis.call('ZCARD', KEYS[1]) < tonumber(ARGV[2]) then
+    redis.call('ZADD', KEYS[1], now_ms, ARGV[3])
+    redis.call('PEXPIRE', KEYS[1], ARGV[1])
+    return 1
+end
+return 0
+"""
+
+
+def with_admission_run(config: dict[str, Any]) -> dict[str, Any]:
+    """Return a copy of a run *config* whose LLM calls are scheduled as one run."""
+    return {**config, "metadata": {**(config.get("metadata") or {}), ADMISSION_RUN_METADATA_KEY: uuid.uuid4().hex}}
+
+
+def call_pool(model_pool: LLMPool, metadata: Mapping[str, Any] | None) -> LLMPool:
+    """Return the pool of a call of a model in *model_pool*, given the call's run metadata."""
+    return _NODE_POOLS.get((metadata or {}).get("langgraph_node", ""), model_pool)
+
+
+@dataclass(eq=False)
+class _Waiter:
+    pool: LLMPool
+    run_id: str
+    seq: int
+    enqueued: float = field(default_factory=time.monotonic)
+    granted: asyncio.Future[None] = field(default_factory=lambda: asyncio.get_running_loop().create_future())
+
+
+class LLMAdmissionController:
+    """Concurrency budgets and fair queue of the LLM calls of this process.
+
+    Parameters
+    ----------
+    limits:
+        Maximum concurrent calls per pool; pools without a limit are not restricted.
+    max_concurrent:
+        Maximum concurrent calls of all pools together, or ``None``.
+    redis:
+        Optional Redis client to share the pool budgets between replicas.
+    lease_seconds:
+        Lifetime of a Redis lease; must exceed the longest LLM call.
+    """
+
+    def __init__(
+        self,
+        limits: Mapping[LLMPool, int],
+        max_concurrent: int | None = None,
+        redis: AsyncRedis | None = None,
+        lease_seconds: float = 300.0,
+        key_prefix: str = "riski:llm_admission:",
+    ) -> None:
+        self.limits = dict(limits)
+        self.max_concurrent = max_concurrent
+        self._redis = redis
+        self._lease_ms = int(lease_seconds * 1000)
+        self._key_prefix = key_prefix
+        self._waiting: list[_Waiter] = []
+        self._in_flight: Counter[LLMPool] = Counter()
+        self._run_in_flight: Counter[str] = Counter()
+        self._run_admitted: Counter[str] = Counter()
+        self._seq = itertools.count()
+
+    def _has_room(self, pool: LLMPool) -> bool:
+        if self.max_concurrent is not None and sum(self._in_flight.values()) >= self.max_concurrent:
+            return False
+        limit = self.limits.get(pool)
+        return limit is None or self._in_flight[pool] < limit
+
+    def _dispatch(self) -> None:
+        """Grant free slots to waiting calls by priority, then the fewest in-flight and admitted calls of their run, then arrival."""
+        while True:
+            candidates = [w for w in self._waiting if self._has_room(w.pool)]
+            if not candidates:
+                break
+            waiter = min(
+                candidates,
+                key=lambda w: (PRIORITIES[w.pool], self._run_in_flight[w.run_id], self._run_admitted[w.run_id], w.seq),
+            )
+            self._waiting.remove(waiter)
+            self._in_flight[waiter.pool] += 1
+            self._run_in_flight[waiter.run_id] += 1
+            self._run_admitted[waiter.run_id] += 1
+            waiter.granted.set_result(None)
+        self._update_gauges()
+
+    def _release(self, waiter: _Waiter) -> None:
+        self._in_flight[waiter.pool] -= 1
+        self._run_in_flight[waiter.run_id] -= 1
+        self._forget_if_idle(waiter.run_id)
+        self._dispatch()
+
+    def _forget_if_idle(self, run_id: str) -> None:
+        if self._run_in_flight[run_id] <= 0 and not any(w.run_id == run_id for w in self._waiting):
+            self._run_in_flight.pop(run_id, None)
+            self._run_admitted.pop(run_id, None)
+
+    def _update_gauges(self) -> None:
+        queued = Counter(w.pool for w in self._waiting)
+        for pool in PRIORITIES:
+            metrics.set_gauge(f"llm_admission_{pool}_queued", queued[pool])
+            metrics.set_gauge(f"llm_admission_{pool}_in_flight", self._in_flight[pool])
+
+    async def _acquire_lease(self, pool: LLMPool) -> str | None:
+        """Wait for a replica-wide lease of *pool*; ``None`` if Redis is not used or failed."""
+        if self._redis is None or pool not in self.limits:
+            return None
+        token = uuid.uuid4().hex
+        delay = 0.05
+        try:
+            # The asyncio client's eval is typed as returning ``Awaitable[str] | str``
+            while not await cast(
+                Awaitable[int],
+                self._redis.eval(_ACQUIRE_LEASE_SCRIPT, 1, self._key_prefix + pool, self._lease_ms, self.limits[pool], token),
+            ):
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 0.5)
+        except Exception:
+            logger.warning("LLM admission: shared budget unavailable; using the local budget only.", exc_info=True)
+            return None
+        return token
+
+    async def _release_lease(self, pool: LLMPool, token: str) -> None:
+        try:
+            await self._redis.zrem(self._key_prefix + pool, token)  # type: ignore[union-attr]
+        except Exception:
+            logger.warning("LLM admission: could not release a shared lease; it expires on its own.", exc_info=True)
+
+    @asynccontextmanager
+    async def admit(self, pool: LLMPool, run_id: str | None = None) -> AsyncIterator[None]:
+        """Hold a slot of *pool* for the duration of the ``async with`` block.
+
+        Parameters
+        ----------
+        pool:
+            The pool of the call (see ``call_pool``).
+        run_id:
+            The run the call belongs to, for fair scheduling between runs.
+        """
+        waiter = _Waiter(pool, run_id or "", next(self._seq))
+        self._waiting.append(waiter)
+        self._dispatch()
+        try:
+            await waiter.granted
+        except asyncio.CancelledError:
+            if waiter in self._waiting:
+                self._waiting.remove(waiter)
+                self._forget_if_idle(waiter.run_id)
+                self._update_gauges()
+            elif waiter.granted.done():
+                self._release(waiter)
+            raise
+        try:
+            token = await self._acquire_lease(pool)
+            waited = time.monotonic() - waiter.enqueued
+            metrics.inc(f"llm_admission_{pool}_admitted_total")
+            metrics.inc(f"llm_admission_{pool}_wait_seconds_total", waited)
+            if waited >= 1.0:
+                logger.debug("LLM admission: %s call waited %.1fs for a slot.", pool, waited)
+            try:
+                yield
+            finally:
+                if token is not None:
+                    await self._release_lease(pool, token)
+        finally:
+            self._release(waiter)
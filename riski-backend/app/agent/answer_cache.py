@@ -0,0 +1,210 @@
+"""Semantic cache of final answers for recurring questions.
+
+Much of the traffic is a small set of recurring questions.  For the first
+question of a thread, ``call_model`` looks the question up in a
+``SemanticAnswerCache`` while the first model call is running.  A hit is a
+cached question with the same normalized text, or one whose embedding is at
+least ``min_similarity`` cosine-similar (one matrix product over the unit
+embeddings of all cached questions).  On a hit the stored structured answer,
+tracked documents and proposals are returned right away and retrieval, guard
+and generation are skipped.
+
+An entry is dropped after its TTL.  It is also dropped when one of its source
+files is deleted, or when a source file or a paper linked to one has a newer
+``modified`` timestamp than when the answer was stored.  This check is one
+indexed query per hit.  Follow-up questions depend on the conversation and are
+never cached.
+
+The cache lives in-process and is shared by all requests via
+``config["configurable"]["answer_cache"]``.
+"""
+
+import asyncio
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from datetime import datetime
+from logging import Logger
+from typing import Any
+
+import numpy as np
+from app.core.metrics import metrics
+from app.utils.logging import getLogger
+from app.utils.ttl_cache import TTLCache
+from core.model.data_models import File, Paper, PaperFileLink
+from langchain_core.runnables import RunnableConfig
+from sqlalchemy import distinct, func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlmodel import col
+
+from .relevance_cache import normalize_query
+
+logger: Logger = getLogger()
+
+ANSWER_CACHE_CONFIG_KEY = "answer_cache"
+
+EmbedQuery = Callable[[], Awaitable[list[float]]]
+"""Returns the embedding of the question; only called if the exact text is not cached."""
+
+
+@dataclass(frozen=True, eq=False)
+class CachedAnswer:
+    """A final answer with the state it was generated from."""
+
+    query: str
+    embedding: np.ndarray
+    content: str
+    tracked_documents: list[dict[str, Any]]
+    tracked_proposals: list[dict[str, Any]]
+    source_count: int
+    sources_modified: datetime | None
+
+
+def _unit(vector: list[float]) -> np.ndarray:
+    array = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(array)
+    return array / norm if norm else array
+
+
+async def _sources_version(db_sessionmaker: async_sessionmaker, file_ids: list[str]) -> tuple[int, datetime | None]:
+    """Return how many of *file_ids* exist and the latest ``modified`` of them and their linked papers."""
+    statement = (
+        select(func.count(distinct(col(File.db_id))), func.max(File.modified), func.max(Paper.modified))
+        .select_from(File)
+        .outerjoin(PaperFileLink, col(PaperFileLink.file_id) == col(File.db_id))
+        .outerjoin(Paper, col(Paper.db_id) == col(PaperFileLink.paper_id))
+        .where(col(File.db_id).in_(file_ids))
+    )
+    async with db_sessionmaker() as session:
+        count, file_modified, paper_modified = (await session.execute(statement)).one()
+    stamps = [stamp for stamp in (file_modified, paper_modified) if stamp is not None]
+    return count, max(stamps) if stamps else None
+
+
+class SemanticAnswerCache:
+    """In-process cache of final answers keyed by question similarity.
+
+    Parameters
+    ----------
+    min_similarity:
+        Minimum cosine similarity between two questions for a hit.
+    max_entries:
+        Maximum number of cached answers (least recently used are evicted).
+    ttl_seconds:
+        Time after which an answer is regenerated even if its sources are unchanged.
+    """
+
+    def __init__(self, min_similarity: float = 0.95, max_entries: int = 256, ttl_seconds: float = 3600.0) -> None:
+        self.min_similarity = min_similarity
+        self._answers: TTLCache[str, CachedAnswer] = TTLCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+        # Embeddings computed by lookups, reused when the answer to the same question is stored
+        self._embeddings: TTLCache[str, np.ndarray] = TTLCache(max_entries=max_entries, ttl_seconds=600.0)
+        # Keys and stacked embeddings of the cached answers; rebuilt after every change
+        self._index: tuple[list[str], np.ndarray] | None = None
+        self._pending: set[asyncio.Task] = set()
+
+    def __len__(self) -> int:
+        return len(self._answers)
+
+    async def _embedding(self, key: str, embed_query: EmbedQuery) -> np.ndarray:
+        embedding = self._embeddings.get(key)
+        if embedding is None:
+            embedding = _unit(await embed_query())
+            self._embeddings.set(key, embedding)
+        return embedding
+
+    def _similarity_index(self) -> tuple[list[str], np.ndarray]:
+        if self._index is None:
+            entries = self._answers.items()
+            keys = [key for key, _ in entries]
+            matrix = np.stack([answer.embedding for _, answer in entries]) if entries else np.empty((0, 0), dtype=np.float32)
+            self._index = (keys, matrix)
+        return self._index
+
+    def _most_similar(self, embedding: np.ndarray) -> tuple[str, CachedAnswer] | None:
+        """Return the cached answer whose question is most similar to *embedding*, if similar enough."""
+        keys, matrix = self._similarity_index()
+        if not keys or matrix.shape[1] != embedding.shape[0]:
+            return None
+        similarities = matrix @ embedding
+        best = int(np.argmax(similarities))
+        if similarities[best] < self.min_similarity:
+            return None
+        answer = self._answers.get(keys[best])
+        if answer is None:
+            # Expired since the index was built
+            self._index = None
+            return None
+        return keys[best], answer
+
+    def _evict(self, key: str) -> None:
+        self._answers.pop(key)
+        self._index = None
+        metrics.inc("answer_cache_invalidations_total")
+        metrics.set_gauge("answer_cache_entries", len(self._answers))
+
+    async def lookup(self, query: str, embed_query: EmbedQuery, db_sessionmaker: async_sessionmaker) -> CachedAnswer | None:
+        """Return a current cached answer for *query*, or ``None``."""
+        key = normalize_query(query)
+        answer = self._answers.get(key)
+        if answer is None:
+            similar = self._most_similar(await self._embedding(key, embed_query))
+            if similar is not None:
+                key, answer = similar
+        if answer is not None:
+            file_ids = [document["id"] for document in answer.tracked_documents]
+            count, modified = await _sources_version(db_sessionmaker, file_ids)
+            if count != answer.source_count or (
+                modified is not None and (answer.sources_modified is None or modified > answer.sources_modified)
+            ):
+                logger.info("Cached answer for %r is outdated; its sources changed.", answer.query)
+                self._evict(key)
+                answer = None
+        if answer is None:
+            metrics.inc("answer_cache_misses_total")
+            return None
+        metrics.inc("answer_cache_hits_total")
+        logger.info("Answering %r from the answer cache (cached question %r).", query, answer.query)
+        return answer
+
+    async def store(
+        self,
+        query: str,
+        content: str,
+        tracked_documents: list[dict[str, Any]],
+        tracked_proposals: list[dict[str, Any]],
+        embed_query: EmbedQuery,
+        db_sessionmaker: async_sessionmaker,
+    ) -> None:
+        """Store the final answer to *query* with the current version of its sources."""
+        key = normalize_query(query)
+        file_ids = [document["id"] for document in tracked_documents]
+        if not file_ids:
+            return
+        embedding = await self._embedding(key, embed_query)
+        count, modified = await _sources_version(db_sessionmaker, file_ids)
+        self._answers.set(key, CachedAnswer(query, embedding, content, tracked_documents, tracked_proposals, count, modified))
+        self._index = None
+        metrics.set_gauge("answer_cache_entries", len(self._answers))
+
+    def store_in_background(self, *args: Any, **kwargs: Any) -> None:
+        """Run ``store`` without delaying the end of the run; failures are logged."""
+
+        async def run() -> None:
+            try:
+                await self.store(*args, **kwargs)
+            except Exception:
+                logger.warning("Could not store the answer in the answer cache.", exc_info=True)
+
+        task = asyncio.create_task(run())
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    def clear(self) -> None:
+        self._answers.clear()
+        self._embeddings.clear()
+        self._index = None
+
+
+def get_answer_cache(config: RunnableConfig | None) -> SemanticAnswerCache | None:
+    """Return the answer cache from *config*, if enabled."""
+    return ((config or {}).get("configurable") or {}).get(ANSWER_CACHE_CONFIG_KEY)
@@ -1,23 +1,34 @@
-from datetime import datetime
+import asyncio
 from logging import Logger
 
+import httpx
 from ag_ui_langgraph import LangGraphAgent
 from app.core.settings import BackendSettings, InMemoryCheckpointerSettings, RedisCheckpointerSettings, get_settings
 from app.utils.logging import getLogger
+from app.utils.single_flight import SingleFlight
 from langchain_core.callbacks import Callbacks
 from langchain_openai import ChatOpenAI
 from langchain_postgres import PGVectorStore
 from langfuse import Langfuse
-from langfuse.model import TextPromptClient
 from langgraph.checkpoint.base import BaseCheckpointSaver
-from langgraph.checkpoint.memory import InMemorySaver
 from langgraph.checkpoint.redis import AsyncShallowRedisSaver
 from redis.asyncio import Redis as AsyncRedis
 from sqlalchemy.ext.asyncio import async_sessionmaker
 
+from .admission import LLMAdmissionController, LLMPool
+from .answer_cache import ANSWER_CACHE_CONFIG_KEY, SemanticAnswerCache
+from .checkpoint_serde import CompactShallowRedisSaver
+from .coalescing import SINGLE_FLIGHT_CONFIG_KEY
+from .memory_checkpointer import BoundedInMemorySaver
+from .prompt_cache import PromptCache
+from .prompt_manager import PROMPT_MANAGER_CONFIG_KEY, PromptManager
+from .proposal_cache import PROPOSAL_CACHE_CONFIG_KEY, ProposalCache
+from .relevance_cache import RelevanceVerdictCache
+from .reranker import CrossEncoderScorer, RelevanceScorer
+from .resilient_llm import ResilientChatOpenAI
+from .retrieval_filters import RETRIEVAL_FILTERS_CONFIG_KEY
 from .riski_agent import build_riski_graph
 from .tools import get_agent_capabilities, retrieve_documents
-from .types import AGENT_CAPABILITIES_PROMPT, CHECK_DOCUMENT_PROMPT_TEMPLATE
 
 settings: BackendSettings = get_settings()
 logger: Logger = getLogger()
@@ -28,97 +39,215 @@ logger: Logger = getLogger()
 # ---------------------------------------------------------------------------
 
 
+def _build_chat_model(
+    model: str,
+    temperature: float,
+    max_retries: int,
+    timeout: float,
+    fallback_model: str | None,
+    http_client: httpx.AsyncClient | None,
+    admission: LLMAdmissionController | None = None,
+    admission_pool: LLMPool = "chat",
+) -> ChatOpenAI:
+    """Build a ``ResilientChatOpenAI`` with the hedging and fallback settings of ``llm_resilience``."""
+    resilience = settings.llm_resilience
+    return ResilientChatOpenAI(
+        model_name=model,
+        temperature=temperature,
+        max_retries=max_retries,
+        timeout=timeout,
+        http_async_client=http_client,
+        hedge=resilience.hedge,
+        hedge_quantile=resilience.hedge_quantile,
+        hedge_min_samples=resilience.hedge_min_samples,
+        hedge_min_delay_seconds=resilience.hedge_min_delay_seconds,
+        fallback=(
+            ChatOpenAI(
+                model_name=fallback_model,
+                temperature=temperature,
+                max_retries=max_retries,
+                timeout=timeout,
+                http_async_client=http_client,
+            )
+            if fallback_model
+            else None
+        ),
+        fallback_when_remaining_seconds=resilience.fallback_when_remaining_seconds,
+        admission=admission,
+        admission_pool=admission_pool,
+    )
+
+
+def _build_admission_controller() -> LLMAdmissionController | None:
+    """Build the process-wide ``LLMAdmissionController`` of the ``llm_admission`` settings, if enabled."""
+    admission = settings.llm_admission
+    if not admission.enabled:
+        return None
+    return LLMAdmissionController(
+        limits={"chat": admission.chat, "relevance": admission.relevance, "suggestions": admission.suggestions},
+        max_concurrent=admission.max_concurrent,
+        redis=AsyncRedis.from_url(url=admission.redis.redis_url.encoded_string()) if admission.redis is not None else None,
+        lease_seconds=admission.lease_seconds,
+    )
+
+
+def create_prompt_manager(lf_client: Langfuse, prompt_cache: PromptCache) -> PromptManager:
+    """Create the ``PromptManager`` of the Langfuse prompts configured in the settings."""
+    return PromptManager(
+        lf_client,
+        prompt_cache,
+        system=(settings.langfuse_system_prompt_name, settings.langfuse_system_prompt_label),
+        check_document=(settings.langfuse_check_document_prompt_name, settings.langfuse_check_document_prompt_label),
+        agent_capabilities=(settings.langfuse_agent_capabilities_prompt_name, settings.langfuse_agent_capabilities_prompt_label),
+        # Only fetched when it is used, so other modes do not warn about a missing prompt
+        check_documents_batch=(
+            (settings.langfuse_check_documents_batch_prompt_name, settings.langfuse_check_documents_batch_prompt_label)
+            if settings.relevance_check_mode == "batched"
+            else None
+        ),
+        refresh_interval_seconds=settings.prompt_refresh_interval_seconds,
+    )
+
+
 async def build_agent(
-    vectorstore: PGVectorStore, db_sessionmaker: async_sessionmaker, callbacks: Callbacks, lf_client: Langfuse
+    vectorstore: PGVectorStore,
+    db_sessionmaker: async_sessionmaker,
+    callbacks: Callbacks,
+    lf_client: Langfuse,
+    http_client: httpx.AsyncClient | None = None,
+    prompt_manager: PromptManager | None = None,
+    retrieval_filters: bool = False,
 ) -> LangGraphAgent:
     """
     Constructs and returns a configured RISKI LangGraphAgent with a custom graph.
 
+    All model clients share *http_client* (see ``app.core.http_client``) if given.
+    The prompts come from *prompt_manager* (see ``create_prompt_manager``); the
+    caller starts its background refresh.  *retrieval_filters* enables the
+    structured filters of ``retrieve_documents``; it requires a vector store on
+    the ``file_retrieval`` view.
+
     The graph enforces that the ``retrieve_documents`` tool is called and
     returns non-empty results **before** the model generates its final answer.
     If the tool is not called or returns no results, the agent deterministically
     responds with a fixed "no results" message — no LLM generation happens.
     """
 
-    # Build the chat model
-    chat_model: ChatOpenAI = ChatOpenAI(
-        model_name=settings.core.genai.chat_model,
+    # Build the chat model; all model calls share one admission controller
+    admission = _build_admission_controller()
+    chat_model: ChatOpenAI = _build_chat_model(
+        settings.core.genai.chat_model,
         temperature=settings.core.genai.chat_temperature,
         max_retries=settings.core.genai.chat_max_retries,
         timeout=settings.core.genai.chat_timeout_seconds,
+        fallback_model=settings.llm_resilience.fallback_chat_model,
+        http_client=http_client,
+        admission=admission,
     )
 
     # Build the relevance check model
-    relevance_check_model: ChatOpenAI = ChatOpenAI(
-        model_name=settings.core.genai.relevance_check_model,
+    relevance_check_model: ChatOpenAI = _build_chat_model(
+        settings.core.genai.relevance_check_model,
         temperature=settings.core.genai.relevance_check_temperature,
         max_retries=settings.core.genai.relevance_check_max_retries,
         timeout=settings.core.genai.relevance_check_timeout_seconds,
+        fallback_model=settings.llm_resilience.fallback_relevance_check_model,
+        http_client=http_client,
+        admission=admission,
+        admission_pool="relevance",
     )
 
     # Bind tools so the model knows about them
     tools = [retrieve_documents, get_agent_capabilities]
-    try:
-        system_prompt_template: TextPromptClient = lf_client.get_prompt(
-            name=settings.langfuse_system_prompt_name, label=settings.langfuse_system_prompt_label
-        )
-        system_prompt = system_prompt_template.compile(
-            date_written=datetime.now().strftime("%A, %d %B %Y - %H:%M"),
-            date_isoformat=datetime.now().isoformat(),
-        )
-    except Exception as e:
-        logger.error(f"Failed to fetch system prompt from Langfuse: {e}")
-        raise ValueError(
-            f"Could not retrieve the {settings.langfuse_system_prompt_name} prompt (label={settings.langfuse_system_prompt_label}) from Langfuse. "
-            "Ensure the prompt exists and Langfuse is reachable."
-        )
+    # Prompts: read from the local cache (Langfuse only for missing ones), refreshed in the background by the caller
+    prompt_manager = prompt_manager or create_prompt_manager(lf_client, PromptCache(None))
+    await prompt_manager.load()
 
-    try:
-        check_document_prompt_template: TextPromptClient | str = lf_client.get_prompt(
-            name=settings.langfuse_check_document_prompt_name, label=settings.langfuse_check_document_prompt_label
+    # -- Configure relevance verdict cache --
+    relevance_cache: RelevanceVerdictCache | None = None
+    if settings.relevance_cache.enabled:
+        relevance_cache = RelevanceVerdictCache(
+            max_entries=settings.relevance_cache.max_entries,
+            ttl_seconds=settings.relevance_cache.ttl_minutes * 60,
+            redis=(
+                AsyncRedis.from_url(url=settings.relevance_cache.redis.redis_url.encoded_string())
+                if settings.relevance_cache.redis is not None
+                else None
+            ),
         )
-    except Exception as e:
-        logger.warning(
-            "Failed to fetch check-document prompt from Langfuse, using local template: %s",
-            e,
-        )
-        check_document_prompt_template = CHECK_DOCUMENT_PROMPT_TEMPLATE
 
-    try:
-        agent_capabilities_prompt: TextPromptClient = lf_client.get_prompt(
-            name=settings.langfuse_agent_capabilities_prompt_name,
-            label=settings.langfuse_agent_capabilities_prompt_label,
+    # -- Configure proposal cache --
+    proposal_cache: ProposalCache | None = None
+    if settings.proposal_cache_ttl_seconds is not None:
+        proposal_cache = ProposalCache(max_entries=settings.proposal_cache_max_entries, ttl_seconds=settings.proposal_cache_ttl_seconds)
+
+    # -- Configure coalescing of identical in-flight work --
+    single_flight: SingleFlight | None = SingleFlight() if settings.request_coalescing else None
+
+    # -- Configure answer cache --
+    answer_cache: SemanticAnswerCache | None = None
+    if settings.answer_cache.enabled:
+        answer_cache = SemanticAnswerCache(
+            min_similarity=settings.answer_cache.min_similarity,
+            max_entries=settings.answer_cache.max_entries,
+            ttl_seconds=settings.answer_cache.ttl_minutes * 60,
         )
-        agent_capabilities: str = agent_capabilities_prompt.compile()
-    except Exception as e:
-        logger.warning(
-            "Failed to fetch agent-capabilities prompt from Langfuse, using local fallback: %s",
-            e,
+
+    # -- Configure local relevance backend --
+    relevance_scorer: RelevanceScorer | None = None
+    if settings.relevance_backend == "cross_encoder":
+        relevance_scorer = await asyncio.to_thread(
+            CrossEncoderScorer,
+            settings.cross_encoder.model,
+            max_length=settings.cross_encoder.max_length,
+            batch_size=settings.cross_encoder.batch_size,
         )
-        agent_capabilities = AGENT_CAPABILITIES_PROMPT
 
     graph = build_riski_graph(
         chat_model=chat_model,
         relevance_check_model=relevance_check_model,
         tools=tools,
-        system_prompt=system_prompt,
-        check_document_prompt_template=check_document_prompt_template,
+        prompt_manager=prompt_manager,
+        relevance_cache=relevance_cache,
+        check_mode=settings.relevance_check_mode,
+        batch_max_tokens=settings.relevance_batch_max_tokens,
+        early_exit_quorum=settings.relevance_early_exit_quorum,
+        early_exit_deadline_seconds=settings.relevance_early_exit_deadline_seconds,
+        early_exit_unfinished_policy=settings.relevance_early_exit_unfinished_policy,
+        snippet_max_tokens=settings.relevance_snippet_max_tokens,
+        generation_snippet_max_tokens=settings.generation_snippet_max_tokens,
+        auto_accept_max_distance=settings.relevance_auto_accept_max_distance,
+        auto_reject_min_distance=settings.relevance_auto_reject_min_distance,
+        relevance_scorer=relevance_scorer,
+        scorer_accept_threshold=settings.cross_encoder.accept_threshold,
+        scorer_reject_threshold=settings.cross_encoder.reject_threshold,
+        reuse_followup_documents=settings.followup_document_reuse,
     )
     # -- Configure checkpointer --
     checkpointer: BaseCheckpointSaver
     if isinstance(settings.checkpointer, InMemoryCheckpointerSettings):
-        checkpointer = InMemorySaver()
+        checkpointer = BoundedInMemorySaver(
+            max_threads=settings.checkpointer.max_threads,
+            max_bytes=settings.checkpointer.max_megabytes * 1024 * 1024 if settings.checkpointer.max_megabytes else None,
+            ttl_seconds=settings.checkpointer.ttl_minutes * 60 if settings.checkpointer.ttl_minutes else None,
+        )
     elif isinstance(settings.checkpointer, RedisCheckpointerSettings):
         async_redis: AsyncRedis = AsyncRedis.from_url(
             url=settings.checkpointer.redis_url.encoded_string(),
         )
-        checkpointer = AsyncShallowRedisSaver(
-            redis_client=async_redis,
-            ttl={
-                "default_ttl": settings.checkpointer.ttl_minutes,
-                "refresh_on_read": True,
-            },
-        )
+        ttl = {
+            "default_ttl": settings.checkpointer.ttl_minutes,
+            "refresh_on_read": True,
+        }
+        if settings.checkpointer.compression:
+            checkpointer = CompactShallowRedisSaver(
+                redis_client=async_redis,
+                ttl=ttl,
+                blob_min_chars=settings.checkpointer.blob_min_chars,
+                codec=settings.checkpointer.codec,
+            )
+        else:
+            checkpointer = AsyncShallowRedisSaver(redis_client=async_redis, ttl=ttl)
         await checkpointer.asetup()
     else:
         raise ValueError("Unsupported checkpointer configuration")
@@ -135,13 +264,21 @@ async def build_agent(
                 "vectorstore": vectorstore,
                 "db_sessionmaker": db_sessionmaker,
                 "top_k_docs": settings.top_k_docs,
-                "agent_capabilities": agent_capabilities,
+                PROMPT_MANAGER_CONFIG_KEY: prompt_manager,
+                PROPOSAL_CACHE_CONFIG_KEY: proposal_cache,
+                ANSWER_CACHE_CONFIG_KEY: answer_cache,
+                SINGLE_FLIGHT_CONFIG_KEY: single_flight,
                 "db_query_timeout_seconds": settings.db_query_timeout_seconds,
                 "db_query_total_timeout_seconds": settings.db_query_total_timeout_seconds,
                 "vectorstore_timeout_seconds": settings.vectorstore_timeout_seconds,
                 "force_vectorstore_timeout": settings.force_vectorstore_timeout,
                 "force_db_timeout": settings.force_db_timeout,
                 "force_llm_timeout": settings.force_llm_timeout,
+                "state_snippet_max_tokens": settings.state_snippet_max_tokens,
+                RETRIEVAL_FILTERS_CONFIG_KEY: retrieval_filters,
+                "speculative_retrieval_min_similarity": (
+                    settings.speculative_retrieval_min_similarity if settings.speculative_retrieval else None
+                ),
             },
             "callbacks": callbacks,
             # Cap parallel check_document fan-out branches to avoid overwhelming
@@ -0,0 +1,315 @@
+"""Compressed, deduplicated checkpoint storage for the Redis checkpointer.
+
+``AsyncShallowRedisSaver`` stores the full channel values of every checkpoint
+as an inline RedisJSON document.  Long conversations therefore rewrite the
+whole message history, tool artifacts and tracked documents on every graph
+step.  ``CompactShallowRedisSaver`` changes only the representation:
+
+* Large strings (document snippets, tool artifacts, long answers) are moved
+  out of the checkpoint into per-thread blob keys addressed by content hash.
+  A blob is written once per thread and only referenced afterwards.
+* The remaining channel values are serialised with the saver's serde,
+  compressed with the configured codec (``zstd`` or ``zlib``) and stored as a
+  single base64 string inside the checkpoint document.  This also keeps
+  pydantic state values such as ``TrackedDocument`` out of the RedisJSON
+  conversion.
+
+The codec is part of every stored payload.  The saver refuses to start with an
+unknown codec, so replicas never silently write with a different codec than
+configured.  A checkpoint that cannot be restored (expired blob, unknown codec)
+is treated like a missing checkpoint and logged.
+
+Checkpoint metadata, ids and timestamps are untouched, so listing and TTL
+handling of the base saver keep working.
+"""
+
+import base64
+import hashlib
+import re
+import zlib
+from logging import Logger
+from typing import Any, Callable
+
+import zstandard
+from app.utils.logging import getLogger
+from app.utils.ttl_cache import TTLCache
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import ChannelVersions, Checkpoint, CheckpointMetadata, CheckpointTuple
+from langgraph.checkpoint.redis.ashallow import AsyncShallowRedisSaver
+from langgraph.checkpoint.serde.base import SerializerProtocol
+from pydantic import BaseModel
+
+logger: Logger = getLogger()
+
+PACKED_KEY = "__riski_packed__"
+BLOB_REF_PREFIX = "\x00riski-blob:"
+CODECS = ("zstd", "zlib")
+DEFAULT_CODEC = "zstd"
+# Characters with a meaning in Redis MATCH patterns
+_GLOB_SPECIAL = re.compile(r"([*?\[\]\\])")
+
+
+# ---------------------------------------------------------------------------
+# Codecs
+# ---------------------------------------------------------------------------
+
+
+def compress(data: bytes, codec: str = DEFAULT_CODEC) -> bytes:
+    """Compress *data* with *codec* (``zstd`` or ``zlib``)."""
+    if codec == "zstd":
+        return zstandard.compress(data, 3)
+    if codec == "zlib":
+        return zlib.compress(data, 6)
+    raise ValueError(f"Unknown compression codec: {codec}")
+
+
+def decompress(data: bytes, codec: str) -> bytes:
+    """Decompress *data* that was compressed with *codec*."""
+    if codec == "zstd":
+        return zstandard.decompress(data)
+    if codec == "zlib":
+        return zlib.decompress(data)
+    raise ValueError(f"Unknown compression codec: {codec}")
+
+
+# ---------------------------------------------------------------------------
+# Packing of channel values
+# ---------------------------------------------------------------------------
+
+
+def _blob_ref(digest: str) -> str:
+    return f"{BLOB_REF_PREFIX}{digest}"
+
+
+def _map_strings(value: Any, fn: Callable[[str], str]) -> Any:
+    """Apply *fn* to every string in *value*, descending into containers and pydantic models.
+
+    Containers and models are only copied when one of their strings changed.
+    Other objects are returned unchanged.
+    """
+    if isinstance(value, str):
+        return fn(value)
+    if isinstance(value, dict):
+        mapped = {k: _map_strings(v, fn) for k, v in value.items()}
+        return mapped if any(mapped[k] is not value[k] for k in value) else value
+    if isinstance(value, (list, tuple)):
+        mapped_items = [_map_strings(v, fn) for v in value]
+        if all(m is v for m, v in zip(mapped_items, value)):
+            return value
+        return type(value)(mapped_items) if isinstance(value, list) else tuple(mapped_items)
+    if isinstance(value, BaseModel):
+        changes = {}
+        for name in type(value).model_fields:
+            field_value = getattr(value, name, None)
+            mapped = _map_strings(field_value, fn)
+            if mapped is not field_value:
+                changes[name] = mapped
+        return value.model_copy(update=changes) if changes else value
+    return value
+
+
+def extract_blobs(value: Any, min_chars: int) -> tuple[Any, dict[str, str]]:
+    """Replace strings of at least *min_chars* characters with content-hash references.
+
+    Returns the stripped value and the extracted strings keyed by hash.
+    """
+    blobs: dict[str, str] = {}
+
+    def _extract(text: str) -> str:
+        if len(text) < min_chars:
+            return text
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        blobs[digest] = text
+        return _blob_ref(digest)
+
+    return _map_strings(value, _extract), blobs
+
+
+def blob_refs(value: Any) -> set[str]:
+    """Return the content hashes referenced in *value*."""
+    refs: set[str] = set()
+
+    def _collect(text: str) -> str:
+        if text.startswith(BLOB_REF_PREFIX):
+            refs.add(text[len(BLOB_REF_PREFIX) :])
+        return text
+
+    _map_strings(value, _collect)
+    return refs
+
+
+def restore_blobs(value: Any, blobs: dict[str, str]) -> Any:
+    """Inverse of ``extract_blobs``; raises ``KeyError`` for unknown references."""
+
+    def _restore(text: str) -> str:
+        return blobs[text[len(BLOB_REF_PREFIX) :]] if text.startswith(BLOB_REF_PREFIX) else text
+
+    return _map_strings(value, _restore)
+
+
+def pack_channel_values(
+    channel_values: dict[str, Any],
+    serde: SerializerProtocol,
+    min_chars: int,
+    codec: str = DEFAULT_CODEC,
+) -> tuple[dict[str, Any], dict[str, str]]:
+    """Pack *channel_values* for storage in the RedisJSON checkpoint document.
+
+    Returns
+    -------
+    tuple
+        The packed channel values (a single JSON-safe entry holding the
+        compressed, base64-encoded payload of *serde*) and the extracted
+        blobs keyed by content hash.
+    """
+    stripped, blobs = extract_blobs(channel_values, min_chars)
+    type_, data = serde.dumps_typed(stripped)
+    payload = base64.b64encode(compress(data, codec)).decode("ascii")
+    return {PACKED_KEY: {"type": type_, "codec": codec, "data": payload}}, blobs
+
+
+def is_packed(channel_values: Any) -> bool:
+    return isinstance(channel_values, dict) and PACKED_KEY in channel_values
+
+
+def unpack_stripped(channel_values: dict[str, Any], serde: SerializerProtocol) -> dict[str, Any]:
+    """Decode packed channel values; blob references are left in place."""
+    packed = channel_values[PACKED_KEY]
+    return serde.loads_typed((packed["type"], decompress(base64.b64decode(packed["data"]), packed["codec"])))
+
+
+def unpack_channel_values(channel_values: dict[str, Any], serde: SerializerProtocol, blobs: dict[str, str]) -> dict[str, Any]:
+    """Inverse of ``pack_channel_values``."""
+    return restore_blobs(unpack_stripped(channel_values, serde), blobs)
+
+
+def encode_blob(text: str, codec: str = DEFAULT_CODEC) -> bytes:
+    return codec.encode("ascii") + b":" + compress(text.encode("utf-8"), codec)
+
+
+def decode_blob(raw: bytes) -> str:
+    codec, _, data = raw.partition(b":")
+    return decompress(data, codec.decode("ascii")).decode("utf-8")
+
+
+# ---------------------------------------------------------------------------
+# Checkpointer
+# ---------------------------------------------------------------------------
+
+
+class CompactShallowRedisSaver(AsyncShallowRedisSaver):
+    """``AsyncShallowRedisSaver`` that stores channel values compressed and large strings deduplicated per thread."""
+
+    def __init__(
+        self,
+        *args: Any,
+        blob_min_chars: int = 1024,
+        blob_key_prefix: str = "riski:checkpoint_blob",
+        codec: str = DEFAULT_CODEC,
+        **kwargs: Any,
+    ) -> None:
+        if codec not in CODECS:
+            raise ValueError(f"Unknown checkpoint compression codec '{codec}'; use one of {', '.join(CODECS)}.")
+        super().__init__(*args, **kwargs)
+        self._codec = codec
+        self._blob_min_chars = blob_min_chars
+        self._blob_key_prefix = blob_key_prefix
+        ttl_minutes = (self.ttl_config or {}).get("default_ttl")
+        self._blob_ttl_seconds: int | None = int(ttl_minutes * 60) if ttl_minutes else None
+        # Blobs written recently by this process; they are not sent to Redis again.
+        self._written_blobs: TTLCache[str, bool] = TTLCache(max_entries=50_000, ttl_seconds=(self._blob_ttl_seconds or 3600) // 2)
+
+    def _blob_key(self, thread_id: str, digest: str) -> str:
+        return f"{self._blob_key_prefix}:{thread_id}:{digest}"
+
+    async def _awrite_blobs(self, thread_id: str, blobs: dict[str, str]) -> None:
+        new = {self._blob_key(thread_id, digest): text for digest, text in blobs.items()}
+        new = {key: text for key, text in new.items() if self._written_blobs.get(key) is None}
+        if not new:
+            return
+        pipeline = self._redis.pipeline(transaction=False)
+        for key, text in new.items():
+            pipeline.set(key, encode_blob(text, self._codec), ex=self._blob_ttl_seconds)
+        await pipeline.execute()
+        for key in new:
+            self._written_blobs.set(key, True)
+
+    async def _aread_blobs(self, thread_id: str, digests: set[str]) -> dict[str, str]:
+        if not digests:
+            return {}
+        ordered = sorted(digests)
+        raw_values = await self._redis.mget([self._blob_key(thread_id, digest) for digest in ordered])
+        blobs = {digest: decode_blob(raw) for digest, raw in zip(ordered, raw_values) if raw is not None}
+        if self._blob_ttl_seconds and (self.ttl_config or {}).get("refresh_on_read"):
+            pipeline = self._redis.pipeline(transaction=False)
+            for digest in blobs:
+                pipeline.expire(self._blob_key(thread_id, digest), self._blob_ttl_seconds)
+            await pipeline.execute()
+        return blobs
+
+    async def _aunpack(self, thread_id: str, channel_values: dict[str, Any]) -> dict[str, Any] | None:
+        """Restore packed *channel_values*; returns ``None`` if the checkpoint cannot be restored."""
+        try:
+            stripped = unpack_stripped(channel_values, self.serde)
+            blobs = await self._aread_blobs(thread_id, blob_refs(stripped))
+            return restore_blobs(stripped, blobs)
+        except KeyError:
+            # A blob expired before the checkpoint; the thread cannot be restored consistently.
+            logger.warning("Checkpoint of thread %s references missing blobs; starting from an empty state.", thread_id)
+        except ValueError as exc:
+            # Written with a codec this replica cannot read.
+            logger.error("Checkpoint of thread %s cannot be decompressed (%s); starting from an empty state.", thread_id, exc)
+        return None
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        packed, blobs = pack_channel_values(checkpoint.get("channel_values") or {}, self.serde, self._blob_min_chars, self._codec)
+        await self._awrite_blobs(config["configurable"]["thread_id"], blobs)
+        stored = checkpoint.copy()
+        stored["channel_values"] = packed
+        return await super().aput(config, stored, metadata, new_versions)
+
+    async def aget_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        checkpoint_tuple = await super().aget_tuple(config)
+        if checkpoint_tuple is None or not is_packed(checkpoint_tuple.checkpoint.get("channel_values")):
+            return checkpoint_tuple
+        channel_values = await self._aunpack(config["configurable"]["thread_id"], checkpoint_tuple.checkpoint["channel_values"])
+        if channel_values is None:
+            return None
+        checkpoint = checkpoint_tuple.checkpoint.copy()
+        checkpoint["channel_values"] = channel_values
+        return checkpoint_tuple._replace(checkpoint=checkpoint)
+
+    async def aget_channel_values(
+        self,
+        thread_id: str,
+        checkpoint_ns: str,
+        checkpoint_id: str,
+        channel_versions: dict[str, Any] | None = None,
+    ) -> dict[str, Any]:
+        channel_values = await super().aget_channel_values(thread_id, checkpoint_ns, checkpoint_id, channel_versions)
+        if not is_packed(channel_values):
+            return channel_values
+        restored = await self._aunpack(thread_id, channel_values)
+        return restored if restored is not None else {}
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        """Delete the checkpoints, writes and blobs of *thread_id*."""
+        await super().adelete_thread(thread_id)
+        prefix = f"{self._blob_key_prefix}:{thread_id}:"
+        batch: list[Any] = []
+        async for key in self._redis.scan_iter(match=_GLOB_SPECIAL.sub(r"\\\1", prefix) + "*", count=500):
+            batch.append(key)
+            if len(batch) >= 500:
+                await self._redis.unlink(*batch)
+                batch = []
+        if batch:
+            await self._redis.unlink(*batch)
+        for key, _ in self._written_blobs.items():
+            if key.startswith(prefix):
+                self._written_blobs.pop(key)
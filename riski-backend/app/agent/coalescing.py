@@ -0,0 +1,86 @@
+"""Coalescing of identical in-flight work across concurrent requests.
+
+When a topic trends, many users ask the same question within seconds.  The
+expensive steps that only depend on their inputs are shared with a
+``SingleFlight`` (``app/utils/single_flight.py``) so concurrent identical
+calls wait for one in-flight call:
+
+* query embeddings – ``CoalescingEmbeddings`` wraps the vector store's embedding model,
+* vector searches – keyed by query, ``k`` and filter (``retrieve_documents`` and speculative retrieval),
+* relevance verdicts – keyed like the relevance cache (query, document, content hash, prompt version),
+* proposal lookups – keyed by the file ids that are not cached.
+
+Message history, state and the generated answer stay per request.  The
+``SingleFlight`` is shared by all requests via
+``config["configurable"]["single_flight"]``.
+
+A shared call belongs to no request: it runs detached from the run that
+started it, without its callbacks, run deadline or admission run (see
+``SingleFlight``).  Consequently the LLM call of a shared relevance check does
+not appear in the Langfuse trace of any run; the joins are counted as
+``coalesced_<step>_total``.  Each caller still waits at most until its own run
+deadline (``riski_run_deadline``); a caller that gives up does not cancel the
+call for the others.
+"""
+
+import asyncio
+import json
+import time
+from collections.abc import Awaitable, Callable, Hashable
+from typing import Any, TypeVar
+
+from app.agent.resilient_llm import DEADLINE_METADATA_KEY
+from app.utils.single_flight import SingleFlight
+from langchain_core.embeddings import Embeddings
+from langchain_core.runnables import RunnableConfig
+
+SINGLE_FLIGHT_CONFIG_KEY = "single_flight"
+
+T = TypeVar("T")
+
+
+class CoalescingEmbeddings(Embeddings):
+    """Embedding model that shares concurrent ``aembed_query`` calls for the same text."""
+
+    def __init__(self, embeddings: Embeddings, single_flight: SingleFlight | None = None) -> None:
+        self.embeddings = embeddings
+        self.single_flight = single_flight or SingleFlight()
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.embeddings.embed_query(text)
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        return await self.embeddings.aembed_documents(texts)
+
+    async def aembed_query(self, text: str) -> list[float]:
+        return await self.single_flight.do(("embedding", text), lambda: self.embeddings.aembed_query(text))
+
+
+def search_key(query: str, k: int, search_filter: dict[str, Any] | None = None) -> tuple[str, str, int, str]:
+    """Return the single-flight key of a vector search."""
+    return ("vector_search", query, k, json.dumps(search_filter, sort_keys=True, default=str))
+
+
+def get_single_flight(config: RunnableConfig | None) -> SingleFlight | None:
+    """Return the shared ``SingleFlight`` from *config*, if coalescing is enabled."""
+    return ((config or {}).get("configurable") or {}).get(SINGLE_FLIGHT_CONFIG_KEY)
+
+
+async def coalesce(config: RunnableConfig | None, key: tuple[Hashable, ...], fn: Callable[[], Awaitable[T]]) -> T:
+    """Await ``fn()``, shared with concurrent calls for the same *key* if *config* enables coalescing.
+
+    Raises
+    ------
+    asyncio.TimeoutError
+        If the run deadline in *config* passes while waiting for a shared call.
+    """
+    single_flight = get_single_flight(config)
+    if single_flight is None:
+        return await fn()
+    deadline = ((config or {}).get("metadata") or {}).get(DEADLINE_METADATA_KEY)
+    if not isinstance(deadline, (int, float)):
+        return await single_flight.do(key, fn)
+    return await asyncio.wait_for(single_flight.do(key, fn), timeout=max(deadline - time.time(), 0.0))
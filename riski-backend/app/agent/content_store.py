@@ -0,0 +1,97 @@
+"""Request-scoped store for the full text of retrieved documents.
+
+The agent state only carries document ids, metadata and a bounded snippet
+(see ``TrackedDocument``).  The full ``File.text`` of every retrieved document
+is kept in a ``DocumentContentStore`` that lives for one request and is passed
+to the graph via ``config["configurable"]["content_store"]``.  Nodes that need
+the full text fetch it lazily; entries that are not in the store (e.g. for a
+thread resumed in a later request) are loaded from the database.
+
+This keeps the full texts out of ``Send`` payloads, checkpoints and
+``STATE_SNAPSHOT`` events.
+"""
+
+import asyncio
+from collections.abc import Mapping
+from logging import Logger
+from typing import Any
+
+from app.utils.logging import getLogger
+from core.model.data_models import File
+from langchain_core.runnables import RunnableConfig
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlmodel import select
+
+logger: Logger = getLogger()
+
+CONTENT_STORE_CONFIG_KEY = "content_store"
+
+
+class DocumentContentStore:
+    """In-memory map of document id → full text with lazy database fallback."""
+
+    def __init__(self, db_sessionmaker: async_sessionmaker | None = None, db_timeout_seconds: float = 10) -> None:
+        self._texts: dict[str, str] = {}
+        self._db_sessionmaker = db_sessionmaker
+        self._db_timeout_seconds = db_timeout_seconds
+        self._lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        return len(self._texts)
+
+    def put(self, doc_id: str, text: str) -> None:
+        """Store the full text of *doc_id*."""
+        self._texts[doc_id] = text
+
+    async def aget(self, doc_id: str) -> str | None:
+        """Return the full text of *doc_id*, loading it from the database on a miss."""
+        return (await self.aget_many([doc_id])).get(doc_id)
+
+    async def aget_many(self, doc_ids: list[str]) -> dict[str, str]:
+        """Return the full texts of *doc_ids* that are known or can be loaded.
+
+        Database errors are logged; callers fall back to the snippet in state.
+        """
+        missing = [doc_id for doc_id in doc_ids if doc_id not in self._texts]
+        if missing and self._db_sessionmaker is not None:
+            async with self._lock:
+                missing = [doc_id for doc_id in missing if doc_id not in self._texts]
+                if missing:
+                    try:
+                        self._texts.update(await asyncio.wait_for(self._load(missing), timeout=self._db_timeout_seconds))
+                    except Exception:
+                        logger.warning("Content store: loading %d document texts failed.", len(missing), exc_info=True)
+        return {doc_id: self._texts[doc_id] for doc_id in doc_ids if doc_id in self._texts}
+
+    async def _load(self, doc_ids: list[str]) -> dict[str, str]:
+        assert self._db_sessionmaker is not None
+        async with self._db_sessionmaker() as db_session:
+            result = await db_session.execute(select(File.db_id, File.text).where(File.db_id.in_(doc_ids)))  # type: ignore[attr-defined]
+            return {str(db_id): text or "" for db_id, text in result.all()}
+
+
+def get_content_store(config: Mapping[str, Any] | None) -> DocumentContentStore | None:
+    """Return the request's content store from *config*, if one is configured."""
+    return ((config or {}).get("configurable") or {}).get(CONTENT_STORE_CONFIG_KEY)
+
+
+def with_content_store(config: dict[str, Any]) -> dict[str, Any]:
+    """Return a copy of a run *config* with a fresh ``DocumentContentStore``.
+
+    The store loads missing texts with the ``db_sessionmaker`` of the config.
+    """
+    configurable: dict[str, Any] = dict(config.get("configurable") or {})
+    configurable[CONTENT_STORE_CONFIG_KEY] = DocumentContentStore(
+        configurable.get("db_sessionmaker"),
+        db_timeout_seconds=configurable.get("db_query_total_timeout_seconds", 10),
+    )
+    return {**config, "configurable": configurable}
+
+
+async def resolve_document_text(doc_id: str, snippet: str, config: RunnableConfig | None) -> str:
+    """Return the full text of *doc_id* from the request's store, or *snippet* if it is unavailable."""
+    store = get_content_store(config)
+    if store is None or not doc_id:
+        return snippet
+    text = await store.aget(doc_id)
+    return text if text else snippet
@@ -0,0 +1,190 @@
+"""In-memory checkpointer with bounded size.
+
+``InMemorySaver`` keeps every checkpoint of every thread for the lifetime of
+the process.  ``BoundedInMemorySaver`` tracks the serialised size and last
+access of each thread and evicts whole threads when
+
+* a thread has not been used for longer than the TTL,
+* the number of threads exceeds ``max_threads``, or
+* the total size exceeds ``max_bytes``
+
+(least recently used first).  An evicted thread simply starts over with an
+empty state on its next request, like an expired Redis checkpoint.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Sequence
+from dataclasses import dataclass, field
+from logging import Logger
+from typing import Any
+
+from app.core.metrics import metrics
+from app.utils.logging import getLogger
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import ChannelVersions, Checkpoint, CheckpointMetadata, CheckpointTuple
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.checkpoint.serde.base import SerializerProtocol
+
+logger: Logger = getLogger()
+
+
+@dataclass
+class _ThreadUsage:
+    last_access: float
+    checkpoint_bytes: int = 0
+    blob_keys: set[tuple] = field(default_factory=set)
+    blob_bytes: int = 0
+    write_bytes: dict[tuple, int] = field(default_factory=dict)
+
+    @property
+    def total_bytes(self) -> int:
+        return self.checkpoint_bytes + self.blob_bytes + sum(self.write_bytes.values())
+
+
+class BoundedInMemorySaver(InMemorySaver):
+    """``InMemorySaver`` with LRU/TTL eviction of whole threads.
+
+    Parameters
+    ----------
+    max_threads:
+        Maximum number of threads kept; ``None`` for no limit.
+    max_bytes:
+        Maximum serialised size of all threads; ``None`` for no limit.
+        The thread that is currently written is never evicted.
+    ttl_seconds:
+        Threads idle for longer than this are dropped; ``None`` for no TTL.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_threads: int | None = 1000,
+        max_bytes: int | None = 256 * 1024 * 1024,
+        ttl_seconds: float | None = 12 * 3600,
+        serde: SerializerProtocol | None = None,
+    ) -> None:
+        super().__init__(serde=serde)
+        self.max_threads = max_threads
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._usage: OrderedDict[str, _ThreadUsage] = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.RLock()
+
+    # -- bookkeeping ---------------------------------------------------------
+
+    def _touch(self, thread_id: str) -> _ThreadUsage:
+        usage = self._usage.get(thread_id)
+        if usage is None:
+            usage = self._usage[thread_id] = _ThreadUsage(last_access=time.monotonic())
+        else:
+            usage.last_access = time.monotonic()
+            self._usage.move_to_end(thread_id)
+        return usage
+
+    def _is_expired(self, usage: _ThreadUsage, now: float) -> bool:
+        return self.ttl_seconds is not None and now - usage.last_access > self.ttl_seconds
+
+    def _drop(self, thread_id: str, reason: str) -> None:
+        usage = self._usage.pop(thread_id, None)
+        if usage is None:
+            return
+        self._total_bytes -= usage.total_bytes
+        self.storage.pop(thread_id, None)
+        for key in usage.blob_keys:
+            self.blobs.pop(key, None)
+        for key in usage.write_bytes:
+            self.writes.pop(key, None)
+        metrics.inc(f"checkpointer_evictions_{reason}_total")
+        logger.debug("Checkpointer: evicted thread %s (%s, %d bytes).", thread_id, reason, usage.total_bytes)
+
+    def _evict(self, keep: str | None = None) -> None:
+        now = time.monotonic()
+        for thread_id in [t for t, usage in self._usage.items() if self._is_expired(usage, now) and t != keep]:
+            self._drop(thread_id, "ttl")
+        while (self.max_threads is not None and len(self._usage) > self.max_threads) or (
+            self.max_bytes is not None and self._total_bytes > self.max_bytes
+        ):
+            lru = next((t for t in self._usage if t != keep), None)
+            if lru is None:
+                break
+            self._drop(lru, "lru")
+        self._update_gauges()
+
+    def _update_gauges(self) -> None:
+        metrics.set_gauge("checkpointer_threads", len(self._usage))
+        metrics.set_gauge("checkpointer_bytes", self._total_bytes)
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total_bytes
+
+    def __len__(self) -> int:
+        return len(self._usage)
+
+    # -- BaseCheckpointSaver -------------------------------------------------
+
+    def get_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        thread_id = config["configurable"]["thread_id"]
+        with self._lock:
+            usage = self._usage.get(thread_id)
+            if usage is None:
+                # Unknown or evicted thread; avoid creating empty entries in ``storage``.
+                return None
+            if self._is_expired(usage, time.monotonic()):
+                self._drop(thread_id, "ttl")
+                self._update_gauges()
+                return None
+            self._touch(thread_id)
+            return super().get_tuple(config)
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+        with self._lock:
+            result = super().put(config, checkpoint, metadata, new_versions)
+            usage = self._touch(thread_id)
+            before = usage.total_bytes
+            for channel, version in new_versions.items():
+                key = (thread_id, checkpoint_ns, channel, version)
+                if key not in usage.blob_keys and key in self.blobs:
+                    usage.blob_keys.add(key)
+                    usage.blob_bytes += len(self.blobs[key][1])
+            saved_checkpoint, saved_metadata, _ = self.storage[thread_id][checkpoint_ns][checkpoint["id"]]
+            usage.checkpoint_bytes += len(saved_checkpoint[1]) + len(saved_metadata[1])
+            self._total_bytes += usage.total_bytes - before
+            self._evict(keep=thread_id)
+            return result
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        thread_id = config["configurable"]["thread_id"]
+        outer_key = (thread_id, config["configurable"].get("checkpoint_ns", ""), config["configurable"]["checkpoint_id"])
+        with self._lock:
+            super().put_writes(config, writes, task_id, task_path)
+            usage = self._touch(thread_id)
+            before = usage.total_bytes
+            usage.write_bytes[outer_key] = sum(len(entry[2][1]) for entry in self.writes.get(outer_key, {}).values())
+            self._total_bytes += usage.total_bytes - before
+            self._evict(keep=thread_id)
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            usage = self._usage.pop(thread_id, None)
+            if usage is not None:
+                self._total_bytes -= usage.total_bytes
+            super().delete_thread(thread_id)
+            self._update_gauges()
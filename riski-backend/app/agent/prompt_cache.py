@@ -0,0 +1,108 @@
+"""Local file cache of Langfuse prompts.
+
+``build_agent`` needs three Langfuse prompts.  Fetching them on every start
+makes startup depend on Langfuse latency and availability.  ``PromptCache``
+keeps the last fetched version of each prompt in a JSON file: startup reads
+the prompts from there, and only prompts missing from the cache are fetched
+from Langfuse.  Every later fetch (see ``PromptManager.refresh``) writes the
+current Langfuse version for the next start.
+"""
+
+import asyncio
+import json
+import os
+import threading
+from logging import Logger
+from pathlib import Path
+from typing import Any
+
+from app.core.metrics import metrics
+from app.utils.logging import getLogger
+from langfuse import Langfuse
+from langfuse.api.resources.prompts.types import Prompt_Text
+from langfuse.model import TextPromptClient
+
+logger: Logger = getLogger()
+
+
+def _key(name: str, label: str) -> str:
+    return f"{name}@{label}"
+
+
+class PromptCache:
+    """JSON file with the last fetched version of each ``(name, label)`` prompt.
+
+    Parameters
+    ----------
+    path:
+        Cache file; created on the first ``put``.  ``None`` disables the cache
+        (every ``get`` misses, ``put`` does nothing).
+    """
+
+    def __init__(self, path: Path | None) -> None:
+        self.path = path
+        self._entries: dict[str, dict[str, Any]] | None = None
+        self._lock = threading.Lock()
+
+    def _load(self) -> dict[str, dict[str, Any]]:
+        if self._entries is None:
+            self._entries = {}
+            if self.path is not None and self.path.exists():
+                try:
+                    self._entries = json.loads(self.path.read_text(encoding="utf-8"))
+                except (OSError, ValueError):
+                    logger.warning("Prompt cache %s is unreadable; ignoring it.", self.path, exc_info=True)
+        return self._entries
+
+    def get(self, name: str, label: str) -> TextPromptClient | None:
+        """Return the cached prompt, or ``None`` if it is not cached."""
+        with self._lock:
+            entry = self._load().get(_key(name, label))
+        if entry is None:
+            metrics.inc("prompt_cache_misses_total")
+            return None
+        metrics.inc("prompt_cache_hits_total")
+        return TextPromptClient(Prompt_Text(**entry))
+
+    def put(self, prompt: TextPromptClient, label: str) -> None:
+        """Store *prompt* and rewrite the cache file atomically."""
+        if self.path is None:
+            return
+        entry = {
+            "type": "text",
+            "name": prompt.name,
+            "version": prompt.version,
+            "prompt": prompt.prompt,
+            "config": prompt.config,
+            "labels": prompt.labels,
+            "tags": prompt.tags,
+        }
+        with self._lock:
+            entries = self._load()
+            if entries.get(_key(prompt.name, label)) == entry:
+                return
+            entries[_key(prompt.name, label)] = entry
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+                tmp_path.write_text(json.dumps(entries, ensure_ascii=False, indent=2), encoding="utf-8")
+                tmp_path.replace(self.path)
+            except OSError:
+                logger.warning("Could not write prompt cache %s.", self.path, exc_info=True)
+
+
+async def fetch_prompt(lf_client: Langfuse, cache: PromptCache, name: str, label: str) -> TextPromptClient:
+    """Fetch a prompt from Langfuse (off the event loop) and store it in *cache*."""
+    # cache_ttl_seconds=0: the SDK's own cache would return a stale version; caching is done here
+    prompt: TextPromptClient = await asyncio.to_thread(lf_client.get_prompt, name=name, label=label, cache_ttl_seconds=0)  # type: ignore[assignment]
+    if not prompt.is_fallback:
+        cache.put(prompt, label)
+    return prompt
+
+
+async def load_prompt(lf_client: Langfuse, cache: PromptCache, name: str, label: str) -> TextPromptClient:
+    """Return the prompt from *cache*, fetching it from Langfuse only on a cache miss."""
+    cached = cache.get(name, label)
+    if cached is not None:
+        return cached
+    return await fetch_prompt(lf_client, cache, name, label)
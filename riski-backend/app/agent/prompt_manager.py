@@ -0,0 +1,243 @@
+"""Hot-reloadable prompts of the agent.
+
+``PromptManager`` holds the current ``PromptSet`` (system, check-document,
+agent-capabilities and batched check-documents prompt).  The graph nodes read ``manager.current`` on
+every call instead of capturing prompts when the graph is built, so a
+background task can refresh the prompts from Langfuse and swap in a new
+``PromptSet`` (one attribute assignment) without recompiling the graph.
+
+* ``load`` reads the prompts from the ``PromptCache`` and only fetches
+  missing ones from Langfuse (startup).
+* ``refresh`` fetches all prompts from Langfuse; a prompt that cannot be
+  fetched keeps its last good version.
+* ``system_prompt`` compiles the system prompt with the current date and
+  caches the result until the minute changes.
+
+Request-time code never calls Langfuse.
+"""
+
+import asyncio
+from dataclasses import dataclass
+from datetime import datetime
+from functools import cached_property
+from logging import Logger
+
+from app.core.metrics import metrics
+from app.utils.logging import getLogger
+from langchain_core.runnables import RunnableConfig
+from langfuse import Langfuse
+from langfuse.model import TextPromptClient
+
+from .prompt_cache import PromptCache, fetch_prompt, load_prompt
+from .relevance_cache import prompt_version
+from .types import AGENT_CAPABILITIES_PROMPT, CHECK_DOCUMENT_PROMPT_TEMPLATE, CHECK_DOCUMENTS_BATCH_PROMPT_TEMPLATE, SYSTEM_PROMPT
+
+logger: Logger = getLogger()
+
+PROMPT_MANAGER_CONFIG_KEY = "prompt_manager"
+
+PromptRef = tuple[str, str]
+"""``(name, label)`` of a Langfuse prompt."""
+
+
+@dataclass(frozen=True)
+class PromptSet:
+    """One consistent version of all agent prompts."""
+
+    system: TextPromptClient | str = SYSTEM_PROMPT
+    check_document: TextPromptClient | str = CHECK_DOCUMENT_PROMPT_TEMPLATE
+    agent_capabilities: str = AGENT_CAPABILITIES_PROMPT
+    check_documents_batch: TextPromptClient | str = CHECK_DOCUMENTS_BATCH_PROMPT_TEMPLATE
+
+    @cached_property
+    def check_document_version(self) -> str:
+        """Identifier of the check-document prompt used in relevance cache keys."""
+        return prompt_version(self.check_document)
+
+    @cached_property
+    def check_documents_batch_version(self) -> str:
+        """Identifier of the batched check-documents prompt used in relevance cache keys."""
+        return prompt_version(self.check_documents_batch)
+
+
+def _describe(prompt: TextPromptClient | str) -> str:
+    return f"{prompt.name} v{prompt.version}" if isinstance(prompt, TextPromptClient) else "local"
+
+
+class PromptManager:
+    """Current agent prompts with background refresh from Langfuse.
+
+    Parameters
+    ----------
+    lf_client:
+        Langfuse client; ``None`` for fixed prompts (see ``static``).
+    cache:
+        Local prompt cache read on ``load`` and written on every fetch.
+    system / check_document / agent_capabilities / check_documents_batch:
+        ``(name, label)`` of the Langfuse prompts; without a reference the
+        local default of that prompt is used.
+    refresh_interval_seconds:
+        Interval of the background refresh started by ``start``; ``None``
+        disables it.
+    """
+
+    def __init__(
+        self,
+        lf_client: Langfuse | None,
+        cache: PromptCache | None = None,
+        system: PromptRef | None = None,
+        check_document: PromptRef | None = None,
+        agent_capabilities: PromptRef | None = None,
+        check_documents_batch: PromptRef | None = None,
+        refresh_interval_seconds: float | None = 300.0,
+        prompts: PromptSet | None = None,
+    ) -> None:
+        self.lf_client = lf_client
+        self.cache = cache or PromptCache(None)
+        self.system_ref = system
+        self.check_document_ref = check_document
+        self.agent_capabilities_ref = agent_capabilities
+        self.check_documents_batch_ref = check_documents_batch
+        self.refresh_interval_seconds = refresh_interval_seconds
+        self.current: PromptSet = prompts or PromptSet()
+        self._compiled_system: tuple[PromptSet, str, str] | None = None
+        self._task: asyncio.Task | None = None
+
+    @classmethod
+    def static(
+        cls,
+        system_prompt: str = SYSTEM_PROMPT,
+        check_document_prompt_template: TextPromptClient | str = CHECK_DOCUMENT_PROMPT_TEMPLATE,
+        agent_capabilities: str = AGENT_CAPABILITIES_PROMPT,
+        check_documents_batch_prompt_template: TextPromptClient | str = CHECK_DOCUMENTS_BATCH_PROMPT_TEMPLATE,
+    ) -> "PromptManager":
+        """Return a manager with fixed prompts that never refreshes."""
+        return cls(
+            None,
+            prompts=PromptSet(system_prompt, check_document_prompt_template, agent_capabilities, check_documents_batch_prompt_template),
+        )
+
+    # -- prompts --------------------------------------------------------------
+
+    def system_prompt(self) -> str:
+        """Return the system prompt compiled with the current date."""
+        prompts = self.current
+        if not isinstance(prompts.system, TextPromptClient):
+            return prompts.system
+        now = datetime.now()
+        date_written = now.strftime("%A, %d %B %Y - %H:%M")
+        compiled = self._compiled_system
+        if compiled is not None and compiled[0] is prompts and compiled[1] == date_written:
+            return compiled[2]
+        text = prompts.system.compile(date_written=date_written, date_isoformat=now.isoformat())
+        self._compiled_system = (prompts, date_written, text)
+        return text
+
+    # -- loading ---------------------------------------------------------------
+
+    async def _get(self, ref: PromptRef, refresh: bool) -> TextPromptClient:
+        assert self.lf_client is not None
+        if refresh:
+            return await fetch_prompt(self.lf_client, self.cache, *ref)
+        return await load_prompt(self.lf_client, self.cache, *ref)
+
+    async def _build(self, refresh: bool) -> PromptSet:
+        """Return a new ``PromptSet``; prompts that cannot be loaded keep their current value."""
+        current = self.current
+        system, check_document, agent_capabilities = current.system, current.check_document, current.agent_capabilities
+        check_documents_batch = current.check_documents_batch
+        if self.system_ref is not None:
+            try:
+                system = await self._get(self.system_ref, refresh)
+            except Exception as e:
+                if not refresh:
+                    logger.error(f"Failed to fetch system prompt from Langfuse: {e}")
+                    name, label = self.system_ref
+                    raise ValueError(
+                        f"Could not retrieve the {name} prompt (label={label}) from Langfuse. Ensure the prompt exists and Langfuse is reachable."
+                    )
+                metrics.inc("prompt_refresh_failures_total")
+                logger.warning("Could not refresh system prompt, keeping %s: %s", _describe(system), e)
+        if self.check_document_ref is not None:
+            try:
+                check_document = await self._get(self.check_document_ref, refresh)
+            except Exception as e:
+                metrics.inc("prompt_refresh_failures_total")
+                logger.warning("Failed to fetch check-document prompt from Langfuse, keeping %s: %s", _describe(check_document), e)
+        if self.agent_capabilities_ref is not None:
+            try:
+                agent_capabilities = (await self._get(self.agent_capabilities_ref, refresh)).compile()
+            except Exception as e:
+                metrics.inc("prompt_refresh_failures_total")
+                logger.warning("Failed to fetch agent-capabilities prompt from Langfuse, keeping the current text: %s", e)
+        if self.check_documents_batch_ref is not None:
+            try:
+                check_documents_batch = await self._get(self.check_documents_batch_ref, refresh)
+            except Exception as e:
+                metrics.inc("prompt_refresh_failures_total")
+                logger.warning(
+                    "Failed to fetch check-documents-batch prompt from Langfuse, keeping %s: %s", _describe(check_documents_batch), e
+                )
+        return PromptSet(system, check_document, agent_capabilities, check_documents_batch)
+
+    def _swap(self, prompts: PromptSet) -> None:
+        previous = self.current
+        for label, old, new in (
+            ("system", previous.system, prompts.system),
+            ("check-document", previous.check_document, prompts.check_document),
+            ("check-documents-batch", previous.check_documents_batch, prompts.check_documents_batch),
+        ):
+            if _describe(old) != _describe(new):
+                logger.info("Prompt %s updated: %s -> %s", label, _describe(old), _describe(new))
+        self.current = prompts
+
+    async def load(self) -> PromptSet:
+        """Load the prompts from the local cache, fetching only missing ones from Langfuse.
+
+        Raises
+        ------
+        ValueError
+            If the system prompt is neither cached nor available in Langfuse.
+        """
+        if self.lf_client is not None:
+            self._swap(await self._build(refresh=False))
+        return self.current
+
+    async def refresh(self) -> PromptSet:
+        """Fetch the current prompt versions from Langfuse and swap them in."""
+        if self.lf_client is not None:
+            self._swap(await self._build(refresh=True))
+            metrics.inc("prompt_refreshes_total")
+        return self.current
+
+    # -- background refresh ------------------------------------------------------
+
+    async def _run(self) -> None:
+        assert self.refresh_interval_seconds is not None
+        while True:
+            try:
+                await self.refresh()
+            except Exception:
+                logger.warning("Prompt refresh failed; keeping the current prompts.", exc_info=True)
+            await asyncio.sleep(self.refresh_interval_seconds)
+
+    def start(self) -> None:
+        """Refresh the prompts now and then every ``refresh_interval_seconds`` in the background."""
+        if self._task is None and self.lf_client is not None and self.refresh_interval_seconds:
+            self._task = asyncio.create_task(self._run())
+
+    async def aclose(self) -> None:
+        """Stop the background refresh."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+
+def agent_capabilities_text(config: RunnableConfig | None) -> str:
+    """Return the current agent-capabilities text for a run *config*."""
+    configurable = (config or {}).get("configurable") or {}
+    manager: PromptManager | None = configurable.get(PROMPT_MANAGER_CONFIG_KEY)
+    if manager is not None:
+        return manager.current.agent_capabilities
+    return configurable.get("agent_capabilities", AGENT_CAPABILITIES_PROMPT)
@@ -0,0 +1,59 @@
+"""Short-lived cache of the proposals linked to a file.
+
+Proposals (``Stadtratsantrag`` papers) change rarely, but the lookup is on
+the path of every question.  ``ProposalCache`` maps a file id to the
+proposals linked to it (an empty tuple for files without proposals), so
+``get_proposals`` only queries the database for files it has not seen
+within the TTL.
+"""
+
+from typing import NamedTuple
+
+from app.core.metrics import metrics
+from app.utils.ttl_cache import TTLCache
+from langchain_core.runnables import RunnableConfig
+
+PROPOSAL_CACHE_CONFIG_KEY = "proposal_cache"
+
+
+class ProposalRow(NamedTuple):
+    """The columns of a proposal that ``TrackedProposal`` needs."""
+
+    identifier: str
+    name: str
+    subject: str
+    date: str | None
+    risUrl: str
+
+
+class ProposalCache:
+    """In-process TTL cache of ``file id -> proposals``."""
+
+    def __init__(self, max_entries: int = 10_000, ttl_seconds: float = 60.0) -> None:
+        self._cache: TTLCache[str, tuple[ProposalRow, ...]] = TTLCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+
+    def get_many(self, file_ids: list[str]) -> tuple[dict[str, tuple[ProposalRow, ...]], list[str]]:
+        """Return the cached proposals by file id and the file ids that are not cached."""
+        cached: dict[str, tuple[ProposalRow, ...]] = {}
+        missing: list[str] = []
+        for file_id in file_ids:
+            rows = self._cache.get(file_id)
+            if rows is None:
+                missing.append(file_id)
+            else:
+                cached[file_id] = rows
+        metrics.inc("proposal_cache_hits_total", len(cached))
+        metrics.inc("proposal_cache_misses_total", len(missing))
+        return cached, missing
+
+    def set_many(self, rows_by_file: dict[str, tuple[ProposalRow, ...]]) -> None:
+        for file_id, rows in rows_by_file.items():
+            self._cache.set(file_id, rows)
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+
+def get_proposal_cache(config: RunnableConfig | None) -> ProposalCache | None:
+    """Return the proposal cache from *config*, if configured."""
+    return ((config or {}).get("configurable") or {}).get(PROPOSAL_CACHE_CONFIG_KEY)
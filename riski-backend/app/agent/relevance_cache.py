@@ -0,0 +1,105 @@
+"""Cache for ``DocumentRelevanceVerdict`` results of the relevance guard.
+
+Popular questions tend to retrieve the same documents again and again.  The
+verdict for a (query, document) pair only changes when the document text or
+the relevance prompt changes, so it is safe to reuse it across runs.
+
+The cache is two-tiered: an in-process LRU/TTL cache that is always used, and
+an optional Redis backend that is shared between backend replicas.
+"""
+
+import hashlib
+import re
+from logging import Logger
+
+from app.utils.logging import getLogger
+from app.utils.ttl_cache import TTLCache
+from langfuse.model import TextPromptClient
+from pydantic import ValidationError
+from redis.asyncio import Redis as AsyncRedis
+
+from .types import DocumentRelevanceVerdict
+
+logger: Logger = getLogger()
+
+_TRAILING_PUNCTUATION = re.compile(r"[\s?!.]+$")
+
+
+def normalize_query(query: str) -> str:
+    """Normalise a user query so trivially different spellings share a cache entry."""
+    collapsed = " ".join(query.casefold().split())
+    return _TRAILING_PUNCTUATION.sub("", collapsed)
+
+
+def content_hash(text: str) -> str:
+    """Return a stable hash of a document's text content."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def prompt_version(template: str | TextPromptClient) -> str:
+    """Return an identifier for the relevance prompt that changes whenever the prompt does.
+
+    Langfuse prompts are identified by name and version; local templates by a
+    hash of their text.
+    """
+    if isinstance(template, str):
+        return f"local:{content_hash(template)[:16]}"
+    return f"langfuse:{template.name}:{template.version}"
+
+
+class RelevanceVerdictCache:
+    """Two-tier cache of relevance verdicts keyed by query, document and prompt version."""
+
+    def __init__(
+        self,
+        max_entries: int = 5000,
+        ttl_seconds: int = 86400,
+        redis: AsyncRedis | None = None,
+        key_prefix: str = "riski:relevance:",
+    ) -> None:
+        self._local: TTLCache[str, DocumentRelevanceVerdict] = TTLCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+        self._redis = redis
+        self._ttl_seconds = ttl_seconds
+        self._key_prefix = key_prefix
+
+    @staticmethod
+    def make_key(user_query: str, doc_id: str, page_content: str, version: str) -> str:
+        """Build the cache key for a single relevance check."""
+        raw = "\x1f".join((normalize_query(user_query), doc_id, content_hash(page_content), version))
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    async def aget(self, key: str) -> DocumentRelevanceVerdict | None:
+        """Return the cached verdict for *key*, or ``None`` on a miss.
+
+        Errors of the shared backend are logged and treated as a miss so the
+        guard falls back to a regular LLM check.
+        """
+        verdict = self._local.get(key)
+        if verdict is not None or self._redis is None:
+            return verdict
+
+        try:
+            raw = await self._redis.get(self._key_prefix + key)
+        except Exception:
+            logger.warning("Relevance cache: shared backend lookup failed.", exc_info=True)
+            return None
+        if raw is None:
+            return None
+
+        try:
+            verdict = DocumentRelevanceVerdict.model_validate_json(raw)
+        except ValidationError:
+            logger.warning("Relevance cache: ignoring malformed entry for key %s.", key)
+            return None
+        self._local.set(key, verdict)
+        return verdict
+
+    async def aset(self, key: str, verdict: DocumentRelevanceVerdict) -> None:
+        """Store *verdict* in the local cache and, if configured, in the shared backend."""
+        self._local.set(key, verdict)
+        if self._redis is None:
+            return
+        try:
+            await self._redis.set(self._key_prefix + key, verdict.model_dump_json(), ex=self._ttl_seconds)
+        except Exception:
+            logger.warning("Relevance cache: shared backend write failed.", exc_info=True)
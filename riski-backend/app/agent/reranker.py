@@ -0,0 +1,56 @@
+"""Local relevance scoring backends for the guard.
+
+A ``RelevanceScorer`` scores all retrieved documents for a query in one call.
+The guard uses the scores to accept or reject documents directly and sends
+only borderline documents to the LLM relevance check.
+"""
+
+import asyncio
+from logging import Logger
+from typing import Protocol
+
+from app.utils.logging import getLogger
+
+logger: Logger = getLogger()
+
+
+class RelevanceScorer(Protocol):
+    """Scores how relevant each passage is for a query (higher is more relevant, range 0..1)."""
+
+    async def ascore(self, query: str, passages: list[str]) -> list[float]: ...
+
+
+class CrossEncoderScorer:
+    """Relevance scorer backed by a local ``sentence-transformers`` cross-encoder on CPU.
+
+    All (query, passage) pairs are scored in a single batched forward pass that
+    runs in a worker thread, so the event loop is not blocked.  The model is
+    loaded from the local Hugging Face cache; no LLM or network call is needed
+    at request time.
+
+    ``sentence-transformers`` is an optional dependency and is imported lazily.
+    """
+
+    def __init__(self, model_name: str, max_length: int = 512, batch_size: int = 32) -> None:
+        try:
+            from sentence_transformers import CrossEncoder  # ty: ignore[unresolved-import]
+        except ImportError as e:
+            raise ImportError(
+                "The cross_encoder relevance backend requires the optional 'sentence-transformers' package. "
+                "Install the 'cross-encoder' extra (uv sync --extra cross-encoder) or use RISKI_BACKEND__RELEVANCE_BACKEND=llm."
+            ) from e
+
+        logger.info("Loading cross-encoder '%s' on CPU.", model_name)
+        self._model = CrossEncoder(model_name, device="cpu", max_length=max_length)
+        self._batch_size = batch_size
+
+    async def ascore(self, query: str, passages: list[str]) -> list[float]:
+        if not passages:
+            return []
+        scores = await asyncio.to_thread(
+            self._model.predict,
+            [(query, passage) for passage in passages],
+            batch_size=self._batch_size,
+            show_progress_bar=False,
+        )
+        return [float(score) for score in scores]
@@ -0,0 +1,300 @@
+"""Hedged, deadline-aware chat model calls with model fallback.
+
+``ResilientChatOpenAI`` is a drop-in ``ChatOpenAI`` whose low-level
+``_astream`` / ``_agenerate`` add three things, so ``bind_tools``,
+``with_structured_output`` and ``bind`` keep working unchanged:
+
+* **Hedging** – if the first token (or, without streaming, the response)
+  has not arrived after the observed p95 latency of this model, a duplicate
+  request is sent and whichever answers first wins; the other is cancelled.
+  Time to first token and full response times are tracked separately.
+* **Run deadline** – the router stores an absolute deadline in the run's
+  ``config["metadata"]`` (``with_run_deadline``).  LangChain passes the
+  metadata to every model call of the run, which fails with
+  ``APITimeoutError`` once the deadline has passed instead of waiting for the
+  client timeout and retries.
+* **Fallback** – when less than ``fallback_when_remaining_seconds`` of the
+  budget is left, the call goes to the ``fallback`` model (a faster model or
+  another deployment) instead.
+
+With an ``admission`` controller every call first waits for a slot of its
+pool (see ``admission.py``); the deadline and fallback are planned after the
+wait.  A hedged duplicate waits for a slot of its own.
+
+``BaseChatModel`` calls ``_astream`` without a run manager from ``astream``
+and from streaming ``ainvoke``; both entry points hand the run metadata to
+``_astream`` through a context variable instead.
+"""
+
+import asyncio
+import math
+import time
+from collections import deque
+from collections.abc import AsyncIterator, Awaitable, Callable, Mapping
+from contextlib import AbstractAsyncContextManager, AsyncExitStack, nullcontext
+from contextvars import ContextVar
+from logging import Logger
+from typing import Any, TypeVar
+
+import httpx
+from app.core.metrics import metrics
+from app.utils.logging import getLogger
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun
+from langchain_core.language_models import LanguageModelInput
+from langchain_core.messages import AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+from langchain_core.runnables import RunnableConfig, ensure_config
+from langchain_openai import ChatOpenAI
+from openai import APITimeoutError
+from pydantic import PrivateAttr
+
+from .admission import ADMISSION_RUN_METADATA_KEY, LLMAdmissionController, LLMPool, call_pool
+
+logger: Logger = getLogger()
+
+DEADLINE_METADATA_KEY = "riski_run_deadline"
+
+T = TypeVar("T")
+
+# Run metadata for ``_astream`` calls that get no run manager
+_run_metadata: ContextVar[Mapping[str, Any] | None] = ContextVar("riski_run_metadata", default=None)
+
+
+def with_run_deadline(config: dict[str, Any], budget_seconds: float | None) -> dict[str, Any]:
+    """Return a copy of a run *config* whose model calls must finish within *budget_seconds* from now."""
+    if budget_seconds is None:
+        return config
+    return {**config, "metadata": {**(config.get("metadata") or {}), DEADLINE_METADATA_KEY: time.time() + budget_seconds}}
+
+
+def _call_metadata(run_manager: AsyncCallbackManagerForLLMRun | None) -> Mapping[str, Any]:
+    """Return the run metadata of a model call."""
+    if run_manager is not None:
+        return run_manager.metadata or {}
+    return _run_metadata.get() or {}
+
+
+def _remaining_seconds(metadata: Mapping[str, Any]) -> float | None:
+    deadline = metadata.get(DEADLINE_METADATA_KEY)
+    return deadline - time.time() if isinstance(deadline, (int, float)) else None
+
+
+class LatencyWindow:
+    """Sliding window of the most recent latencies of a model."""
+
+    def __init__(self, size: int = 200) -> None:
+        self._samples: deque[float] = deque(maxlen=size)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def add(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def quantile(self, q: float) -> float | None:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(math.ceil(q * len(ordered)) - 1, len(ordered) - 1)] if q > 0 else ordered[0]
+
+
+class ResilientChatOpenAI(ChatOpenAI):
+    """``ChatOpenAI`` with request hedging, run deadline and model fallback."""
+
+    hedge: bool = False
+    """Send a duplicate request when a call is slower than the observed ``hedge_quantile``."""
+    hedge_quantile: float = 0.95
+    hedge_min_samples: int = 20
+    """Hedging starts once this many latencies have been observed."""
+    hedge_min_delay_seconds: float = 1.0
+    fallback: ChatOpenAI | None = None
+    fallback_when_remaining_seconds: float = 15.0
+    admission: LLMAdmissionController | None = None
+    """Process-wide admission control shared by all models."""
+    admission_pool: LLMPool = "chat"
+
+    _generate_latencies: LatencyWindow = PrivateAttr(default_factory=LatencyWindow)
+    """Full response times of calls without streaming."""
+    _stream_latencies: LatencyWindow = PrivateAttr(default_factory=LatencyWindow)
+    """Times to the first chunk of streamed calls."""
+
+    # -- helpers -------------------------------------------------------------
+
+    def _deadline_error(self) -> APITimeoutError:
+        metrics.inc("llm_deadline_exceeded_total")
+        return APITimeoutError(request=httpx.Request("POST", self.openai_api_base or "https://api.openai.com/v1"))
+
+    def _hedge_delay(self, latencies: LatencyWindow | None) -> float | None:
+        if not self.hedge or latencies is None or len(latencies) < self.hedge_min_samples:
+            return None
+        return max(latencies.quantile(self.hedge_quantile) or 0.0, self.hedge_min_delay_seconds)
+
+    def _admit(self, metadata: Mapping[str, Any]) -> AbstractAsyncContextManager[None]:
+        if self.admission is None:
+            return nullcontext()
+        return self.admission.admit(call_pool(self.admission_pool, metadata), metadata.get(ADMISSION_RUN_METADATA_KEY))
+
+    def _plan(self, metadata: Mapping[str, Any]) -> tuple[float | None, ChatOpenAI]:
+        """Return the monotonic deadline of the call and the model to use."""
+        remaining = _remaining_seconds(metadata)
+        if remaining is None:
+            return None, self
+        if remaining <= 0:
+            raise self._deadline_error()
+        if self.fallback is not None and remaining <= self.fallback_when_remaining_seconds:
+            metrics.inc("llm_fallback_total")
+            logger.info("%.1fs of the run budget left; using fallback model %s.", remaining, self.fallback.model_name)
+            return time.monotonic() + remaining, self.fallback
+        return time.monotonic() + remaining, self
+
+    async def _race(
+        self,
+        start: Callable[[bool], Awaitable[T]],
+        deadline: float | None,
+        latencies: LatencyWindow | None,
+        discard: Callable[[T], Awaitable[None]] | None = None,
+    ) -> T:
+        """Await ``start(False)`` and return the first successful attempt.
+
+        With *latencies* (calls to this model, not the fallback) a duplicate
+        ``start(True)`` is started after the hedge delay, and the latency is
+        recorded in *latencies*.
+        """
+        started = time.monotonic()
+        hedge_delay = self._hedge_delay(latencies)
+        primary: asyncio.Future[T] = asyncio.ensure_future(start(False))
+        attempts: set[asyncio.Future[T]] = {primary}
+        error: BaseException | None = None
+        try:
+            while attempts:
+                timeout = None if deadline is None else max(deadline - time.monotonic(), 0)
+                if hedge_delay is not None:
+                    hedge_in = max(started + hedge_delay - time.monotonic(), 0)
+                    timeout = hedge_in if timeout is None else min(timeout, hedge_in)
+                done, _ = await asyncio.wait(attempts, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    if deadline is not None and time.monotonic() >= deadline:
+                        raise self._deadline_error()
+                    hedge_delay = None
+                    attempts.add(asyncio.ensure_future(start(True)))
+                    metrics.inc("llm_hedged_requests_total")
+                    continue
+                attempts -= done
+                succeeded = [attempt for attempt in done if attempt.exception() is None]
+                if not succeeded:
+                    error = next(iter(done)).exception()
+                    continue
+                winner, *others = succeeded
+                for other in others:
+                    if discard is not None:
+                        await discard(other.result())
+                if winner is not primary:
+                    metrics.inc("llm_hedge_wins_total")
+                if latencies is not None:
+                    latencies.add(time.monotonic() - started)
+                return winner.result()
+            assert error is not None
+            raise error
+        finally:
+            for attempt in attempts:
+                attempt.cancel()
+            if attempts:
+                await asyncio.gather(*attempts, return_exceptions=True)
+
+    # -- BaseChatModel -------------------------------------------------------
+
+    async def _agenerate(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: AsyncCallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        if self.streaming:
+            return await super()._agenerate(messages, stop, run_manager, **kwargs)
+        metadata = _call_metadata(run_manager)
+        async with self._admit(metadata):
+            deadline, model = self._plan(metadata)
+
+            async def generate(duplicate: bool) -> ChatResult:
+                async with self._admit(metadata) if duplicate else nullcontext():
+                    return await ChatOpenAI._agenerate(model, messages, stop, None, **kwargs)
+
+            return await self._race(generate, deadline, self._generate_latencies if model is self else None)
+
+    async def _agenerate_with_cache(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: AsyncCallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        token = _run_metadata.set(run_manager.metadata if run_manager is not None else None)
+        try:
+            return await super()._agenerate_with_cache(messages, stop, run_manager, **kwargs)
+        finally:
+            _run_metadata.reset(token)
+
+    async def astream(
+        self,
+        input: LanguageModelInput,
+        config: RunnableConfig | None = None,
+        *,
+        stop: list[str] | None = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[AIMessageChunk]:
+        stream = super().astream(input, config, stop=stop, **kwargs)
+        # _astream reads the metadata before its first chunk; the variable is reset in the same step.
+        token = _run_metadata.set(ensure_config(config).get("metadata") or {})
+        try:
+            chunk = await anext(stream, None)
+        finally:
+            _run_metadata.reset(token)
+        try:
+            while chunk is not None:
+                yield chunk
+                chunk = await anext(stream, None)
+        finally:
+            await stream.aclose()  # type: ignore[attr-defined]
+
+    async def _astream(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: AsyncCallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        metadata = _call_metadata(run_manager)
+        async with self._admit(metadata):
+            deadline, model = self._plan(metadata)
+
+            async def first_chunk(duplicate: bool) -> tuple[AsyncIterator[ChatGenerationChunk], ChatGenerationChunk | None, AsyncExitStack]:
+                # Closes the stream and releases the duplicate's slot once the attempt is done.
+                stack = AsyncExitStack()
+                try:
+                    if duplicate:
+                        await stack.enter_async_context(self._admit(metadata))
+                    # Tokens are forwarded to the callbacks below, only for the winning attempt.
+                    stream = ChatOpenAI._astream(model, messages, stop, None, **kwargs)
+                    stack.push_async_callback(stream.aclose)  # type: ignore[attr-defined]
+                    return stream, await anext(stream, None), stack
+                except BaseException:
+                    await stack.aclose()
+                    raise
+
+            async def close(result: tuple[AsyncIterator[ChatGenerationChunk], ChatGenerationChunk | None, AsyncExitStack]) -> None:
+                await result[2].aclose()
+
+            stream, chunk, stack = await self._race(first_chunk, deadline, self._stream_latencies if model is self else None, discard=close)
+            try:
+                while chunk is not None:
+                    if run_manager is not None:
+                        await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+                    yield chunk
+                    try:
+                        timeout = None if deadline is None else max(deadline - time.monotonic(), 0)
+                        chunk = await asyncio.wait_for(anext(stream, None), timeout=timeout)
+                    except TimeoutError:
+                        raise self._deadline_error()
+            finally:
+                await stack.aclose()
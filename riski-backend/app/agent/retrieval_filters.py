@@ -0,0 +1,62 @@
+"""Structured filters of ``retrieve_documents`` pushed into the vector search.
+
+The model can narrow a search by date, paper type, originator organization
+and Stadtbezirk.  ``vectorstore_filter`` translates these arguments into a
+``PGVectorStore`` filter on the filter columns of the ``file_retrieval``
+view (see ``FileCard`` in riski-core), so they become ``WHERE`` conditions
+of the same statement that ranks by vector distance:
+
+* ``date_from`` / ``date_to`` – range on ``date`` (B-tree index),
+* ``paper_types`` – ``paper_types LIKE '%|<type>|%'``,
+* ``originators`` / ``districts`` – case-insensitive substring match on
+  ``originators`` / ``keywords``.
+
+The substring filters are served by trigram indexes.  Several values of one
+filter are combined with OR, different filters with AND.
+"""
+
+from datetime import date, datetime, time
+from typing import Any
+
+from core.model.data_models import PaperTypeEnum
+
+RETRIEVAL_FILTERS_CONFIG_KEY = "retrieval_filters"
+
+
+def _like_escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _any_of(column: str, operator: str, patterns: list[str]) -> dict[str, Any]:
+    clauses = [{column: {operator: pattern}} for pattern in patterns]
+    return clauses[0] if len(clauses) == 1 else {"$or": clauses}
+
+
+def vectorstore_filter(
+    date_from: date | None = None,
+    date_to: date | None = None,
+    paper_types: list[PaperTypeEnum] | None = None,
+    originators: list[str] | None = None,
+    districts: list[str] | None = None,
+) -> dict[str, Any] | None:
+    """Return the ``PGVectorStore`` filter for the given tool arguments.
+
+    Returns
+    -------
+    dict | None
+        The filter, or ``None`` if no argument restricts the search.
+    """
+    conditions: list[dict[str, Any]] = []
+    if date_from is not None:
+        conditions.append({"date": {"$gte": datetime.combine(date_from, time.min)}})
+    if date_to is not None:
+        conditions.append({"date": {"$lte": datetime.combine(date_to, time.max)}})
+    if paper_types:
+        conditions.append(_any_of("paper_types", "$like", [f"%|{_like_escape(PaperTypeEnum(t).value)}|%" for t in paper_types]))
+    for column, values in (("originators", originators), ("keywords", districts)):
+        patterns = [f"%{_like_escape(value.strip())}%" for value in values or [] if value.strip()]
+        if patterns:
+            conditions.append(_any_of(column, "$ilike", patterns))
+    if not conditions:
+        return None
+    return conditions[0] if len(conditions) == 1 else {"$and": conditions}
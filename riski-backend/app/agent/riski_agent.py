@@ -1,9 +1,13 @@
 import asyncio
 import json
+import time
+import uuid
 from logging import Logger
-from typing import Any, Iterable
+from typing import Any, Iterable, Literal
 
+from app.core.metrics import metrics
 from app.utils.logging import getLogger
+from langchain_core.callbacks.manager import adispatch_custom_event
 from langchain_core.messages import AIMessage, AnyMessage, HumanMessage, SystemMessage, ToolMessage
 from langchain_core.runnables import RunnableConfig
 from langchain_openai import ChatOpenAI
@@ -13,7 +17,16 @@ from langgraph.prebuilt import ToolNode
 from langgraph.types import Send
 from openai import APITimeoutError, BadRequestError
 
+from .answer_cache import CachedAnswer, get_answer_cache
+from .coalescing import coalesce
+from .content_store import get_content_store, resolve_document_text
+from .prompt_manager import PromptManager, agent_capabilities_text
+from .relevance_cache import RelevanceVerdictCache
+from .reranker import RelevanceScorer
+from .snippets import estimate_tokens, select_snippet
+from .speculative_retrieval import SpeculativeRetrieval, get_speculative_retrieval
 from .state import (
+    DocumentBatchCheckInput,
     DocumentCheckInput,
     ErrorInfo,
     RelevanceUpdate,
@@ -22,14 +35,19 @@ from .state import (
     TrackedDocument,
     TrackedProposal,
 )
+from .structured_stream import astream_structured_output
 from .tools import (
     get_agent_capabilities,
+    retrieve_documents,
+    reuse_previous_documents,
 )
 from .types import (
-    AGENT_CAPABILITIES_PROMPT,
     CHECK_DOCUMENT_PROMPT_TEMPLATE,
     CHECK_DOCUMENT_SYSTEM_PROMPT,
+    CHECK_DOCUMENTS_BATCH_ENTRY_TEMPLATE,
+    FOLLOWUP_DOCUMENTS_PROMPT_TEMPLATE,
     SYSTEM_PROMPT,
+    DocumentRelevanceBatchVerdict,
     DocumentRelevanceVerdict,
     StructuredAgentResponse,
     SuggestionsResponse,
@@ -66,17 +84,125 @@ NODE_MODEL = "model"
 NODE_TOOLS = "tools"
 NODE_GUARD = "guard"
 NODE_CHECK_DOCUMENT = "check_document"
+NODE_CHECK_DOCUMENTS_BATCH = "check_documents_batch"
+NODE_CHECK_DOCUMENTS_EARLY_EXIT = "check_documents_early_exit"
 NODE_COLLECT_RESULTS = "collect_results"
 
 
+RelevanceCheckMode = Literal["per_document", "batched", "early_exit"]
+UnfinishedCheckPolicy = Literal["accept", "reject"]
+
+
+def _check_snippet_tokens(doc: TrackedDocument, snippet_size: int, snippet_max_tokens: int) -> int:
+    """Estimate the tokens of the snippet a relevance check sends for *doc*.
+
+    The check sends ``select_snippet(full_text, query, snippet_max_tokens)[:snippet_size]``
+    of the full text, which may be longer than the snippet carried in state.
+    """
+    full_tokens = doc.content_tokens if doc.content_tokens is not None else estimate_tokens(doc.page_content)
+    return min(full_tokens, snippet_max_tokens, estimate_tokens("x" * snippet_size))
+
+
+def _group_documents_by_budget(
+    docs: list[TrackedDocument], max_tokens: int, snippet_size: int, snippet_max_tokens: int
+) -> list[list[TrackedDocument]]:
+    """Split *docs* into groups whose relevance-check snippets fit into *max_tokens*.
+
+    Document order is preserved.  A document whose snippet alone exceeds the
+    budget forms its own group.
+    """
+    groups: list[list[TrackedDocument]] = []
+    current: list[TrackedDocument] = []
+    current_tokens = 0
+    for doc in docs:
+        doc_tokens = _check_snippet_tokens(doc, snippet_size, snippet_max_tokens)
+        if current and current_tokens + doc_tokens > max_tokens:
+            groups.append(current)
+            current, current_tokens = [], 0
+        current.append(doc)
+        current_tokens += doc_tokens
+    if current:
+        groups.append(current)
+    return groups
+
+
 def _extract_user_query(messages: list[AnyMessage]) -> str:
-    """Return the content of the first HumanMessage in *messages*, or an empty string."""
-    for msg in messages:
+    """Return the content of the last HumanMessage in *messages*, i.e. the question of the current turn, or an empty string."""
+    for msg in reversed(messages):
         if isinstance(msg, HumanMessage):
             return msg.content if isinstance(msg.content, str) else str(msg.content)
     return ""
 
 
+def _current_turn(messages: list[AnyMessage]) -> list[AnyMessage]:
+    """Return the messages after the last HumanMessage, i.e. those of the current turn."""
+    for i in range(len(messages) - 1, -1, -1):
+        if isinstance(messages[i], HumanMessage):
+            return messages[i + 1 :]
+    return messages
+
+
+def _start_speculative_retrieval(messages: list[AnyMessage], config: RunnableConfig | None) -> SpeculativeRetrieval | None:
+    """Start a speculative vector search for a new user question, if enabled for the request."""
+    speculation = get_speculative_retrieval(config)
+    configurable = (config or {}).get("configurable") or {}
+    vectorstore = configurable.get("vectorstore")
+    if speculation is None or vectorstore is None or not messages or not isinstance(messages[-1], HumanMessage):
+        return None
+    query = messages[-1].content if isinstance(messages[-1].content, str) else str(messages[-1].content)
+    if not query.strip():
+        return None
+    speculation.start(query, vectorstore, configurable.get("top_k_docs", 10))
+    return speculation
+
+
+def _is_first_question(messages: list[AnyMessage]) -> bool:
+    """Return True if *messages* holds exactly one HumanMessage, i.e. the first question of the thread."""
+    return sum(isinstance(msg, HumanMessage) for msg in messages) == 1
+
+
+async def _lookup_cached_answer(query: str, speculation: SpeculativeRetrieval | None, config: RunnableConfig | None) -> CachedAnswer | None:
+    """Look *query* up in the answer cache, reusing the embedding of the speculative search if one is running."""
+    answer_cache = get_answer_cache(config)
+    configurable = (config or {}).get("configurable") or {}
+    vectorstore = configurable.get("vectorstore")
+    if answer_cache is None or vectorstore is None or not query.strip():
+        return None
+
+    async def embed_query() -> list[float]:
+        embedding_task = speculation.query_embedding(query) if speculation is not None else None
+        if embedding_task is not None:
+            # Shielded: a cache miss must not cancel the embedding the speculative search is waiting for
+            return await asyncio.shield(embedding_task)
+        return await vectorstore.embeddings.aembed_query(query)
+
+    try:
+        return await answer_cache.lookup(query, embed_query, configurable["db_sessionmaker"])
+    except Exception:
+        logger.warning("Answer cache lookup failed; answering normally.", exc_info=True)
+        return None
+
+
+async def _cached_answer_update(answer: CachedAnswer, user_query: str, config: RunnableConfig | None) -> RiskiAgentStateUpdate:
+    """Return the final state update for a cached answer and send its text to the client.
+
+    The cached documents are already checked, so the graph ends after ``call_model``.
+    """
+    message = AIMessage(content=answer.content, id=str(uuid.uuid4()))
+    try:
+        # No model streams this answer, so it is emitted as a whole
+        await adispatch_custom_event("manually_emit_message", {"message_id": message.id, "message": answer.content}, config=config)
+    except RuntimeError:
+        logger.debug("No run to emit the cached answer to; it is only part of the final state.")
+    return {
+        "messages": [message],
+        "tracked_documents": [TrackedDocument(**d) for d in answer.tracked_documents],
+        "tracked_proposals": [TrackedProposal(**p) for p in answer.tracked_proposals],
+        "user_query": user_query,
+        "initial_question": user_query,
+    }
+
+
 def _is_capabilities_answer(messages: list[AnyMessage]) -> bool:
     """Return True if the last AIMessage was generated in response to get_agent_capabilities."""
     # Walk backwards: skip the last AIMessage (the answer), then look for the
@@ -137,6 +263,7 @@ def _route_after_tools(state: RiskiAgentState) -> str:
 
     - ``has_error`` is set (e.g. timeout) → END immediately, preserving error_info.
     - ``get_agent_capabilities`` was called → back to model for final LLM answer.
+    - ``reuse_previous_documents`` was called → back to model for the generation pass.
     - Otherwise → guard as usual.
     """
     if state.has_error:
@@ -144,6 +271,9 @@ def _route_after_tools(state: RiskiAgentState) -> str:
     last_message = state["messages"][-1] if state["messages"] else None
     if isinstance(last_message, ToolMessage) and last_message.name == get_agent_capabilities.name:
         return NODE_MODEL
+    if isinstance(last_message, ToolMessage) and last_message.name == reuse_previous_documents.name and state.all_checked:
+        # Follow-up answered from the previous turn's documents – no retrieval, no guard
+        return NODE_MODEL
     return NODE_GUARD
 
 
@@ -156,6 +286,105 @@ def _assume_relevant(doc_id: str, reason: str) -> dict[str, list[RelevanceUpdate
     return {"tracked_documents": [RelevanceUpdate(doc_id=doc_id, is_relevant=True, reason=reason)]}
 
 
+def _gate_by_distance(
+    docs: list[TrackedDocument],
+    auto_accept_max_distance: float | None,
+    auto_reject_min_distance: float | None,
+) -> list[RelevanceUpdate]:
+    """Decide clear-cut documents from their vector distance without an LLM call.
+
+    Documents whose ``metadata["distance"]`` is at most *auto_accept_max_distance*
+    are accepted, documents at or above *auto_reject_min_distance* are rejected.
+    Everything in between – and documents without a distance – is left for the
+    LLM relevance check.  Updates the ``relevance_*`` metrics.
+    """
+    updates: list[RelevanceUpdate] = []
+    for doc in docs:
+        distance = doc.metadata.get("distance")
+        if not isinstance(distance, (int, float)):
+            continue
+        if auto_accept_max_distance is not None and distance <= auto_accept_max_distance:
+            updates.append(
+                RelevanceUpdate(
+                    doc_id=doc.id, is_relevant=True, reason="Sehr hohe Ähnlichkeit zur Anfrage, ohne weitere Prüfung übernommen."
+                )
+            )
+            metrics.inc("relevance_auto_accepted_total")
+        elif auto_reject_min_distance is not None and distance >= auto_reject_min_distance:
+            updates.append(RelevanceUpdate(doc_id=doc.id, is_relevant=False, reason="Zu geringe Ähnlichkeit zur Anfrage."))
+            metrics.inc("relevance_auto_rejected_total")
+
+    metrics.inc("relevance_documents_total", len(docs))
+    _update_auto_decided_ratio()
+    return updates
+
+
+def _update_auto_decided_ratio() -> None:
+    """Recompute the share of documents decided without an LLM relevance check."""
+    total = metrics.counter("relevance_documents_total")
+    if total:
+        auto_decided = metrics.counter("relevance_auto_accepted_total") + metrics.counter("relevance_auto_rejected_total")
+        metrics.set_gauge("relevance_auto_decided_ratio", auto_decided / total)
+
+
+async def _with_full_texts(docs: list[TrackedDocument], config: RunnableConfig | None) -> list[TrackedDocument]:
+    """Return copies of *docs* whose ``page_content`` is the full text from the request's content store.
+
+    Documents whose text is not available keep their snippet.
+    """
+    store = get_content_store(config)
+    if store is None or not docs:
+        return docs
+    texts = await store.aget_many([doc.id for doc in docs if doc.id])
+    return [doc.model_copy(update={"page_content": texts[doc.id]}) if texts.get(doc.id) else doc for doc in docs]
+
+
+async def _gate_by_scorer(
+    scorer: RelevanceScorer,
+    user_query: str,
+    docs: list[TrackedDocument],
+    accept_threshold: float,
+    reject_threshold: float,
+    snippet_size: int,
+    snippet_max_tokens: int,
+) -> list[RelevanceUpdate]:
+    """Decide documents with a local relevance scorer (e.g. a cross-encoder).
+
+    All *docs* are scored in one call.  Scores at or above *accept_threshold*
+    are accepted, scores at or below *reject_threshold* are rejected; the
+    borderline documents are left for the LLM relevance check.  A failing
+    scorer decides nothing, so the LLM check acts as the fallback.
+    """
+    if not docs:
+        return []
+
+    started = time.perf_counter()
+    try:
+        passages = [select_snippet(doc.page_content, user_query, snippet_max_tokens)[:snippet_size] for doc in docs]
+        scores = await scorer.ascore(user_query, passages)
+    except Exception:
+        logger.warning("Guard: relevance scorer failed, falling back to LLM checks for all documents.", exc_info=True)
+        return []
+    metrics.set_gauge("relevance_scorer_last_seconds", time.perf_counter() - started)
+
+    updates: list[RelevanceUpdate] = []
+    for doc, score in zip(docs, scores):
+        if score >= accept_threshold:
+            updates.append(
+                RelevanceUpdate(doc_id=doc.id, is_relevant=True, reason=f"Vom Re-Ranker als relevant bewertet (Score {score:.2f}).")
+            )
+            metrics.inc("relevance_auto_accepted_total")
+        elif score <= reject_threshold:
+            updates.append(
+                RelevanceUpdate(doc_id=doc.id, is_relevant=False, reason=f"Vom Re-Ranker als nicht relevant bewertet (Score {score:.2f}).")
+            )
+            metrics.inc("relevance_auto_rejected_total")
+
+    metrics.inc("relevance_scorer_decided_total", len(updates))
+    _update_auto_decided_ratio()
+    return updates
+
+
 def _coerce_verdict(verdict_raw: Any, doc_name: str, doc_id: str) -> DocumentRelevanceVerdict:
     """Normalise the raw LLM output to a ``DocumentRelevanceVerdict``.
 
@@ -191,7 +420,17 @@ def build_guard_nodes(
     relevance_check_model: ChatOpenAI,
     check_document_prompt_template: str | TextPromptClient = CHECK_DOCUMENT_PROMPT_TEMPLATE,
     snippet_size: int = 10_000,
+    snippet_max_tokens: int = 2_500,
     force_llm_timeout: bool = False,
+    relevance_cache: RelevanceVerdictCache | None = None,
+    check_mode: RelevanceCheckMode = "per_document",
+    batch_max_tokens: int = 12_000,
+    auto_accept_max_distance: float | None = None,
+    auto_reject_min_distance: float | None = None,
+    relevance_scorer: RelevanceScorer | None = None,
+    scorer_accept_threshold: float = 0.8,
+    scorer_reject_threshold: float = 0.2,
+    prompt_manager: PromptManager | None = None,
 ):
     """Build and return the three guard-related node functions + fan-out router.
 
@@ -201,16 +440,45 @@ def build_guard_nodes(
         The LLM to use for relevance checking and suggestion generation.
     check_document_prompt_template:
         Prompt template (str or Langfuse ``TextPromptClient``) for the
-        per-document relevance check.
+        per-document relevance check.  Ignored if *prompt_manager* is given.
     snippet_size:
-        Maximum number of characters from ``page_content`` to include in
-        the relevance-check prompt.  Defaults to 10 000 characters.
+        Hard cap on the number of characters from ``page_content`` in the
+        relevance-check prompt.  Defaults to 10 000 characters.
+    snippet_max_tokens:
+        Token budget of the query-focused snippet (see ``snippets.py``) that
+        replaces the full ``page_content`` in the relevance check.
+    relevance_cache:
+        Optional cache of relevance verdicts.  When given, ``check_document``
+        reuses earlier verdicts for the same query, document content and
+        prompt version instead of calling the LLM again.
+    check_mode:
+        ``"per_document"`` sends one ``check_document`` branch per document.
+        ``"batched"`` groups documents into ``check_documents_batch``
+        branches that each make a single LLM call.  ``"early_exit"`` sends
+        all documents to ``check_documents_early_exit`` (see
+        ``build_early_exit_check_node``).
+    batch_max_tokens:
+        Estimated token budget for the document snippets of one batched call.
+    auto_accept_max_distance / auto_reject_min_distance:
+        Optional vector-distance thresholds.  The guard accepts or rejects
+        documents outside the ambiguous band directly; only the rest is sent
+        to the LLM relevance check.  ``None`` disables the respective side.
+    relevance_scorer:
+        Optional local scorer (e.g. ``CrossEncoderScorer``) that scores all
+        documents left after distance gating in one pass.  Documents scoring
+        at or above *scorer_accept_threshold* are accepted, at or below
+        *scorer_reject_threshold* rejected; only borderline documents go to
+        the LLM relevance check.
+    prompt_manager:
+        Source of the current check-document prompt and agent capabilities,
+        read on every call so refreshed prompts apply without rebuilding.
 
     Returns
     -------
     tuple of (guard, fan_out_checks, check_document, collect_results)
         Ready to be wired into the main ``StateGraph``.
     """
+    prompts: PromptManager = prompt_manager or PromptManager.static(check_document_prompt_template=check_document_prompt_template)
 
     # ----- LLM-based suggestion generator -----------------------------------
     async def _generate_suggestions(user_query: str, config: RunnableConfig) -> list[str]:
@@ -223,7 +491,7 @@ def build_guard_nodes(
         Returns an empty list on any failure so callers never have to handle errors.
         """
         try:
-            capabilities_text: str = config.get("configurable", {}).get("agent_capabilities", AGENT_CAPABILITIES_PROMPT)
+            capabilities_text: str = agent_capabilities_text(config)
             suggestion_model = chat_model.with_structured_output(SuggestionsResponse)
             response = await suggestion_model.ainvoke(
                 [
@@ -263,15 +531,19 @@ def build_guard_nodes(
         1. Handles the edge case where no tool was called.
         2. Handles the edge case where the tool returned zero documents.
         3. Ensures ``user_query`` / ``initial_question`` are set.
+        4. Decides clearly relevant / irrelevant documents by vector distance
+           and, if configured, by the local relevance scorer.
         """
         messages = state["messages"]
-        has_any_tool_call = any(isinstance(m, ToolMessage) for m in messages)
+        # Only the current turn: earlier turns of the thread have their own tool calls
+        turn_messages = _current_turn(messages)
+        has_any_tool_call = any(isinstance(m, ToolMessage) for m in turn_messages)
 
         # If the only tool called was get_agent_capabilities, the answer was
         # already generated – guard should never be reached in this case, but
         # defend against it here to avoid a false no_tool_call error.
         if has_any_tool_call and all(
-            isinstance(m, ToolMessage) and m.name == get_agent_capabilities.name for m in messages if isinstance(m, ToolMessage)
+            isinstance(m, ToolMessage) and m.name == get_agent_capabilities.name for m in turn_messages if isinstance(m, ToolMessage)
         ):
             logger.warning("Guard reached after get_agent_capabilities – this should not happen. Skipping.")
             return {}
@@ -301,21 +573,66 @@ def build_guard_nodes(
                 ),
             }
 
-        return {
+        result: dict[str, Any] = {
             "user_query": user_query,
             "initial_question": user_query,
         }
+        gated = _gate_by_distance(state.tracked_documents, auto_accept_max_distance, auto_reject_min_distance)
+        if relevance_scorer is not None:
+            gated_ids = {u.doc_id for u in gated}
+            gated += await _gate_by_scorer(
+                relevance_scorer,
+                user_query,
+                await _with_full_texts([doc for doc in state.tracked_documents if doc.id not in gated_ids], config),
+                scorer_accept_threshold,
+                scorer_reject_threshold,
+                snippet_size,
+                snippet_max_tokens,
+            )
+        if gated:
+            logger.info("Guard: %d/%d documents decided without LLM check.", len(gated), len(state.tracked_documents))
+            result["tracked_documents"] = gated
+        return result
 
-    # ----- fan-out conditional edge (Send per document) -----
+    # ----- fan-out conditional edge (Send per document or per batch) -----
     def fan_out_checks(state: RiskiAgentState) -> list[Send]:
         """Create a ``Send`` per tracked document for parallel relevance checking.
 
-        If the guard already set error_info (no docs / no tool call),
-        skip the fan-out and go straight to collect_results.
+        In ``batched`` mode one ``Send`` is created per group of documents
+        that fits into ``batch_max_tokens``.  Documents the guard already
+        decided by vector distance are skipped.
+
+        If the guard already set error_info (no docs / no tool call), or no
+        document is left to check, go straight to collect_results.
         """
-        if state.has_error:
+        unchecked = [doc for doc in state.tracked_documents if not doc.is_checked]
+        if state.has_error or not unchecked:
             return [Send(NODE_COLLECT_RESULTS, state)]
 
+        if check_mode == "early_exit":
+            return [
+                Send(
+                    NODE_CHECK_DOCUMENTS_EARLY_EXIT,
+                    DocumentBatchCheckInput(
+                        docs=[doc.model_dump() for doc in unchecked],
+                        user_query=state["user_query"],
+                        already_relevant=sum(1 for doc in state.tracked_documents if doc.is_checked and doc.is_relevant),
+                    ),
+                )
+            ]
+
+        if check_mode == "batched":
+            return [
+                Send(
+                    NODE_CHECK_DOCUMENTS_BATCH,
+                    DocumentBatchCheckInput(
+                        docs=[doc.model_dump() for doc in group],
+                        user_query=state["user_query"],
+                    ),
+                )
+                for group in _group_documents_by_budget(unchecked, batch_max_tokens, snippet_size, snippet_max_tokens)
+            ]
+
         return [
             Send(
                 NODE_CHECK_DOCUMENT,
@@ -325,13 +642,16 @@ def build_guard_nodes(
                     user_query=state["user_query"],
                 ),
             )
-            for i, doc in enumerate(state.tracked_documents)
+            for i, doc in enumerate(unchecked)
         ]
 
     # ----- check_document node (runs once per document via Send) -----
-    async def check_document(state: DocumentCheckInput) -> dict[str, list[RelevanceUpdate]]:
+    async def check_document(state: DocumentCheckInput, config: RunnableConfig | None = None) -> dict[str, list[RelevanceUpdate]]:
         """Check a single document for relevance using the LLM.
 
+        The full document text is fetched from the request's content store;
+        without one, the ``page_content`` carried in *state* is used.
+
         Returns a ``RelevanceUpdate`` which the custom reducer on
         ``tracked_documents`` will merge back into the main list.
         """
@@ -355,9 +675,12 @@ def build_guard_nodes(
         metadata: dict = doc.get("metadata", {}) if isinstance(doc, dict) else {}
         doc_name: str = metadata.get("name", metadata.get("title", doc_id or "Dokument"))
         page_content: str = doc.get("page_content", "") if isinstance(doc, dict) else ""
-        snippet: str = page_content[:snippet_size]
+        page_content = await resolve_document_text(doc_id, page_content, config)
+        snippet: str = select_snippet(page_content, user_query, snippet_max_tokens)[:snippet_size]
 
         # --- Phase 2: build the relevance-check prompt -----------------------
+        prompt_set = prompts.current
+        check_document_prompt_template = prompt_set.check_document
         try:
             if isinstance(check_document_prompt_template, TextPromptClient):
                 check_prompt: str = check_document_prompt_template.compile(
@@ -394,19 +717,38 @@ def build_guard_nodes(
             )
             return _assume_relevant(doc_id, "Prompt-Kompilierung fehlgeschlagen, Dokument wird beibehalten.")
 
-        # --- Phase 3: LLM relevance check ------------------------------------
+        # --- Phase 3: LLM relevance check (skipped on a cache hit) -----------
+        cache_key: str | None = None
+        if relevance_cache is not None:
+            cache_key = relevance_cache.make_key(user_query, doc_id, page_content, prompt_set.check_document_version)
+            cached_verdict = await relevance_cache.aget(cache_key)
+            if cached_verdict is not None:
+                logger.debug("check_document: cache hit for '%s' (id=%s).", doc_name, doc_id)
+                return {
+                    "tracked_documents": [RelevanceUpdate(doc_id=doc_id, is_relevant=cached_verdict.relevant, reason=cached_verdict.reason)]
+                }
+
         relevance_model = relevance_check_model.with_structured_output(DocumentRelevanceVerdict)
         try:
             if force_llm_timeout:
                 raise APITimeoutError.__new__(APITimeoutError)
-            verdict_raw = await relevance_model.ainvoke(
-                [
-                    SystemMessage(content=CHECK_DOCUMENT_SYSTEM_PROMPT),
-                    HumanMessage(content=check_prompt),
-                ]
+            # Identical checks of concurrent requests (same query, document text and prompt) share one LLM call
+            verdict_key = cache_key or RelevanceVerdictCache.make_key(user_query, doc_id, page_content, prompt_set.check_document_version)
+            verdict_raw = await coalesce(
+                config,
+                ("relevance_verdict", verdict_key),
+                lambda: relevance_model.ainvoke(
+                    [
+                        SystemMessage(content=CHECK_DOCUMENT_SYSTEM_PROMPT),
+                        HumanMessage(content=check_prompt),
+                    ]
+                ),
             )
             verdict = _coerce_verdict(verdict_raw, doc_name, doc_id)
-        except APITimeoutError:
+            # Only cache real model verdicts, never the "assume relevant" fallback.
+            if relevance_cache is not None and cache_key is not None and isinstance(verdict_raw, (DocumentRelevanceVerdict, dict)):
+                await relevance_cache.aset(cache_key, verdict)
+        except (APITimeoutError, asyncio.TimeoutError):
             logger.error(
                 "check_document: LLM relevance check timed out for doc '%s' (id=%s). Assuming relevant.",
                 doc_name,
@@ -480,6 +822,244 @@ def build_guard_nodes(
     return guard, fan_out_checks, check_document, collect_results
 
 
+def build_batch_check_node(
+    relevance_check_model: ChatOpenAI,
+    check_document,
+    snippet_size: int = 10_000,
+    snippet_max_tokens: int = 2_500,
+    force_llm_timeout: bool = False,
+    relevance_cache: RelevanceVerdictCache | None = None,
+    prompt_manager: PromptManager | None = None,
+):
+    """Build the ``check_documents_batch`` node used in ``batched`` check mode.
+
+    The node judges a group of documents with a single structured-output
+    call returning one verdict per document.  Documents the model did not
+    return a verdict for – or all documents, if the call fails – are checked
+    individually with *check_document* as a fallback.
+
+    Parameters
+    ----------
+    relevance_check_model:
+        The LLM to use for the batched relevance check.
+    check_document:
+        The per-document ``check_document`` node from ``build_guard_nodes``.
+    snippet_size:
+        Hard cap on the number of characters of ``page_content`` per document.
+    snippet_max_tokens:
+        Token budget of the query-focused snippet per document.
+    relevance_cache:
+        Optional verdict cache, shared with ``check_document``.
+    prompt_manager:
+        Source of the batch prompt (``PromptSet.check_documents_batch``), read
+        on every call; without one the local template is used.
+    """
+    prompts: PromptManager = prompt_manager or PromptManager.static()
+
+    async def _fallback_checks(docs: list[dict[str, Any]], user_query: str, config: RunnableConfig | None) -> list[RelevanceUpdate]:
+        """Run the per-document check for *docs*, bounded by the run's ``max_concurrency``."""
+        semaphore = asyncio.Semaphore((config or {}).get("max_concurrency") or 1)
+
+        async def _check(index: int, doc: dict[str, Any]) -> list[RelevanceUpdate]:
+            async with semaphore:
+                result = await check_document(DocumentCheckInput(doc_index=index, doc=doc, user_query=user_query), config)
+            return result["tracked_documents"]
+
+        results = await asyncio.gather(*(_check(i, doc) for i, doc in enumerate(docs)))
+        return [update for updates in results for update in updates]
+
+    async def check_documents_batch(
+        state: DocumentBatchCheckInput, config: RunnableConfig | None = None
+    ) -> dict[str, list[RelevanceUpdate]]:
+        """Check several documents for relevance with one LLM call.
+
+        Returns one ``RelevanceUpdate`` per document, which the custom reducer
+        on ``tracked_documents`` merges back into the main list.
+        """
+        docs: list[dict[str, Any]] = [d for d in state.get("docs", []) if isinstance(d, dict)]
+        user_query: str = state.get("user_query", "")
+        if not docs:
+            return {"tracked_documents": []}
+        prompt_set = prompts.current
+
+        store = get_content_store(config)
+        if store is not None:
+            texts = await store.aget_many([str(d.get("id", "")) for d in docs])
+            docs = [{**d, "page_content": texts.get(str(d.get("id", ""))) or d.get("page_content", "")} for d in docs]
+
+        updates: list[RelevanceUpdate] = []
+        pending: dict[str, dict[str, Any]] = {}
+        cache_keys: dict[str, str] = {}
+
+        # --- Cache lookup ------------------------------------------------------
+        for doc in docs:
+            doc_id = str(doc.get("id", ""))
+            if relevance_cache is not None:
+                cache_keys[doc_id] = relevance_cache.make_key(
+                    user_query, doc_id, doc.get("page_content", ""), prompt_set.check_documents_batch_version
+                )
+                cached_verdict = await relevance_cache.aget(cache_keys[doc_id])
+                if cached_verdict is not None:
+                    updates.append(RelevanceUpdate(doc_id=doc_id, is_relevant=cached_verdict.relevant, reason=cached_verdict.reason))
+                    continue
+            pending[doc_id] = doc
+
+        if not pending:
+            return {"tracked_documents": updates}
+
+        # --- Batched LLM relevance check ---------------------------------------
+        entries = []
+        for doc_id, doc in pending.items():
+            metadata: dict = doc.get("metadata", {}) or {}
+            entries.append(
+                CHECK_DOCUMENTS_BATCH_ENTRY_TEMPLATE.format(
+                    doc_id=doc_id,
+                    doc_name=metadata.get("name", metadata.get("title", doc_id or "Dokument")),
+                    snippet=select_snippet(str(doc.get("page_content", "")), user_query, snippet_max_tokens)[:snippet_size],
+                )
+            )
+        batch_template = prompt_set.check_documents_batch
+        relevance_model = relevance_check_model.with_structured_output(DocumentRelevanceBatchVerdict)
+        try:
+            if isinstance(batch_template, TextPromptClient):
+                batch_prompt = batch_template.compile(user_query=user_query, documents="\n".join(entries))
+            else:
+                batch_prompt = batch_template.format(user_query=user_query, documents="\n".join(entries))
+            if force_llm_timeout:
+                raise APITimeoutError.__new__(APITimeoutError)
+            response = await relevance_model.ainvoke(
+                [
+                    SystemMessage(content=CHECK_DOCUMENT_SYSTEM_PROMPT),
+                    HumanMessage(content=batch_prompt),
+                ]
+            )
+            if isinstance(response, dict):
+                response = DocumentRelevanceBatchVerdict.model_validate(response)
+            if not isinstance(response, DocumentRelevanceBatchVerdict):
+                raise TypeError(f"Unexpected batch verdict type {type(response).__name__}")
+        except Exception:
+            logger.warning(
+                "check_documents_batch: batched relevance check failed for %d documents, falling back to per-document checks.",
+                len(pending),
+                exc_info=True,
+            )
+            return {"tracked_documents": updates + await _fallback_checks(list(pending.values()), user_query, config)}
+
+        for item in response.verdicts:
+            if item.doc_id not in pending:
+                continue
+            pending.pop(item.doc_id)
+            verdict = DocumentRelevanceVerdict(relevant=item.relevant, reason=item.reason)
+            if relevance_cache is not None:
+                await relevance_cache.aset(cache_keys[item.doc_id], verdict)
+            updates.append(RelevanceUpdate(doc_id=item.doc_id, is_relevant=verdict.relevant, reason=verdict.reason))
+
+        if pending:
+            logger.warning(
+                "check_documents_batch: no verdict for %d documents (%s), falling back to per-document checks.",
+                len(pending),
+                list(pending),
+            )
+            updates += await _fallback_checks(list(pending.values()), user_query, config)
+
+        logger.info("check_documents_batch: checked %d documents.", len(docs))
+        return {"tracked_documents": updates}
+
+    return check_documents_batch
+
+
+def build_early_exit_check_node(
+    check_document,
+    quorum: int | None = 3,
+    deadline_seconds: float | None = 10.0,
+    unfinished_policy: UnfinishedCheckPolicy = "accept",
+):
+    """Build the ``check_documents_early_exit`` node used in ``early_exit`` check mode.
+
+    The node runs the per-document checks itself, bounded by the run's
+    ``max_concurrency``, and stops waiting as soon as *quorum* documents are
+    relevant (documents the guard already accepted count as well) or
+    *deadline_seconds* have passed.  Checks still running at that point are
+    cancelled and their documents decided by *unfinished_policy*.
+
+    Parameters
+    ----------
+    check_document:
+        The per-document ``check_document`` node from ``build_guard_nodes``.
+    quorum:
+        Number of relevant documents after which generation may start;
+        ``None`` waits for all checks (up to the deadline).
+    deadline_seconds:
+        Latency budget of the relevance checks; ``None`` for no deadline.
+    unfinished_policy:
+        ``"accept"`` keeps documents whose check did not finish for the
+        generation, ``"reject"`` drops them.
+    """
+
+    async def check_documents_early_exit(
+        state: DocumentBatchCheckInput, config: RunnableConfig | None = None
+    ) -> dict[str, list[RelevanceUpdate]]:
+        """Check documents concurrently until the quorum is reached or the deadline expires."""
+        docs: list[dict[str, Any]] = [d for d in state.get("docs", []) if isinstance(d, dict)]
+        user_query: str = state.get("user_query", "")
+        needed = None if quorum is None else max(quorum - state.get("already_relevant", 0), 0)
+        semaphore = asyncio.Semaphore((config or {}).get("max_concurrency") or 1)
+
+        async def _check(index: int, doc: dict[str, Any]) -> list[RelevanceUpdate]:
+            async with semaphore:
+                result = await check_document(DocumentCheckInput(doc_index=index, doc=doc, user_query=user_query), config)
+            return result["tracked_documents"]
+
+        loop = asyncio.get_running_loop()
+        deadline = None if deadline_seconds is None else loop.time() + deadline_seconds
+        tasks = {asyncio.create_task(_check(i, doc)): doc for i, doc in enumerate(docs)}
+        pending = set(tasks)
+        updates: list[RelevanceUpdate] = []
+        relevant = 0
+        exit_reason: str | None = None
+        try:
+            while pending:
+                if needed is not None and relevant >= needed:
+                    exit_reason = "quorum"
+                    break
+                timeout = None if deadline is None else max(deadline - loop.time(), 0)
+                done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    exit_reason = "deadline"
+                    break
+                for task in done:
+                    result = task.result()
+                    updates += result
+                    relevant += sum(1 for update in result if update.is_relevant)
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+        if pending:
+            keep = unfinished_policy == "accept"
+            reason = (
+                "Relevanzprüfung nicht abgewartet, Dokument wird beibehalten."
+                if keep
+                else "Relevanzprüfung nicht abgewartet, Dokument wird nicht berücksichtigt."
+            )
+            updates += [RelevanceUpdate(doc_id=str(tasks[task].get("id", "")), is_relevant=keep, reason=reason) for task in pending]
+            metrics.inc(f"relevance_early_exit_{exit_reason}_total")
+            metrics.inc("relevance_unfinished_checks_total", len(pending))
+            logger.info(
+                "check_documents_early_exit: %s reached after %d/%d checks; %d unfinished checks %s.",
+                exit_reason,
+                len(docs) - len(pending),
+                len(docs),
+                len(pending),
+                "accepted" if keep else "rejected",
+            )
+        return {"tracked_documents": updates}
+
+    return check_documents_early_exit
+
+
 def _sanitize_messages(messages: list[AnyMessage]) -> list[AnyMessage]:
     """Remove any ToolMessages that are not preceded by an AIMessage with matching tool_calls.
 
@@ -526,15 +1106,43 @@ def build_riski_graph(
     system_prompt: str = SYSTEM_PROMPT,
     check_document_prompt_template: str | TextPromptClient = CHECK_DOCUMENT_PROMPT_TEMPLATE,
     snippet_size: int = 10_000,
+    snippet_max_tokens: int = 2_500,
+    generation_snippet_max_tokens: int | None = 3_000,
     force_llm_timeout: bool = False,
+    relevance_cache: RelevanceVerdictCache | None = None,
+    check_mode: RelevanceCheckMode = "per_document",
+    batch_max_tokens: int = 12_000,
+    auto_accept_max_distance: float | None = None,
+    auto_reject_min_distance: float | None = None,
+    relevance_scorer: RelevanceScorer | None = None,
+    scorer_accept_threshold: float = 0.8,
+    scorer_reject_threshold: float = 0.2,
+    early_exit_quorum: int | None = 3,
+    early_exit_deadline_seconds: float | None = 10.0,
+    early_exit_unfinished_policy: UnfinishedCheckPolicy = "accept",
+    prompt_manager: PromptManager | None = None,
+    reuse_followup_documents: bool = True,
 ) -> StateGraph:
-    """Build the RISKI agent graph with core nodes and guard pipeline."""
+    """Build the RISKI agent graph with core nodes and guard pipeline.
+
+    ``generation_snippet_max_tokens`` limits every relevant document in the
+    generation prompt to a query-focused snippet of that many tokens; ``None``
+    sends the full ``page_content``.  The ``early_exit_*`` parameters configure
+    the ``early_exit`` check mode (see ``build_early_exit_check_node``).
+    With a *prompt_manager* the system and check-document prompts are read
+    from it on every call (hot reload) and *system_prompt* /
+    *check_document_prompt_template* are ignored.
+    With *reuse_followup_documents* the first pass of a follow-up turn may
+    call ``reuse_previous_documents`` to answer from the relevant documents
+    of the previous turn without retrieval and relevance checks.
+    """
     tools = list(tools)
     model_with_tools = chat_model.bind_tools(tools)
-    system_message = SystemMessage(content=system_prompt)
+    model_with_followup_tools = chat_model.bind_tools([*tools, reuse_previous_documents]) if reuse_followup_documents else None
+    prompts: PromptManager = prompt_manager or PromptManager.static(system_prompt, check_document_prompt_template)
 
     # -- Node: call the model --
-    async def call_model(state: RiskiAgentState) -> RiskiAgentStateUpdate:
+    async def call_model(state: RiskiAgentState, config: RunnableConfig | None = None) -> RiskiAgentStateUpdate:
         """Invoke the LLM.
 
         When relevant documents are available in state (after the guard),
@@ -542,12 +1150,15 @@ def build_riski_graph(
         On the first call (no documents yet) the model decides which tool to call.
         """
         relevant_docs = state.relevant_documents
+        system_message = SystemMessage(content=prompts.system_prompt())
+        last_message = state["messages"][-1] if state["messages"] else None
+        # A new question; on follow-up turns the state still holds the previous turn's documents
+        new_question = isinstance(last_message, HumanMessage)
 
         # -- Capabilities pass: model was routed back after get_agent_capabilities --
         # With add_messages the full history is intact, so state["messages"] already
         # contains the correct [... HumanMessage, AIMessage(tool_calls), ToolMessage]
         # sequence that OpenAI expects.
-        last_message = state["messages"][-1] if state["messages"] else None
         if isinstance(last_message, ToolMessage) and last_message.name == get_agent_capabilities.name:
             # The capabilities ToolMessage is already in state["messages"] (added by run_tools via
             # add_messages).  _sanitize_messages ensures no orphan tool-call pairs exist before
@@ -571,7 +1182,7 @@ def build_riski_graph(
                     ),
                 }
             return {"messages": [response]}
-        if relevant_docs:
+        if relevant_docs and not new_question:
             # -- Generation pass: we have guard-filtered documents --
             # Build a clean prompt: keep only non-ToolMessages from history
             # (OpenAI rejects AIMessage(tool_calls) without a matching ToolMessage
@@ -580,8 +1191,16 @@ def build_riski_graph(
             synthetic_context = HumanMessage(
                 content="Nutze die folgenden gefilterten Dokumente und Vorschläge, um die Nutzerfrage zu beantworten."
             )
+            user_query = state.get("user_query", "") or state.get("initial_question", "")
+            documents = [
+                d.model_dump(mode="json", exclude={"is_checked", "is_relevant", "relevance_reason", "content_hash"})
+                for d in await _with_full_texts(relevant_docs, config)
+            ]
+            if generation_snippet_max_tokens is not None:
+                for document in documents:
+                    document["page_content"] = select_snippet(document["page_content"], user_query, generation_snippet_max_tokens)
             docs_payload = {
-                "documents": [d.model_dump(mode="json", exclude={"is_checked", "is_relevant", "relevance_reason"}) for d in relevant_docs],
+                "documents": documents,
                 "proposals": [p.model_dump(mode="json") for p in state.tracked_proposals],
             }
             docs_message = HumanMessage(content=json.dumps(docs_payload))
@@ -599,26 +1218,14 @@ def build_riski_graph(
             ]
 
             messages = [system_message, *base_messages, synthetic_context, docs_message]
-            structured_model = chat_model.with_structured_output(StructuredAgentResponse)
+            generated = False
             try:
                 if force_llm_timeout:
                     raise APITimeoutError.__new__(APITimeoutError)
-                response = await structured_model.ainvoke(messages)
-                try:
-                    if isinstance(response, StructuredAgentResponse):
-                        content = json.dumps(response.model_dump())
-                    elif isinstance(response, dict):
-                        content = json.dumps(response)
-                    elif isinstance(response, str):
-                        content = response
-                    else:
-                        content = json.dumps({"response": str(response)})
-                except (TypeError, ValueError):
-                    logger.warning(
-                        "Structured generation parse failed, returning raw response.",
-                        exc_info=True,
-                    )
-                    content = str(response)
+                # Streamed, so the answer text reaches the client token by token.
+                response = await astream_structured_output(chat_model, StructuredAgentResponse, messages)
+                content = json.dumps(response.model_dump())
+                generated = True
             except APITimeoutError:
                 logger.warning("call_model: structured generation timed out.")
                 return {
@@ -639,18 +1246,67 @@ def build_riski_graph(
                     }
                 )
 
+            answer_cache = get_answer_cache(config)
+            if answer_cache is not None and generated and _is_first_question(state["messages"]):
+                configurable = (config or {}).get("configurable") or {}
+                vectorstore = configurable["vectorstore"]
+                answer_cache.store_in_background(
+                    user_query,
+                    content,
+                    [d.model_dump(mode="json", exclude={"page_content"}) for d in state.tracked_documents],
+                    [p.model_dump(mode="json") for p in state.tracked_proposals],
+                    lambda: vectorstore.embeddings.aembed_query(user_query),
+                    configurable["db_sessionmaker"],
+                )
+
             ai_msg = AIMessage(content=content)
             return {"messages": [ai_msg]}
 
         # -- First pass: extract user query and let the model decide which tool(s) to call --
-        user_query = state.get("user_query", "") or state.get("initial_question", "") or _extract_user_query(state["messages"])
+        if new_question:
+            user_query = _extract_user_query(state["messages"])
+        else:
+            user_query = state.get("user_query", "") or state.get("initial_question", "") or _extract_user_query(state["messages"])
+        followup = new_question and not _is_first_question(state["messages"])
+
+        # -- Follow-up: offer to answer from the previous turn's checked documents --
+        model = model_with_tools
+        context_messages: list[AnyMessage] = []
+        if followup and model_with_followup_tools is not None and relevant_docs and state.all_checked:
+            model = model_with_followup_tools
+            context_messages.append(
+                SystemMessage(
+                    content=FOLLOWUP_DOCUMENTS_PROMPT_TEMPLATE.format(
+                        documents="\n".join(f"- {doc.metadata.get('name') or doc.id}" for doc in relevant_docs)
+                    )
+                )
+            )
 
-        messages = [system_message, *_sanitize_messages(state["messages"])]
+        messages = [system_message, *context_messages, *_sanitize_messages(state["messages"])]
+        speculation = _start_speculative_retrieval(state["messages"], config)
+        # -- Answer cache: looked up while the first model call is already running --
+        model_call: asyncio.Task[AIMessage] | None = None
+        if get_answer_cache(config) is not None and not force_llm_timeout and _is_first_question(state["messages"]):
+            model_call = asyncio.create_task(model_with_tools.ainvoke(messages))
+            try:
+                cached_answer = await _lookup_cached_answer(user_query, speculation, config)
+            except BaseException:
+                model_call.cancel()
+                raise
+            if cached_answer is not None:
+                model_call.cancel()
+                if speculation is not None:
+                    speculation.discard()
+                return await _cached_answer_update(cached_answer, user_query, config)
         try:
             if force_llm_timeout:
                 raise APITimeoutError.__new__(APITimeoutError)
-            response = await model_with_tools.ainvoke(messages)
+            response = await (model_call if model_call is not None else model.ainvoke(messages))
+            if speculation is not None and not any(call["name"] == retrieve_documents.name for call in response.tool_calls):
+                speculation.discard()
         except APITimeoutError:
+            if speculation is not None:
+                speculation.discard()
             logger.warning("call_model: first-pass LLM call timed out.")
             return {
                 "error_info": ErrorInfo(
@@ -659,6 +1315,8 @@ def build_riski_graph(
                 )
             }
         except BadRequestError as e:
+            if speculation is not None:
+                speculation.discard()
             if _is_content_filter_error(e):
                 logger.warning("Content policy violation for user query.", exc_info=True)
                 return {
@@ -676,10 +1334,19 @@ def build_riski_graph(
         if user_query:
             result["user_query"] = user_query
             result["initial_question"] = user_query
+        if followup:
+            # Start the turn without the previous turn's error; keep its documents only if they are reused
+            result["error_info"] = None
+            if any(call["name"] == reuse_previous_documents.name for call in response.tool_calls):
+                logger.info("Follow-up answered from %d documents of the previous turn.", len(relevant_docs))
+                metrics.inc("followup_documents_reused_total")
+            else:
+                result["tracked_documents"] = None
+                result["tracked_proposals"] = []
         return result
 
     # -- Node: run tools and write tracked state directly --
-    tool_node = ToolNode(tools)
+    tool_node = ToolNode([*tools, reuse_previous_documents] if reuse_followup_documents else tools)
 
     async def run_tools(state: RiskiAgentState) -> RiskiAgentStateUpdate:
         """Run tools via ToolNode and extract tracked state from the artifact.
@@ -770,7 +1437,32 @@ def build_riski_graph(
         relevance_check_model,
         check_document_prompt_template=check_document_prompt_template,
         snippet_size=snippet_size,
+        snippet_max_tokens=snippet_max_tokens,
+        force_llm_timeout=force_llm_timeout,
+        relevance_cache=relevance_cache,
+        check_mode=check_mode,
+        batch_max_tokens=batch_max_tokens,
+        auto_accept_max_distance=auto_accept_max_distance,
+        auto_reject_min_distance=auto_reject_min_distance,
+        relevance_scorer=relevance_scorer,
+        scorer_accept_threshold=scorer_accept_threshold,
+        scorer_reject_threshold=scorer_reject_threshold,
+        prompt_manager=prompt_manager,
+    )
+    check_documents_batch = build_batch_check_node(
+        relevance_check_model,
+        check_document,
+        snippet_size=snippet_size,
+        snippet_max_tokens=snippet_max_tokens,
         force_llm_timeout=force_llm_timeout,
+        relevance_cache=relevance_cache,
+        prompt_manager=prompts,
+    )
+    check_documents_early_exit = build_early_exit_check_node(
+        check_document,
+        quorum=early_exit_quorum,
+        deadline_seconds=early_exit_deadline_seconds,
+        unfinished_policy=early_exit_unfinished_policy,
     )
 
     graph = StateGraph(RiskiAgentState)
@@ -779,13 +1471,21 @@ def build_riski_graph(
     graph.add_node(NODE_TOOLS, run_tools)
     graph.add_node(NODE_GUARD, guard)
     graph.add_node(NODE_CHECK_DOCUMENT, check_document)
+    graph.add_node(NODE_CHECK_DOCUMENTS_BATCH, check_documents_batch)
+    graph.add_node(NODE_CHECK_DOCUMENTS_EARLY_EXIT, check_documents_early_exit)
     graph.add_node(NODE_COLLECT_RESULTS, collect_results)
 
     graph.add_edge(START, NODE_MODEL)
     graph.add_conditional_edges(NODE_MODEL, _route_after_model, {NODE_TOOLS: NODE_TOOLS, NODE_GUARD: NODE_GUARD, END: END})
     graph.add_conditional_edges(NODE_TOOLS, _route_after_tools, {NODE_MODEL: NODE_MODEL, NODE_GUARD: NODE_GUARD, END: END})
-    graph.add_conditional_edges(NODE_GUARD, fan_out_checks, [NODE_CHECK_DOCUMENT, NODE_COLLECT_RESULTS])
+    graph.add_conditional_edges(
+        NODE_GUARD,
+        fan_out_checks,
+        [NODE_CHECK_DOCUMENT, NODE_CHECK_DOCUMENTS_BATCH, NODE_CHECK_DOCUMENTS_EARLY_EXIT, NODE_COLLECT_RESULTS],
+    )
     graph.add_edge(NODE_CHECK_DOCUMENT, NODE_COLLECT_RESULTS)
+    graph.add_edge(NODE_CHECK_DOCUMENTS_BATCH, NODE_COLLECT_RESULTS)
+    graph.add_edge(NODE_CHECK_DOCUMENTS_EARLY_EXIT, NODE_COLLECT_RESULTS)
     graph.add_conditional_edges(NODE_COLLECT_RESULTS, _route_after_collect, {NODE_MODEL: NODE_MODEL, END: END})
 
     return graph
@@ -0,0 +1,173 @@
+"""Query-focused snippet selection for long document texts.
+
+Many RIS documents are long OCR texts whose relevant passage is not at the
+start.  Instead of sending a fixed prefix to the LLM, the text is split into
+passages, each passage is scored lexically against the user query (BM25 over
+the passages of the document), and the best passages are kept within a token
+budget.  The selected passages are returned in their original order.
+"""
+
+import math
+import re
+from collections import Counter
+
+GAP_MARKER = "[…]"
+
+_PARAGRAPH_SPLIT = re.compile(r"\n\s*\n")
+_WORD = re.compile(r"\w+")
+_STEM_LENGTH = 6
+_MIN_TERM_LENGTH = 3
+_BM25_K1 = 1.2
+_BM25_B = 0.75
+
+# Frequent German function words that carry no topical signal.
+_STOPWORDS = frozenset(
+    {
+        "aber",
+        "alle",
+        "als",
+        "auch",
+        "auf",
+        "aus",
+        "bei",
+        "bis",
+        "das",
+        "dass",
+        "dem",
+        "den",
+        "der",
+        "des",
+        "die",
+        "ein",
+        "eine",
+        "einem",
+        "einen",
+        "einer",
+        "für",
+        "gibt",
+        "hat",
+        "ich",
+        "ist",
+        "mit",
+        "nach",
+        "nicht",
+        "oder",
+        "sich",
+        "sind",
+        "über",
+        "und",
+        "vom",
+        "von",
+        "was",
+        "welche",
+        "wie",
+        "wird",
+        "wurde",
+        "zum",
+        "zur",
+    }
+)
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (≈ 4 characters per token)."""
+    return len(text) // 4 + 1
+
+
+def _terms(text: str) -> list[str]:
+    """Lower-case, drop stopwords and cut words to a common prefix.
+
+    The prefix acts as a crude stemmer for German inflection and compounds
+    (``Radverkehrs`` and ``Radverkehr`` share ``radver``).
+    """
+    return [
+        word[:_STEM_LENGTH]
+        for word in _WORD.findall(text.casefold())
+        if len(word) >= _MIN_TERM_LENGTH and word not in _STOPWORDS and not word.isdigit()
+    ]
+
+
+def split_passages(text: str, max_chars: int = 1_200) -> list[str]:
+    """Split *text* into paragraphs; paragraphs longer than *max_chars* are cut at whitespace."""
+    passages: list[str] = []
+    for paragraph in _PARAGRAPH_SPLIT.split(text):
+        paragraph = paragraph.strip()
+        while len(paragraph) > max_chars:
+            cut = paragraph.rfind(" ", max_chars // 2, max_chars)
+            if cut == -1:
+                cut = max_chars
+            passages.append(paragraph[:cut].strip())
+            paragraph = paragraph[cut:].strip()
+        if paragraph:
+            passages.append(paragraph)
+    return passages
+
+
+def _score_passages(passages: list[list[str]], query_terms: set[str]) -> list[float]:
+    """BM25 score of every passage for *query_terms*, using the passages as corpus."""
+    if not query_terms:
+        return [0.0] * len(passages)
+    document_frequency = Counter(term for terms in passages for term in set(terms) & query_terms)
+    average_length = sum(len(terms) for terms in passages) / len(passages) or 1.0
+    scores = []
+    for terms in passages:
+        counts = Counter(terms)
+        length_norm = _BM25_K1 * (1 - _BM25_B + _BM25_B * len(terms) / average_length)
+        score = 0.0
+        for term in query_terms:
+            tf = counts.get(term, 0)
+            if tf:
+                idf = math.log(1 + (len(passages) - document_frequency[term] + 0.5) / (document_frequency[term] + 0.5))
+                score += idf * tf * (_BM25_K1 + 1) / (tf + length_norm)
+        scores.append(score)
+    return scores
+
+
+def select_snippet(text: str, query: str, max_tokens: int) -> str:
+    """Return the passages of *text* that best match *query* within *max_tokens*.
+
+    Texts that fit into the budget are returned unchanged.  Otherwise the first
+    passage (usually title and subject) is always kept, followed by the
+    highest-scoring passages; passages with equal scores are taken in document
+    order, so a text without any query match degrades to its prefix.  Omitted
+    stretches are marked with ``GAP_MARKER``.
+
+    Parameters
+    ----------
+    text:
+        Full document text.
+    query:
+        The user query the snippet should answer.
+    max_tokens:
+        Token budget of the snippet (estimated with ``estimate_tokens``).
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return text
+
+    passages = split_passages(text)
+    if not passages:
+        return ""
+    scores = _score_passages([_terms(p) for p in passages], set(_terms(query)))
+    scores[0] = math.inf
+
+    budget = max_tokens
+    selected: set[int] = set()
+    for index in sorted(range(len(passages)), key=lambda i: (-scores[i], i)):
+        cost = estimate_tokens(passages[index])
+        if cost <= budget:
+            selected.add(index)
+            budget -= cost
+
+    if not selected:
+        return passages[0][: max_tokens * 4]
+
+    parts: list[str] = []
+    previous = -1
+    for index in sorted(selected):
+        if index != previous + 1:
+            parts.append(GAP_MARKER)
+        parts.append(passages[index])
+        previous = index
+    if previous != len(passages) - 1:
+        parts.append(GAP_MARKER)
+    return "\n\n".join(parts)
@@ -0,0 +1,155 @@
+"""Speculative vector search in parallel with the first model pass.
+
+For a new question the model almost always calls ``retrieve_documents`` with
+a query close to the user's text.  Instead of waiting for that decision, the
+first ``call_model`` pass starts embedding and vector search for the raw user
+text right away.  When the tool runs, the speculative result is reused if the
+tool query is the same after ``relevance_cache.normalize_query`` or its embedding is at
+least ``min_similarity`` cosine-similar; otherwise it is discarded and the
+search runs with the tool query's embedding, so no embedding call is wasted.
+
+A ``SpeculativeRetrieval`` lives for one request and is passed to the graph
+via ``config["configurable"]["speculative_retrieval"]``, like the
+``DocumentContentStore``.
+"""
+
+import asyncio
+import math
+from collections.abc import Mapping
+from logging import Logger
+from typing import Any
+
+from app.core.metrics import metrics
+from app.utils.logging import getLogger
+from app.utils.single_flight import SingleFlight
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStore
+
+from .coalescing import SINGLE_FLIGHT_CONFIG_KEY, search_key
+from .relevance_cache import normalize_query
+
+logger: Logger = getLogger()
+
+SPECULATIVE_RETRIEVAL_CONFIG_KEY = "speculative_retrieval"
+
+
+def cosine_similarity(a: list[float], b: list[float]) -> float:
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return sum(x * y for x, y in zip(a, b)) / norm if norm else 0.0
+
+
+def _retrieve_exception(task: asyncio.Task) -> None:
+    # Failures of discarded speculations are expected; avoid "exception was never retrieved" warnings.
+    if not task.cancelled():
+        task.exception()
+
+
+class SpeculativeRetrieval:
+    """Request-scoped handle of at most one speculative vector search."""
+
+    def __init__(self, min_similarity: float = 0.9, single_flight: SingleFlight | None = None) -> None:
+        self.min_similarity = min_similarity
+        self.single_flight = single_flight
+        self._query: str | None = None
+        self._embedding_task: asyncio.Task[list[float]] | None = None
+        self._search_task: asyncio.Task[list[tuple[Document, float]]] | None = None
+
+    def start(self, query: str, vectorstore: VectorStore, k: int) -> None:
+        """Start embedding and vector search for *query* in the background."""
+        self.discard()
+        self._query = query
+        self._embedding_task = asyncio.create_task(vectorstore.embeddings.aembed_query(query))  # type: ignore[union-attr]
+        if self.single_flight is not None:
+            # Shared with identical searches of other requests; the embedding is coalesced by the vector store's model
+            self._search_task = asyncio.create_task(
+                self.single_flight.do(search_key(query, k), lambda: vectorstore.asimilarity_search_with_score(query, k=k))
+            )
+        else:
+            self._search_task = asyncio.create_task(self._search(self._embedding_task, vectorstore, k))
+        for task in (self._embedding_task, self._search_task):
+            task.add_done_callback(_retrieve_exception)
+        metrics.inc("speculative_retrieval_started_total")
+        logger.debug("Speculative retrieval started for query: %s", query)
+
+    @staticmethod
+    async def _search(embedding_task: "asyncio.Task[list[float]]", vectorstore: VectorStore, k: int) -> list[tuple[Document, float]]:
+        return await vectorstore.asimilarity_search_with_score_by_vector(await embedding_task, k=k)  # type: ignore[attr-defined]
+
+    def query_embedding(self, query: str) -> "asyncio.Task[list[float]] | None":
+        """Return the pending embedding of *query* if a speculation for the same text is running."""
+        if self._embedding_task is None or self._query is None or normalize_query(self._query) != normalize_query(query):
+            return None
+        return self._embedding_task
+
+    def discard(self) -> None:
+        """Cancel a pending speculative search whose result will not be used."""
+        if self._search_task is None:
+            return
+        for task in (self._embedding_task, self._search_task):
+            if task is not None and not task.done():
+                task.cancel()
+        self._embedding_task = self._search_task = None
+        self._query = None
+        metrics.inc("speculative_retrieval_discarded_total")
+
+    async def search(self, query: str, vectorstore: VectorStore, k: int) -> list[tuple[Document, float]]:
+        """Return the top *k* documents for *query*, reusing the speculative result if it matches.
+
+        Parameters
+        ----------
+        query:
+            The query of the ``retrieve_documents`` call.
+        vectorstore:
+            The vector store; used when there is no usable speculative result.
+        k:
+            Number of documents.
+        """
+        embedding_task, search_task, speculative_query = self._embedding_task, self._search_task, self._query
+        self._embedding_task = self._search_task = None
+        self._query = None
+        if search_task is None or embedding_task is None or speculative_query is None:
+            return await vectorstore.asimilarity_search_with_score(query, k=k)
+
+        query_embedding: list[float] | None = None
+        try:
+            if normalize_query(query) == normalize_query(speculative_query):
+                reuse = True
+            else:
+                speculative_embedding, query_embedding = await asyncio.gather(
+                    embedding_task,
+                    vectorstore.embeddings.aembed_query(query),  # type: ignore[union-attr]
+                )
+                reuse = cosine_similarity(speculative_embedding, query_embedding) >= self.min_similarity
+            if reuse:
+                docs_with_scores = await search_task
+                metrics.inc("speculative_retrieval_reused_total")
+                logger.debug("Speculative retrieval reused for query: %s", query)
+                return docs_with_scores
+        except Exception:
+            logger.warning("Speculative retrieval failed; searching again.", exc_info=True)
+
+        if not search_task.done():
+            search_task.cancel()
+        metrics.inc("speculative_retrieval_discarded_total")
+        if query_embedding is not None:
+            return await vectorstore.asimilarity_search_with_score_by_vector(query_embedding, k=k)  # type: ignore[attr-defined]
+        return await vectorstore.asimilarity_search_with_score(query, k=k)
+
+
+def get_speculative_retrieval(config: Mapping[str, Any] | None) -> SpeculativeRetrieval | None:
+    """Return the request's speculative retrieval handle from *config*, if enabled."""
+    return ((config or {}).get("configurable") or {}).get(SPECULATIVE_RETRIEVAL_CONFIG_KEY)
+
+
+def with_speculative_retrieval(config: dict[str, Any]) -> dict[str, Any]:
+    """Return a copy of a run *config* with a fresh ``SpeculativeRetrieval``.
+
+    Speculation is only enabled if the config carries
+    ``speculative_retrieval_min_similarity``; otherwise *config* is returned unchanged.
+    """
+    configurable: dict[str, Any] = dict(config.get("configurable") or {})
+    min_similarity = configurable.get("speculative_retrieval_min_similarity")
+    if min_similarity is None:
+        return config
+    configurable[SPECULATIVE_RETRIEVAL_CONFIG_KEY] = SpeculativeRetrieval(min_similarity, configurable.get(SINGLE_FLIGHT_CONFIG_KEY))
+    return {**config, "configurable": configurable}
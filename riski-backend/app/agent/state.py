@@ -1,6 +1,6 @@
 """State models for the RISKI Agent graph."""
 
-from typing import Annotated, Any, TypedDict
+from typing import Annotated, Any, NotRequired, TypedDict
 
 from langchain_core.messages import AnyMessage
 from langgraph.graph.message import add_messages
@@ -21,7 +21,13 @@ class TrackedDocument(BaseModel):
     """
 
     id: str = Field(default="", description="Unique document id (usually the DB primary key).")
-    page_content: str = Field(default="", description="Text content of the document chunk.")
+    page_content: str = Field(
+        default="",
+        description="Bounded snippet of the document text. The full text is kept in the request's content store "
+        "(see ``content_store.py``) and fetched lazily by the nodes that need it.",
+    )
+    content_hash: str = Field(default="", description="SHA-256 hash of the full document text.")
+    content_tokens: int | None = Field(default=None, description="Estimated tokens of the full document text, if known.")
     metadata: dict[str, Any] = Field(default_factory=dict, description="Arbitrary metadata from the vector store.")
 
     # Relevance-check fields – populated by the guard
@@ -86,7 +92,7 @@ class ErrorInfo(BaseModel):
 
 
 # ---------------------------------------------------------------------------
-# Input type for the per-document relevance check (used with Send)
+# Input types for the relevance checks (used with Send)
 # ---------------------------------------------------------------------------
 
 
@@ -98,6 +104,15 @@ class DocumentCheckInput(TypedDict):
     user_query: str
 
 
+class DocumentBatchCheckInput(TypedDict):
+    """Input for a batched relevance check of several documents (used with Send)."""
+
+    docs: list[dict[str, Any]]
+    user_query: str
+    # Documents the guard already accepted; counted towards the early-exit quorum.
+    already_relevant: NotRequired[int]
+
+
 # ---------------------------------------------------------------------------
 # Reducer: merge relevance-check results back into the tracked documents list
 # ---------------------------------------------------------------------------
@@ -113,14 +128,17 @@ class RelevanceUpdate(BaseModel):
 
 def _merge_tracked_documents(
     current: list[TrackedDocument],
-    update: list[TrackedDocument] | list[RelevanceUpdate],
+    update: list[TrackedDocument] | list[RelevanceUpdate] | None,
 ) -> list[TrackedDocument]:
     """Custom reducer for ``tracked_documents``.
 
-    Accepts two kinds of updates:
+    Accepts three kinds of updates:
     * A fresh ``list[TrackedDocument]`` (from the tool node) – replaces the list.
     * A ``list[RelevanceUpdate]`` (from check_document) – patches existing entries.
+    * ``None`` (from the first pass of a follow-up turn) – clears the documents of the previous turn.
     """
+    if update is None:
+        return []
     if not update:
         return current
 
@@ -221,6 +239,6 @@ class RiskiAgentStateUpdate(TypedDict, total=False):
     messages: list[AnyMessage]
     user_query: str
     initial_question: str
-    tracked_documents: list[TrackedDocument]
+    tracked_documents: list[TrackedDocument] | None
     tracked_proposals: list[TrackedProposal]
     error_info: ErrorInfo | None
@@ -0,0 +1,94 @@
+"""Streaming structured output for the generation pass.
+
+``chat_model.with_structured_output(schema).ainvoke(...)`` only returns once
+the whole JSON answer is complete; whether the tokens are streamed to the
+client in the meantime depends on the callback handlers of the run.
+``astream_structured_output`` always requests a streamed completion with the
+same ``response_format``, so every token is emitted as ``on_chat_model_stream``
+event (→ AG-UI ``TEXT_MESSAGE_CONTENT``, whose partial JSON the frontend
+renders), parses the partial JSON as it arrives and validates the complete
+answer at the end.
+"""
+
+import time
+from logging import Logger
+from typing import Any, TypeVar, cast
+
+from app.core.metrics import metrics
+from app.utils.logging import getLogger
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessageChunk, BaseMessage
+from langchain_core.utils.json import parse_partial_json
+from pydantic import BaseModel
+
+logger: Logger = getLogger()
+
+M = TypeVar("M", bound=BaseModel)
+
+
+def _chunk_text(chunk: AIMessageChunk) -> str:
+    if isinstance(chunk.content, str):
+        return chunk.content
+    return "".join(part.get("text", "") if isinstance(part, dict) else str(part) for part in chunk.content)
+
+
+def parse_partial_answer(text: str, text_field: str = "response") -> str:
+    """Return the value of *text_field* from the (possibly incomplete) JSON *text*, or ``""``."""
+    try:
+        parsed: Any = parse_partial_json(text)
+    except ValueError:
+        return ""
+    value = parsed.get(text_field) if isinstance(parsed, dict) else None
+    return value if isinstance(value, str) else ""
+
+
+async def astream_structured_output(
+    chat_model: BaseChatModel,
+    schema: type[M],
+    messages: list[BaseMessage],
+    text_field: str = "response",
+) -> M:
+    """Generate a *schema* instance from a streamed completion.
+
+    Parameters
+    ----------
+    chat_model:
+        The chat model; it is bound with ``response_format=schema`` like
+        ``with_structured_output(schema)`` does.
+    schema:
+        Pydantic model of the answer.
+    messages:
+        The prompt.
+    text_field:
+        Field of *schema* holding the answer text.  The time until its first
+        characters arrive is recorded in the ``generation_first_token_seconds``
+        gauge, the total time in ``generation_seconds``.
+
+    Raises
+    ------
+    pydantic.ValidationError
+        If the completed answer does not match *schema*.
+    """
+    started = time.monotonic()
+    streaming_model = chat_model.bind(response_format=schema)
+    accumulated: AIMessageChunk | None = None
+    text = ""
+    first_token_seen = False
+
+    async for message in streaming_model.astream(messages):
+        # A streamed chat model yields chunks; the binding only declares ``AIMessage``.
+        chunk = cast(AIMessageChunk, message)
+        accumulated = chunk if accumulated is None else accumulated + chunk
+        delta = _chunk_text(chunk)
+        if not delta:
+            continue
+        text += delta
+        if not first_token_seen and parse_partial_answer(text, text_field):
+            first_token_seen = True
+            metrics.set_gauge("generation_first_token_seconds", time.monotonic() - started)
+
+    metrics.set_gauge("generation_seconds", time.monotonic() - started)
+    parsed = accumulated.additional_kwargs.get("parsed") if accumulated is not None else None
+    if isinstance(parsed, schema):
+        return parsed
+    return schema.model_validate_json(text)
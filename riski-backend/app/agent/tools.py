@@ -1,26 +1,47 @@
 import asyncio
 import json
+from datetime import date
 from logging import Logger
 from typing import TypedDict
 
+from app.core.metrics import metrics
 from app.utils.logging import getLogger
-from core.model.data_models import File
+from core.model.data_models import Paper, PaperFileLink, PaperTypeEnum
 from langchain.tools import ToolException, ToolRuntime, tool
 from langchain_core.documents import Document
 from langchain_core.runnables import RunnableConfig, RunnableLambda
 from pydantic import BaseModel, Field
+from sqlalchemy import distinct, func, select
 from sqlalchemy.ext.asyncio import async_sessionmaker
-from sqlalchemy.orm import defer, selectinload
-from sqlmodel import select
-
+from sqlmodel import col
+
+from .coalescing import coalesce, search_key
+from .content_store import get_content_store
+from .prompt_manager import agent_capabilities_text
+from .proposal_cache import ProposalRow, get_proposal_cache
+from .relevance_cache import content_hash
+from .retrieval_filters import RETRIEVAL_FILTERS_CONFIG_KEY, vectorstore_filter
+from .snippets import estimate_tokens, select_snippet
+from .speculative_retrieval import get_speculative_retrieval
 from .state import TrackedDocument, TrackedProposal
-from .types import AGENT_CAPABILITIES_PROMPT, AgentContext
+from .types import AgentContext
 
 logger: Logger = getLogger()
 
 
 class RetrieveDocumentsArgs(BaseModel):
     query: str = Field(description="The search query string.")
+    date_from: date | None = Field(default=None, description="Only documents dated on or after this day.")
+    date_to: date | None = Field(default=None, description="Only documents dated on or before this day.")
+    paper_types: list[PaperTypeEnum] | None = Field(
+        default=None, description="Only documents linked to a paper of one of these types, e.g. 'Stadtratsantrag' for proposals."
+    )
+    originators: list[str] | None = Field(
+        default=None, description="Only documents of papers submitted by one of these organizations, e.g. a faction name like 'Grüne'."
+    )
+    districts: list[str] | None = Field(
+        default=None, description="Only documents concerning one of these Munich districts (Stadtbezirke), e.g. 'Maxvorstadt'."
+    )
 
 
 class RetrieveDocumentsArtifact(TypedDict):
@@ -30,6 +51,46 @@ class RetrieveDocumentsArtifact(TypedDict):
     proposals: list[dict]
 
 
+PROPOSAL_PAPER_TYPE = "Stadtratsantrag"
+
+
+def _proposal_query(file_ids: list[str]):
+    """Proposals linked to *file_ids*: one row per proposal with the ids of its linked files.
+
+    Joins ``paper_file`` → ``paper``, filters the paper type and deduplicates
+    (by reference and RIS URL) in SQL, selecting only the columns ``TrackedProposal`` needs.
+    """
+    return (
+        select(
+            col(Paper.reference),
+            col(Paper.id),
+            func.min(Paper.name),
+            func.min(Paper.subject),
+            func.min(Paper.date),
+            func.array_agg(distinct(col(PaperFileLink.file_id))),
+        )
+        .join(PaperFileLink, col(PaperFileLink.paper_id) == col(Paper.db_id))
+        .where(col(PaperFileLink.file_id).in_(file_ids), col(Paper.paper_type) == PROPOSAL_PAPER_TYPE)
+        .group_by(col(Paper.reference), col(Paper.id))
+        .order_by(col(Paper.reference), col(Paper.id))
+    )
+
+
+def _card_proposal_rows(papers: list[dict]) -> tuple[ProposalRow, ...]:
+    """Proposal rows from the ``papers`` field of a file card (see ``FileCard`` in riski-core)."""
+    return tuple(
+        ProposalRow(
+            identifier=str(paper.get("identifier") or ""),
+            name=str(paper.get("name") or ""),
+            subject=str(paper.get("subject") or ""),
+            date=paper.get("date") or None,
+            risUrl=str(paper.get("risUrl") or ""),
+        )
+        for paper in papers
+        if paper.get("paper_type") == PROPOSAL_PAPER_TYPE
+    )
+
+
 async def get_proposals(
     documents: list[Document],
     db_sessionmaker: async_sessionmaker,
@@ -40,6 +101,11 @@ async def get_proposals(
 ) -> list[TrackedProposal]:
     """Fetch proposals related to the given documents from the database.
 
+    Documents from the retrieval view carry their file card in
+    ``metadata["papers"]``; their proposals are taken from there.  For the
+    other files the ``ProposalCache`` of the run config is checked and the
+    remaining ones are looked up with a single projection query.
+
     Args:
         documents (list[Document]): List of documents to find related proposals for.
         db_sessionmaker (async_sessionmaker): The async session maker for database access.
@@ -50,63 +116,74 @@ async def get_proposals(
     Returns:
         list[TrackedProposal]: A list of proposals related to the documents.
     """
-    proposals_by_key: dict[tuple[str, str], TrackedProposal] = {}
-    if documents:
-        file_ids = {doc.id for doc in documents}
-        logger.debug(f"Fetching proposals for file IDs: {file_ids}")
-
-        if force_db_timeout:
-            raise asyncio.TimeoutError("forced DB timeout for testing")
-
-        async with db_sessionmaker() as db_session:
-            try:
-
-                async def call_db(_):
-                    result = await asyncio.wait_for(
-                        db_session.execute(
-                            select(File)
-                            .where(File.db_id.in_(file_ids))
-                            .options(
-                                selectinload(File.papers),
-                                defer(File.text),
-                                defer(File.content),
-                                defer(File.embed),
-                            ),  # type: ignore[arg-type, attr-defined]
-                        ),
-                        timeout=db_query_total_timeout_seconds,
-                    )
-                    files = result.scalars().all()
-                    return files
+    if not documents:
+        return []
+    file_ids: list[str] = list(dict.fromkeys(str(doc.id) for doc in documents if doc.id))
+    logger.debug(f"Fetching proposals for file IDs: {file_ids}")
+
+    if force_db_timeout:
+        raise asyncio.TimeoutError("forced DB timeout for testing")
+
+    # Hits from the retrieval view carry their file card; only files without one are looked up.
+    rows_by_file: dict[str, tuple[ProposalRow, ...]] = {}
+    for doc in documents:
+        papers = doc.metadata.get("papers")
+        if doc.id and isinstance(papers, list):
+            rows_by_file[str(doc.id)] = _card_proposal_rows(papers)
+    missing: list[str] = [file_id for file_id in file_ids if file_id not in rows_by_file]
+
+    proposal_cache = get_proposal_cache(config)
+    if proposal_cache is not None and missing:
+        cached, missing = proposal_cache.get_many(missing)
+        rows_by_file.update(cached)
+
+    if missing:
+
+        async def query_proposals():
+            # The session belongs to the shared call, so it outlives a cancelled caller
+            async with db_sessionmaker() as db_session:
+                result = await db_session.execute(_proposal_query(missing))
+                return result.all()
+
+        async def call_db(_):
+            # Concurrent lookups of the same files by other requests share one query (see coalescing.py)
+            return await asyncio.wait_for(
+                coalesce(config, ("proposals", frozenset(missing)), query_proposals),
+                timeout=db_query_total_timeout_seconds,
+            )
 
-                files = await RunnableLambda(call_db).ainvoke(None, config)  # type: ignore
-            except asyncio.TimeoutError:
-                logger.error(
-                    f"get_proposals timed out waiting for DB query (timeout={db_query_total_timeout_seconds}s, file_ids={file_ids})"
-                )
-                raise
-
-            logger.debug(f"Look for proposals in {len(files)} files from db.")
-            for f in files:
-                if not f.papers:
-                    continue
-                file_id = str(f.db_id)
-                for p in f.papers:
-                    if p.paper_type != "Stadtratsantrag":
-                        continue
-                    key = (str(p.reference or ""), str(p.id or ""))
-                    existing = proposals_by_key.get(key)
-                    if existing:
-                        if file_id not in existing.source_document_ids:
-                            existing.source_document_ids.append(file_id)
-                    else:
-                        proposals_by_key[key] = TrackedProposal(
-                            identifier=str(p.reference or ""),
-                            name=str(p.name or ""),
-                            subject=str(p.subject or ""),
-                            date=p.date.isoformat() if p.date else None,
-                            risUrl=str(p.id or ""),
-                            source_document_ids=[file_id],
-                        )
+        try:
+            rows = await RunnableLambda(call_db).ainvoke(None, config)
+        except asyncio.TimeoutError:
+            logger.error(f"get_proposals timed out waiting for DB query (timeout={db_query_total_timeout_seconds}s, file_ids={missing})")
+            raise
+
+        logger.debug(f"Found {len(rows)} proposals for {len(missing)} files in db.")
+        fetched: dict[str, list[ProposalRow]] = {file_id: [] for file_id in missing}
+        for reference, ris_url, name, subject, date, linked_file_ids in rows:
+            row = ProposalRow(
+                identifier=str(reference or ""),
+                name=str(name or ""),
+                subject=str(subject or ""),
+                date=date.isoformat() if date else None,
+                risUrl=str(ris_url or ""),
+            )
+            for file_id in linked_file_ids:
+                fetched.setdefault(str(file_id), []).append(row)
+        fetched_rows = {file_id: tuple(rows) for file_id, rows in fetched.items()}
+        if proposal_cache is not None:
+            proposal_cache.set_many(fetched_rows)
+        rows_by_file.update(fetched_rows)
+
+    # Merge proposals linked to several files, keeping the order of the documents.
+    proposals_by_key: dict[tuple[str, str], TrackedProposal] = {}
+    for file_id in file_ids:
+        for row in rows_by_file.get(file_id, ()):
+            existing = proposals_by_key.get((row.identifier, row.risUrl))
+            if existing is None:
+                proposals_by_key[(row.identifier, row.risUrl)] = TrackedProposal(**row._asdict(), source_document_ids=[file_id])
+            elif file_id not in existing.source_document_ids:
+                existing.source_document_ids.append(file_id)
     return list(proposals_by_key.values())
 
 
@@ -118,7 +195,14 @@ async def get_proposals(
     response_format="content_and_artifact",
 )
 async def retrieve_documents(
-    query: str, runtime: ToolRuntime[AgentContext], config: RunnableConfig
+    query: str,
+    runtime: ToolRuntime[AgentContext],
+    config: RunnableConfig,
+    date_from: date | None = None,
+    date_to: date | None = None,
+    paper_types: list[PaperTypeEnum] | None = None,
+    originators: list[str] | None = None,
+    districts: list[str] | None = None,
 ) -> tuple[str, RetrieveDocumentsArtifact]:
     """
     Retrieve relevant documents and proposals based on a query.
@@ -126,6 +210,11 @@ async def retrieve_documents(
     The artifact carries ``TrackedDocument`` / ``TrackedProposal`` dicts
     so the guard node can write them directly into state without parsing
     message content.
+
+    The optional filters are applied in the SQL of the similarity search
+    (see ``retrieval_filters.py``) if the vector store searches the
+    ``file_retrieval`` view.  If the filtered search finds nothing, the search
+    is repeated without filters.
     """
     try:
         logger.info(f"Retrieving documents for query: {query}")
@@ -138,6 +227,8 @@ async def retrieve_documents(
             vectorstore_timeout_seconds = config["configurable"]["vectorstore_timeout_seconds"]
             force_vectorstore_timeout: bool = config["configurable"].get("force_vectorstore_timeout", False)
             force_db_timeout: bool = config["configurable"].get("force_db_timeout", False)
+            state_snippet_max_tokens: int = config["configurable"].get("state_snippet_max_tokens", 500)
+            filters_enabled: bool = config["configurable"].get(RETRIEVAL_FILTERS_CONFIG_KEY, False)
         else:
             vectorstore = runtime.context["vectorstore"]
             db_sessionmaker = runtime.context["db_sessionmaker"]
@@ -147,25 +238,56 @@ async def retrieve_documents(
             vectorstore_timeout_seconds = runtime.context["vectorstore_timeout_seconds"]
             force_vectorstore_timeout = runtime.context.get("force_vectorstore_timeout", False)
             force_db_timeout = runtime.context.get("force_db_timeout", False)
+            state_snippet_max_tokens = runtime.context.get("state_snippet_max_tokens", 500)
+            filters_enabled = runtime.context.get(RETRIEVAL_FILTERS_CONFIG_KEY, False)
             logger.debug(f"Using context: {runtime.context} of type {type(runtime.context)}")
 
         # Step 1: Perform similarity search in the vector store
         if force_vectorstore_timeout:
             raise asyncio.TimeoutError("forced vectorstore timeout for testing")
+        search_filter = vectorstore_filter(date_from, date_to, paper_types, originators, districts) if filters_enabled else None
         try:
+            # With speculative retrieval the search may already be running for the user's text.
+            # It is unfiltered, so a filtered search discards it and runs its own query.
+            speculation = get_speculative_retrieval(config)
+            if speculation is not None and search_filter is not None:
+                speculation.discard()
+                speculation = None
 
             async def call_vectorstore(_):
-                docs: list[Document] = await asyncio.wait_for(
-                    vectorstore.asimilarity_search(query=query, k=top_k_docs),
-                    timeout=vectorstore_timeout_seconds,
+                # Concurrent identical searches of other requests share one query (see coalescing.py)
+                search = (
+                    speculation.search(query, vectorstore, top_k_docs)
+                    if speculation is not None
+                    else coalesce(
+                        config,
+                        search_key(query, top_k_docs, search_filter),
+                        lambda: vectorstore.asimilarity_search_with_score(query=query, k=top_k_docs, filter=search_filter),
+                    )
                 )
-                return docs
+                docs_with_scores: list[tuple[Document, float]] = await asyncio.wait_for(search, timeout=vectorstore_timeout_seconds)
+                if not docs_with_scores and search_filter is not None:
+                    logger.info(f"No documents match the filter {search_filter}; searching without filters.")
+                    metrics.inc("retrieval_filter_fallbacks_total")
+                    docs_with_scores = await asyncio.wait_for(
+                        coalesce(
+                            config,
+                            search_key(query, top_k_docs),
+                            lambda: vectorstore.asimilarity_search_with_score(query=query, k=top_k_docs),
+                        ),
+                        timeout=vectorstore_timeout_seconds,
+                    )
+                return docs_with_scores
 
-            docs = await RunnableLambda(call_vectorstore).ainvoke(None, config)  # type: ignore
+            if search_filter is not None:
+                logger.info(f"Filtering vector search with {search_filter}")
+                metrics.inc("retrieval_filtered_total")
+            docs_with_scores = await RunnableLambda(call_vectorstore).ainvoke(None, config)
         except asyncio.TimeoutError:
             logger.error(f"retrieve_documents timed out waiting for vector store (timeout={vectorstore_timeout_seconds}s)")
             raise ToolException("TIMEOUT: vector store query timed out")
-        logger.debug(f"Retrieved {len(docs)} documents:\n{[doc.metadata for doc in docs]}")
+        docs: list[Document] = [doc for doc, _ in docs_with_scores]
+        logger.debug(f"Retrieved {len(docs)} documents:\n{[(doc.metadata, score) for doc, score in docs_with_scores]}")
 
         if not docs:
             logger.info("No documents found for query.")
@@ -183,8 +305,27 @@ async def retrieve_documents(
             force_db_timeout=force_db_timeout,
         )
 
-        # Build TrackedDocument entries (is_checked=False, is_relevant=True by default)
-        tracked_docs = [TrackedDocument(id=doc.id or "", page_content=doc.page_content, metadata=doc.metadata) for doc in docs]
+        # Build TrackedDocument entries (is_checked=False, is_relevant=True by default).
+        # The vector distance is kept in the metadata so the guard can gate on it.
+        # With a request-scoped content store, state only carries a bounded snippet;
+        # the full text is fetched lazily from the store by the nodes that need it.
+        content_store = get_content_store(config)
+        tracked_docs: list[TrackedDocument] = []
+        for doc, score in docs_with_scores:
+            doc_id = doc.id or ""
+            page_content = doc.page_content
+            if content_store is not None and doc_id:
+                content_store.put(doc_id, doc.page_content)
+                page_content = select_snippet(doc.page_content, query, state_snippet_max_tokens)
+            tracked_docs.append(
+                TrackedDocument(
+                    id=doc_id,
+                    page_content=page_content,
+                    content_hash=content_hash(doc.page_content),
+                    content_tokens=estimate_tokens(doc.page_content),
+                    metadata={**doc.metadata, "distance": float(score)},
+                )
+            )
 
         # Artifact carries serialised TrackedDocument / TrackedProposal dicts
         artifact: RetrieveDocumentsArtifact = {
@@ -230,7 +371,7 @@ async def get_agent_capabilities(config: RunnableConfig) -> tuple[str, dict]:
     the prompt is not available via context.
     """
     try:
-        capabilities_text: str = config.get("configurable", {}).get("agent_capabilities", AGENT_CAPABILITIES_PROMPT)
+        capabilities_text: str = agent_capabilities_text(config)
 
         logger.info("Returning agent capabilities.")
         artifact: dict = {"capabilities": capabilities_text}
@@ -238,3 +379,26 @@ async def get_agent_capabilities(config: RunnableConfig) -> tuple[str, dict]:
     except Exception as e:
         logger.error(f"Error in get_agent_capabilities tool: {e}", exc_info=True)
         raise ToolException(f"Failed to retrieve agent capabilities: {str(e)}")
+
+
+class ReusePreviousDocumentsArgs(BaseModel):
+    """No arguments needed – the documents of the previous answer are already in state."""
+
+
+@tool(
+    description=(
+        "Answer a follow-up question from the documents that were already found and checked for the previous question, "
+        "without searching again. Use it only if the question refers to the previous answer or asks for more detail about "
+        "its documents; for a new topic call retrieve_documents."
+    ),
+    args_schema=ReusePreviousDocumentsArgs,
+    parse_docstring=False,
+)
+async def reuse_previous_documents() -> str:
+    """Confirm the reuse of the previous turn's documents.
+
+    The tool itself does nothing: the relevant documents and proposals of the
+    previous turn are still in state and the graph routes straight to the
+    generation pass.  It is only offered to the model on follow-up turns.
+    """
+    return "Die bereits geprüften Dokumente der vorherigen Antwort werden wiederverwendet."
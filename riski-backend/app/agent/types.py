@@ -17,6 +17,8 @@ class AgentContext(TypedDict):
     force_vectorstore_timeout: bool
     force_db_timeout: bool
     force_llm_timeout: bool
+    state_snippet_max_tokens: int
+    retrieval_filters: bool
 
 
 NO_RESULTS_RESPONSE: str = json.dumps(
@@ -38,6 +40,13 @@ SYSTEM_PROMPT: str = (
     "You MUST always call the retrieve_documents tool before answering a question."
 )
 
+FOLLOWUP_DOCUMENTS_PROMPT_TEMPLATE: str = (
+    "The previous question was answered with the following documents, which were already checked for relevance:\n"
+    "{documents}\n\n"
+    "If the new question only refers to the previous answer or asks for more detail about these documents, "
+    "call reuse_previous_documents instead of retrieve_documents. For a new topic, call retrieve_documents."
+)
+
 CHECK_DOCUMENT_SYSTEM_PROMPT: str = "Du bist ein Relevanz-Prüfer. Bewerte ob ein Dokument relevant für eine Benutzeranfrage ist."
 
 CHECK_DOCUMENT_PROMPT_TEMPLATE: str = (
@@ -48,6 +57,15 @@ CHECK_DOCUMENT_PROMPT_TEMPLATE: str = (
     "Ist dieses Dokument relevant für die Anfrage?"
 )
 
+CHECK_DOCUMENTS_BATCH_PROMPT_TEMPLATE: str = (
+    "Prüfe für jedes der folgenden Dokumente, ob es für die Benutzeranfrage relevant ist.\n\n"
+    "Benutzeranfrage: {user_query}\n\n"
+    "{documents}\n\n"
+    "Gib für jedes Dokument genau ein Urteil zurück und übernimm dabei die Dokument-ID unverändert."
+)
+
+CHECK_DOCUMENTS_BATCH_ENTRY_TEMPLATE: str = "Dokument-ID: {doc_id}\nDokumentname: {doc_name}\nDokumentinhalt (Auszug):\n{snippet}\n---"
+
 AGENT_CAPABILITIES_PROMPT: str = (
     "Der RISKI Agent hilft bei der Recherche und Analyse von Dokumenten und Beschlussvorlagen "
     "aus dem Rats-Informations-System (RIS) der Stadt München.\n\n"
@@ -103,6 +121,20 @@ class DocumentRelevanceVerdict(BaseModel):
     reason: str = Field(description="Brief reason for the relevance decision (1-2 sentences, in German).")
 
 
+class DocumentRelevanceBatchItem(BaseModel):
+    """LLM verdict for one document of a batched relevance check."""
+
+    doc_id: str = Field(description="The document id exactly as given in the prompt.")
+    relevant: bool = Field(description="True if the document is relevant to the user's query.")
+    reason: str = Field(description="Brief reason for the relevance decision (1-2 sentences, in German).")
+
+
+class DocumentRelevanceBatchVerdict(BaseModel):
+    """LLM verdicts for several documents checked in a single call."""
+
+    verdicts: list[DocumentRelevanceBatchItem] = Field(description="One verdict per document in the prompt.")
+
+
 class SuggestionsResponse(BaseModel):
     """LLM-generated alternative search query suggestions."""
 
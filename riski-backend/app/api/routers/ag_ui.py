@@ -1,13 +1,21 @@
-from typing import Any, AsyncGenerator
+import asyncio
+from typing import Any, AsyncGenerator, AsyncIterator, TypeVar
 
-from ag_ui.core import RunErrorEvent
+import jsonpatch
+from ag_ui.core import EventType, RunErrorEvent, StateDeltaEvent
 from ag_ui.core.types import RunAgentInput
 from ag_ui.encoder import EventEncoder
 from ag_ui_langgraph import LangGraphAgent
 from ag_ui_langgraph.agent import ProcessedEvents
+from app.agent.admission import with_admission_run
+from app.agent.content_store import with_content_store
+from app.agent.resilient_llm import with_run_deadline
+from app.agent.speculative_retrieval import with_speculative_retrieval
 from app.agent.state import ErrorInfo, RelevanceUpdate, TrackedDocument, TrackedProposal
+from app.core.metrics import metrics
+from app.core.settings import get_settings
 from app.utils.logging import getLogger
-from fastapi import APIRouter, Request
+from fastapi import APIRouter, HTTPException, Request, status
 from fastapi.responses import StreamingResponse
 from langfuse import observe
 
@@ -15,6 +23,20 @@ router = APIRouter(prefix="/api/ag-ui", tags=["ag-ui"])
 logger = getLogger()
 
 
+def prepare_run_config(config: dict[str, Any]) -> dict[str, Any]:
+    """Return the config of one agent run, derived from the shared agent *config*.
+
+    Each run gets its own ``DocumentContentStore`` that holds the full texts
+    of the retrieved documents outside the graph state, and, if enabled, its
+    own ``SpeculativeRetrieval`` handle and LLM run deadline.  Its LLM calls
+    are queued as one run by the LLM admission controller.
+    """
+    return with_run_deadline(
+        with_admission_run(with_speculative_retrieval(with_content_store(config))),
+        get_settings().llm_resilience.run_budget_seconds,
+    )
+
+
 def _make_request_agent(request: Request) -> LangGraphAgent:
     """Create a fresh ``LangGraphAgent`` instance for each request.
 
@@ -24,14 +46,15 @@ def _make_request_agent(request: Request) -> LangGraphAgent:
     overwritten by whichever coroutine runs last, leading to corrupted
     event streams and errors.  Creating a lightweight wrapper per request
     is safe because the expensive objects (compiled graph, config) are
-    shared by reference from the application-level singleton.
+    shared by reference from the application-level singleton.  The config
+    is prepared per run by ``prepare_run_config``.
     """
     singleton: LangGraphAgent = request.app.state.agent
     return LangGraphAgent(
         name=singleton.name,
         description=singleton.description,
         graph=singleton.graph,
-        config=singleton.config,
+        config=prepare_run_config(singleton.config),
     )
 
 
@@ -42,6 +65,58 @@ async def run_agent_traced(input_data: RunAgentInput, request: Request) -> Async
         yield event
 
 
+_T = TypeVar("_T")
+_END = object()
+
+
+class _RunFailed:
+    def __init__(self, error: Exception) -> None:
+        self.error = error
+
+
+async def cancel_on_disconnect(events: AsyncIterator[_T], request: Request, poll_interval_seconds: float = 1.0) -> AsyncGenerator[_T, None]:
+    """Yield from *events* and cancel the underlying run once the client is gone.
+
+    The run is consumed in its own task.  A watcher polls
+    ``request.is_disconnected()`` so a disconnect is also noticed while the
+    graph is busy and does not emit events (relevance checks, structured
+    generation).  When the client disconnects, or the response stream is
+    closed or cancelled by the server, the run task is cancelled; the
+    ``CancelledError`` propagates into LangGraph, which cancels the
+    in-flight node tasks together with their LLM and database calls.
+    """
+    queue: asyncio.Queue[Any] = asyncio.Queue()
+
+    async def produce() -> None:
+        try:
+            async for event in events:
+                queue.put_nowait(event)
+        except Exception as e:
+            queue.put_nowait(_RunFailed(e))
+        else:
+            queue.put_nowait(_END)
+
+    async def watch() -> None:
+        while not await request.is_disconnected():
+            await asyncio.sleep(poll_interval_seconds)
+        queue.put_nowait(_END)
+
+    producer = asyncio.create_task(produce())
+    watcher = asyncio.create_task(watch())
+    try:
+        while (item := await queue.get()) is not _END:
+            if isinstance(item, _RunFailed):
+                raise item.error
+            yield item
+    finally:
+        watcher.cancel()
+        if not producer.done():
+            producer.cancel()
+            metrics.inc("agent_runs_cancelled_total")
+            logger.info("Client disconnected; cancelled agent run.")
+        await asyncio.gather(producer, watcher, return_exceptions=True)
+
+
 def encode(encoder, event):
     # raw_event = getattr(event, "event", None)
     # event_name = raw_event.get("event") if isinstance(raw_event, dict) else None
@@ -66,6 +141,7 @@ class SnapshotStripper:
 
     def __init__(self) -> None:
         self._cached_docs: list[TrackedDocument] = []
+        self._slim_docs: list[dict[str, Any]] = []
 
     def strip(self, event: ProcessedEvents) -> ProcessedEvents:
         """Reduce STATE_SNAPSHOT payload to a lightweight summary."""
@@ -107,9 +183,12 @@ class SnapshotStripper:
                 slim_messages.append(slim_msg)
 
         # -- Merge tracked_documents with cached state -------------------------
-        raw_docs: list[TrackedDocument | RelevanceUpdate] = snapshot.get("tracked_documents", [])
-        self._merge_docs(raw_docs)
-        slim_docs: list[dict[str, Any]] = [doc.to_slim_dict() for doc in self._cached_docs]
+        raw_docs: list[TrackedDocument | RelevanceUpdate] | None = snapshot.get("tracked_documents", [])
+        if raw_docs is None:
+            # A follow-up turn cleared the documents of the previous turn
+            self._cached_docs, self._slim_docs = [], []
+        elif self._merge_docs(raw_docs):
+            self._slim_docs = [doc.to_slim_dict() for doc in self._cached_docs]
 
         # -- tracked_proposals pass through as model_dump() (already lightweight)
         tracked_proposals: list[TrackedProposal] = snapshot.get("tracked_proposals", [])
@@ -124,7 +203,7 @@ class SnapshotStripper:
 
         event.snapshot = {
             "messages": slim_messages,
-            "tracked_documents": slim_docs,
+            "tracked_documents": self._slim_docs,
             "tracked_proposals": [p.model_dump() for p in tracked_proposals],
             "user_query": snapshot.get("user_query", ""),
             "error_info": error_info_dict,
@@ -133,15 +212,17 @@ class SnapshotStripper:
 
     # ------------------------------------------------------------------
 
-    def _merge_docs(self, raw: list[TrackedDocument | RelevanceUpdate]) -> None:
+    def _merge_docs(self, raw: list[TrackedDocument | RelevanceUpdate]) -> bool:
         """Update the internal document cache.
 
         - If the list contains ``TrackedDocument`` entries, replace the cache.
         - If it contains ``RelevanceUpdate`` entries, patch the cached docs.
         - Mixed / empty lists are handled gracefully.
+
+        Returns ``True`` if the cache was changed.
         """
         if not raw:
-            return
+            return False
 
         updates: list[RelevanceUpdate] = [d for d in raw if isinstance(d, RelevanceUpdate)]
         full_docs: list[TrackedDocument] = [d for d in raw if isinstance(d, TrackedDocument)]
@@ -167,6 +248,87 @@ class SnapshotStripper:
                 patched.append(doc)
             self._cached_docs = patched
 
+        return bool(full_docs or updates)
+
+
+class StateDeltaEmitter:
+    """Turns stripped ``STATE_SNAPSHOT`` events into JSON-Patch ``STATE_DELTA`` events.
+
+    The first snapshot of a stream is sent in full; later ones are replaced by
+    the patch against the last sent state.  Every *snapshot_interval* deltas a
+    full snapshot is sent again so clients can resync.  Snapshots that do not
+    change the state are dropped.  ``snapshot_interval <= 0`` disables deltas.
+
+    The patch only descends into values that changed.  Values that are the
+    same object as in the last sent state (``SnapshotStripper`` reuses its
+    slim document list until the documents change) are skipped without
+    comparing them, and lists of unchanged length are diffed element by
+    element.
+    """
+
+    def __init__(self, snapshot_interval: int = 20) -> None:
+        self._snapshot_interval = snapshot_interval
+        self._last_state: dict[str, Any] | None = None
+        self._deltas_since_snapshot = 0
+
+    def convert(self, event: ProcessedEvents) -> ProcessedEvents | StateDeltaEvent | None:
+        """Return the event to send for *event*, or ``None`` if nothing changed."""
+        snapshot = getattr(event, "snapshot", None)
+        if getattr(event, "type", None) != "STATE_SNAPSHOT" or not isinstance(snapshot, dict):
+            return event
+
+        if self._last_state is None or self._snapshot_interval <= 0 or self._deltas_since_snapshot >= self._snapshot_interval:
+            self._last_state = snapshot
+            self._deltas_since_snapshot = 0
+            return event
+
+        operations = self._diff(self._last_state, snapshot)
+        self._last_state = snapshot
+        if not operations:
+            return None
+        self._deltas_since_snapshot += 1
+        # The operations are validated into the typed JSON-Patch models of ag-ui
+        return StateDeltaEvent.model_validate({"type": EventType.STATE_DELTA, "delta": operations})
+
+    @staticmethod
+    def _diff(old: dict[str, Any], new: dict[str, Any]) -> list[dict[str, Any]]:
+        """Return the JSON-Patch operations that turn *old* into *new*."""
+        operations: list[dict[str, Any]] = []
+        _diff_into(operations, "", old, new)
+        return operations
+
+
+def _diff_into(operations: list[dict[str, Any]], path: str, old: Any, new: Any) -> None:
+    """Append the operations that turn *old* at *path* into *new*, descending only into changed values."""
+    if old is new or old == new:
+        return
+    if isinstance(old, dict) and isinstance(new, dict):
+        for key in old:
+            if key not in new:
+                operations.append({"op": "remove", "path": f"{path}/{_escape(key)}"})
+        for key, value in new.items():
+            if key in old:
+                _diff_into(operations, f"{path}/{_escape(key)}", old[key], value)
+            else:
+                operations.append({"op": "add", "path": f"{path}/{_escape(key)}", "value": value})
+    elif isinstance(old, list) and isinstance(new, list) and len(old) == len(new):
+        for index, (previous, value) in enumerate(zip(old, new)):
+            _diff_into(operations, f"{path}/{index}", previous, value)
+    elif isinstance(old, list) and isinstance(new, list):
+        # Lists that grew or shrank (messages, documents of a new search)
+        for operation in jsonpatch.make_patch(old, new).patch:
+            operation["path"] = path + operation["path"]
+            if "from" in operation:
+                operation["from"] = path + operation["from"]
+            operations.append(operation)
+    else:
+        operations.append({"op": "replace", "path": path, "value": new})
+
+
+def _escape(key: str) -> str:
+    """Escape *key* for use in a JSON Pointer (RFC 6901)."""
+    return key.replace("~", "~0").replace("/", "~1")
+
 
 def _get_langgraph_node(event: Any) -> str | None:
     """Return the ``langgraph_node`` metadata value for a raw event, or ``None``."""
@@ -179,17 +341,21 @@ def _get_langgraph_node(event: Any) -> str | None:
     return metadata.get("langgraph_node")
 
 
+_CHECK_DOCUMENT_NODES = {"check_document", "check_documents_batch", "check_documents_early_exit"}
+
+
 def _is_check_document_node(event: Any) -> bool:
     """Return True for non-snapshot events from check_document nodes.
 
     We want to suppress ``STEP_STARTED`` / ``STEP_FINISHED`` for
-    ``check_document`` (they create UI noise) but we must **not** suppress
-    ``STATE_SNAPSHOT`` events – the ``SnapshotStripper`` needs them to
-    accumulate each ``RelevanceUpdate`` incrementally.
+    ``check_document`` and ``check_documents_batch`` (they create UI noise)
+    but we must **not** suppress ``STATE_SNAPSHOT`` events – the
+    ``SnapshotStripper`` needs them to accumulate each ``RelevanceUpdate``
+    incrementally.
     """
     if getattr(event, "type", None) == "STATE_SNAPSHOT":
         return False
-    return _get_langgraph_node(event) == "check_document"
+    return _get_langgraph_node(event) in _CHECK_DOCUMENT_NODES
 
 
 _TEXT_MESSAGE_TYPES = {"TEXT_MESSAGE_START", "TEXT_MESSAGE_CONTENT", "TEXT_MESSAGE_END"}
@@ -198,12 +364,24 @@ _TEXT_MESSAGE_TYPES = {"TEXT_MESSAGE_START", "TEXT_MESSAGE_CONTENT", "TEXT_MESSA
 # - First model pass (no tool call yet): may stream text before routing to guard → suppress.
 # - Guard node (e.g. ``_generate_suggestions``): internal LLM call → suppress.
 # - Capabilities / final model pass after a tool call: real answer → allow.
+# - Messages emitted as a whole (cached answers, ``manually_emit_message``): always allowed.
 _TEXT_MESSAGE_ALLOWED_NODES = {"model"}
 
 
+def _is_manually_emitted_message(event: Any) -> bool:
+    """Return True for text message events of a ``manually_emit_message`` custom event."""
+    raw_event = getattr(event, "raw_event", None)
+    return isinstance(raw_event, dict) and raw_event.get("event") == "on_custom_event" and raw_event.get("name") == "manually_emit_message"
+
+
 @router.post("/riskiagent", response_class=StreamingResponse)
 async def invoke_riski_agent(input_data: RunAgentInput, request: Request) -> StreamingResponse:
     """Stream LangGraph events back to AG-UI clients."""
+    if getattr(request.app.state, "agent", None) is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Der RISKI Agent wird gerade gestartet. Bitte versuchen Sie es in Kürze erneut.",
+        )
 
     encoder = EventEncoder(accept=request.headers.get("accept", ""))
     allowed_types = {
@@ -215,6 +393,7 @@ async def invoke_riski_agent(input_data: RunAgentInput, request: Request) -> Str
         "TOOL_CALL_ARGS",
         "TOOL_CALL_END",
         "STATE_SNAPSHOT",
+        "STATE_DELTA",
         "TEXT_MESSAGE_CONTENT",
         "TEXT_MESSAGE_START",
         "TEXT_MESSAGE_END",
@@ -224,21 +403,28 @@ async def invoke_riski_agent(input_data: RunAgentInput, request: Request) -> Str
     strip_raw_event_types = {*text_message_types, "TOOL_CALL_ARGS"}
 
     snapshot_stripper = SnapshotStripper()
+    settings = get_settings()
+    state_delta_emitter = StateDeltaEmitter(snapshot_interval=settings.state_snapshot_interval)
 
     async def event_generator() -> AsyncGenerator[bytes, None]:
         tool_call_seen = False
         try:
-            async for event in run_agent_traced(input_data, request):
+            async for event in cancel_on_disconnect(
+                run_agent_traced(input_data, request), request, settings.disconnect_poll_interval_seconds
+            ):
                 if event.type == "TOOL_CALL_START":
                     tool_call_seen = True
                 if _is_check_document_node(event) or (
                     getattr(event, "type", None) in _TEXT_MESSAGE_TYPES
+                    and not _is_manually_emitted_message(event)
                     and (not tool_call_seen or _get_langgraph_node(event) not in _TEXT_MESSAGE_ALLOWED_NODES)
                 ):
                     continue
                 if event.type in allowed_types:
                     if event.type == "STATE_SNAPSHOT":
-                        event = snapshot_stripper.strip(event)
+                        event = state_delta_emitter.convert(snapshot_stripper.strip(event))
+                        if event is None:
+                            continue
                     if event.type in strip_raw_event_types:
                         event.raw_event = None
                     yield encode(encoder=encoder, event=event)
@@ -0,0 +1,137 @@
+import asyncio
+import json
+import time
+import uuid
+from typing import Any, AsyncGenerator, AsyncIterator
+
+from app.agent.state import ErrorInfo, TrackedDocument, TrackedProposal
+from app.api.routers.ag_ui import cancel_on_disconnect, prepare_run_config
+from app.core.metrics import metrics
+from app.core.settings import get_settings
+from app.models.batch_request import BatchQuestion, BatchRequest
+from app.models.batch_result import BatchResult
+from app.utils.logging import getLogger
+from fastapi import APIRouter, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from langgraph.graph.state import CompiledStateGraph
+
+router = APIRouter(prefix="/api/batch", tags=["batch"])
+logger = getLogger()
+
+
+def _result(index: int, question: BatchQuestion, state: dict[str, Any], seconds: float) -> BatchResult:
+    """Build the result of one question from the final graph state."""
+    error_info: ErrorInfo | None = state.get("error_info")
+    documents: list[TrackedDocument] = state.get("tracked_documents", [])
+    proposals: list[TrackedProposal] = state.get("tracked_proposals", [])
+    answer: dict[str, Any] | None = None
+    last_message = state["messages"][-1] if state.get("messages") else None
+    if error_info is None and isinstance(last_message, AIMessage) and not last_message.tool_calls:
+        content = last_message.content if isinstance(last_message.content, str) else str(last_message.content)
+        try:
+            answer = json.loads(content)
+        except ValueError:
+            pass
+        if not isinstance(answer, dict):
+            # Plain-text answer, e.g. of get_agent_capabilities
+            answer = {"response": content}
+        elif "error" in answer:
+            # Safe response of a failed structured generation
+            error_info, answer = ErrorInfo(error_type=answer["error"], message=answer.get("response", "")), None
+    return BatchResult(
+        index=index,
+        id=question.id,
+        question=question.question,
+        answer=answer,
+        documents=[doc.to_slim_dict() for doc in documents],
+        proposals=[proposal.model_dump() for proposal in proposals],
+        error=error_info.model_dump() if error_info is not None else None,
+        seconds=round(seconds, 3),
+    )
+
+
+async def answer_question(graph: CompiledStateGraph, config: dict[str, Any], index: int, question: BatchQuestion) -> BatchResult:
+    """Answer one question in a new thread of *graph*; failures are returned as the result's error."""
+    thread_id = f"batch-{uuid.uuid4()}"
+    base_config = prepare_run_config(config)
+    run_config: RunnableConfig = {**base_config, "configurable": {**base_config.get("configurable", {}), "thread_id": thread_id}}
+    started = time.monotonic()
+    try:
+        state = await graph.ainvoke({"messages": [HumanMessage(content=question.question)]}, run_config)
+        result = _result(index, question, state, time.monotonic() - started)
+    except Exception as e:
+        logger.error("Batch question %d failed: %s", index, e, exc_info=True)
+        metrics.inc("batch_questions_failed_total")
+        result = BatchResult(
+            index=index,
+            id=question.id,
+            question=question.question,
+            error=ErrorInfo(error_type="internal_error", message="Ein interner Fehler ist aufgetreten.").model_dump(),
+            seconds=round(time.monotonic() - started, 3),
+        )
+    finally:
+        if isinstance(graph.checkpointer, BaseCheckpointSaver):
+            # Batch threads are never continued
+            try:
+                await graph.checkpointer.adelete_thread(thread_id)
+            except Exception:
+                logger.debug("Could not delete batch thread %s.", thread_id, exc_info=True)
+    metrics.inc("batch_questions_total")
+    return result
+
+
+async def answer_questions(
+    graph: CompiledStateGraph, config: dict[str, Any], questions: list[BatchQuestion], max_concurrency: int
+) -> AsyncIterator[BatchResult]:
+    """Answer *questions* with at most *max_concurrency* at a time and yield the results as they finish.
+
+    Every question is a separate run; the caches and the LLM admission
+    control in *config* are shared with all other runs of the backend.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def answer(index: int, question: BatchQuestion) -> BatchResult:
+        async with semaphore:
+            return await answer_question(graph, config, index, question)
+
+    tasks = [asyncio.create_task(answer(index, question)) for index, question in enumerate(questions)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+@router.post(
+    "/questions",
+    response_class=StreamingResponse,
+    responses={status.HTTP_200_OK: {"content": {"application/x-ndjson": {}}, "description": "One BatchResult per line."}},
+)
+async def answer_batch(batch: BatchRequest, request: Request) -> StreamingResponse:
+    """Answer many questions without event streaming; the results are returned as JSON Lines in completion order."""
+    agent = getattr(request.app.state, "agent", None)
+    if agent is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Der RISKI Agent wird gerade gestartet. Bitte versuchen Sie es in Kürze erneut.",
+        )
+    settings = get_settings()
+    if len(batch.questions) > settings.batch_max_questions:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Es können höchstens {settings.batch_max_questions} Fragen auf einmal beantwortet werden.",
+        )
+    max_concurrency = min(batch.max_concurrency or settings.batch_max_concurrency, settings.batch_max_concurrency)
+    logger.info("Answering a batch of %d questions with concurrency %d.", len(batch.questions), max_concurrency)
+
+    async def lines() -> AsyncGenerator[bytes, None]:
+        results = answer_questions(agent.graph, agent.config, batch.questions, max_concurrency)
+        async for result in cancel_on_disconnect(results, request, settings.disconnect_poll_interval_seconds):
+            yield (result.model_dump_json() + "\n").encode()
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
@@ -1,19 +1,44 @@
+from app.core.metrics import metrics
+from app.core.readiness import Readiness
 from app.core.settings import get_settings
 from app.models.config_response import ConfigResponse
 from app.models.health_check_response import HealthCheckResponse
-from fastapi import APIRouter
+from app.models.metrics_response import MetricsResponse
+from app.models.readiness_response import ReadinessResponse
+from fastapi import APIRouter, Request, Response, status
 
 settings = get_settings()
 
 router = APIRouter(prefix="/api", tags=["system"])
 
 
-@router.get("/healthz", response_model=HealthCheckResponse)
-def healthz() -> HealthCheckResponse:
-    """Health check endpoint for backend availability and version info."""
+@router.get(
+    "/healthz",
+    response_model=HealthCheckResponse,
+    responses={status.HTTP_503_SERVICE_UNAVAILABLE: {"model": HealthCheckResponse, "description": "The startup has failed for good."}},
+)
+def healthz(request: Request, response: Response) -> HealthCheckResponse:
+    """Health check endpoint for backend availability and version info; returns 503 once the startup has failed for good."""
+    readiness: Readiness | None = getattr(request.app.state, "readiness", None)
+    if readiness is not None and readiness.has_failed:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+        return HealthCheckResponse(status="failed", version=settings.version)
     return HealthCheckResponse(version=settings.version)
 
 
+@router.get(
+    "/readyz",
+    response_model=ReadinessResponse,
+    responses={status.HTTP_503_SERVICE_UNAVAILABLE: {"model": ReadinessResponse, "description": "The backend is not ready."}},
+)
+def readyz(request: Request, response: Response) -> ReadinessResponse:
+    """Readiness endpoint; returns 503 until the agent has been initialized."""
+    readiness: Readiness = request.app.state.readiness
+    if not readiness.is_ready:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return ReadinessResponse(status=readiness.status, startup_seconds=readiness.startup_seconds, error=readiness.error)
+
+
 @router.get("/config", response_model=ConfigResponse)
 def get_config() -> ConfigResponse:
     """Get application configuration."""
@@ -26,3 +51,10 @@ def get_config() -> ConfigResponse:
         impressum_url=settings.impressum_url,
         townhallbulletin_url=settings.townhallbulletin_url,
     )
+
+
+@router.get("/metrics", response_model=MetricsResponse)
+def get_metrics() -> MetricsResponse:
+    """Get operational counters and gauges of this backend process."""
+    counters, gauges = metrics.snapshot()
+    return MetricsResponse(counters=counters, gauges=gauges)
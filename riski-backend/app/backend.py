@@ -1,14 +1,21 @@
 # FastAPI backend creation
+import asyncio
 from contextlib import asynccontextmanager
 
-from app.agent import build_agent
+from app.agent import build_agent, create_prompt_manager
+from app.agent.coalescing import CoalescingEmbeddings
+from app.agent.prompt_cache import PromptCache
 from app.api.routers.ag_ui import router as ag_ui_router
+from app.api.routers.batch import router as batch_router
 from app.api.routers.system import router as systems_router
-from app.core.observer import setup_langfuse
+from app.core.http_client import create_http_client, prewarm_connections
+from app.core.observer import check_langfuse, setup_langfuse
+from app.core.readiness import Readiness
 from app.core.settings import BackendSettings, get_settings
 from app.utils.logging import getLogger
 from core.genai import create_embedding_model
 from fastapi import FastAPI
+from httpx import AsyncClient
 from langchain_postgres import PGEngine, PGVectorStore
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.asyncio.engine import AsyncEngine
@@ -24,8 +31,10 @@ def create_app() -> FastAPI:
 
     @asynccontextmanager
     async def lifespan(app: FastAPI):
-        # Setup database connection
+        # Only local setup happens here, so the app answers liveness probes right away.
+        # The agent is initialized in the background and gates readiness (/api/readyz).
         logger.info(msg="Starting up application and creating database handler")
+        app.state.readiness = Readiness()
         db_engine: AsyncEngine = create_async_engine(
             url=settings.core.db.async_database_url.encoded_string(),
             echo=True,
@@ -38,29 +47,76 @@ def create_app() -> FastAPI:
             bind=db_engine,
             expire_on_commit=False,
         )
-        vectorstore, pg_engine = await build_vectorstore(settings, db_engine)
-        logger.info("Database handler created")
-
+        # Shared connection pool of all LLM and embedding clients
+        http_client: AsyncClient = create_http_client(settings.http_client)
         lf_client, lf_callback_handler = setup_langfuse()
-
-        # Build and assign the agent
-        logger.info("Setting up the agent")
-        app.state.agent = await build_agent(
-            vectorstore=vectorstore,
-            db_sessionmaker=db_sessionmaker,
-            callbacks=[lf_callback_handler],
-            lf_client=lf_client,
+        prompt_manager = create_prompt_manager(lf_client, PromptCache(settings.prompt_cache_path))
+        pg_engines: list[PGEngine] = []
+
+        async def initialize_agent() -> None:
+            vectorstore, pg_engine, retrieval_table = await build_vectorstore(settings, db_engine, http_client)
+            pg_engines.append(pg_engine)
+            logger.info("Database handler created")
+
+            # Build and assign the agent
+            logger.info("Setting up the agent")
+            app.state.agent = await build_agent(
+                vectorstore=vectorstore,
+                db_sessionmaker=db_sessionmaker,
+                callbacks=[lf_callback_handler],
+                lf_client=lf_client,
+                http_client=http_client,
+                prompt_manager=prompt_manager,
+                # Filter columns only exist in the retrieval view
+                retrieval_filters=retrieval_table != "file",
+            )
+            logger.info("Agent setup complete")
+
+            # initial db call to establish connection (longer waiting time for first request)
+            logger.info("Running initial DB connection test")
+            async with db_engine.begin() as conn:
+                await conn.execute(text("SELECT 1"))
+
+        async def startup() -> None:
+            delay = settings.startup_retry_delay_seconds
+            for attempt in range(1, settings.startup_max_attempts + 1):
+                try:
+                    await initialize_agent()
+                    break
+                except Exception as e:
+                    if attempt == settings.startup_max_attempts:
+                        logger.error("Startup failed after %d attempts: %s", attempt, e, exc_info=True)
+                        app.state.readiness.mark_failed(e)
+                        return
+                    logger.warning("Startup attempt %d failed: %s; retrying in %.0fs", attempt, e, delay, exc_info=True)
+                    app.state.readiness.record_attempt_failure(e)
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, 60.0)
+            app.state.readiness.mark_ready()
+            logger.info("Setup on startup complete after %.2fs", app.state.readiness.startup_seconds)
+
+            # Remote dependencies that are not needed to serve requests
+            await check_langfuse(lf_client)
+            prompt_manager.start()
+
+        startup_task = asyncio.create_task(startup())
+        # Warm the LLM connections so the first request does not pay TLS handshakes; does not gate readiness
+        prewarm_task = asyncio.create_task(
+            prewarm_connections(
+                http_client,
+                settings.openai_api_base or "https://api.openai.com/v1",
+                settings.http_client.prewarm_connections,
+            )
         )
-        logger.info("Agent setup complete")
-
-        # initial db call to establish connection (longer waiting time for first request)
-        logger.info("Running initial DB connection test")
-        async with db_engine.begin() as conn:
-            await conn.execute(text("SELECT 1"))
-        logger.info("Setup on startup complete")
         yield
-        await pg_engine.close()
+        startup_task.cancel()
+        prewarm_task.cancel()
+        await asyncio.gather(startup_task, prewarm_task, return_exceptions=True)
+        await prompt_manager.aclose()
+        for pg_engine in pg_engines:
+            await pg_engine.close()
         await db_engine.dispose()
+        await http_client.aclose()
 
     app = FastAPI(
         title="RISKI Backend",
@@ -73,24 +129,45 @@ def create_app() -> FastAPI:
 
     app.include_router(systems_router)
     app.include_router(ag_ui_router)
+    app.include_router(batch_router)
 
     return app
 
 
-async def build_vectorstore(settings, db_engine: AsyncEngine) -> tuple[PGVectorStore, PGEngine]:
+FILE_CARD_COLUMNS = ["papers", "meetings"]
+
+
+async def build_vectorstore(
+    settings, db_engine: AsyncEngine, http_client: AsyncClient | None = None
+) -> tuple[PGVectorStore, PGEngine, str]:
+    """Create the vector store on the retrieval view; return it with its engine and the table it searches."""
     pg_engine = PGEngine.from_engine(db_engine)
-    embedding_model = create_embedding_model(settings)
-    vectorstore = await PGVectorStore.create(
-        engine=pg_engine,
-        schema_name=settings.core.db.schemaname,
-        table_name="file",
-        embedding_service=embedding_model,
-        id_column="db_id",
-        content_column="text",
-        embedding_column="embed",
-        metadata_columns=["id", "name", "size"],
-    )
-    return vectorstore, pg_engine
+    # Known models are validated without network; others need a test embedding, so keep it off the event loop
+    embedding_model = await asyncio.to_thread(create_embedding_model, settings, http_client)
+    if settings.request_coalescing:
+        embedding_model = CoalescingEmbeddings(embedding_model)
+
+    async def create(table_name: str, metadata_columns: list[str]) -> PGVectorStore:
+        return await PGVectorStore.create(
+            engine=pg_engine,
+            schema_name=settings.core.db.schemaname,
+            table_name=table_name,
+            embedding_service=embedding_model,
+            id_column="db_id",
+            content_column="text",
+            embedding_column="embed",
+            metadata_columns=metadata_columns,
+        )
+
+    metadata_columns = ["id", "name", "size"]
+    if settings.retrieval_table == "file":
+        return await create("file", metadata_columns), pg_engine, "file"
+    try:
+        # The retrieval view returns the file card of every hit in the same statement as the vector search
+        return await create(settings.retrieval_table, metadata_columns + FILE_CARD_COLUMNS), pg_engine, settings.retrieval_table
+    except ValueError as e:
+        logger.warning("Retrieval view %s is not usable (%s); searching the file table instead.", settings.retrieval_table, e)
+        return await create("file", metadata_columns), pg_engine, "file"
 
 
 backend = create_app()
@@ -0,0 +1,142 @@
+"""Shared HTTP connection pool of the OpenAI-compatible clients.
+
+Every ``ChatOpenAI`` / ``OpenAIEmbeddings`` instance creates its own httpx
+pool unless it is given one.  ``create_http_client`` builds a single
+``httpx.AsyncClient`` with tuned keep-alive limits and timeouts that the
+builder injects into the chat, relevance check, fallback and embedding
+clients, so all of them reuse the same warm connections.
+
+The transport records pool metrics for ``GET /api/metrics``:
+
+* ``http_requests_total`` / ``http_request_errors_total`` (counters),
+* ``http_requests_in_flight`` – requests whose response is not yet fully read,
+* ``http_pool_connections`` / ``http_pool_idle_connections`` – open and idle
+  connections after the last request.
+"""
+
+import asyncio
+from collections.abc import AsyncIterator, Callable
+from logging import Logger
+
+import httpx
+from app.core.metrics import metrics
+from app.core.settings import HttpClientSettings
+from app.utils.logging import getLogger
+
+logger: Logger = getLogger()
+
+
+class _MeteredStream(httpx.AsyncByteStream):
+    """Response body that reports when it has been closed."""
+
+    def __init__(self, stream: httpx.AsyncByteStream, on_close: Callable[[], None]) -> None:
+        self._stream = stream
+        self._on_close: Callable[[], None] | None = on_close
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for part in self._stream:
+            yield part
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            if self._on_close is not None:
+                self._on_close()
+                self._on_close = None
+
+
+class MeteredTransport(httpx.AsyncBaseTransport):
+    """``AsyncHTTPTransport`` wrapper that records request and pool metrics."""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport) -> None:
+        self._transport = transport
+        self._in_flight = 0
+
+    def _request_done(self) -> None:
+        self._in_flight -= 1
+        metrics.set_gauge("http_requests_in_flight", self._in_flight)
+        self._update_pool_gauges()
+
+    def _update_pool_gauges(self) -> None:
+        # httpx does not expose its httpcore pool publicly; skip the gauges if that changes.
+        pool = getattr(self._transport, "_pool", None)
+        connections = getattr(pool, "connections", None)
+        if connections is None:
+            return
+        metrics.set_gauge("http_pool_connections", len(connections))
+        metrics.set_gauge("http_pool_idle_connections", sum(1 for connection in connections if connection.is_idle()))
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        metrics.inc("http_requests_total")
+        self._in_flight += 1
+        metrics.set_gauge("http_requests_in_flight", self._in_flight)
+        try:
+            response = await self._transport.handle_async_request(request)
+        except BaseException:
+            metrics.inc("http_request_errors_total")
+            self._request_done()
+            raise
+        response.stream = _MeteredStream(response.stream, self._request_done)  # type: ignore[arg-type]
+        return response
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+def create_http_client(settings: HttpClientSettings) -> httpx.AsyncClient:
+    """Create the shared async HTTP client of the LLM and embedding clients.
+
+    Parameters
+    ----------
+    settings:
+        Pool limits, timeouts and HTTP/2 flag.  Without the optional ``h2``
+        package HTTP/1.1 is used and a warning is logged.
+    """
+    http2 = settings.http2
+    if http2:
+        try:
+            import h2  # noqa: F401  # ty: ignore[unresolved-import]
+        except ImportError:
+            logger.warning("HTTP/2 requested but the 'h2' package is not installed; using HTTP/1.1.")
+            http2 = False
+
+    limits = httpx.Limits(
+        max_connections=settings.max_connections,
+        max_keepalive_connections=settings.max_keepalive_connections,
+        keepalive_expiry=settings.keepalive_expiry_seconds,
+    )
+    timeout = httpx.Timeout(
+        connect=settings.connect_timeout_seconds,
+        read=settings.read_timeout_seconds,
+        write=settings.read_timeout_seconds,
+        pool=settings.pool_timeout_seconds,
+    )
+    transport = MeteredTransport(httpx.AsyncHTTPTransport(limits=limits, http2=http2))
+    return httpx.AsyncClient(transport=transport, timeout=timeout, follow_redirects=True)
+
+
+async def prewarm_connections(client: httpx.AsyncClient, base_url: str, connections: int) -> int:
+    """Open up to *connections* keep-alive connections to *base_url* before the first user request.
+
+    Sends unauthenticated ``GET {base_url}/models`` requests in parallel; any
+    HTTP response (including 401) leaves a connection with a finished TLS
+    handshake in the pool.  Failures are logged and never raised.
+
+    Returns
+    -------
+    int
+        Number of requests that got a response.
+    """
+    if connections <= 0:
+        return 0
+    url = f"{base_url.rstrip('/')}/models"
+    results = await asyncio.gather(*(client.get(url) for _ in range(connections)), return_exceptions=True)
+    warmed = sum(1 for result in results if isinstance(result, httpx.Response))
+    failures = [result for result in results if isinstance(result, BaseException)]
+    if failures:
+        logger.warning("Pre-warming %d of %d connections to %s failed: %s", len(failures), connections, base_url, failures[0])
+    else:
+        logger.info("Pre-warmed %d connections to %s.", warmed, base_url)
+    metrics.set_gauge("http_prewarmed_connections", warmed)
+    return warmed
@@ -0,0 +1,50 @@
+from collections import defaultdict
+from threading import Lock
+
+
+class MetricsRegistry:
+    """Process-wide counters and gauges exposed via ``/api/metrics``.
+
+    Counters only ever increase; gauges hold the last value that was set.
+    The registry is intentionally tiny – it has no labels or histograms and
+    is meant for a handful of operational numbers per backend process.
+    """
+
+    def __init__(self) -> None:
+        self._lock = Lock()
+        self._counters: defaultdict[str, float] = defaultdict(float)
+        self._gauges: dict[str, float] = {}
+
+    def inc(self, name: str, value: float = 1.0) -> None:
+        """Increase counter *name* by *value*."""
+        with self._lock:
+            self._counters[name] += value
+
+    def set_gauge(self, name: str, value: float) -> None:
+        """Set gauge *name* to *value*."""
+        with self._lock:
+            self._gauges[name] = value
+
+    def counter(self, name: str) -> float:
+        """Return the current value of counter *name* (0 if it was never increased)."""
+        with self._lock:
+            return self._counters.get(name, 0.0)
+
+    def gauge(self, name: str) -> float | None:
+        """Return the current value of gauge *name*, or ``None`` if it was never set."""
+        with self._lock:
+            return self._gauges.get(name)
+
+    def snapshot(self) -> tuple[dict[str, float], dict[str, float]]:
+        """Return copies of all counters and gauges."""
+        with self._lock:
+            return dict(self._counters), dict(self._gauges)
+
+    def reset(self) -> None:
+        """Remove all counters and gauges (used by tests)."""
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+
+
+metrics = MetricsRegistry()
@@ -1,7 +1,9 @@
+import asyncio
 import os
 from logging import Logger
 
 from anyio.functools import lru_cache
+from app.core.metrics import metrics
 from app.utils.logging import getLogger
 from langfuse import Langfuse, get_client
 from langfuse.langchain import CallbackHandler
@@ -11,16 +13,27 @@ logger: Logger = getLogger(__name__)
 
 @lru_cache(maxsize=1)
 def setup_langfuse() -> tuple[Langfuse, CallbackHandler]:
+    """Create the Langfuse client and tracing callback without contacting Langfuse.
+
+    The connection is verified in the background by ``check_langfuse``.
+    """
     langfuse: Langfuse = get_client()
-    # Verify connection
-    if not os.getenv("LOCAL_DEBUG"):
-        try:
-            langfuse.auth_check()
-            logger.info("Langfuse auth check successful.")
-        except Exception as e:
-            logger.error(f"Langfuse auth check failed with the following error {e}. ")
-            raise e
 
     # Initialize Langfuse CallbackHandler for Tracing
     langfuse_handler = CallbackHandler()
     return langfuse, langfuse_handler
+
+
+async def check_langfuse(langfuse: Langfuse) -> bool:
+    """Verify the Langfuse credentials; failures are logged, not raised, so tracing issues never block the backend."""
+    if os.getenv("LOCAL_DEBUG"):
+        return True
+    try:
+        await asyncio.to_thread(langfuse.auth_check)
+    except Exception as e:
+        metrics.set_gauge("langfuse_auth_ok", 0)
+        logger.error(f"Langfuse auth check failed with the following error {e}. ")
+        return False
+    metrics.set_gauge("langfuse_auth_ok", 1)
+    logger.info("Langfuse auth check successful.")
+    return True
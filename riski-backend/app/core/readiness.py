@@ -0,0 +1,49 @@
+"""Readiness of the backend, separate from liveness.
+
+The lifespan of the app returns right away and initializes the agent in the
+background, so ``/api/healthz`` (liveness) answers immediately.
+``/api/readyz`` answers 503 until the agent is ready.  A failed initialization
+is retried with backoff; once all attempts have failed, ``/api/healthz``
+answers 503 too, so the orchestrator restarts the process.  Remote
+dependencies that are not needed to serve requests (Langfuse auth check,
+prompt refresh, connection pre-warming) never gate readiness.
+"""
+
+import time
+from typing import Literal
+
+from app.core.metrics import metrics
+
+ReadinessStatus = Literal["starting", "ready", "failed"]
+
+
+class Readiness:
+    """Startup state of the backend process."""
+
+    def __init__(self) -> None:
+        self.status: ReadinessStatus = "starting"
+        self.error: str | None = None
+        self._started = time.monotonic()
+        self.startup_seconds: float | None = None
+
+    @property
+    def is_ready(self) -> bool:
+        return self.status == "ready"
+
+    def mark_ready(self) -> None:
+        self.status = "ready"
+        self.startup_seconds = time.monotonic() - self._started
+        metrics.set_gauge("startup_seconds", self.startup_seconds)
+
+    @property
+    def has_failed(self) -> bool:
+        return self.status == "failed"
+
+    def record_attempt_failure(self, error: BaseException) -> None:
+        """Record the error of a startup attempt that will be retried."""
+        self.error = f"{type(error).__name__}: {error}"
+        metrics.inc("startup_failed_attempts_total")
+
+    def mark_failed(self, error: BaseException) -> None:
+        self.status = "failed"
+        self.error = f"{type(error).__name__}: {error}"
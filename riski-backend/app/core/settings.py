@@ -11,34 +11,44 @@ from core.settings.base import AppBaseSettings
 
 class InMemoryCheckpointerSettings(BaseModel):
     type: Literal["in_memory"] = "in_memory"
+    max_threads: int | None = Field(
+        default=1000,
+        ge=1,
+        description="Maximum number of conversation threads kept in memory; least recently used threads are evicted. Unset for no limit.",
+    )
+    max_megabytes: int | None = Field(
+        default=256,
+        ge=1,
+        description="Maximum serialised size of all checkpoints in MiB; least recently used threads are evicted. Unset for no limit.",
+    )
+    ttl_minutes: int | None = Field(
+        default=720,
+        ge=1,
+        description="Threads idle for longer than this are evicted. Unset for no TTL.",
+    )
 
 
-class RedisCheckpointerSettings(BaseModel):
-    type: Literal["redis"] = "redis"
+class RedisConnectionSettings(BaseModel):
     host: str = Field(
         default="localhost",
-        description="Redis host for checkpointer",
+        description="Redis host",
     )
     port: int = Field(
         default=6379,
-        description="Redis port for checkpointer",
+        description="Redis port",
     )
     db: int = Field(
         default=0,
-        description="Redis database number for checkpointer",
+        description="Redis database number",
     )
     password: SecretStr | None = Field(
         default=None,
-        description="Redis password for checkpointer",
+        description="Redis password",
     )
     secure: bool = Field(
         default=False,
         description="Use SSL/TLS for Redis connection",
     )
-    ttl_minutes: int = Field(
-        default=720,
-        description="TTL for checkpoints in minutes",
-    )
 
     @property
     def redis_url(self) -> RedisDsn:
@@ -55,6 +65,226 @@ class RedisCheckpointerSettings(BaseModel):
         )
 
 
+class RedisCheckpointerSettings(RedisConnectionSettings):
+    type: Literal["redis"] = "redis"
+    ttl_minutes: int = Field(
+        default=720,
+        description="TTL for checkpoints in minutes",
+    )
+    compression: bool = Field(
+        default=True,
+        description="Store channel values compressed and large strings deduplicated per thread (CompactShallowRedisSaver).",
+    )
+    blob_min_chars: int = Field(
+        default=1024,
+        ge=1,
+        description="Strings of at least this many characters are stored once per thread by content hash.",
+    )
+    codec: Literal["zstd", "zlib"] = Field(
+        default="zstd",
+        description="Compression codec of stored checkpoints. All replicas must use the same codec.",
+    )
+
+
+class RelevanceCacheSettings(BaseModel):
+    enabled: bool = Field(
+        default=True,
+        description="Cache relevance verdicts of the guard so repeated questions skip the relevance LLM call.",
+    )
+    max_entries: int = Field(
+        default=5000,
+        ge=0,
+        description="Maximum number of verdicts kept in the in-process cache.",
+    )
+    ttl_minutes: int = Field(
+        default=1440,
+        ge=1,
+        description="TTL for cached verdicts in minutes",
+    )
+    redis: RedisConnectionSettings | None = Field(
+        default=None,
+        description="Optional Redis connection used as a cache shared between backend instances.",
+    )
+
+
+class AnswerCacheSettings(BaseModel):
+    enabled: bool = Field(
+        default=False,
+        description="Answer recurring first questions of a thread from a semantic cache of earlier answers.",
+    )
+    min_similarity: float = Field(
+        default=0.95,
+        gt=0,
+        le=1,
+        description="Minimum cosine similarity between the question and a cached question for a hit.",
+    )
+    max_entries: int = Field(
+        default=256,
+        ge=1,
+        description="Maximum number of cached answers.",
+    )
+    ttl_minutes: int = Field(
+        default=60,
+        ge=1,
+        description="TTL for cached answers in minutes.",
+    )
+
+
+class CrossEncoderSettings(BaseModel):
+    model: str = Field(
+        default="cross-encoder/mmarco-mMiniLMv2-L12-H384-v1",
+        description="Hugging Face name or local path of the multilingual cross-encoder model.",
+    )
+    max_length: int = Field(
+        default=512,
+        ge=16,
+        description="Maximum number of tokens per (query, document) pair.",
+    )
+    batch_size: int = Field(
+        default=32,
+        ge=1,
+        description="Batch size of the forward pass.",
+    )
+    accept_threshold: float = Field(
+        default=0.8,
+        ge=0.0,
+        le=1.0,
+        description="Documents scoring at or above this value are accepted without an LLM check.",
+    )
+    reject_threshold: float = Field(
+        default=0.2,
+        ge=0.0,
+        le=1.0,
+        description="Documents scoring at or below this value are rejected without an LLM check.",
+    )
+
+    @model_validator(mode="after")
+    def validate_thresholds(self) -> "CrossEncoderSettings":
+        """Validate that the reject threshold does not exceed the accept threshold."""
+        if self.reject_threshold > self.accept_threshold:
+            raise ValueError(f"reject_threshold ({self.reject_threshold}) must be <= accept_threshold ({self.accept_threshold}).")
+        return self
+
+
+class LLMResilienceSettings(BaseModel):
+    hedge: bool = Field(
+        default=False,
+        description="Send a duplicate LLM request when a call is slower than the observed latency quantile.",
+    )
+    hedge_quantile: float = Field(
+        default=0.95,
+        gt=0.0,
+        le=1.0,
+        description="Latency quantile after which a hedged request is sent.",
+    )
+    hedge_min_samples: int = Field(
+        default=20,
+        ge=1,
+        description="Number of observed calls per model before hedging starts.",
+    )
+    hedge_min_delay_seconds: float = Field(
+        default=1.0,
+        ge=0.0,
+        description="Lower bound of the hedge delay.",
+    )
+    run_budget_seconds: float | None = Field(
+        default=None,
+        gt=0,
+        description="Deadline for all LLM calls of one agent run; unset disables the deadline.",
+    )
+    fallback_chat_model: str | None = Field(
+        default=None,
+        description="Model used for chat calls when the run budget is nearly spent.",
+    )
+    fallback_relevance_check_model: str | None = Field(
+        default=None,
+        description="Model used for relevance checks when the run budget is nearly spent.",
+    )
+    fallback_when_remaining_seconds: float = Field(
+        default=15.0,
+        ge=0.0,
+        description="Switch to the fallback model when less than this much of the run budget is left.",
+    )
+
+
+class LLMAdmissionSettings(BaseModel):
+    enabled: bool = Field(
+        default=True,
+        description="Queue LLM calls of all runs in a process-wide admission controller with per-pool budgets.",
+    )
+    chat: int = Field(
+        default=16,
+        ge=1,
+        description="Maximum concurrent chat model calls (first pass and answer generation).",
+    )
+    relevance: int = Field(
+        default=32,
+        ge=1,
+        description="Maximum concurrent relevance check calls.",
+    )
+    suggestions: int = Field(
+        default=4,
+        ge=1,
+        description="Maximum concurrent calls generating search suggestions.",
+    )
+    max_concurrent: int | None = Field(
+        default=48,
+        ge=1,
+        description="Maximum concurrent LLM calls of all pools together; unset only applies the pool budgets.",
+    )
+    redis: RedisConnectionSettings | None = Field(
+        default=None,
+        description="Optional Redis connection to apply the pool budgets to all backend instances together.",
+    )
+    lease_seconds: float = Field(
+        default=300.0,
+        gt=0,
+        description="Lifetime of a slot held in Redis, so slots of a crashed instance are freed.",
+    )
+
+
+class HttpClientSettings(BaseModel):
+    max_connections: int = Field(
+        default=100,
+        ge=1,
+        description="Maximum number of concurrent connections of the shared HTTP client of the LLM and embedding clients.",
+    )
+    max_keepalive_connections: int = Field(
+        default=20,
+        ge=0,
+        description="Maximum number of idle keep-alive connections kept in the pool.",
+    )
+    keepalive_expiry_seconds: float = Field(
+        default=60.0,
+        gt=0,
+        description="Idle connections are closed after this time.",
+    )
+    connect_timeout_seconds: float = Field(
+        default=5.0,
+        gt=0,
+        description="Timeout for establishing a connection (including TLS).",
+    )
+    read_timeout_seconds: float = Field(
+        default=120.0,
+        gt=0,
+        description="Timeout between two received chunks of a response.",
+    )
+    pool_timeout_seconds: float = Field(
+        default=10.0,
+        gt=0,
+        description="Timeout for waiting for a free connection of the pool.",
+    )
+    http2: bool = Field(
+        default=False,
+        description="Use HTTP/2 (requires the 'h2' package; falls back to HTTP/1.1 if it is missing).",
+    )
+    prewarm_connections: int = Field(
+        default=2,
+        ge=0,
+        description="Number of connections opened to the LLM endpoint on startup; 0 disables pre-warming.",
+    )
+
+
 class BackendSettings(AppBaseSettings):
     """
     Application settings for the riski-backend.
@@ -122,6 +352,16 @@ class BackendSettings(AppBaseSettings):
         validation_alias="LANGFUSE_CHECK_DOCUMENT_PROMPT_LABEL",
         description="Langfuse check document prompt label",
     )
+    langfuse_check_documents_batch_prompt_name: str = Field(
+        default="check_documents_batch",
+        validation_alias="LANGFUSE_CHECK_DOCUMENTS_BATCH_PROMPT_NAME",
+        description="Langfuse prompt name of the batched relevance check (only used in 'batched' check mode)",
+    )
+    langfuse_check_documents_batch_prompt_label: str = Field(
+        default="production",
+        validation_alias="LANGFUSE_CHECK_DOCUMENTS_BATCH_PROMPT_LABEL",
+        description="Langfuse prompt label of the batched relevance check",
+    )
     langfuse_agent_capabilities_prompt_name: str = Field(
         default="agent_capabilities",
         validation_alias="LANGFUSE_AGENT_CAPABILITIES_PROMPT_NAME",
@@ -139,6 +379,14 @@ class BackendSettings(AppBaseSettings):
         default={"type": "in_memory"},
         description="Settings for the agent's checkpointer.",
     )
+    relevance_cache: RelevanceCacheSettings = Field(
+        default_factory=RelevanceCacheSettings,
+        description="Settings for the relevance verdict cache of the guard.",
+    )
+    answer_cache: AnswerCacheSettings = Field(
+        default_factory=AnswerCacheSettings,
+        description="Settings for the semantic cache of final answers.",
+    )
     # === Server Settings ===
     server_host: str = Field(
         default="localhost",
@@ -173,11 +421,27 @@ class BackendSettings(AppBaseSettings):
         description="Total asyncio timeout for vector store similarity search (seconds).",
     )
 
+    retrieval_table: str = Field(
+        default="file_retrieval",
+        description="Table or view searched by the vector store. The default view (created by riski-core) adds the "
+        "file cards with papers and meetings to every hit; 'file' searches the plain file table.",
+    )
+
     db_connect_timeout_seconds: int = Field(
         default=30,
         ge=1,
         description="Timeout for establishing a new database connection (seconds).",
     )
+    startup_max_attempts: int = Field(
+        default=5,
+        ge=1,
+        description="Attempts to initialize the agent on startup. After the last failed attempt /api/healthz returns 503.",
+    )
+    startup_retry_delay_seconds: float = Field(
+        default=2.0,
+        gt=0,
+        description="Delay before the second startup attempt; doubled for every further attempt (at most 60 seconds).",
+    )
 
     @model_validator(mode="after")
     def validate_db_timeouts(self) -> "BackendSettings":
@@ -197,6 +461,183 @@ class BackendSettings(AppBaseSettings):
         validation_alias="RISKI_BACKEND__CHECK_DOCUMENT_MAX_CONCURRENCY",
     )
 
+    state_snapshot_interval: int = Field(
+        default=20,
+        ge=0,
+        description="State updates are streamed as JSON-Patch STATE_DELTA events; every N deltas a full STATE_SNAPSHOT "
+        "is sent for resync. 0 sends full snapshots only.",
+    )
+
+    disconnect_poll_interval_seconds: float = Field(
+        default=1.0,
+        gt=0,
+        description="How often a running agent stream checks whether the client has disconnected; the run is cancelled then.",
+    )
+
+    request_coalescing: bool = Field(
+        default=True,
+        description="Share query embeddings, vector searches, relevance checks and proposal lookups between concurrent "
+        "requests that need the same result.",
+    )
+
+    batch_max_questions: int = Field(
+        default=1000,
+        ge=1,
+        description="Maximum number of questions of one request to the batch endpoint.",
+    )
+    batch_max_concurrency: int = Field(
+        default=4,
+        ge=1,
+        description="Maximum number of questions of one batch request that are answered at the same time.",
+    )
+
+    followup_document_reuse: bool = Field(
+        default=True,
+        description="Let the model answer follow-up questions from the checked documents of the previous turn "
+        "without a new retrieval and relevance check.",
+    )
+
+    speculative_retrieval: bool = Field(
+        default=False,
+        description="Start the vector search for the user's text in parallel with the first model pass and reuse it "
+        "if the retrieve_documents query matches.",
+    )
+    speculative_retrieval_min_similarity: float = Field(
+        default=0.9,
+        ge=0,
+        le=1,
+        description="Minimum cosine similarity between the embeddings of the user's text and the tool query "
+        "for reusing the speculative search result.",
+    )
+
+    relevance_check_mode: Literal["per_document", "batched", "early_exit"] = Field(
+        default="per_document",
+        description="How the guard checks documents for relevance: one LLM call per document, "
+        "batched calls that judge several documents at once and fall back to per-document checks on failure, "
+        "or per-document calls that stop at a quorum of relevant documents or a deadline (early_exit).",
+    )
+
+    relevance_early_exit_quorum: int | None = Field(
+        default=3,
+        ge=1,
+        description="early_exit mode: start generation once this many documents are relevant; unset waits for all checks.",
+    )
+
+    relevance_early_exit_deadline_seconds: float | None = Field(
+        default=10.0,
+        gt=0,
+        description="early_exit mode: latency budget of the relevance checks; unset disables the deadline.",
+    )
+
+    relevance_early_exit_unfinished_policy: Literal["accept", "reject"] = Field(
+        default="accept",
+        description="early_exit mode: whether documents whose check did not finish are kept for generation or dropped.",
+    )
+
+    relevance_batch_max_tokens: int = Field(
+        default=12_000,
+        ge=1,
+        description="Estimated token budget for the document snippets of a single batched relevance check.",
+    )
+
+    state_snippet_max_tokens: int = Field(
+        default=500,
+        ge=1,
+        description="Token budget of the document snippet kept in the agent state. "
+        "The full document text stays in a request-scoped content store.",
+    )
+
+    relevance_snippet_max_tokens: int = Field(
+        default=2_500,
+        ge=1,
+        description="Token budget of the query-focused snippet that is sent to the relevance check per document.",
+    )
+
+    generation_snippet_max_tokens: int | None = Field(
+        default=3_000,
+        ge=1,
+        description="Token budget of the query-focused snippet per relevant document in the generation prompt. "
+        "Unset sends the full document text.",
+    )
+
+    relevance_backend: Literal["llm", "cross_encoder"] = Field(
+        default="llm",
+        description="Relevance backend of the guard. 'cross_encoder' scores all documents with a local CPU cross-encoder "
+        "and uses the LLM check only for borderline scores.",
+    )
+
+    cross_encoder: CrossEncoderSettings = Field(
+        default_factory=CrossEncoderSettings,
+        description="Settings for the local cross-encoder relevance backend.",
+    )
+
+    llm_resilience: LLMResilienceSettings = Field(
+        default_factory=LLMResilienceSettings,
+        description="Hedging, run deadline and fallback models for the chat and relevance check models.",
+    )
+
+    llm_admission: LLMAdmissionSettings = Field(
+        default_factory=LLMAdmissionSettings,
+        description="Process-wide concurrency budgets and fair queuing of LLM calls.",
+    )
+
+    prompt_cache_path: Path | None = Field(
+        default=Path("prompt_cache/prompts.json"),
+        description="File caching the Langfuse prompts so startup does not wait for Langfuse; refreshed in the background. "
+        "Unset disables the cache.",
+    )
+
+    prompt_refresh_interval_seconds: float | None = Field(
+        default=300.0,
+        gt=0,
+        description="Interval in which the Langfuse prompts are refreshed in the background and swapped into the running agent. "
+        "Unset disables the refresh.",
+    )
+
+    proposal_cache_ttl_seconds: float | None = Field(
+        default=60.0,
+        gt=0,
+        description="How long the proposals linked to a file are cached in-process. Unset disables the cache.",
+    )
+    proposal_cache_max_entries: int = Field(
+        default=10_000,
+        ge=1,
+        description="Maximum number of files whose proposals are cached.",
+    )
+
+    http_client: HttpClientSettings = Field(
+        default_factory=HttpClientSettings,
+        description="Shared HTTP connection pool of all OpenAI-compatible clients.",
+    )
+
+    relevance_auto_accept_max_distance: float | None = Field(
+        default=None,
+        ge=0.0,
+        description="Retrieved documents with a cosine distance at or below this value are accepted without an LLM relevance check. "
+        "Unset disables auto-acceptance.",
+    )
+
+    relevance_auto_reject_min_distance: float | None = Field(
+        default=None,
+        ge=0.0,
+        description="Retrieved documents with a cosine distance at or above this value are dropped without an LLM relevance check. "
+        "Unset disables auto-rejection.",
+    )
+
+    @model_validator(mode="after")
+    def validate_relevance_distance_band(self) -> "BackendSettings":
+        """Validate that the auto-accept threshold lies below the auto-reject threshold."""
+        if (
+            self.relevance_auto_accept_max_distance is not None
+            and self.relevance_auto_reject_min_distance is not None
+            and self.relevance_auto_accept_max_distance >= self.relevance_auto_reject_min_distance
+        ):
+            raise ValueError(
+                f"relevance_auto_accept_max_distance ({self.relevance_auto_accept_max_distance}) must be "
+                f"< relevance_auto_reject_min_distance ({self.relevance_auto_reject_min_distance})."
+            )
+        return self
+
     # === Debug / testing flags ===
     # Set via env var (e.g. RISKI_BACKEND__FORCE_VECTORSTORE_TIMEOUT=true) or config.yaml.
     # These immediately trigger the corresponding timeout path without needing a real
@@ -0,0 +1,19 @@
+from pydantic import BaseModel, Field
+
+
+class BatchQuestion(BaseModel):
+    """A question of a batch request."""
+
+    id: str | None = Field(default=None, description="Optional identifier of the caller, returned with the result.")
+    question: str = Field(min_length=1, description="The question for the agent.", examples=["Welche Anträge gibt es zu Radwegen?"])
+
+
+class BatchRequest(BaseModel):
+    """Request body of the batch question-answering endpoint."""
+
+    questions: list[BatchQuestion] = Field(min_length=1, description="The questions; each one is answered in a new thread.")
+    max_concurrency: int | None = Field(
+        default=None,
+        ge=1,
+        description="Maximum number of questions answered at the same time; capped by the backend's batch_max_concurrency.",
+    )
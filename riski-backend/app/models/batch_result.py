@@ -0,0 +1,18 @@
+from typing import Any
+
+from pydantic import BaseModel, Field
+
+
+class BatchResult(BaseModel):
+    """Result of one question, sent as one JSON line."""
+
+    index: int = Field(description="Position of the question in the request; results arrive in completion order.")
+    id: str | None = Field(default=None, description="Identifier of the question from the request.")
+    question: str = Field(description="The question.")
+    answer: dict[str, Any] | None = Field(
+        default=None, description="The structured answer (response, documents, proposals), or None if the agent gave no answer."
+    )
+    documents: list[dict[str, Any]] = Field(default_factory=list, description="Retrieved documents with their relevance verdicts.")
+    proposals: list[dict[str, Any]] = Field(default_factory=list, description="Proposals linked to the retrieved documents.")
+    error: dict[str, Any] | None = Field(default=None, description="Error information if the question could not be answered.")
+    seconds: float = Field(description="Time taken to answer the question.")
@@ -0,0 +1,8 @@
+from pydantic import BaseModel, Field
+
+
+class MetricsResponse(BaseModel):
+    """Response for the metrics endpoint."""
+
+    counters: dict[str, float] = Field(default_factory=dict, description="Monotonic counters since process start.")
+    gauges: dict[str, float] = Field(default_factory=dict, description="Current values of gauges.")
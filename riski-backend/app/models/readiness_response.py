@@ -0,0 +1,9 @@
+from pydantic import BaseModel, Field
+
+
+class ReadinessResponse(BaseModel):
+    """Response for the readiness endpoint."""
+
+    status: str = Field(description="Startup state of the backend: 'starting', 'ready' or 'failed'.", examples=["ready"])
+    startup_seconds: float | None = Field(default=None, description="Time from process start until the backend was ready.")
+    error: str | None = Field(default=None, description="Error that made the startup fail.")
@@ -0,0 +1,64 @@
+import asyncio
+import contextvars
+from collections.abc import Awaitable, Callable
+from typing import Any, Hashable
+
+from app.core.metrics import metrics
+
+
+class SingleFlight:
+    """Share one in-flight call between concurrent callers with the same key.
+
+    ``do(key, fn)`` runs ``fn()`` unless a call for *key* is already running,
+    in which case the caller awaits that call's result (or exception) instead.
+    Nothing is kept after the call finishes, so this only merges concurrent
+    calls and never returns stale results.  Keys are tuples whose first item
+    names the step; joined calls are counted as ``coalesced_<step>_total``.
+
+    The shared call runs in an empty ``contextvars`` context, detached from
+    the caller that started it.  It therefore inherits none of that caller's
+    LangChain run config (callbacks, metadata such as the run deadline or the
+    admission run), which would otherwise apply to every joined caller.
+
+    A cancelled caller does not cancel the shared call while other callers
+    still wait for it; the call is cancelled with its last caller.  Like
+    ``TTLCache`` this is meant to be used from a single event loop.
+    """
+
+    def __init__(self) -> None:
+        self._calls: dict[Hashable, tuple[asyncio.Task, list[int]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: tuple[Hashable, ...], fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Return the result of ``fn()``, shared with concurrent calls for the same *key*."""
+        call = self._calls.get(key)
+        if call is None:
+            task = asyncio.get_running_loop().create_task(self._run(fn), context=contextvars.Context())
+            call = self._calls[key] = (task, [0])
+            task.add_done_callback(lambda _: self._forget(key, task))
+        else:
+            metrics.inc(f"coalesced_{key[0]}_total")
+        task, waiters = call
+        waiters[0] += 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if not task.done() and waiters[0] == 1:
+                task.cancel()
+            raise
+        finally:
+            waiters[0] -= 1
+
+    @staticmethod
+    async def _run(fn: Callable[[], Awaitable[Any]]) -> Any:
+        # Called inside the task, so ``fn`` itself also runs in the detached context
+        return await fn()
+
+    def _forget(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._calls.get(key, (None,))[0] is task:
+            del self._calls[key]
+        if not task.cancelled():
+            # Retrieved here so a failure nobody awaits any more is not reported as "never retrieved"
+            task.exception()
@@ -0,0 +1,59 @@
+import time
+from collections import OrderedDict
+from typing import Generic, Hashable, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class TTLCache(Generic[K, V]):
+    """Small in-process LRU cache with a per-entry time-to-live.
+
+    Entries expire ``ttl_seconds`` after they were written.  When more than
+    ``max_entries`` entries are stored, the least recently used entry is
+    evicted.  The cache is meant to be used from a single event loop and does
+    not lock.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[K, tuple[float, V]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: K) -> V | None:
+        """Return the cached value for *key*, or ``None`` if missing or expired."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def items(self) -> list[tuple[K, V]]:
+        """Return all entries that have not expired, without changing their LRU order."""
+        now = time.monotonic()
+        for key in [key for key, (expires_at, _) in self._entries.items() if expires_at <= now]:
+            del self._entries[key]
+        return [(key, value) for key, (_, value) in self._entries.items()]
+
+    def pop(self, key: K) -> None:
+        """Remove *key* if present."""
+        self._entries.pop(key, None)
+
+    def set(self, key: K, value: V) -> None:
+        """Store *value* under *key* and evict the least recently used entries if needed."""
+        if self.max_entries <= 0:
+            return
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
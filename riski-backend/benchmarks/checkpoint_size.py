@@ -0,0 +1,149 @@
+"""Measure the bytes written to Redis per agent run with and without ``CompactShallowRedisSaver``.
+
+The script simulates a conversation of several turns.  Every turn performs the
+checkpoint writes of a regular run (input, tool call, tool result, guard,
+answer) with realistic message, artifact and tracked-document sizes.  No Redis
+server is needed: the sizes of the payloads the savers would write are
+computed directly.
+
+Three sizes are reported per run: the plain checkpoint, the deduplicated but
+uncompressed one (``dedup``) and the deduplicated and compressed one
+(``compact``).  The deduplication saving does not depend on the text.  The
+compression saving does: the default synthetic text draws from a small
+vocabulary and compresses far better than real documents, so its ``compact``
+figures are an upper bound of the saving.  Pass ``--corpus`` with plain-text
+files of real documents, e.g. ``file.text`` values exported from the database,
+for representative numbers; every tracked document then gets its own,
+non-overlapping slice of the corpus.
+
+Usage::
+
+    PYTHONPATH=. uv run python benchmarks/checkpoint_size.py --turns 10 --docs 10
+    PYTHONPATH=. uv run python benchmarks/checkpoint_size.py --corpus exported/*.txt
+"""
+
+import argparse
+import random
+from pathlib import Path
+
+import orjson
+from app.agent.checkpoint_serde import DEFAULT_CODEC, encode_blob, extract_blobs, pack_channel_values
+from app.agent.state import TrackedDocument
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langgraph.checkpoint.redis.jsonplus_redis import JsonPlusRedisSerializer
+
+VOCABULARY = (
+    "Stadtrat Antrag Beschluss Radverkehr Bebauungsplan Haushalt Schule Kita Wohnungsbau München Bezirksausschuss "
+    "Verwaltung Referat Mobilität Klimaschutz Förderung Sanierung Grünfläche Verkehr Sitzung Vorlage Stellungnahme "
+    "die der und zu mit für wird wurde von im auf das eine nicht als auch nach bei Landeshauptstadt"
+).split()
+
+
+def _text(rng: random.Random, chars: int) -> str:
+    words: list[str] = []
+    length = 0
+    while length < chars:
+        word = rng.choice(VOCABULARY)
+        words.append(word)
+        length += len(word) + 1
+    return " ".join(words)
+
+
+class Corpus:
+    """Consecutive, non-overlapping slices of real document text."""
+
+    def __init__(self, paths: list[Path]) -> None:
+        self._text = " ".join(" ".join(path.read_text(encoding="utf-8", errors="replace").split()) for path in paths)
+        self._offset = 0
+        if not self._text:
+            raise SystemExit("The corpus is empty.")
+
+    def take(self, chars: int) -> str:
+        if self._offset + chars > len(self._text):
+            print("warning: corpus exhausted, slices repeat from the start")
+            self._offset = 0
+        text = self._text[self._offset : self._offset + chars]
+        self._offset += chars
+        return text
+
+
+def _run_states(
+    rng: random.Random,
+    history: list,
+    docs_per_turn: int,
+    snippet_chars: int,
+    answer_chars: int,
+    turn: int,
+    corpus: Corpus | None = None,
+):
+    """Yield the channel values after each checkpoint write of one run."""
+    history.append(HumanMessage(content=f"Frage {turn}: {_text(rng, 80)}"))
+    yield {"messages": list(history)}
+
+    call_id = f"call-{turn}"
+    history.append(AIMessage(content="", tool_calls=[{"id": call_id, "name": "retrieve_documents", "args": {"query": _text(rng, 40)}}]))
+    yield {"messages": list(history)}
+
+    docs = [
+        TrackedDocument(
+            id=f"doc-{turn}-{i}",
+            page_content=corpus.take(snippet_chars) if corpus else _text(rng, snippet_chars),
+            metadata={"name": _text(rng, 60), "distance": 0.4},
+        )
+        for i in range(docs_per_turn)
+    ]
+    artifact = {"documents": [d.model_dump() for d in docs], "proposals": []}
+    summary = orjson.dumps({"documents": [{"id": d.id, "name": d.metadata["name"]} for d in docs]}).decode()
+    history.append(ToolMessage(content=summary, tool_call_id=call_id, name="retrieve_documents", artifact=artifact))
+    yield {"messages": list(history), "tracked_documents": docs}
+
+    checked = [d.model_copy(update={"is_checked": True, "relevance_reason": _text(rng, 120)}) for d in docs]
+    yield {"messages": list(history), "tracked_documents": checked, "user_query": "Frage"}
+
+    answer = corpus.take(answer_chars) if corpus else _text(rng, answer_chars)
+    history.append(AIMessage(content=orjson.dumps({"response": answer}).decode()))
+    yield {"messages": list(history), "tracked_documents": checked, "user_query": "Frage"}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=(__doc__ or "").partition("\n")[0])
+    parser.add_argument("--turns", type=int, default=10)
+    parser.add_argument("--docs", type=int, default=10)
+    parser.add_argument("--snippet-chars", type=int, default=2000)
+    parser.add_argument("--answer-chars", type=int, default=1500)
+    parser.add_argument("--blob-min-chars", type=int, default=1024)
+    parser.add_argument("--corpus", type=Path, nargs="+", help="plain-text files of real documents used for snippets and answers")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    corpus = Corpus(args.corpus) if args.corpus else None
+    serde = JsonPlusRedisSerializer()
+    history: list = []
+    written_blobs: set[str] = set()
+    total_plain = total_dedup = total_compact = 0
+
+    print(f"codec={DEFAULT_CODEC} text={'corpus' if corpus else 'synthetic (compression is an upper bound)'}")
+    print(f"{'turn':>4} {'plain bytes/run':>16} {'dedup bytes/run':>16} {'compact bytes/run':>18} {'ratio':>6}")
+    for turn in range(1, args.turns + 1):
+        plain = dedup = compact = 0
+        for channel_values in _run_states(rng, history, args.docs, args.snippet_chars, args.answer_chars, turn, corpus):
+            # Uncompressed serde payload, i.e. what the inline checkpoint has to carry.
+            plain += len(serde.dumps_typed(channel_values)[1])
+            stripped, _ = extract_blobs(channel_values, args.blob_min_chars)
+            dedup += len(serde.dumps_typed(stripped)[1])
+            packed, blobs = pack_channel_values(channel_values, serde, args.blob_min_chars)
+            compact += len(orjson.dumps(packed))
+            for digest, text in blobs.items():
+                if digest not in written_blobs:
+                    written_blobs.add(digest)
+                    dedup += len(text.encode("utf-8"))
+                    compact += len(encode_blob(text))
+        total_plain += plain
+        total_dedup += dedup
+        total_compact += compact
+        print(f"{turn:>4} {plain:>16,} {dedup:>16,} {compact:>18,} {compact / plain:>6.2f}")
+    print(f"{'sum':>4} {total_plain:>16,} {total_dedup:>16,} {total_compact:>18,} {total_compact / total_plain:>6.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Measure backend startup time with simulated latencies of the remote dependencies.
+
+The script runs the real FastAPI lifespan of ``create_app`` and replaces only
+the remote calls: database (vector store setup and ``SELECT 1``), Langfuse
+(``get_prompt``, ``auth_check``) and the LLM connection pre-warming, each of
+which sleeps ``--latency`` seconds.  It reports the time until the app answers
+liveness probes (lifespan returned) and until ``/api/readyz`` would report
+ready, once with an empty and once with a warm prompt cache.
+
+For comparison, the previous startup waited for all of these calls in
+sequence before the app accepted any request (embedding test call, Langfuse
+auth check, three prompt fetches, database setup and test query).
+
+Usage::
+
+    PYTHONPATH=. uv run python benchmarks/startup_time.py --latency 1.0
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from langfuse.api.resources.prompts.types import Prompt_Text
+from langfuse.model import TextPromptClient
+
+
+def _fake_langfuse(latency: float) -> MagicMock:
+    def get_prompt(name: str, label: str, cache_ttl_seconds: int | None = None) -> TextPromptClient:
+        time.sleep(latency)
+        return TextPromptClient(Prompt_Text(type="text", name=name, version=1, prompt=f"Prompt {name}", config={}, labels=[label], tags=[]))
+
+    lf_client = MagicMock()
+    lf_client.get_prompt = MagicMock(side_effect=get_prompt)
+    lf_client.auth_check = MagicMock(side_effect=lambda: time.sleep(latency))
+    return lf_client
+
+
+def _fake_engine(latency: float) -> MagicMock:
+    @asynccontextmanager
+    async def begin():
+        await asyncio.sleep(latency)
+        yield SimpleNamespace(execute=lambda *args, **kwargs: asyncio.sleep(0))
+
+    async def dispose() -> None:
+        pass
+
+    return MagicMock(begin=begin, dispose=dispose)
+
+
+async def _measure(latency: float, prompt_cache_path: Path) -> tuple[float, float]:
+    from app.backend import create_app
+    from app.core.settings import get_settings
+
+    async def build_vectorstore(*args, **kwargs):
+        await asyncio.sleep(latency)
+        return MagicMock(), MagicMock(close=lambda: asyncio.sleep(0)), "file_retrieval"
+
+    async def prewarm_connections(*args, **kwargs) -> int:
+        await asyncio.sleep(latency)
+        return 1
+
+    settings = get_settings()
+    settings.prompt_cache_path = prompt_cache_path
+    lf_client = _fake_langfuse(latency)
+    with (
+        patch("app.backend.create_async_engine", return_value=_fake_engine(latency)),
+        patch("app.backend.build_vectorstore", build_vectorstore),
+        patch("app.backend.prewarm_connections", prewarm_connections),
+        patch("app.backend.setup_langfuse", return_value=(lf_client, None)),
+    ):
+        app = create_app()
+        started = time.perf_counter()
+        async with app.router.lifespan_context(app):
+            live = time.perf_counter() - started
+            while app.state.readiness.status == "starting":
+                await asyncio.sleep(0.005)
+            ready = time.perf_counter() - started
+            if app.state.readiness.status == "failed":
+                raise RuntimeError(app.state.readiness.error)
+            # Let the background tasks (auth check, first prompt refresh) finish before shutdown.
+            await asyncio.sleep(latency * 5)
+    return live, ready
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=1.0, help="Simulated latency of every remote call in seconds")
+    args = parser.parse_args()
+    os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+    os.environ.setdefault("LOCAL_DEBUG", "")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        prompt_cache_path = Path(tmp) / "prompts.json"
+        cold_live, cold_ready = asyncio.run(_measure(args.latency, prompt_cache_path))
+        warm_live, warm_ready = asyncio.run(_measure(args.latency, prompt_cache_path))
+
+    previous = 7 * args.latency
+    print(f"Simulated latency per remote call: {args.latency:.2f}s")
+    print(f"{'':<28}{'liveness':>10}{'readiness':>11}")
+    print(f"{'previous (sequential)':<28}{previous:>9.2f}s{previous:>10.2f}s")
+    print(f"{'cold prompt cache':<28}{cold_live:>9.2f}s{cold_ready:>10.2f}s")
+    print(f"{'warm prompt cache':<28}{warm_live:>9.2f}s{warm_ready:>10.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 import pytest
+from app.core.metrics import metrics
 from app.core.settings import BackendSettings, get_settings
 
 # Apply immediately at import time so any module-level get_settings() calls during collection
@@ -17,3 +18,10 @@ def reset_settings_after_session():
     yield
     BackendSettings.model_config = _ORIGINAL_MODEL_CONFIG
     get_settings.cache_clear()
+
+
+@pytest.fixture(autouse=True)
+def reset_metrics():
+    metrics.reset()
+    yield
+    metrics.reset()
@@ -1,11 +1,14 @@
 from app.backend import get_backend
+from app.core.readiness import Readiness
 from app.core.settings import get_settings
 from fastapi.testclient import TestClient
 
 
 def test_healthz_returns_ok_and_version() -> None:
     settings = get_settings()
-    client = TestClient(get_backend())
+    app = get_backend()
+    app.state.readiness = Readiness()
+    client = TestClient(app)
     response = client.get("/api/healthz")
 
     assert response.status_code == 200
@@ -13,3 +16,14 @@ def test_healthz_returns_ok_and_version() -> None:
     payload = response.json()
 
     assert payload == {"status": "ok", "version": settings.version}
+
+
+def test_healthz_fails_once_startup_has_failed() -> None:
+    app = get_backend()
+    app.state.readiness = Readiness()
+    app.state.readiness.mark_failed(ConnectionError("DB nicht erreichbar"))
+
+    response = TestClient(app).get("/api/healthz")
+
+    assert response.status_code == 503
+    assert response.json()["status"] == "failed"
@@ -0,0 +1,17 @@
+from app.backend import get_backend
+from app.core.metrics import metrics
+from fastapi.testclient import TestClient
+
+
+def test_metrics_returns_counters_and_gauges() -> None:
+    metrics.inc("relevance_documents_total", 4)
+    metrics.set_gauge("relevance_auto_decided_ratio", 0.5)
+    client = TestClient(get_backend())
+
+    response = client.get("/api/metrics")
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "counters": {"relevance_documents_total": 4.0},
+        "gauges": {"relevance_auto_decided_ratio": 0.5},
+    }
@@ -0,0 +1,31 @@
+from app.backend import get_backend
+from app.core.readiness import Readiness
+from fastapi.testclient import TestClient
+
+
+def test_readyz_returns_503_until_ready() -> None:
+    app = get_backend()
+    app.state.readiness = Readiness()
+    client = TestClient(app)
+
+    response = client.get("/api/readyz")
+    assert response.status_code == 503
+    assert response.json()["status"] == "starting"
+
+    app.state.readiness.mark_ready()
+    response = client.get("/api/readyz")
+    assert response.status_code == 200
+    payload = response.json()
+    assert payload["status"] == "ready"
+    assert payload["startup_seconds"] >= 0
+
+
+def test_readyz_reports_startup_failure() -> None:
+    app = get_backend()
+    app.state.readiness = Readiness()
+    app.state.readiness.mark_failed(ValueError("Prompt fehlt"))
+
+    response = TestClient(app).get("/api/readyz")
+
+    assert response.status_code == 503
+    assert response.json() == {"status": "failed", "startup_seconds": None, "error": "ValueError: Prompt fehlt"}
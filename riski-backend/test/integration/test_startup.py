@@ -0,0 +1,71 @@
+import asyncio
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.backend import create_app
+from app.core.metrics import metrics
+from app.core.settings import get_settings
+from fastapi import FastAPI
+
+
+def _fake_engine() -> MagicMock:
+    @asynccontextmanager
+    async def begin():
+        yield SimpleNamespace(execute=AsyncMock())
+
+    return MagicMock(begin=begin, dispose=AsyncMock())
+
+
+async def _run_startup(build_vectorstore: AsyncMock, prewarm_connections: AsyncMock, max_attempts: int) -> FastAPI:
+    settings = get_settings()
+    with (
+        patch.object(settings, "startup_max_attempts", max_attempts),
+        patch.object(settings, "startup_retry_delay_seconds", 0.01),
+        patch("app.backend.create_async_engine", return_value=_fake_engine()),
+        patch("app.backend.build_vectorstore", build_vectorstore),
+        patch("app.backend.build_agent", AsyncMock(return_value=MagicMock())),
+        patch("app.backend.prewarm_connections", prewarm_connections),
+        patch("app.backend.setup_langfuse", return_value=(MagicMock(), None)),
+        patch("app.backend.check_langfuse", AsyncMock()),
+        patch("app.backend.create_prompt_manager", return_value=MagicMock(aclose=AsyncMock())),
+    ):
+        app = create_app()
+        async with app.router.lifespan_context(app):
+            while app.state.readiness.status == "starting":
+                await asyncio.sleep(0.005)
+    return app
+
+
+async def test_failed_startup_attempts_are_retried() -> None:
+    vectorstore = (MagicMock(), MagicMock(close=AsyncMock()), "file_retrieval")
+    build_vectorstore = AsyncMock(side_effect=[ConnectionError("DB nicht erreichbar"), vectorstore])
+
+    app = await _run_startup(build_vectorstore, AsyncMock(return_value=1), max_attempts=3)
+
+    assert app.state.readiness.status == "ready"
+    assert build_vectorstore.await_count == 2
+    assert metrics.counter("startup_failed_attempts_total") == 1
+
+
+async def test_startup_fails_after_the_last_attempt() -> None:
+    build_vectorstore = AsyncMock(side_effect=ConnectionError("DB nicht erreichbar"))
+
+    app = await _run_startup(build_vectorstore, AsyncMock(return_value=1), max_attempts=2)
+
+    assert app.state.readiness.status == "failed"
+    assert app.state.readiness.error == "ConnectionError: DB nicht erreichbar"
+    assert build_vectorstore.await_count == 2
+
+
+async def test_prewarming_does_not_gate_readiness() -> None:
+    vectorstore = (MagicMock(), MagicMock(close=AsyncMock()), "file_retrieval")
+    never_done = asyncio.Event()
+
+    async def slow_prewarm(*args, **kwargs) -> int:
+        await never_done.wait()
+        return 0
+
+    app = await _run_startup(AsyncMock(return_value=vectorstore), AsyncMock(side_effect=slow_prewarm), max_attempts=1)
+
+    assert app.state.readiness.status == "ready"
@@ -0,0 +1,184 @@
+"""Unit tests for the semantic answer cache and its use in the first model pass."""
+
+import asyncio
+import json
+from datetime import datetime
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from ag_ui.core import RunAgentInput, UserMessage
+from ag_ui_langgraph import LangGraphAgent
+from app.agent.answer_cache import ANSWER_CACHE_CONFIG_KEY, SemanticAnswerCache
+from app.agent.riski_agent import build_riski_graph
+from app.agent.speculative_retrieval import SpeculativeRetrieval
+from app.agent.tools import get_agent_capabilities, retrieve_documents
+from app.api.routers.ag_ui import invoke_riski_agent
+from app.core.metrics import metrics
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.memory import InMemorySaver
+
+EMBEDDINGS = {
+    "Radwege in Schwabing": [1.0, 0.0, 0.0],
+    "Wo gibt es Radwege in Schwabing?": [0.99, 0.1, 0.0],
+    "Kita-Ausbau": [0.0, 1.0, 0.0],
+}
+ANSWER = json.dumps({"response": "Es gibt mehrere Anträge zu Radwegen in Schwabing.", "suggestions": []})
+DOCUMENTS = [{"id": "file-1", "metadata": {"name": "Radwege.pdf"}, "is_checked": True, "is_relevant": True, "relevance_reason": "passt"}]
+PROPOSALS = [
+    {"identifier": "AN-1", "name": "Radwege", "subject": "", "date": None, "risUrl": "https://ris/1", "source_document_ids": ["file-1"]}
+]
+STORED = datetime(2024, 5, 1)
+
+
+def _sessionmaker(count: int = 1, modified: datetime | None = STORED) -> MagicMock:
+    session = MagicMock()
+    session.execute = AsyncMock(return_value=MagicMock(one=MagicMock(return_value=(count, modified, None))))
+    session.__aenter__ = AsyncMock(return_value=session)
+    session.__aexit__ = AsyncMock(return_value=None)
+    return MagicMock(return_value=session, session=session)
+
+
+def _embed(query: str) -> AsyncMock:
+    return AsyncMock(return_value=EMBEDDINGS[query])
+
+
+async def _cache_with_answer(min_similarity: float = 0.95) -> SemanticAnswerCache:
+    cache = SemanticAnswerCache(min_similarity=min_similarity)
+    await cache.store("Radwege in Schwabing", ANSWER, DOCUMENTS, PROPOSALS, _embed("Radwege in Schwabing"), _sessionmaker())
+    return cache
+
+
+class TestSemanticAnswerCache:
+    async def test_same_question_hits_without_embedding(self):
+        cache = await _cache_with_answer()
+        embed = _embed("Radwege in Schwabing")
+
+        answer = await cache.lookup("  radwege IN schwabing", embed, _sessionmaker())
+
+        assert answer is not None and answer.content == ANSWER
+        assert answer.tracked_proposals == PROPOSALS
+        embed.assert_not_awaited()
+        assert metrics.counter("answer_cache_hits_total") == 1
+
+    async def test_similar_question_hits(self):
+        cache = await _cache_with_answer()
+
+        answer = await cache.lookup("Wo gibt es Radwege in Schwabing?", _embed("Wo gibt es Radwege in Schwabing?"), _sessionmaker())
+
+        assert answer is not None and answer.query == "Radwege in Schwabing"
+
+    async def test_most_similar_of_several_answers_hits(self):
+        cache = await _cache_with_answer(min_similarity=0.9)
+        # Looked up once before the second answer is stored, so the similarity index must be rebuilt
+        assert await cache.lookup("Kita-Ausbau", _embed("Kita-Ausbau"), _sessionmaker()) is None
+        await cache.store("Kita-Ausbau", ANSWER, DOCUMENTS, PROPOSALS, _embed("Kita-Ausbau"), _sessionmaker())
+
+        answer = await cache.lookup("Wo gibt es Radwege in Schwabing?", _embed("Wo gibt es Radwege in Schwabing?"), _sessionmaker())
+        assert answer is not None and answer.query == "Radwege in Schwabing"
+        answer = await cache.lookup("Kitas", AsyncMock(return_value=[0.1, 1.0, 0.0]), _sessionmaker())
+        assert answer is not None and answer.query == "Kita-Ausbau"
+
+    async def test_question_below_threshold_misses(self):
+        cache = await _cache_with_answer(min_similarity=0.999)
+
+        assert await cache.lookup("Wo gibt es Radwege in Schwabing?", _embed("Wo gibt es Radwege in Schwabing?"), _sessionmaker()) is None
+        assert await cache.lookup("Kita-Ausbau", _embed("Kita-Ausbau"), _sessionmaker()) is None
+        assert metrics.counter("answer_cache_misses_total") == 2
+
+    @pytest.mark.parametrize(
+        ("count", "modified"),
+        [(0, None), (1, datetime(2024, 6, 1))],
+        ids=["source-deleted", "source-modified"],
+    )
+    async def test_changed_sources_invalidate_the_answer(self, count: int, modified: datetime | None):
+        cache = await _cache_with_answer()
+
+        assert await cache.lookup("Radwege in Schwabing", _embed("Radwege in Schwabing"), _sessionmaker(count, modified)) is None
+        assert len(cache) == 0
+        assert metrics.counter("answer_cache_invalidations_total") == 1
+
+    async def test_answer_without_sources_is_not_stored(self):
+        cache = SemanticAnswerCache()
+
+        await cache.store("Kita-Ausbau", ANSWER, [], [], _embed("Kita-Ausbau"), _sessionmaker())
+
+        assert len(cache) == 0
+
+
+async def test_speculation_shares_its_embedding():
+    vectorstore = MagicMock()
+    vectorstore.embeddings.aembed_query = AsyncMock(return_value=[1.0, 0.0, 0.0])
+    vectorstore.asimilarity_search_with_score_by_vector = AsyncMock(return_value=[])
+    speculation = SpeculativeRetrieval()
+    speculation.start("Radwege in Schwabing", vectorstore, k=5)
+
+    embedding = speculation.query_embedding("radwege in schwabing")
+    assert embedding is not None
+    assert await embedding == [1.0, 0.0, 0.0]
+    assert speculation.query_embedding("Kita-Ausbau") is None
+
+
+async def test_cache_hit_skips_model_and_pipeline():
+    cache = await _cache_with_answer()
+
+    async def slow_model(messages):
+        await asyncio.sleep(10)
+        return AIMessage(content="")
+
+    chat_model = MagicMock()
+    model_call = chat_model.bind_tools.return_value.ainvoke = AsyncMock(side_effect=slow_model)
+    graph = build_riski_graph(chat_model, MagicMock(), [retrieve_documents, get_agent_capabilities]).compile()
+    vectorstore = MagicMock()
+    vectorstore.embeddings.aembed_query = _embed("Wo gibt es Radwege in Schwabing?")
+    config: RunnableConfig = {
+        "configurable": {ANSWER_CACHE_CONFIG_KEY: cache, "vectorstore": vectorstore, "db_sessionmaker": _sessionmaker()}
+    }
+
+    state = await asyncio.wait_for(graph.ainvoke({"messages": [HumanMessage(content="Wo gibt es Radwege in Schwabing?")]}, config), 5)
+
+    # The first model call was started alongside the lookup and cancelled on the hit.
+    model_call.assert_called_once()
+    assert state["messages"][-1].content == ANSWER
+    assert [d.id for d in state["tracked_documents"]] == ["file-1"]
+    assert [p.identifier for p in state["tracked_proposals"]] == ["AN-1"]
+    assert state["user_query"] == "Wo gibt es Radwege in Schwabing?"
+
+
+async def test_cache_hit_is_streamed_to_the_client():
+    cache = await _cache_with_answer()
+
+    async def slow_model(messages):
+        await asyncio.sleep(10)
+        return AIMessage(content="")
+
+    chat_model = MagicMock()
+    chat_model.bind_tools.return_value.ainvoke = AsyncMock(side_effect=slow_model)
+    graph = build_riski_graph(chat_model, MagicMock(), [retrieve_documents, get_agent_capabilities]).compile(checkpointer=InMemorySaver())
+    vectorstore = MagicMock()
+    vectorstore.embeddings.aembed_query = _embed("Wo gibt es Radwege in Schwabing?")
+    agent = LangGraphAgent(
+        name="riski",
+        graph=graph,
+        config={"configurable": {ANSWER_CACHE_CONFIG_KEY: cache, "vectorstore": vectorstore, "db_sessionmaker": _sessionmaker()}},
+    )
+    request = MagicMock(headers={}, app=SimpleNamespace(state=SimpleNamespace(agent=agent)))
+    request.is_disconnected = AsyncMock(return_value=False)
+    input_data = RunAgentInput(
+        thread_id="t-1",
+        run_id="r-1",
+        state={},
+        messages=[UserMessage(id="m-1", role="user", content="Wo gibt es Radwege in Schwabing?")],
+        tools=[],
+        context=[],
+        forwarded_props={},
+    )
+
+    response = await invoke_riski_agent(input_data, request)
+    body = "".join([chunk if isinstance(chunk, str) else chunk.decode() async for chunk in response.body_iterator])
+    events = [json.loads(line[len("data: ") :]) for line in body.splitlines() if line.startswith("data: ")]
+
+    contents = [event["delta"] for event in events if event["type"] == "TEXT_MESSAGE_CONTENT"]
+    assert contents == [ANSWER]
+    assert {"TEXT_MESSAGE_START", "TEXT_MESSAGE_END", "RUN_FINISHED"} <= {event["type"] for event in events}
@@ -94,3 +94,14 @@ def test_checkpointer_secure_overrides(monkeypatch: pytest.MonkeyPatch):
     assert cp.redis_url.host == "localhost"
     assert cp.redis_url.port == 6380
     assert cp.redis_url.path.strip("/") == "5"
+
+
+def test_relevance_distance_band_must_be_ordered(monkeypatch: pytest.MonkeyPatch):
+    """The auto-accept distance must lie below the auto-reject distance."""
+
+    _base_env(monkeypatch)
+    monkeypatch.setenv("RISKI_BACKEND__RELEVANCE_AUTO_ACCEPT_MAX_DISTANCE", "0.6")
+    monkeypatch.setenv("RISKI_BACKEND__RELEVANCE_AUTO_REJECT_MIN_DISTANCE", "0.4")
+
+    with pytest.raises(ValueError, match="relevance_auto_accept_max_distance"):
+        get_settings()
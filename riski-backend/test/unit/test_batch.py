@@ -0,0 +1,99 @@
+"""Unit tests for the batch question-answering endpoint."""
+
+import asyncio
+import json
+from unittest.mock import AsyncMock, MagicMock
+
+from app.agent.state import ErrorInfo, TrackedDocument
+from app.api.routers.batch import _result, answer_questions
+from app.core.metrics import metrics
+from app.models.batch_request import BatchQuestion
+from app.models.batch_result import BatchResult
+from langchain_core.messages import AIMessage
+from langgraph.checkpoint.base import BaseCheckpointSaver
+
+
+def _answer_state(response: str) -> dict:
+    return {
+        "messages": [AIMessage(content=json.dumps({"response": response, "documents": [], "proposals": []}))],
+        "tracked_documents": [TrackedDocument(id="doc-1", page_content="Volltext", metadata={"name": "Radwege.pdf"})],
+        "tracked_proposals": [],
+    }
+
+
+def _graph(ainvoke: AsyncMock) -> MagicMock:
+    graph = MagicMock()
+    graph.ainvoke = ainvoke
+    graph.checkpointer = MagicMock(spec=BaseCheckpointSaver)
+    graph.checkpointer.adelete_thread = AsyncMock()
+    return graph
+
+
+def _error(result: BatchResult) -> dict:
+    assert result.error is not None
+    return result.error
+
+
+async def test_results_of_all_questions_are_yielded():
+    graph = _graph(AsyncMock(side_effect=lambda state, config: _answer_state(state["messages"][0].content)))
+    questions = [BatchQuestion(id=f"q{i}", question=f"Frage {i}") for i in range(3)]
+
+    results = [result async for result in answer_questions(graph, {"configurable": {}}, questions, 2)]
+
+    assert sorted((r.index, r.id, (r.answer or {}).get("response")) for r in results) == [(i, f"q{i}", f"Frage {i}") for i in range(3)]
+    assert results[0].documents[0]["id"] == "doc-1"
+    assert "page_content" not in results[0].documents[0]
+    # Every question is its own thread, which is deleted afterwards
+    thread_ids = {call.args[1]["configurable"]["thread_id"] for call in graph.ainvoke.await_args_list}
+    assert len(thread_ids) == 3
+    assert {call.args[0] for call in graph.checkpointer.adelete_thread.await_args_list} == thread_ids
+    assert metrics.counter("batch_questions_total") == 3
+
+
+async def test_concurrency_is_limited():
+    active: list[int] = []
+    peak: list[int] = []
+
+    async def ainvoke(state, config):
+        active.append(1)
+        peak.append(len(active))
+        await asyncio.sleep(0.01)
+        active.pop()
+        return _answer_state("ok")
+
+    questions = [BatchQuestion(question=f"Frage {i}") for i in range(6)]
+
+    results = [result async for result in answer_questions(_graph(AsyncMock(side_effect=ainvoke)), {}, questions, 2)]
+
+    assert len(results) == 6
+    assert max(peak) == 2
+
+
+async def test_failed_question_does_not_stop_the_batch():
+    async def ainvoke(state, config):
+        if state["messages"][0].content == "kaputt":
+            raise RuntimeError("LLM weg")
+        return _answer_state("ok")
+
+    questions = [BatchQuestion(question="kaputt"), BatchQuestion(question="Radwege")]
+
+    results = sorted([r async for r in answer_questions(_graph(AsyncMock(side_effect=ainvoke)), {}, questions, 2)], key=lambda r: r.index)
+
+    assert results[0].answer is None
+    assert _error(results[0])["error_type"] == "internal_error"
+    assert results[1].answer == {"response": "ok", "documents": [], "proposals": []}
+    assert metrics.counter("batch_questions_failed_total") == 1
+
+
+def test_result_of_agent_errors_and_plain_text_answers():
+    question = BatchQuestion(question="Frage")
+
+    no_docs = _result(0, question, {"messages": [], "error_info": ErrorInfo(error_type="no_documents_found", message="Nichts")}, 1.0)
+    assert no_docs.answer is None and _error(no_docs)["error_type"] == "no_documents_found"
+
+    failed = _result(0, question, {"messages": [AIMessage(content=json.dumps({"error": "generation_failed", "response": "Leider"}))]}, 1.0)
+    assert failed.answer is None
+    assert (_error(failed)["error_type"], _error(failed)["message"]) == ("generation_failed", "Leider")
+
+    capabilities = _result(0, question, {"messages": [AIMessage(content="Ich kann Dokumente durchsuchen.")]}, 1.0)
+    assert capabilities.answer == {"response": "Ich kann Dokumente durchsuchen."}
@@ -0,0 +1,85 @@
+"""Unit tests for cancelling agent runs when the SSE client disconnects."""
+
+import asyncio
+
+import pytest
+from app.api.routers.ag_ui import cancel_on_disconnect
+from app.core.metrics import metrics
+from fastapi import Request
+
+
+class _FakeRequest(Request):
+    def __init__(self) -> None:
+        super().__init__({"type": "http"})
+        self.disconnected = False
+
+    async def is_disconnected(self) -> bool:
+        return self.disconnected
+
+
+async def test_events_are_passed_through():
+    async def events():
+        for i in range(3):
+            yield i
+
+    received = [event async for event in cancel_on_disconnect(events(), _FakeRequest(), 0.01)]
+
+    assert received == [0, 1, 2]
+    assert metrics.counter("agent_runs_cancelled_total") == 0
+
+
+async def test_disconnect_cancels_busy_run():
+    request = _FakeRequest()
+    cancelled = asyncio.Event()
+
+    async def events():
+        yield "RUN_STARTED"
+        try:
+            await asyncio.sleep(60)  # e.g. a long LLM call without events
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+        yield "never"
+
+    received = []
+    async for event in cancel_on_disconnect(events(), request, 0.01):
+        received.append(event)
+        request.disconnected = True
+
+    assert received == ["RUN_STARTED"]
+    assert cancelled.is_set()
+    assert metrics.counter("agent_runs_cancelled_total") == 1
+
+
+async def test_closing_the_stream_cancels_run():
+    cancelled = asyncio.Event()
+
+    async def events():
+        try:
+            while True:
+                yield "event"
+                await asyncio.sleep(0.01)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    stream = cancel_on_disconnect(events(), _FakeRequest(), 0.01)
+    assert await anext(stream) == "event"
+    await stream.aclose()
+
+    assert cancelled.is_set()
+    assert metrics.counter("agent_runs_cancelled_total") == 1
+
+
+async def test_run_errors_are_reraised():
+    async def events():
+        yield 1
+        raise RuntimeError("boom")
+
+    received = []
+    with pytest.raises(RuntimeError, match="boom"):
+        async for event in cancel_on_disconnect(events(), _FakeRequest(), 0.01):
+            received.append(event)
+
+    assert received == [1]
+    assert metrics.counter("agent_runs_cancelled_total") == 0
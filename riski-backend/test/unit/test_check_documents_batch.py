@@ -0,0 +1,145 @@
+"""Unit tests for the batched relevance check (``check_documents_batch``) and its fan-out."""
+
+from unittest.mock import AsyncMock, MagicMock
+
+from app.agent.prompt_manager import PromptManager
+from app.agent.relevance_cache import RelevanceVerdictCache
+from app.agent.riski_agent import (
+    NODE_CHECK_DOCUMENTS_BATCH,
+    _group_documents_by_budget,
+    build_batch_check_node,
+    build_guard_nodes,
+)
+from app.agent.state import DocumentBatchCheckInput, RiskiAgentState, TrackedDocument
+from app.agent.types import DocumentRelevanceBatchItem, DocumentRelevanceBatchVerdict, DocumentRelevanceVerdict
+
+
+def _make_doc(doc_id: str, page_content: str = "Inhalt") -> dict:
+    return {"id": doc_id, "page_content": page_content, "metadata": {"name": f"Dokument {doc_id}"}}
+
+
+def _make_batch_node(
+    batch_result=None,
+    batch_side_effect=None,
+    single_verdict=None,
+    cache: RelevanceVerdictCache | None = None,
+    prompt_manager: PromptManager | None = None,
+):
+    """Build a batch node whose batched and per-document LLM calls are mocked separately."""
+    batch_llm = AsyncMock()
+    if batch_side_effect is not None:
+        batch_llm.ainvoke = AsyncMock(side_effect=batch_side_effect)
+    else:
+        batch_llm.ainvoke = AsyncMock(return_value=batch_result)
+    single_llm = AsyncMock()
+    single_llm.ainvoke = AsyncMock(return_value=single_verdict or DocumentRelevanceVerdict(relevant=True, reason="Einzeln geprüft."))
+
+    mock_check_llm = MagicMock()
+    mock_check_llm.with_structured_output = MagicMock(
+        side_effect=lambda schema: batch_llm if schema is DocumentRelevanceBatchVerdict else single_llm
+    )
+
+    _, _, check_document, _ = build_guard_nodes(chat_model=MagicMock(), relevance_check_model=mock_check_llm)
+    node = build_batch_check_node(mock_check_llm, check_document, relevance_cache=cache, prompt_manager=prompt_manager)
+    return node, batch_llm, single_llm
+
+
+class TestGrouping:
+    def test_groups_respect_token_budget_and_order(self):
+        docs = [TrackedDocument(id=str(i), page_content="x" * 400) for i in range(5)]
+
+        groups = _group_documents_by_budget(docs, max_tokens=250, snippet_size=10_000, snippet_max_tokens=2_500)
+
+        assert [[d.id for d in g] for g in groups] == [["0", "1"], ["2", "3"], ["4"]]
+
+    def test_oversized_document_forms_its_own_group(self):
+        docs = [TrackedDocument(id="small", page_content="x"), TrackedDocument(id="big", page_content="x" * 10_000)]
+
+        groups = _group_documents_by_budget(docs, max_tokens=100, snippet_size=10_000, snippet_max_tokens=2_500)
+
+        assert [[d.id for d in g] for g in groups] == [["small"], ["big"]]
+
+    def test_budget_uses_the_snippet_of_the_full_text(self):
+        # State carries a 100-token snippet, but the check sends up to snippet_max_tokens of the 5000-token full text
+        docs = [TrackedDocument(id=str(i), page_content="x" * 400, content_tokens=5_000) for i in range(3)]
+
+        groups = _group_documents_by_budget(docs, max_tokens=2_500, snippet_size=10_000, snippet_max_tokens=1_000)
+
+        assert [[d.id for d in g] for g in groups] == [["0", "1"], ["2"]]
+
+    def test_fan_out_sends_batches_in_batched_mode(self):
+        guard_nodes = build_guard_nodes(chat_model=MagicMock(), relevance_check_model=MagicMock(), check_mode="batched")
+        fan_out_checks = guard_nodes[1]
+        state = RiskiAgentState(
+            user_query="Frage",
+            tracked_documents=[TrackedDocument(id=str(i), page_content="Inhalt") for i in range(10)],
+        )
+
+        sends = fan_out_checks(state)
+
+        assert len(sends) == 1
+        assert sends[0].node == NODE_CHECK_DOCUMENTS_BATCH
+        assert len(sends[0].arg["docs"]) == 10
+
+
+class TestBatchNode:
+    async def test_single_call_returns_update_per_document(self):
+        verdicts = DocumentRelevanceBatchVerdict(
+            verdicts=[
+                DocumentRelevanceBatchItem(doc_id="a", relevant=True, reason="Passt."),
+                DocumentRelevanceBatchItem(doc_id="b", relevant=False, reason="Passt nicht."),
+            ]
+        )
+        node, batch_llm, single_llm = _make_batch_node(batch_result=verdicts)
+
+        result = await node(DocumentBatchCheckInput(docs=[_make_doc("a"), _make_doc("b")], user_query="Frage"))
+
+        updates = {u.doc_id: u for u in result["tracked_documents"]}
+        assert updates["a"].is_relevant is True
+        assert updates["b"].is_relevant is False
+        assert batch_llm.ainvoke.await_count == 1
+        assert single_llm.ainvoke.await_count == 0
+
+    async def test_missing_verdicts_fall_back_to_per_document_checks(self):
+        verdicts = DocumentRelevanceBatchVerdict(verdicts=[DocumentRelevanceBatchItem(doc_id="a", relevant=False, reason="Nein.")])
+        node, _, single_llm = _make_batch_node(batch_result=verdicts)
+
+        result = await node(DocumentBatchCheckInput(docs=[_make_doc("a"), _make_doc("b")], user_query="Frage"))
+
+        updates = {u.doc_id: u for u in result["tracked_documents"]}
+        assert updates["a"].is_relevant is False
+        assert updates["b"].reason == "Einzeln geprüft."
+        assert single_llm.ainvoke.await_count == 1
+
+    async def test_failed_batch_call_falls_back_for_all_documents(self):
+        node, _, single_llm = _make_batch_node(batch_side_effect=RuntimeError("boom"))
+
+        result = await node(DocumentBatchCheckInput(docs=[_make_doc("a"), _make_doc("b")], user_query="Frage"))
+
+        assert sorted(u.doc_id for u in result["tracked_documents"]) == ["a", "b"]
+        assert single_llm.ainvoke.await_count == 2
+
+    async def test_cached_documents_are_not_sent_again(self):
+        verdicts = DocumentRelevanceBatchVerdict(verdicts=[DocumentRelevanceBatchItem(doc_id="a", relevant=True, reason="Passt.")])
+        node, batch_llm, _ = _make_batch_node(batch_result=verdicts, cache=RelevanceVerdictCache())
+
+        await node(DocumentBatchCheckInput(docs=[_make_doc("a")], user_query="Frage"))
+        result = await node(DocumentBatchCheckInput(docs=[_make_doc("a")], user_query="frage"))
+
+        assert batch_llm.ainvoke.await_count == 1
+        assert result["tracked_documents"][0].reason == "Passt."
+
+    async def test_batch_prompt_comes_from_the_prompt_manager(self):
+        verdicts = DocumentRelevanceBatchVerdict(verdicts=[DocumentRelevanceBatchItem(doc_id="a", relevant=True, reason="Passt.")])
+        manager = PromptManager.static(check_documents_batch_prompt_template="Anfrage: {user_query}\n{documents}")
+        cache = RelevanceVerdictCache()
+        node, batch_llm, _ = _make_batch_node(batch_result=verdicts, cache=cache, prompt_manager=manager)
+
+        await node(DocumentBatchCheckInput(docs=[_make_doc("a")], user_query="Frage"))
+
+        prompt = batch_llm.ainvoke.await_args.args[0][1].content
+        assert prompt.startswith("Anfrage: Frage\nDokument-ID: a")
+        # Verdicts are cached under the version of the prompt that produced them
+        key = cache.make_key("Frage", "a", "Inhalt", manager.current.check_documents_batch_version)
+        verdict = await cache.aget(key)
+        assert verdict is not None and verdict.relevant is True
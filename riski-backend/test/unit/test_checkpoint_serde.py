@@ -0,0 +1,198 @@
+"""Unit tests for the compressed, deduplicated Redis checkpoint storage."""
+
+import fnmatch
+from typing import Any, cast
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from app.agent.checkpoint_serde import (
+    BLOB_REF_PREFIX,
+    PACKED_KEY,
+    CompactShallowRedisSaver,
+    blob_refs,
+    decode_blob,
+    encode_blob,
+    pack_channel_values,
+    unpack_channel_values,
+    unpack_stripped,
+)
+from app.agent.state import TrackedDocument
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import Checkpoint, CheckpointTuple, empty_checkpoint
+from langgraph.checkpoint.redis.ashallow import AsyncShallowRedisSaver
+from langgraph.checkpoint.redis.jsonplus_redis import JsonPlusRedisSerializer
+from redis.asyncio import Redis
+
+SERDE = JsonPlusRedisSerializer()
+
+
+def _checkpoint(channel_values: dict[str, Any]) -> Checkpoint:
+    checkpoint = empty_checkpoint()
+    checkpoint["id"] = "cp-1"
+    checkpoint["channel_values"] = channel_values
+    return checkpoint
+
+
+class FakeBlobRedis:
+    """Minimal stand-in for the plain key/value commands used for blobs."""
+
+    def __init__(self):
+        self.values: dict[str, bytes] = {}
+        self.set_calls = 0
+
+    def pipeline(self, transaction: bool = False):
+        pipeline = MagicMock()
+        pending: list = []
+
+        def _set(key, value, ex=None):
+            pending.append((key, value))
+
+        async def _execute():
+            for key, value in pending:
+                self.values[key] = value
+                self.set_calls += 1
+
+        pipeline.set = _set
+        pipeline.expire = MagicMock()
+        pipeline.execute = _execute
+        return pipeline
+
+    async def mget(self, keys):
+        return [self.values.get(key) for key in keys]
+
+    async def scan_iter(self, match: str, count: int | None = None):
+        for key in list(self.values):
+            if fnmatch.fnmatchcase(key, match):
+                yield key
+
+    async def unlink(self, *keys):
+        for key in keys:
+            self.values.pop(key, None)
+
+
+class TestPacking:
+    def test_round_trip_with_shared_blobs(self):
+        long_text = "Radverkehr " * 200
+        docs = [TrackedDocument(id="a", page_content=long_text), TrackedDocument(id="b", page_content=long_text)]
+        values = {"docs": docs, "short": "kurz"}
+
+        packed, blobs = pack_channel_values(values, SERDE, min_chars=100)
+
+        assert len(blobs) == 1
+        assert long_text not in str(packed)
+        assert docs[0].page_content == long_text
+        assert unpack_channel_values(packed, SERDE, blobs) == values
+
+    def test_unknown_blob_reference_raises(self):
+        packed, _ = pack_channel_values({"text": "x" * 200}, SERDE, min_chars=100)
+
+        with pytest.raises(KeyError):
+            unpack_channel_values(packed, SERDE, {})
+
+    def test_blob_refs_are_collected(self):
+        packed, blobs = pack_channel_values({"a": "x" * 200, "b": [AIMessage(content="y" * 200)]}, SERDE, min_chars=100)
+
+        assert blob_refs(unpack_stripped(packed, SERDE)) == set(blobs)
+        assert all(not text.startswith(BLOB_REF_PREFIX) for text in blobs.values())
+
+    def test_blob_encoding_round_trip(self):
+        assert decode_blob(encode_blob("Stadtratsantrag " * 50)) == "Stadtratsantrag " * 50
+
+
+class TestCompactShallowRedisSaver:
+    def _saver(self) -> tuple[CompactShallowRedisSaver, FakeBlobRedis]:
+        saver = CompactShallowRedisSaver(redis_client=MagicMock(spec=Redis), ttl={"default_ttl": 10}, blob_min_chars=100)
+        fake = FakeBlobRedis()
+        saver._redis = cast(Redis, fake)
+        return saver, fake
+
+    async def test_put_and_get_restore_messages_and_documents(self):
+        saver, fake = self._saver()
+        long_text = "Bebauungsplan " * 100
+        checkpoint = _checkpoint(
+            {
+                "messages": [HumanMessage(content="Frage"), AIMessage(content=long_text)],
+                "tracked_documents": [TrackedDocument(id="doc-1", page_content=long_text)],
+            }
+        )
+        config: RunnableConfig = {"configurable": {"thread_id": "t-1", "checkpoint_ns": ""}}
+
+        with patch.object(AsyncShallowRedisSaver, "aput", new=AsyncMock(return_value=config)) as base_put:
+            await saver.aput(config, checkpoint, {}, {})
+            await saver.aput(config, checkpoint, {}, {})
+        stored = base_put.call_args.args[1]
+
+        assert long_text not in str(stored["channel_values"])
+        assert fake.set_calls == 1
+
+        stored_tuple = CheckpointTuple(config=config, checkpoint=stored, metadata={})
+        with patch.object(AsyncShallowRedisSaver, "aget_tuple", new=AsyncMock(return_value=stored_tuple)):
+            restored = await saver.aget_tuple(config)
+
+        assert restored is not None
+        messages = restored.checkpoint["channel_values"]["messages"]
+        assert isinstance(messages[1], AIMessage)
+        assert messages[1].content == long_text
+        assert restored.checkpoint["channel_values"]["tracked_documents"][0].page_content == long_text
+
+    async def test_missing_blob_drops_the_checkpoint(self):
+        saver, fake = self._saver()
+        packed, _ = pack_channel_values({"text": "x" * 200}, SERDE, min_chars=100)
+        config: RunnableConfig = {"configurable": {"thread_id": "t-1", "checkpoint_ns": ""}}
+        stored_tuple = CheckpointTuple(config=config, checkpoint=_checkpoint(packed), metadata={})
+
+        with patch.object(AsyncShallowRedisSaver, "aget_tuple", new=AsyncMock(return_value=stored_tuple)):
+            assert await saver.aget_tuple(config) is None
+
+    async def test_missing_blob_returns_empty_channel_values(self):
+        saver, fake = self._saver()
+        packed, _ = pack_channel_values({"text": "x" * 200}, SERDE, min_chars=100)
+
+        with patch.object(AsyncShallowRedisSaver, "aget_channel_values", new=AsyncMock(return_value=packed)):
+            assert await saver.aget_channel_values("t-1", "", "cp-1") == {}
+
+    async def test_unreadable_codec_returns_empty_channel_values(self):
+        saver, fake = self._saver()
+        packed, _ = pack_channel_values({"text": "kurz"}, SERDE, min_chars=100, codec="zstd")
+        packed[PACKED_KEY]["codec"] = "lz4"
+
+        with patch.object(AsyncShallowRedisSaver, "aget_channel_values", new=AsyncMock(return_value=packed)):
+            assert await saver.aget_channel_values("t-1", "", "cp-1") == {}
+
+    def test_unknown_codec_fails_at_construction(self):
+        with pytest.raises(ValueError, match="lz4"):
+            CompactShallowRedisSaver(redis_client=MagicMock(spec=Redis), codec="lz4")
+
+    async def test_configured_codec_is_used_for_checkpoint_and_blobs(self):
+        saver = CompactShallowRedisSaver(redis_client=MagicMock(spec=Redis), blob_min_chars=100, codec="zlib")
+        fake = FakeBlobRedis()
+        saver._redis = cast(Redis, fake)
+        checkpoint = _checkpoint({"text": "y" * 200})
+        config: RunnableConfig = {"configurable": {"thread_id": "t-1", "checkpoint_ns": ""}}
+
+        with patch.object(AsyncShallowRedisSaver, "aput", new=AsyncMock(return_value=config)) as base_put:
+            await saver.aput(config, checkpoint, {}, {})
+
+        assert base_put.call_args.args[1]["channel_values"][PACKED_KEY]["codec"] == "zlib"
+        assert all(value.startswith(b"zlib:") for value in fake.values.values())
+
+    async def test_delete_thread_removes_its_blobs(self):
+        saver, fake = self._saver()
+        long_text = "Bebauungsplan " * 100
+        checkpoint = _checkpoint({"text": long_text})
+        configs: list[RunnableConfig] = [{"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}} for thread_id in ("t-1", "t-2")]
+
+        with patch.object(AsyncShallowRedisSaver, "aput", new=AsyncMock(return_value=configs[0])):
+            for config in configs:
+                await saver.aput(config, checkpoint, {}, {})
+        with patch.object(AsyncShallowRedisSaver, "adelete_thread", new=AsyncMock()) as base_delete:
+            await saver.adelete_thread("t-1")
+
+        base_delete.assert_awaited_once_with("t-1")
+        assert [key.split(":")[2] for key in fake.values] == ["t-2"]
+
+        # The blob is written again when the thread is reused.
+        with patch.object(AsyncShallowRedisSaver, "aput", new=AsyncMock(return_value=configs[0])):
+            await saver.aput(configs[0], checkpoint, {}, {})
+        assert fake.set_calls == 3
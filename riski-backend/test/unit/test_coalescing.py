@@ -0,0 +1,167 @@
+"""Unit tests for coalescing identical in-flight work of concurrent requests."""
+
+import asyncio
+import time
+import uuid
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from app.agent.coalescing import SINGLE_FLIGHT_CONFIG_KEY, CoalescingEmbeddings, coalesce
+from app.agent.resilient_llm import DEADLINE_METADATA_KEY
+from app.agent.tools import get_proposals
+from app.core.metrics import metrics
+from app.utils.single_flight import SingleFlight
+from langchain_core.documents import Document
+from langchain_core.runnables import RunnableConfig, RunnableLambda
+from langchain_core.runnables.config import var_child_runnable_config
+
+
+def _slow(result, started: asyncio.Event | None = None) -> AsyncMock:
+    async def call(*args, **kwargs):
+        if started is not None:
+            started.set()
+        await asyncio.sleep(0.05)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    return AsyncMock(side_effect=call)
+
+
+class TestSingleFlight:
+    async def test_concurrent_calls_share_one_result(self):
+        single_flight = SingleFlight()
+        fn = _slow("verdict")
+
+        results = await asyncio.gather(*(single_flight.do(("relevance_verdict", "k"), fn) for _ in range(3)))
+
+        assert results == ["verdict"] * 3
+        assert fn.await_count == 1
+        assert metrics.counter("coalesced_relevance_verdict_total") == 2
+        assert len(single_flight) == 0
+
+    async def test_finished_calls_are_not_reused(self):
+        single_flight = SingleFlight()
+        fn = _slow("a")
+
+        await single_flight.do(("embedding", "x"), fn)
+        await single_flight.do(("embedding", "x"), fn)
+
+        assert fn.await_count == 2
+
+    async def test_different_keys_run_separately(self):
+        single_flight = SingleFlight()
+        fn = _slow("a")
+
+        await asyncio.gather(single_flight.do(("embedding", "x"), fn), single_flight.do(("embedding", "y"), fn))
+
+        assert fn.await_count == 2
+
+    async def test_exception_is_raised_for_all_callers(self):
+        single_flight = SingleFlight()
+
+        results = await asyncio.gather(
+            *(single_flight.do(("proposals", "k"), _slow(RuntimeError("DB weg"))) for _ in range(2)), return_exceptions=True
+        )
+
+        assert all(isinstance(result, RuntimeError) for result in results)
+
+    async def test_cancelled_caller_does_not_cancel_other_callers(self):
+        single_flight = SingleFlight()
+        started = asyncio.Event()
+        fn = _slow("docs", started)
+        first = asyncio.create_task(single_flight.do(("vector_search", "q"), fn))
+        await started.wait()
+        second = asyncio.create_task(single_flight.do(("vector_search", "q"), fn))
+        await asyncio.sleep(0)
+
+        first.cancel()
+
+        assert await second == "docs"
+        assert first.cancelled()
+
+    async def test_last_cancelled_caller_cancels_the_call(self):
+        single_flight = SingleFlight()
+        started = asyncio.Event()
+        finished = MagicMock()
+
+        async def fn():
+            started.set()
+            await asyncio.sleep(10)
+            finished()
+
+        caller = asyncio.create_task(single_flight.do(("vector_search", "q"), fn))
+        await started.wait()
+        caller.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await caller
+        await asyncio.sleep(0)
+
+        finished.assert_not_called()
+        assert len(single_flight) == 0
+
+
+async def test_embeddings_share_concurrent_queries():
+    model = MagicMock()
+    model.aembed_query = _slow([1.0, 0.0])
+    embeddings = CoalescingEmbeddings(model)
+
+    assert await asyncio.gather(embeddings.aembed_query("Radwege"), embeddings.aembed_query("Radwege")) == [[1.0, 0.0]] * 2
+    model.aembed_query.assert_awaited_once_with("Radwege")
+
+
+async def test_concurrent_proposal_lookups_share_one_query():
+    file_id = str(uuid.UUID(int=1))
+    session = MagicMock()
+    session.execute = _slow(MagicMock(all=MagicMock(return_value=[("AN-1", "https://ris/1", "Radwege", None, None, [uuid.UUID(file_id)])])))
+    session.__aenter__ = AsyncMock(return_value=session)
+    session.__aexit__ = AsyncMock(return_value=None)
+    config: RunnableConfig = {"configurable": {SINGLE_FLIGHT_CONFIG_KEY: SingleFlight()}}
+    docs = [Document(id=file_id, page_content="")]
+
+    first, second = await asyncio.gather(*(get_proposals(docs, MagicMock(return_value=session), config, 5, 5) for _ in range(2)))
+
+    assert session.execute.await_count == 1
+    assert [p.identifier for p in first] == [p.identifier for p in second] == ["AN-1"]
+    # Each request gets its own proposal objects
+    assert first[0] is not second[0]
+
+
+def _run_config(single_flight: SingleFlight, remaining_seconds: float) -> RunnableConfig:
+    return {"configurable": {SINGLE_FLIGHT_CONFIG_KEY: single_flight}, "metadata": {DEADLINE_METADATA_KEY: time.time() + remaining_seconds}}
+
+
+async def test_shared_call_does_not_inherit_the_first_callers_run():
+    single_flight = SingleFlight()
+    seen: list[RunnableConfig | None] = []
+
+    async def shared():
+        seen.append(var_child_runnable_config.get())
+        await asyncio.sleep(0.05)
+        return "verdict"
+
+    async def node(_, config: RunnableConfig):
+        return await coalesce(config, ("relevance_verdict", "k"), shared)
+
+    results = await asyncio.gather(*(RunnableLambda(node).ainvoke(None, _run_config(single_flight, 60)) for _ in range(2)))
+
+    assert results == ["verdict", "verdict"]
+    assert seen == [None]
+
+
+async def test_joined_caller_waits_until_its_own_deadline_only():
+    single_flight = SingleFlight()
+
+    async def slow_call():
+        await asyncio.sleep(0.2)
+        return "verdict"
+
+    fn = AsyncMock(side_effect=slow_call)
+
+    first = asyncio.create_task(coalesce(_run_config(single_flight, 60), ("relevance_verdict", "k"), fn))
+    await asyncio.sleep(0)
+    with pytest.raises(asyncio.TimeoutError):
+        await coalesce(_run_config(single_flight, 0.05), ("relevance_verdict", "k"), fn)
+
+    assert await first == "verdict"
+    assert fn.await_count == 1
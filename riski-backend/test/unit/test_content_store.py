@@ -0,0 +1,73 @@
+"""Unit tests for the request-scoped document content store."""
+
+from unittest.mock import AsyncMock, MagicMock
+
+from app.agent.content_store import DocumentContentStore, get_content_store, resolve_document_text, with_content_store
+from app.agent.riski_agent import build_guard_nodes
+from app.agent.state import DocumentCheckInput
+from app.agent.types import DocumentRelevanceVerdict
+from langchain_core.runnables import RunnableConfig
+
+
+def _make_sessionmaker(rows: list[tuple[str, str | None]]) -> tuple[MagicMock, AsyncMock]:
+    session = MagicMock()
+    result = MagicMock()
+    result.all.return_value = rows
+    session.execute = AsyncMock(return_value=result)
+    sessionmaker = MagicMock()
+    sessionmaker.return_value.__aenter__ = AsyncMock(return_value=session)
+    sessionmaker.return_value.__aexit__ = AsyncMock(return_value=False)
+    return sessionmaker, session.execute
+
+
+class TestDocumentContentStore:
+    async def test_put_texts_are_served_without_database(self):
+        sessionmaker, execute = _make_sessionmaker([])
+        store = DocumentContentStore(sessionmaker)
+        store.put("doc-1", "Volltext")
+
+        assert await store.aget("doc-1") == "Volltext"
+        execute.assert_not_awaited()
+
+    async def test_missing_texts_are_loaded_once_from_database(self):
+        sessionmaker, execute = _make_sessionmaker([("doc-2", "Aus der DB")])
+        store = DocumentContentStore(sessionmaker)
+
+        assert await store.aget_many(["doc-2", "unknown"]) == {"doc-2": "Aus der DB"}
+        assert await store.aget("doc-2") == "Aus der DB"
+        execute.assert_awaited_once()
+
+    async def test_database_errors_fall_back_to_snippet(self):
+        sessionmaker, execute = _make_sessionmaker([])
+        execute.side_effect = ConnectionError("db down")
+        config: RunnableConfig = {"configurable": {"content_store": DocumentContentStore(sessionmaker)}}
+
+        assert await resolve_document_text("doc-3", "Snippet", config) == "Snippet"
+
+    def test_with_content_store_creates_a_fresh_store_per_call(self):
+        base = {"configurable": {"db_sessionmaker": MagicMock()}, "max_concurrency": 2}
+
+        first, second = with_content_store(base), with_content_store(base)
+
+        assert get_content_store(first) is not get_content_store(second)
+        assert get_content_store(base) is None
+        assert first["max_concurrency"] == 2
+
+
+class TestCheckDocumentUsesStore:
+    async def test_full_text_from_store_is_used_for_the_prompt(self):
+        structured = AsyncMock()
+        structured.ainvoke = AsyncMock(return_value=DocumentRelevanceVerdict(relevant=True, reason="Ja."))
+        check_model = MagicMock()
+        check_model.with_structured_output = MagicMock(return_value=structured)
+        _, _, check_document, _ = build_guard_nodes(chat_model=MagicMock(), relevance_check_model=check_model)
+        store = DocumentContentStore()
+        store.put("doc-1", "Vollständiger Text zum Radverkehr.")
+
+        await check_document(
+            DocumentCheckInput(doc_index=0, doc={"id": "doc-1", "page_content": "Snippet", "metadata": {}}, user_query="Radverkehr"),
+            {"configurable": {"content_store": store}},
+        )
+
+        prompt = structured.ainvoke.call_args[0][0][1].content
+        assert "Vollständiger Text zum Radverkehr." in prompt
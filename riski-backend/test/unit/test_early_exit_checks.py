@@ -0,0 +1,91 @@
+"""Unit tests for the early-exit relevance check (``check_documents_early_exit``) and its fan-out."""
+
+import asyncio
+from unittest.mock import MagicMock
+
+from app.agent.riski_agent import NODE_CHECK_DOCUMENTS_EARLY_EXIT, build_early_exit_check_node, build_guard_nodes
+from app.agent.state import DocumentBatchCheckInput, RelevanceUpdate, RiskiAgentState, TrackedDocument
+from app.core.metrics import metrics
+
+
+def _make_doc(doc_id: str) -> dict:
+    return {"id": doc_id, "page_content": "Inhalt", "metadata": {"name": f"Dokument {doc_id}"}}
+
+
+def _fake_check_document(delays: dict[str, float], relevant: set[str]):
+    """A ``check_document`` stand-in whose verdict for each document arrives after a delay."""
+    started: list[str] = []
+
+    async def check_document(state, config=None):
+        doc_id = state["doc"]["id"]
+        started.append(doc_id)
+        await asyncio.sleep(delays.get(doc_id, 0))
+        return {"tracked_documents": [RelevanceUpdate(doc_id=doc_id, is_relevant=doc_id in relevant, reason="Geprüft.")]}
+
+    return check_document, started
+
+
+async def test_stops_at_quorum_and_applies_policy_to_unfinished_checks():
+    check_document, _ = _fake_check_document({"a": 0, "b": 0, "slow": 5}, relevant={"a", "b"})
+    node = build_early_exit_check_node(check_document, quorum=2, deadline_seconds=None, unfinished_policy="reject")
+
+    result = await node(
+        DocumentBatchCheckInput(docs=[_make_doc("a"), _make_doc("b"), _make_doc("slow")], user_query="Frage"),
+        {"max_concurrency": 3},
+    )
+
+    updates = {u.doc_id: u for u in result["tracked_documents"]}
+    assert updates["a"].is_relevant and updates["b"].is_relevant
+    assert updates["slow"].is_relevant is False
+    assert "nicht abgewartet" in updates["slow"].reason
+    assert metrics.counter("relevance_early_exit_quorum_total") == 1
+    assert metrics.counter("relevance_unfinished_checks_total") == 1
+
+
+async def test_deadline_keeps_unfinished_documents_with_accept_policy():
+    check_document, _ = _fake_check_document({"fast": 0, "slow": 5}, relevant=set())
+    node = build_early_exit_check_node(check_document, quorum=3, deadline_seconds=0.05, unfinished_policy="accept")
+
+    result = await node(DocumentBatchCheckInput(docs=[_make_doc("fast"), _make_doc("slow")], user_query="Frage"), {"max_concurrency": 2})
+
+    updates = {u.doc_id: u for u in result["tracked_documents"]}
+    assert updates["fast"].is_relevant is False
+    assert updates["slow"].is_relevant is True
+    assert metrics.counter("relevance_early_exit_deadline_total") == 1
+
+
+async def test_guard_accepted_documents_count_towards_quorum():
+    check_document, started = _fake_check_document({}, relevant={"a"})
+    node = build_early_exit_check_node(check_document, quorum=2, deadline_seconds=None)
+
+    result = await node(DocumentBatchCheckInput(docs=[_make_doc("a"), _make_doc("b")], user_query="Frage", already_relevant=2), None)
+
+    assert started == []
+    assert all(u.is_relevant for u in result["tracked_documents"])
+
+
+async def test_waits_for_all_checks_without_quorum_and_deadline():
+    check_document, _ = _fake_check_document({"a": 0.01, "b": 0.02}, relevant={"a"})
+    node = build_early_exit_check_node(check_document, quorum=None, deadline_seconds=None)
+
+    result = await node(DocumentBatchCheckInput(docs=[_make_doc("a"), _make_doc("b")], user_query="Frage"), {"max_concurrency": 2})
+
+    assert {u.doc_id: u.is_relevant for u in result["tracked_documents"]} == {"a": True, "b": False}
+    assert metrics.counter("relevance_unfinished_checks_total") == 0
+
+
+def test_fan_out_sends_single_branch_in_early_exit_mode():
+    fan_out_checks = build_guard_nodes(chat_model=MagicMock(), relevance_check_model=MagicMock(), check_mode="early_exit")[1]
+    state = RiskiAgentState(
+        user_query="Frage",
+        tracked_documents=[
+            TrackedDocument(id="accepted", page_content="Inhalt", is_checked=True, is_relevant=True),
+            *(TrackedDocument(id=str(i), page_content="Inhalt") for i in range(4)),
+        ],
+    )
+
+    sends = fan_out_checks(state)
+
+    assert [send.node for send in sends] == [NODE_CHECK_DOCUMENTS_EARLY_EXIT]
+    assert len(sends[0].arg["docs"]) == 4
+    assert sends[0].arg["already_relevant"] == 1
@@ -0,0 +1,101 @@
+"""Unit tests for answering follow-up questions from the previous turn's documents."""
+
+import json
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from app.agent import riski_agent
+from app.agent.riski_agent import build_riski_graph
+from app.agent.state import ErrorInfo, TrackedDocument, TrackedProposal
+from app.agent.tools import get_agent_capabilities, retrieve_documents, reuse_previous_documents
+from app.agent.types import StructuredAgentResponse
+from app.core.metrics import metrics
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+PREVIOUS_ANSWER = json.dumps({"response": "Es gibt zwei Anträge zu Radwegen in Schwabing.", "documents": [], "proposals": []})
+
+
+@pytest.fixture
+def generation(monkeypatch) -> AsyncMock:
+    generate = AsyncMock(
+        return_value=StructuredAgentResponse(response="Der erste Antrag fordert einen Radweg.", documents=[], proposals=[])
+    )
+    monkeypatch.setattr(riski_agent, "astream_structured_output", generate)
+    return generate
+
+
+def _previous_turn(question: str) -> dict:
+    """Input state of a follow-up turn: the history and the checked documents of the previous turn."""
+    return {
+        "messages": [HumanMessage(content="Radwege in Schwabing"), AIMessage(content=PREVIOUS_ANSWER), HumanMessage(content=question)],
+        "tracked_documents": [
+            TrackedDocument(id="file-1", page_content="Radweg", metadata={"name": "Radwege.pdf"}, is_checked=True, is_relevant=True),
+            TrackedDocument(id="file-2", page_content="Kita", metadata={"name": "Kita.pdf"}, is_checked=True, is_relevant=False),
+        ],
+        "tracked_proposals": [TrackedProposal(identifier="AN-1", source_document_ids=["file-1"])],
+        "user_query": "Radwege in Schwabing",
+    }
+
+
+def _chat_model(first_pass: AIMessage) -> MagicMock:
+    """Chat model whose tool-bound first pass returns *first_pass*; ``followup`` is the binding that offers reuse."""
+    chat_model = MagicMock()
+    chat_model.initial, chat_model.followup = MagicMock(), MagicMock()
+    chat_model.initial.ainvoke = AsyncMock(return_value=first_pass)
+    chat_model.followup.ainvoke = AsyncMock(return_value=first_pass)
+    chat_model.bind_tools.side_effect = lambda tools: (
+        chat_model.followup if reuse_previous_documents.name in [t.name for t in tools] else chat_model.initial
+    )
+    return chat_model
+
+
+def _graph(chat_model: MagicMock, relevance_model: MagicMock | None = None):
+    return build_riski_graph(chat_model, relevance_model or MagicMock(), [retrieve_documents, get_agent_capabilities]).compile()
+
+
+async def test_followup_reuses_previous_documents(generation):
+    call = {"name": reuse_previous_documents.name, "args": {}, "id": "call-1", "type": "tool_call"}
+    chat_model = _chat_model(AIMessage(content="", tool_calls=[call]))
+    relevance_model = MagicMock()
+
+    state = await _graph(chat_model, relevance_model).ainvoke(_previous_turn("Was fordert der erste Antrag genau?"))
+
+    # The first pass saw the previous documents and could choose to reuse them
+    chat_model.initial.ainvoke.assert_not_awaited()
+    first_pass_messages = chat_model.followup.ainvoke.await_args.args[0]
+    assert isinstance(first_pass_messages[1], SystemMessage) and "Radwege.pdf" in first_pass_messages[1].content
+    assert "Kita.pdf" not in first_pass_messages[1].content
+    # No retrieval and no relevance checks; only the relevant document reaches the generation
+    relevance_model.assert_not_called()
+    generation_docs = json.loads(generation.await_args.args[2][-1].content)
+    assert [d["id"] for d in generation_docs["documents"]] == ["file-1"]
+    assert json.loads(state["messages"][-1].content)["response"] == "Der erste Antrag fordert einen Radweg."
+    assert [d.id for d in state["tracked_documents"]] == ["file-1", "file-2"]
+    assert [p.identifier for p in state["tracked_proposals"]] == ["AN-1"]
+    assert state["user_query"] == "Was fordert der erste Antrag genau?"
+    assert metrics.counter("followup_documents_reused_total") == 1
+
+
+async def test_new_topic_drops_previous_documents_and_error(generation):
+    chat_model = _chat_model(AIMessage(content="Dazu kann ich nichts sagen."))
+    previous = _previous_turn("Wie viele Kitas gibt es in Pasing?")
+    previous["error_info"] = ErrorInfo(error_type="timeout", message="Zu langsam")
+
+    state = await _graph(chat_model).ainvoke(previous)
+
+    # No tool was called in this turn: the previous turn's documents must not answer it
+    generation.assert_not_awaited()
+    assert state["tracked_documents"] == []
+    assert state["tracked_proposals"] == []
+    assert state["error_info"].error_type == "no_tool_call"
+    assert metrics.counter("followup_documents_reused_total") == 0
+
+
+async def test_reuse_is_only_offered_on_followups(generation):
+    chat_model = _chat_model(AIMessage(content="Hallo!"))
+
+    await _graph(chat_model).ainvoke({"messages": [HumanMessage(content="Radwege in Schwabing")]})
+
+    chat_model.followup.ainvoke.assert_not_awaited()
+    messages = chat_model.initial.ainvoke.await_args.args[0]
+    assert [type(m) for m in messages] == [SystemMessage, HumanMessage]
@@ -0,0 +1,126 @@
+"""Unit tests for the single-query proposal lookup and its cache."""
+
+import uuid
+from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock
+
+from app.agent.proposal_cache import PROPOSAL_CACHE_CONFIG_KEY, ProposalCache
+from app.agent.tools import _proposal_query, get_proposals
+from app.core.metrics import metrics
+from langchain_core.documents import Document
+from langchain_core.runnables import RunnableConfig
+from sqlalchemy.dialects import postgresql
+
+FILE_A, FILE_B, FILE_C = (str(uuid.UUID(int=i)) for i in (1, 2, 3))
+
+
+def _sessionmaker(rows: list[tuple]) -> MagicMock:
+    session = MagicMock()
+    session.execute = AsyncMock(return_value=MagicMock(all=MagicMock(return_value=rows)))
+    session.__aenter__ = AsyncMock(return_value=session)
+    session.__aexit__ = AsyncMock(return_value=None)
+    return MagicMock(return_value=session, session=session)
+
+
+ROWS = [
+    ("AN-1", "https://ris/1", "Radwege", "Mehr Radwege", datetime(2024, 5, 1), [uuid.UUID(FILE_A), uuid.UUID(FILE_B)]),
+    ("AN-2", "https://ris/2", "Kitas", None, None, [uuid.UUID(FILE_B)]),
+]
+
+
+def test_proposal_query_filters_and_groups_in_sql():
+    sql = str(_proposal_query([FILE_A]).compile(dialect=postgresql.dialect()))
+
+    assert "JOIN paper_file ON paper_file.paper_id = paper.db_id" in sql
+    assert "paper.paper_type = " in sql
+    assert "GROUP BY paper.reference, paper.id" in sql
+    assert "array_agg(DISTINCT paper_file.file_id)" in sql
+    assert "paper.text" not in sql and "JOIN file " not in sql
+
+
+async def test_get_proposals_merges_files_per_proposal():
+    sessionmaker = _sessionmaker(ROWS)
+    docs = [Document(id=FILE_B, page_content=""), Document(id=FILE_A, page_content=""), Document(id=FILE_C, page_content="")]
+
+    proposals = await get_proposals(docs, sessionmaker, {}, 5, 5)
+
+    assert sessionmaker.session.execute.await_count == 1
+    assert [(p.identifier, p.source_document_ids) for p in proposals] == [("AN-1", [FILE_B, FILE_A]), ("AN-2", [FILE_B])]
+    assert proposals[0].model_dump(exclude={"source_document_ids"}) == {
+        "identifier": "AN-1",
+        "name": "Radwege",
+        "subject": "Mehr Radwege",
+        "date": "2024-05-01T00:00:00",
+        "risUrl": "https://ris/1",
+    }
+    assert proposals[1].subject == "" and proposals[1].date is None
+
+
+async def test_get_proposals_only_queries_uncached_files():
+    cache = ProposalCache(ttl_seconds=60)
+    config: RunnableConfig = {"configurable": {PROPOSAL_CACHE_CONFIG_KEY: cache}}
+
+    first = await get_proposals(
+        [Document(id=FILE_A, page_content=""), Document(id=FILE_C, page_content="")],
+        _sessionmaker([ROWS[0][:5] + ([uuid.UUID(FILE_A)],)]),
+        config,
+        5,
+        5,
+    )
+    assert [p.source_document_ids for p in first] == [[FILE_A]]
+
+    # FILE_A (one proposal) and FILE_C (none) are cached; only FILE_B is queried.
+    sessionmaker = _sessionmaker([ROWS[0][:5] + ([uuid.UUID(FILE_B)],), ROWS[1]])
+    second = await get_proposals(
+        [Document(id=FILE_A, page_content=""), Document(id=FILE_B, page_content=""), Document(id=FILE_C, page_content="")],
+        sessionmaker,
+        config,
+        5,
+        5,
+    )
+    statement = sessionmaker.session.execute.await_args.args[0]
+    assert statement.compile().params["file_id_1"] == [FILE_B]
+    assert [(p.identifier, p.source_document_ids) for p in second] == [("AN-1", [FILE_A, FILE_B]), ("AN-2", [FILE_B])]
+    assert metrics.counter("proposal_cache_hits_total") == 2
+
+    sessionmaker = _sessionmaker([])
+    third = await get_proposals([Document(id=FILE_C, page_content="")], sessionmaker, config, 5, 5)
+    assert third == []
+    assert sessionmaker.session.execute.await_count == 0
+
+
+async def test_get_proposals_uses_file_cards_without_db():
+    papers = [
+        {
+            "identifier": "AN-1",
+            "name": "Radwege",
+            "subject": None,
+            "date": "2024-05-01T00:00:00",
+            "risUrl": "https://ris/1",
+            "paper_type": "Stadtratsantrag",
+        },
+        {
+            "identifier": "SV-9",
+            "name": "Vorlage",
+            "subject": None,
+            "date": None,
+            "risUrl": "https://ris/9",
+            "paper_type": "Sitzungsvorlage",
+        },
+    ]
+    sessionmaker = _sessionmaker([ROWS[1][:5] + ([uuid.UUID(FILE_C)],)])
+    docs = [
+        Document(id=FILE_A, page_content="", metadata={"papers": papers, "meetings": []}),
+        Document(id=FILE_B, page_content="", metadata={"papers": papers[:1]}),
+        Document(id=FILE_C, page_content="", metadata={"papers": None}),
+    ]
+
+    proposals = await get_proposals(docs, sessionmaker, {}, 5, 5)
+
+    # Only FILE_C (no card yet) is looked up in the database.
+    statement = sessionmaker.session.execute.await_args.args[0]
+    assert statement.compile().params["file_id_1"] == [FILE_C]
+    assert [(p.identifier, p.date, p.source_document_ids) for p in proposals] == [
+        ("AN-1", "2024-05-01T00:00:00", [FILE_A, FILE_B]),
+        ("AN-2", None, [FILE_C]),
+    ]
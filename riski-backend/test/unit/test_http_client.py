@@ -0,0 +1,58 @@
+"""Unit tests for the shared HTTP client of the LLM and embedding clients."""
+
+import httpx
+import pytest
+from app.core.http_client import MeteredTransport, create_http_client, prewarm_connections
+from app.core.metrics import metrics
+from app.core.settings import HttpClientSettings
+
+
+class _Body(httpx.AsyncByteStream):
+    async def __aiter__(self):
+        yield b'{"error": "unauthorized"}'
+
+
+def _handler(request: httpx.Request) -> httpx.Response:
+    if request.url.host == "down.example":
+        raise httpx.ConnectError("connection refused", request=request)
+    # A streamed body, like a real network response (in-memory bodies are read and closed immediately)
+    return httpx.Response(401, stream=_Body())
+
+
+def _client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=MeteredTransport(httpx.MockTransport(_handler)))
+
+
+async def test_metered_transport_counts_requests_until_body_is_read():
+    async with _client() as client:
+        async with client.stream("GET", "https://llm.example/v1/models") as response:
+            assert metrics.gauge("http_requests_in_flight") == 1
+            await response.aread()
+        assert metrics.gauge("http_requests_in_flight") == 0
+
+        with pytest.raises(httpx.ConnectError):
+            await client.get("https://down.example/v1/models")
+
+    assert metrics.counter("http_requests_total") == 2
+    assert metrics.counter("http_request_errors_total") == 1
+    assert metrics.gauge("http_requests_in_flight") == 0
+
+
+async def test_prewarm_connections_tolerates_auth_errors_and_failures():
+    async with _client() as client:
+        assert await prewarm_connections(client, "https://llm.example/v1/", 3) == 3
+        assert metrics.gauge("http_prewarmed_connections") == 3
+        assert await prewarm_connections(client, "https://down.example/v1", 2) == 0
+        assert await prewarm_connections(client, "https://llm.example/v1", 0) == 0
+
+    assert metrics.counter("http_requests_total") == 5
+
+
+async def test_create_http_client_applies_settings():
+    client = create_http_client(HttpClientSettings(connect_timeout_seconds=2.0, read_timeout_seconds=30.0, http2=True))
+    try:
+        assert client.timeout.connect == 2.0
+        assert client.timeout.read == 30.0
+        assert isinstance(client._transport, MeteredTransport)
+    finally:
+        await client.aclose()
@@ -0,0 +1,181 @@
+"""Unit tests for the process-wide admission control of LLM calls."""
+
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+from app.agent.admission import ADMISSION_RUN_METADATA_KEY, LLMAdmissionController, call_pool, with_admission_run
+from app.agent.resilient_llm import ResilientChatOpenAI
+from app.core.metrics import metrics
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.runnables import RunnableConfig
+from langchain_openai import ChatOpenAI
+from pydantic import SecretStr
+
+API_KEY = SecretStr("test")
+
+
+async def _settle() -> None:
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+class Recorder:
+    """Runs calls through a controller and records the order in which they were admitted."""
+
+    def __init__(self, controller: LLMAdmissionController) -> None:
+        self.controller = controller
+        self.admitted: list[str] = []
+        self.release = asyncio.Event()
+
+    async def call(self, name: str, pool: str, run_id: str) -> None:
+        async with self.controller.admit(pool, run_id):  # type: ignore[arg-type]
+            self.admitted.append(name)
+            await self.release.wait()
+
+    def start(self, name: str, pool: str = "relevance", run_id: str = "run-a") -> asyncio.Task:
+        return asyncio.create_task(self.call(name, pool, run_id))
+
+
+async def _run_one_at_a_time(recorder: Recorder, tasks: list[asyncio.Task]) -> None:
+    """Let the calls finish one after another, so each freed slot is granted separately."""
+    for _ in tasks:
+        await _settle()
+        recorder.release.set()
+        await _settle()
+        recorder.release.clear()
+    await asyncio.gather(*tasks)
+
+
+async def test_pool_budget_limits_concurrent_calls():
+    recorder = Recorder(LLMAdmissionController({"relevance": 2}))
+    tasks = [recorder.start(f"check-{i}") for i in range(5)]
+    await _settle()
+
+    assert recorder.admitted == ["check-0", "check-1"]
+    assert metrics.gauge("llm_admission_relevance_queued") == 3
+    assert metrics.gauge("llm_admission_relevance_in_flight") == 2
+
+    recorder.release.set()
+    await asyncio.gather(*tasks)
+    assert len(recorder.admitted) == 5
+    assert metrics.counter("llm_admission_relevance_admitted_total") == 5
+    assert metrics.counter("llm_admission_relevance_wait_seconds_total") > 0
+    assert metrics.gauge("llm_admission_relevance_in_flight") == 0
+
+
+async def test_runs_share_a_pool_fairly():
+    recorder = Recorder(LLMAdmissionController({"relevance": 1}))
+    tasks = [recorder.start(f"a{i}", run_id="run-a") for i in range(3)]
+    await _settle()
+    tasks += [recorder.start(f"b{i}", run_id="run-b") for i in range(2)]
+
+    await _run_one_at_a_time(recorder, tasks)
+
+    # a0 holds the slot while a1 and a2 wait; run-b's calls are not queued behind them.
+    assert recorder.admitted == ["a0", "b0", "a1", "b1", "a2"]
+
+
+async def test_generation_is_admitted_before_relevance_checks():
+    recorder = Recorder(LLMAdmissionController({"chat": 4, "relevance": 4}, max_concurrent=1))
+    tasks = [recorder.start("check-0"), recorder.start("check-1")]
+    await _settle()
+    tasks.append(recorder.start("generation", pool="chat", run_id="run-b"))
+
+    await _run_one_at_a_time(recorder, tasks)
+
+    assert recorder.admitted == ["check-0", "generation", "check-1"]
+
+
+async def test_cancelled_waiter_leaves_the_queue():
+    recorder = Recorder(LLMAdmissionController({"relevance": 1}))
+    first, second = recorder.start("first"), recorder.start("second")
+    await _settle()
+
+    second.cancel()
+    await _settle()
+    assert metrics.gauge("llm_admission_relevance_queued") == 0
+
+    recorder.release.set()
+    await first
+    assert recorder.admitted == ["first"]
+    assert metrics.gauge("llm_admission_relevance_in_flight") == 0
+
+
+async def test_shared_budget_waits_for_a_redis_lease():
+    redis = SimpleNamespace(eval=AsyncMock(side_effect=[0, 1]), zrem=AsyncMock())
+    controller = LLMAdmissionController({"chat": 2}, redis=redis)  # type: ignore[arg-type]
+
+    async with controller.admit("chat", "run-a"):
+        assert redis.eval.await_count == 2
+
+    key, token = redis.zrem.await_args.args
+    assert key == "riski:llm_admission:chat"
+    assert token == redis.eval.await_args.args[-1]
+
+
+async def test_redis_errors_fall_back_to_the_local_budget():
+    redis = SimpleNamespace(eval=AsyncMock(side_effect=ConnectionError("redis weg")), zrem=AsyncMock())
+    controller = LLMAdmissionController({"chat": 2}, redis=redis)  # type: ignore[arg-type]
+
+    async with controller.admit("chat", "run-a"):
+        pass
+
+    redis.zrem.assert_not_awaited()
+
+
+def test_call_pool_and_run_metadata():
+    assert call_pool("chat", {"langgraph_node": "guard"}) == "suggestions"
+    assert call_pool("chat", {"langgraph_node": "collect_results"}) == "suggestions"
+    assert call_pool("chat", {"langgraph_node": "model"}) == "chat"
+    assert call_pool("relevance", None) == "relevance"
+
+    config = with_admission_run({"metadata": {"source": "ui"}})
+    assert config["metadata"]["source"] == "ui"
+    assert config["metadata"][ADMISSION_RUN_METADATA_KEY] != with_admission_run({})["metadata"][ADMISSION_RUN_METADATA_KEY]
+
+
+async def test_resilient_model_waits_for_admission(monkeypatch):
+    active: list[int] = []
+    peak: list[int] = []
+
+    async def fake_agenerate(model, messages, stop=None, run_manager=None, **kwargs):
+        active.append(1)
+        peak.append(len(active))
+        await asyncio.sleep(0.01)
+        active.pop()
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="ok"))])
+
+    monkeypatch.setattr(ChatOpenAI, "_agenerate", fake_agenerate)
+    controller = LLMAdmissionController({"relevance": 2})
+    model = ResilientChatOpenAI(model_name="primary", openai_api_key=API_KEY, admission=controller, admission_pool="relevance")
+    run_manager = SimpleNamespace(metadata={ADMISSION_RUN_METADATA_KEY: "run-a"})
+
+    await asyncio.gather(*(model._agenerate([HumanMessage(content="Frage")], run_manager=run_manager) for _ in range(6)))  # type: ignore[arg-type]
+
+    assert max(peak) == 2
+    assert metrics.counter("llm_admission_relevance_admitted_total") == 6
+
+
+async def test_streamed_call_is_admitted_with_its_run_and_node_pool(monkeypatch):
+    async def fake_astream(model, messages, stop=None, run_manager=None, **kwargs):
+        yield ChatGenerationChunk(message=AIMessageChunk(content="ok"))
+
+    monkeypatch.setattr(ChatOpenAI, "_astream", fake_astream)
+    controller = LLMAdmissionController({"chat": 2, "suggestions": 2})
+    admitted: list[tuple[str, str | None]] = []
+    admit = controller.admit
+
+    def record(pool, run_id=None):
+        admitted.append((pool, run_id))
+        return admit(pool, run_id)
+
+    monkeypatch.setattr(controller, "admit", record)
+    model = ResilientChatOpenAI(model_name="primary", openai_api_key=API_KEY, admission=controller, streaming=True)
+    config: RunnableConfig = {"metadata": {ADMISSION_RUN_METADATA_KEY: "run-a", "langgraph_node": "collect_results"}}
+
+    [chunk async for chunk in model.astream([HumanMessage(content="Frage")], config=config)]
+    await model.ainvoke([HumanMessage(content="Frage")], config=config)
+
+    assert admitted == [("suggestions", "run-a"), ("suggestions", "run-a")]
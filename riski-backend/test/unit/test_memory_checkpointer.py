@@ -0,0 +1,66 @@
+"""Unit tests for the bounded in-memory checkpointer."""
+
+from unittest.mock import patch
+
+from app.agent.memory_checkpointer import BoundedInMemorySaver
+from app.core.metrics import metrics
+from langgraph.checkpoint.base import create_checkpoint, empty_checkpoint
+
+
+def _put(saver: BoundedInMemorySaver, thread_id: str, text: str = "Inhalt") -> None:
+    checkpoint = create_checkpoint(empty_checkpoint(), None, 1)
+    checkpoint["channel_values"] = {"messages": text}
+    checkpoint["channel_versions"] = {"messages": saver.get_next_version(None, None)}
+    saver.put(
+        {"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}},
+        checkpoint,
+        {"source": "loop", "step": 1},
+        checkpoint["channel_versions"],
+    )
+
+
+def _get(saver: BoundedInMemorySaver, thread_id: str):
+    return saver.get_tuple({"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}})
+
+
+class TestBoundedInMemorySaver:
+    def test_least_recently_used_thread_is_evicted(self):
+        saver = BoundedInMemorySaver(max_threads=2, max_bytes=None, ttl_seconds=None)
+        _put(saver, "a")
+        _put(saver, "b")
+        assert _get(saver, "a") is not None
+        _put(saver, "c")
+
+        assert _get(saver, "b") is None
+        assert _get(saver, "a") is not None
+        assert _get(saver, "c") is not None
+        assert metrics.counter("checkpointer_evictions_lru_total") == 1
+        assert metrics.gauge("checkpointer_threads") == 2
+
+    def test_byte_limit_evicts_but_keeps_current_thread(self):
+        saver = BoundedInMemorySaver(max_threads=None, max_bytes=5_000, ttl_seconds=None)
+        _put(saver, "a", "x" * 3_000)
+        _put(saver, "b", "y" * 3_000)
+
+        assert _get(saver, "a") is None
+        assert _get(saver, "b") is not None
+        assert 3_000 < saver.total_bytes <= 5_000
+        assert metrics.gauge("checkpointer_bytes") == saver.total_bytes
+
+    def test_idle_threads_expire(self):
+        saver = BoundedInMemorySaver(max_threads=None, max_bytes=None, ttl_seconds=60)
+        with patch("app.agent.memory_checkpointer.time.monotonic", return_value=100.0):
+            _put(saver, "a")
+        with patch("app.agent.memory_checkpointer.time.monotonic", return_value=200.0):
+            assert _get(saver, "a") is None
+
+        assert len(saver) == 0
+        assert saver.total_bytes == 0
+        assert not saver.blobs
+        assert metrics.counter("checkpointer_evictions_ttl_total") == 1
+
+    def test_unknown_threads_do_not_allocate_storage(self):
+        saver = BoundedInMemorySaver()
+
+        assert _get(saver, "unknown") is None
+        assert "unknown" not in saver.storage
@@ -0,0 +1,52 @@
+"""Unit tests for the local Langfuse prompt cache."""
+
+from unittest.mock import MagicMock
+
+from app.agent.prompt_cache import PromptCache, load_prompt
+from app.core.metrics import metrics
+from langfuse.api.resources.prompts.types import Prompt_Text
+from langfuse.model import TextPromptClient
+
+
+def _prompt(name: str = "system", version: int = 1, text: str = "Heute ist {{date_written}}.") -> TextPromptClient:
+    return TextPromptClient(Prompt_Text(type="text", name=name, version=version, prompt=text, config={}, labels=["production"], tags=[]))
+
+
+def _lf_client(*prompts: TextPromptClient) -> MagicMock:
+    by_name = {prompt.name: prompt for prompt in prompts}
+    lf_client = MagicMock()
+
+    def get_prompt(name, label, cache_ttl_seconds=None):
+        if name not in by_name:
+            raise RuntimeError("Langfuse nicht erreichbar")
+        return by_name[name]
+
+    lf_client.get_prompt = MagicMock(side_effect=get_prompt)
+    return lf_client
+
+
+async def test_load_prompt_fetches_once_and_then_reads_the_file(tmp_path):
+    path = tmp_path / "prompts" / "prompts.json"
+    lf_client = _lf_client(_prompt())
+
+    fetched = await load_prompt(lf_client, PromptCache(path), "system", "production")
+    assert fetched.compile(date_written="Montag") == "Heute ist Montag."
+    assert path.exists()
+
+    # A new process reads the prompt from the file without contacting Langfuse.
+    cached = await load_prompt(_lf_client(), PromptCache(path), "system", "production")
+    assert cached == fetched
+    assert cached.compile(date_written="Dienstag") == "Heute ist Dienstag."
+    assert lf_client.get_prompt.call_count == 1
+    assert metrics.counter("prompt_cache_hits_total") == 1
+    assert metrics.counter("prompt_cache_misses_total") == 1
+
+
+def test_unreadable_or_disabled_cache_misses(tmp_path):
+    path = tmp_path / "prompts.json"
+    path.write_text("{kaputt", encoding="utf-8")
+    assert PromptCache(path).get("system", "production") is None
+
+    disabled = PromptCache(None)
+    disabled.put(_prompt(), "production")
+    assert disabled.get("system", "production") is None
@@ -0,0 +1,143 @@
+"""Unit tests for the hot-reloadable prompt manager."""
+
+import asyncio
+from unittest.mock import MagicMock
+
+import pytest
+from app.agent.prompt_cache import PromptCache
+from app.agent.prompt_manager import PROMPT_MANAGER_CONFIG_KEY, PromptManager, agent_capabilities_text
+from app.agent.types import AGENT_CAPABILITIES_PROMPT, CHECK_DOCUMENT_PROMPT_TEMPLATE, CHECK_DOCUMENTS_BATCH_PROMPT_TEMPLATE
+from app.core.metrics import metrics
+from langfuse.api.resources.prompts.types import Prompt_Text
+from langfuse.model import TextPromptClient
+
+SYSTEM = ("system", "production")
+CHECK = ("check_document", "production")
+CAPABILITIES = ("agent_capabilities", "production")
+
+
+def _prompt(name: str, version: int, text: str) -> TextPromptClient:
+    return TextPromptClient(Prompt_Text(type="text", name=name, version=version, prompt=text, config={}, labels=["production"], tags=[]))
+
+
+class FakeLangfuse:
+    """Serves the prompts in ``self.prompts``; unknown names or ``available=False`` raise."""
+
+    def __init__(self, **prompts: TextPromptClient) -> None:
+        self.prompts = prompts
+        self.available = True
+        self.get_prompt = MagicMock(side_effect=self._get_prompt)
+
+    def _get_prompt(self, name, label, cache_ttl_seconds=None):
+        if not self.available or name not in self.prompts:
+            raise RuntimeError("Langfuse nicht erreichbar")
+        return self.prompts[name]
+
+
+def _manager(lf_client: FakeLangfuse, tmp_path=None, **kwargs) -> PromptManager:
+    return PromptManager(
+        lf_client,  # type: ignore[arg-type]
+        PromptCache(tmp_path / "prompts.json" if tmp_path else None),
+        system=SYSTEM,
+        check_document=CHECK,
+        agent_capabilities=CAPABILITIES,
+        **kwargs,
+    )
+
+
+async def test_load_uses_local_fallbacks_and_requires_system_prompt():
+    lf_client = FakeLangfuse(system=_prompt("system", 1, "Stand: {{date_written}}"))
+
+    manager = _manager(lf_client)
+    prompts = await manager.load()
+
+    assert manager.system_prompt().startswith("Stand: ")
+    assert prompts.check_document == CHECK_DOCUMENT_PROMPT_TEMPLATE
+    assert prompts.agent_capabilities == AGENT_CAPABILITIES_PROMPT
+
+    with pytest.raises(ValueError):
+        await _manager(FakeLangfuse()).load()
+
+
+async def test_refresh_swaps_new_versions_and_keeps_last_good_on_failure():
+    lf_client = FakeLangfuse(
+        system=_prompt("system", 1, "System v1"),
+        check_document=_prompt("check_document", 1, "Prüfe {{doc_name}}"),
+        agent_capabilities=_prompt("agent_capabilities", 1, "Fähigkeiten v1"),
+    )
+    manager = _manager(lf_client)
+    await manager.load()
+    first = manager.current
+    assert first.check_document_version == "langfuse:check_document:1"
+
+    lf_client.prompts["system"] = _prompt("system", 2, "System v2")
+    lf_client.prompts["agent_capabilities"] = _prompt("agent_capabilities", 2, "Fähigkeiten v2")
+    await manager.refresh()
+
+    assert manager.current is not first
+    assert manager.system_prompt() == "System v2"
+    assert manager.current.check_document_version == "langfuse:check_document:1"
+    assert agent_capabilities_text({"configurable": {PROMPT_MANAGER_CONFIG_KEY: manager}}) == "Fähigkeiten v2"
+
+    lf_client.available = False
+    await manager.refresh()
+
+    assert manager.system_prompt() == "System v2"
+    assert manager.current.agent_capabilities == "Fähigkeiten v2"
+    assert metrics.counter("prompt_refresh_failures_total") == 3
+    assert metrics.counter("prompt_refreshes_total") == 2
+
+
+async def test_load_reads_prompts_refreshed_by_a_previous_process(tmp_path):
+    lf_client = FakeLangfuse(system=_prompt("system", 1, "System v1"))
+    await _manager(lf_client, tmp_path).load()
+    lf_client.prompts["system"] = _prompt("system", 2, "System v2")
+    await _manager(lf_client, tmp_path).refresh()
+
+    lf_client.available = False
+    restarted = _manager(lf_client, tmp_path)
+    await restarted.load()
+
+    assert restarted.system_prompt() == "System v2"
+
+
+async def test_background_refresh_runs_until_closed():
+    lf_client = FakeLangfuse(system=_prompt("system", 1, "System v1"))
+    manager = _manager(lf_client, refresh_interval_seconds=0.01)
+    await manager.load()
+
+    lf_client.prompts["system"] = _prompt("system", 2, "System v2")
+    manager.start()
+    for _ in range(100):
+        if manager.system_prompt() == "System v2":
+            break
+        await asyncio.sleep(0.01)
+    await manager.aclose()
+
+    assert manager.system_prompt() == "System v2"
+    calls = lf_client.get_prompt.call_count
+    await asyncio.sleep(0.05)
+    assert lf_client.get_prompt.call_count == calls
+
+
+async def test_batch_prompt_is_loaded_with_local_fallback():
+    batch = ("check_documents_batch", "production")
+    lf_client = FakeLangfuse(system=_prompt("system", 1, "System v1"))
+    manager = _manager(lf_client, check_documents_batch=batch)
+
+    await manager.load()
+    assert manager.current.check_documents_batch == CHECK_DOCUMENTS_BATCH_PROMPT_TEMPLATE
+    assert manager.current.check_documents_batch_version.startswith("local:")
+
+    lf_client.prompts["check_documents_batch"] = _prompt("check_documents_batch", 3, "Prüfe {{documents}}")
+    await manager.refresh()
+    assert manager.current.check_documents_batch_version == "langfuse:check_documents_batch:3"
+
+
+def test_static_manager_and_config_fallback():
+    manager = PromptManager.static("Fester Prompt", "Prüfe {doc_name}", "Fähigkeiten")
+
+    assert manager.system_prompt() == "Fester Prompt"
+    assert manager.current.check_document_version.startswith("local:")
+    assert agent_capabilities_text({"configurable": {"agent_capabilities": "Alt"}}) == "Alt"
+    assert agent_capabilities_text(None) == AGENT_CAPABILITIES_PROMPT
@@ -0,0 +1,127 @@
+"""Unit tests for the relevance verdict cache and its use in ``check_document``."""
+
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.agent.relevance_cache import RelevanceVerdictCache, normalize_query, prompt_version
+from app.agent.riski_agent import build_guard_nodes
+from app.agent.state import DocumentCheckInput
+from app.agent.types import CHECK_DOCUMENT_PROMPT_TEMPLATE, DocumentRelevanceVerdict
+from app.utils.ttl_cache import TTLCache
+
+
+def _make_state(page_content: str = "Inhalt zum Radverkehr.", user_query: str = "Radverkehr in München?") -> DocumentCheckInput:
+    return DocumentCheckInput(
+        doc_index=0,
+        doc={"id": "doc-1", "page_content": page_content, "metadata": {"name": "Radverkehr"}},
+        user_query=user_query,
+    )
+
+
+def _make_check_document(cache: RelevanceVerdictCache, verdict: DocumentRelevanceVerdict | None = None):
+    mock_check_llm = MagicMock()
+    structured_mock = AsyncMock()
+    structured_mock.ainvoke = AsyncMock(return_value=verdict or DocumentRelevanceVerdict(relevant=False, reason="Nicht relevant."))
+    mock_check_llm.with_structured_output = MagicMock(return_value=structured_mock)
+
+    _, _, check_document, _ = build_guard_nodes(
+        chat_model=MagicMock(),
+        relevance_check_model=mock_check_llm,
+        relevance_cache=cache,
+    )
+    return check_document, structured_mock
+
+
+class TestTTLCache:
+    def test_evicts_least_recently_used_entry(self):
+        cache: TTLCache[str, int] = TTLCache(max_entries=2, ttl_seconds=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        assert cache.get("a") == 1
+        assert cache.get("b") is None
+        assert cache.get("c") == 3
+
+    def test_expired_entries_are_dropped(self):
+        cache: TTLCache[str, int] = TTLCache(max_entries=2, ttl_seconds=60)
+        with patch("app.utils.ttl_cache.time.monotonic", return_value=100.0):
+            cache.set("a", 1)
+        with patch("app.utils.ttl_cache.time.monotonic", return_value=161.0):
+            assert cache.get("a") is None
+        assert len(cache) == 0
+
+
+class TestCacheKey:
+    def test_query_normalisation_ignores_case_whitespace_and_trailing_punctuation(self):
+        assert normalize_query("  Radverkehr   in MÜNCHEN? ") == normalize_query("radverkehr in münchen")
+
+    def test_key_changes_with_content_and_prompt_version(self):
+        base = RelevanceVerdictCache.make_key("frage", "doc-1", "inhalt", "v1")
+
+        assert base == RelevanceVerdictCache.make_key("Frage?", "doc-1", "inhalt", "v1")
+        assert base != RelevanceVerdictCache.make_key("frage", "doc-1", "anderer inhalt", "v1")
+        assert base != RelevanceVerdictCache.make_key("frage", "doc-1", "inhalt", "v2")
+        assert base != RelevanceVerdictCache.make_key("frage", "doc-2", "inhalt", "v1")
+
+    def test_prompt_version_uses_langfuse_name_and_version(self):
+        template = MagicMock()
+        template.name = "check_document"
+        template.version = 7
+
+        assert prompt_version(template) == "langfuse:check_document:7"
+        assert prompt_version(CHECK_DOCUMENT_PROMPT_TEMPLATE).startswith("local:")
+
+
+class TestSharedBackend:
+    async def test_shared_hit_populates_local_cache(self):
+        redis = MagicMock()
+        verdict = DocumentRelevanceVerdict(relevant=True, reason="Passt.")
+        redis.get = AsyncMock(return_value=verdict.model_dump_json())
+        cache = RelevanceVerdictCache(redis=redis)
+
+        assert await cache.aget("key") == verdict
+        assert await cache.aget("key") == verdict
+        redis.get.assert_awaited_once()
+
+    async def test_shared_backend_errors_are_treated_as_miss(self):
+        redis = MagicMock()
+        redis.get = AsyncMock(side_effect=ConnectionError("redis down"))
+        redis.set = AsyncMock(side_effect=ConnectionError("redis down"))
+        cache = RelevanceVerdictCache(redis=redis)
+
+        assert await cache.aget("key") is None
+        await cache.aset("key", DocumentRelevanceVerdict(relevant=True, reason="Passt."))
+        verdict = await cache.aget("key")
+        assert verdict is not None and verdict.relevant is True
+
+
+class TestCheckDocumentWithCache:
+    async def test_repeated_check_skips_llm(self):
+        check_document, llm = _make_check_document(RelevanceVerdictCache())
+
+        first = await check_document(_make_state())
+        second = await check_document(_make_state(user_query="radverkehr in münchen"))
+
+        assert llm.ainvoke.await_count == 1
+        assert second["tracked_documents"][0].is_relevant is False
+        assert second["tracked_documents"][0].reason == first["tracked_documents"][0].reason
+
+    async def test_changed_content_is_checked_again(self):
+        check_document, llm = _make_check_document(RelevanceVerdictCache())
+
+        await check_document(_make_state())
+        await check_document(_make_state(page_content="Geänderter Inhalt."))
+
+        assert llm.ainvoke.await_count == 2
+
+    async def test_fallback_verdicts_are_not_cached(self):
+        check_document, llm = _make_check_document(RelevanceVerdictCache())
+        llm.ainvoke.side_effect = [RuntimeError("boom"), DocumentRelevanceVerdict(relevant=False, reason="Nein.")]
+
+        first = await check_document(_make_state())
+        second = await check_document(_make_state())
+
+        assert first["tracked_documents"][0].is_relevant is True
+        assert second["tracked_documents"][0].is_relevant is False
+        assert llm.ainvoke.await_count == 2
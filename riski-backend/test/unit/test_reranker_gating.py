@@ -0,0 +1,78 @@
+"""Unit tests for the local relevance scorer backend of the guard."""
+
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from app.agent.riski_agent import NODE_CHECK_DOCUMENT, _gate_by_scorer, build_guard_nodes
+from app.agent.state import RiskiAgentState, TrackedDocument, _merge_tracked_documents
+from app.core.metrics import metrics
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+
+class FakeScorer:
+    def __init__(self, scores: dict[str, float]):
+        self.scores = scores
+        self.calls: list[list[str]] = []
+
+    async def ascore(self, query: str, passages: list[str]) -> list[float]:
+        self.calls.append(passages)
+        return [self.scores[p] for p in passages]
+
+
+def _doc(doc_id: str, distance: float | None = None) -> TrackedDocument:
+    metadata = {"name": doc_id} if distance is None else {"name": doc_id, "distance": distance}
+    return TrackedDocument(id=doc_id, page_content=f"Inhalt {doc_id}", metadata=metadata)
+
+
+def _state(docs: list[TrackedDocument]) -> RiskiAgentState:
+    return RiskiAgentState(
+        messages=[
+            HumanMessage(content="Frage"),
+            AIMessage(content="", tool_calls=[{"id": "call-1", "name": "retrieve_documents", "args": {"query": "Frage"}}]),
+            ToolMessage(content="{}", tool_call_id="call-1", name="retrieve_documents"),
+        ],
+        tracked_documents=docs,
+    )
+
+
+class TestGateByScorer:
+    async def test_borderline_scores_are_left_for_llm(self):
+        scorer = FakeScorer({"Inhalt high": 0.95, "Inhalt mid": 0.5, "Inhalt low": 0.05})
+
+        updates = {
+            u.doc_id: u for u in await _gate_by_scorer(scorer, "Frage", [_doc("high"), _doc("mid"), _doc("low")], 0.8, 0.2, 100, 100)
+        }
+
+        assert updates["high"].is_relevant is True
+        assert updates["low"].is_relevant is False
+        assert "mid" not in updates
+        assert len(scorer.calls) == 1
+        assert metrics.counter("relevance_scorer_decided_total") == 2
+
+    async def test_scorer_failure_decides_nothing(self):
+        scorer = MagicMock()
+        scorer.ascore = AsyncMock(side_effect=RuntimeError("model missing"))
+
+        assert await _gate_by_scorer(scorer, "Frage", [_doc("a")], 0.8, 0.2, 100, 100) == []
+
+
+class TestGuardWithScorer:
+    async def test_scorer_only_sees_documents_left_by_distance_gating(self):
+        scorer = FakeScorer({"Inhalt high": 0.9, "Inhalt mid": 0.4})
+        guard, fan_out_checks, _, _ = build_guard_nodes(
+            chat_model=MagicMock(),
+            relevance_check_model=MagicMock(),
+            auto_accept_max_distance=0.2,
+            relevance_scorer=scorer,
+        )
+        state = _state([_doc("close", 0.1), _doc("high", 0.5), _doc("mid", 0.5)])
+
+        update = await guard(state, {})
+        state.tracked_documents = _merge_tracked_documents(state.tracked_documents, update["tracked_documents"])
+        state.user_query = update["user_query"]
+        sends = fan_out_checks(state)
+
+        assert scorer.calls == [["Inhalt high", "Inhalt mid"]]
+        assert [s.node for s in sends] == [NODE_CHECK_DOCUMENT]
+        assert sends[0].arg["doc"]["id"] == "mid"
+        assert metrics.gauge("relevance_auto_decided_ratio") == pytest.approx(2 / 3)
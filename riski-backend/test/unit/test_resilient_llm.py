@@ -0,0 +1,263 @@
+"""Unit tests for hedged, deadline-aware LLM calls with model fallback."""
+
+import asyncio
+import time
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+from app.agent.admission import LLMAdmissionController
+from app.agent.resilient_llm import DEADLINE_METADATA_KEY, LatencyWindow, ResilientChatOpenAI, with_run_deadline
+from app.core.metrics import metrics
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.runnables import RunnableConfig, RunnableLambda
+from langchain_openai import ChatOpenAI
+from openai import APITimeoutError
+from pydantic import SecretStr
+
+MESSAGES = [HumanMessage(content="Wie viele Radwege gibt es?")]
+API_KEY = SecretStr("test")
+
+
+def _model(**kwargs) -> ResilientChatOpenAI:
+    return ResilientChatOpenAI(model_name="primary", openai_api_key=API_KEY, **kwargs)
+
+
+def _run_manager(remaining_seconds: float | None) -> Any:
+    metadata = {} if remaining_seconds is None else {DEADLINE_METADATA_KEY: time.time() + remaining_seconds}
+
+    async def on_llm_new_token(token, chunk=None):
+        tokens.append(token)
+
+    tokens: list[str] = []
+    return SimpleNamespace(metadata=metadata, on_llm_new_token=on_llm_new_token, tokens=tokens)
+
+
+def _fake_agenerate(delays: list[float], calls: list[str]):
+    async def fake(model, messages, stop=None, run_manager=None, **kwargs):
+        attempt = len(calls)
+        calls.append(model.model_name)
+        await asyncio.sleep(delays[attempt] if attempt < len(delays) else 0)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=f"{model.model_name}-{attempt}"))])
+
+    return fake
+
+
+def _fake_astream(delays: list[float], calls: list[str]):
+    async def fake(model, messages, stop=None, run_manager=None, **kwargs):
+        attempt = len(calls)
+        calls.append(model.model_name)
+        await asyncio.sleep(delays[attempt] if attempt < len(delays) else 0)
+        for token in (f"{attempt}:", "Hallo"):
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+    return fake
+
+
+# ---------------------------------------------------------------------------
+# LatencyWindow / with_run_deadline
+# ---------------------------------------------------------------------------
+
+
+def test_latency_window_quantile():
+    window = LatencyWindow(size=100)
+    assert window.quantile(0.95) is None
+    for seconds in range(1, 101):
+        window.add(float(seconds))
+    assert window.quantile(0.95) == 95.0
+    assert window.quantile(0.5) == 50.0
+    window.add(1000.0)
+    assert len(window) == 100
+    assert window.quantile(1.0) == 1000.0
+
+
+def test_with_run_deadline_adds_absolute_deadline_to_metadata():
+    config = {"configurable": {"thread_id": "t"}, "metadata": {"source": "ui"}}
+    assert with_run_deadline(config, None) is config
+
+    result = with_run_deadline(config, 30)
+
+    assert result["configurable"] is config["configurable"]
+    assert result["metadata"]["source"] == "ui"
+    assert 29 < result["metadata"][DEADLINE_METADATA_KEY] - time.time() <= 30
+    assert DEADLINE_METADATA_KEY not in config["metadata"]
+
+
+# ---------------------------------------------------------------------------
+# Hedging
+# ---------------------------------------------------------------------------
+
+
+async def test_no_hedge_before_enough_samples(monkeypatch):
+    calls: list[str] = []
+    monkeypatch.setattr(ChatOpenAI, "_agenerate", _fake_agenerate([0.05], calls))
+    model = _model(hedge=True, hedge_min_samples=5, hedge_min_delay_seconds=0.0)
+
+    result = await model._agenerate(MESSAGES)
+
+    assert result.generations[0].message.content == "primary-0"
+    assert calls == ["primary"]
+    assert len(model._generate_latencies) == 1
+    assert len(model._stream_latencies) == 0
+    assert metrics.counter("llm_hedged_requests_total") == 0
+
+
+async def test_slow_call_is_hedged_and_hedge_wins(monkeypatch):
+    calls: list[str] = []
+    monkeypatch.setattr(ChatOpenAI, "_agenerate", _fake_agenerate([5.0, 0.0], calls))
+    model = _model(hedge=True, hedge_min_samples=3, hedge_min_delay_seconds=0.0)
+    for _ in range(3):
+        model._generate_latencies.add(0.02)
+
+    started = time.monotonic()
+    result = await model._agenerate(MESSAGES)
+
+    assert time.monotonic() - started < 1.0
+    assert result.generations[0].message.content == "primary-1"
+    assert calls == ["primary", "primary"]
+    assert metrics.counter("llm_hedged_requests_total") == 1
+    assert metrics.counter("llm_hedge_wins_total") == 1
+
+
+async def test_stream_is_hedged_on_slow_first_chunk(monkeypatch):
+    calls: list[str] = []
+    monkeypatch.setattr(ChatOpenAI, "_astream", _fake_astream([5.0, 0.0], calls))
+    model = _model(hedge=True, hedge_min_samples=1, hedge_min_delay_seconds=0.0)
+    model._stream_latencies.add(0.02)
+    run_manager = _run_manager(None)
+
+    chunks = [chunk.text async for chunk in model._astream(MESSAGES, run_manager=run_manager)]
+
+    assert chunks == ["1:", "Hallo"]
+    assert run_manager.tokens == ["1:", "Hallo"]
+    assert metrics.counter("llm_hedge_wins_total") == 1
+    assert len(model._stream_latencies) == 2
+    assert len(model._generate_latencies) == 0
+
+
+async def test_stream_latencies_do_not_trigger_hedging_of_full_responses(monkeypatch):
+    calls: list[str] = []
+    monkeypatch.setattr(ChatOpenAI, "_agenerate", _fake_agenerate([0.05], calls))
+    model = _model(hedge=True, hedge_min_samples=3, hedge_min_delay_seconds=0.0)
+    for _ in range(3):
+        model._stream_latencies.add(0.001)
+
+    await model._agenerate(MESSAGES)
+
+    assert calls == ["primary"]
+    assert metrics.counter("llm_hedged_requests_total") == 0
+
+
+async def test_hedged_duplicate_is_admitted_separately(monkeypatch):
+    calls: list[str] = []
+    monkeypatch.setattr(ChatOpenAI, "_astream", _fake_astream([5.0, 0.0], calls))
+    controller = LLMAdmissionController({"chat": 2})
+    model = _model(hedge=True, hedge_min_samples=1, hedge_min_delay_seconds=0.0, admission=controller)
+    model._stream_latencies.add(0.02)
+
+    chunks = [chunk.text async for chunk in model._astream(MESSAGES, run_manager=_run_manager(None))]
+
+    assert chunks == ["1:", "Hallo"]
+    assert metrics.counter("llm_admission_chat_admitted_total") == 2
+    assert metrics.gauge("llm_admission_chat_in_flight") == 0
+
+
+# ---------------------------------------------------------------------------
+# Deadline and fallback
+# ---------------------------------------------------------------------------
+
+
+async def test_expired_deadline_fails_without_calling_the_model(monkeypatch):
+    calls: list[str] = []
+    monkeypatch.setattr(ChatOpenAI, "_agenerate", _fake_agenerate([], calls))
+
+    with pytest.raises(APITimeoutError):
+        await _model()._agenerate(MESSAGES, run_manager=_run_manager(-1))
+
+    assert calls == []
+    assert metrics.counter("llm_deadline_exceeded_total") == 1
+
+
+async def test_call_exceeding_deadline_is_cancelled(monkeypatch):
+    calls: list[str] = []
+    monkeypatch.setattr(ChatOpenAI, "_agenerate", _fake_agenerate([5.0], calls))
+
+    started = time.monotonic()
+    with pytest.raises(APITimeoutError):
+        await _model()._agenerate(MESSAGES, run_manager=_run_manager(0.05))
+
+    assert time.monotonic() - started < 1.0
+    assert metrics.counter("llm_deadline_exceeded_total") == 1
+
+
+async def test_low_budget_switches_to_fallback_model(monkeypatch):
+    calls: list[str] = []
+    monkeypatch.setattr(ChatOpenAI, "_astream", _fake_astream([], calls))
+    model = _model(
+        fallback=ChatOpenAI(model_name="fallback", openai_api_key=API_KEY),
+        fallback_when_remaining_seconds=10.0,
+    )
+
+    chunks = [chunk.text async for chunk in model._astream(MESSAGES, run_manager=_run_manager(5))]
+    assert chunks == ["0:", "Hallo"]
+    assert calls == ["fallback"]
+    assert metrics.counter("llm_fallback_total") == 1
+
+    calls.clear()
+    [chunk async for chunk in model._astream(MESSAGES, run_manager=_run_manager(60))]
+    assert calls == ["primary"]
+
+
+# ---------------------------------------------------------------------------
+# Public entry points
+# ---------------------------------------------------------------------------
+
+
+def _deadline_config(remaining_seconds: float) -> RunnableConfig:
+    return {"metadata": {DEADLINE_METADATA_KEY: time.time() + remaining_seconds}}
+
+
+async def test_astream_applies_the_run_deadline(monkeypatch):
+    calls: list[str] = []
+    monkeypatch.setattr(ChatOpenAI, "_astream", _fake_astream([], calls))
+
+    with pytest.raises(APITimeoutError):
+        [chunk async for chunk in _model().astream(MESSAGES, config=_deadline_config(-1))]
+
+    assert calls == []
+
+
+async def test_astream_switches_to_fallback_model(monkeypatch):
+    calls: list[str] = []
+    monkeypatch.setattr(ChatOpenAI, "_astream", _fake_astream([], calls))
+    model = _model(fallback=ChatOpenAI(model_name="fallback", openai_api_key=API_KEY), fallback_when_remaining_seconds=10.0)
+
+    chunks = [chunk.content async for chunk in model.astream(MESSAGES, config=_deadline_config(5))]
+
+    assert chunks[:2] == ["0:", "Hallo"]
+    assert calls == ["fallback"]
+
+
+async def test_astream_reads_the_metadata_of_the_calling_runnable(monkeypatch):
+    calls: list[str] = []
+    monkeypatch.setattr(ChatOpenAI, "_astream", _fake_astream([], calls))
+    model = _model()
+
+    async def node(_):
+        return [chunk async for chunk in model.astream(MESSAGES)]
+
+    with pytest.raises(APITimeoutError):
+        await RunnableLambda(node).ainvoke(None, _deadline_config(-1))
+    assert calls == []
+
+
+async def test_streaming_ainvoke_applies_the_run_deadline(monkeypatch):
+    calls: list[str] = []
+    monkeypatch.setattr(ChatOpenAI, "_astream", _fake_astream([], calls))
+
+    with pytest.raises(APITimeoutError):
+        await _model(streaming=True).ainvoke(MESSAGES, config=_deadline_config(-1))
+
+    assert calls == []
+    assert metrics.counter("llm_deadline_exceeded_total") == 1
@@ -0,0 +1,101 @@
+"""Unit tests for the structured filters of retrieve_documents."""
+
+from datetime import date, datetime
+from unittest.mock import AsyncMock, MagicMock
+
+from app.agent.retrieval_filters import RETRIEVAL_FILTERS_CONFIG_KEY, vectorstore_filter
+from app.agent.tools import retrieve_documents
+from app.core.metrics import metrics
+from core.model.data_models import PaperTypeEnum
+from langchain_core.documents import Document
+from langchain_core.tools import StructuredTool
+from langchain_postgres.v2.async_vectorstore import AsyncPGVectorStore
+
+
+def _where(search_filter: dict) -> tuple[str, dict]:
+    """Render *search_filter* with the vector store's own filter translation."""
+    store = object.__new__(AsyncPGVectorStore)
+    return store._create_filter_clause(search_filter)
+
+
+def test_no_arguments_means_no_filter():
+    assert vectorstore_filter() is None
+    assert vectorstore_filter(originators=[" "], districts=[]) is None
+
+
+def test_filter_translates_to_sql_conditions():
+    search_filter = vectorstore_filter(
+        date_from=date(2024, 1, 1),
+        date_to=date(2024, 12, 31),
+        paper_types=[PaperTypeEnum.COUNCIL_PROPOSAL],
+        originators=["Grüne", "Rosa Liste"],
+        districts=["Maxvorstadt"],
+    )
+    assert search_filter is not None
+    clause, params = _where(search_filter)
+
+    assert clause.count(" AND ") == 4
+    assert "date >= :" in clause and "date <= :" in clause
+    assert "(paper_types LIKE :" in clause
+    assert "((originators ILIKE :" in clause and " OR (originators ILIKE :" in clause
+    assert "(keywords ILIKE :" in clause
+    assert sorted(params.values(), key=str) == sorted(
+        [
+            datetime(2024, 1, 1),
+            datetime(2024, 12, 31, 23, 59, 59, 999999),
+            "%|Stadtratsantrag|%",
+            "%Grüne%",
+            "%Rosa Liste%",
+            "%Maxvorstadt%",
+        ],
+        key=str,
+    )
+
+
+def test_filter_escapes_like_wildcards():
+    assert vectorstore_filter(districts=["100%_Bezirk"]) == {"keywords": {"$ilike": "%100\\%\\_Bezirk%"}}
+
+
+def _config(vectorstore, filters_enabled: bool = True) -> dict:
+    return {
+        "configurable": {
+            "vectorstore": vectorstore,
+            "db_sessionmaker": MagicMock(),
+            "top_k_docs": 5,
+            "db_query_timeout_seconds": 5,
+            "db_query_total_timeout_seconds": 5,
+            "vectorstore_timeout_seconds": 5,
+            RETRIEVAL_FILTERS_CONFIG_KEY: filters_enabled,
+        }
+    }
+
+
+async def _retrieve_documents(**kwargs) -> tuple[str, dict]:
+    assert isinstance(retrieve_documents, StructuredTool) and retrieve_documents.coroutine is not None
+    return await retrieve_documents.coroutine(**kwargs)
+
+
+async def test_retrieve_documents_passes_filter_and_falls_back_when_empty():
+    hit = (Document(id="f1", page_content="Text", metadata={"name": "Antrag", "papers": []}), 0.2)
+    vectorstore = MagicMock(asimilarity_search_with_score=AsyncMock(side_effect=[[], [hit]]))
+
+    _, artifact = await _retrieve_documents(
+        query="Radverkehr", runtime=MagicMock(context=None), config=_config(vectorstore), districts=["Maxvorstadt"]
+    )
+
+    first, second = vectorstore.asimilarity_search_with_score.await_args_list
+    assert first.kwargs["filter"] == {"keywords": {"$ilike": "%Maxvorstadt%"}}
+    assert "filter" not in second.kwargs
+    assert [doc["id"] for doc in artifact["documents"]] == ["f1"]
+    assert metrics.counter("retrieval_filtered_total") == 1
+    assert metrics.counter("retrieval_filter_fallbacks_total") == 1
+
+
+async def test_retrieve_documents_ignores_filters_without_retrieval_view():
+    vectorstore = MagicMock(asimilarity_search_with_score=AsyncMock(return_value=[]))
+
+    await _retrieve_documents(
+        query="Radverkehr", runtime=MagicMock(context=None), config=_config(vectorstore, filters_enabled=False), districts=["Maxvorstadt"]
+    )
+
+    assert vectorstore.asimilarity_search_with_score.await_args.kwargs["filter"] is None
@@ -0,0 +1,74 @@
+"""Unit tests for vector-distance gating in front of the LLM relevance guard."""
+
+from unittest.mock import MagicMock
+
+from app.agent.riski_agent import NODE_CHECK_DOCUMENT, NODE_COLLECT_RESULTS, _gate_by_distance, build_guard_nodes
+from app.agent.state import RiskiAgentState, TrackedDocument, _merge_tracked_documents
+from app.core.metrics import metrics
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+
+def _doc(doc_id: str, distance: float | None) -> TrackedDocument:
+    metadata = {"name": doc_id} if distance is None else {"name": doc_id, "distance": distance}
+    return TrackedDocument(id=doc_id, page_content="Inhalt", metadata=metadata)
+
+
+def _state(docs: list[TrackedDocument]) -> RiskiAgentState:
+    return RiskiAgentState(
+        messages=[
+            HumanMessage(content="Frage"),
+            AIMessage(content="", tool_calls=[{"id": "call-1", "name": "retrieve_documents", "args": {"query": "Frage"}}]),
+            ToolMessage(content="{}", tool_call_id="call-1", name="retrieve_documents"),
+        ],
+        tracked_documents=docs,
+    )
+
+
+class TestGateByDistance:
+    def test_only_ambiguous_band_is_left_undecided(self):
+        docs = [_doc("close", 0.1), _doc("middle", 0.5), _doc("far", 0.9), _doc("unknown", None)]
+
+        updates = {u.doc_id: u for u in _gate_by_distance(docs, 0.2, 0.8)}
+
+        assert updates["close"].is_relevant is True
+        assert updates["far"].is_relevant is False
+        assert "middle" not in updates
+        assert "unknown" not in updates
+
+    def test_disabled_thresholds_decide_nothing(self):
+        assert _gate_by_distance([_doc("a", 0.0), _doc("b", 2.0)], None, None) == []
+
+    def test_auto_decided_share_is_exposed_as_metric(self):
+        _gate_by_distance([_doc("close", 0.1), _doc("middle", 0.5), _doc("far", 0.9), _doc("other", 0.4)], 0.2, 0.8)
+
+        assert metrics.counter("relevance_documents_total") == 4
+        assert metrics.counter("relevance_auto_accepted_total") == 1
+        assert metrics.counter("relevance_auto_rejected_total") == 1
+        assert metrics.gauge("relevance_auto_decided_ratio") == 0.5
+
+
+class TestGuardWithGating:
+    async def test_guard_writes_updates_and_fan_out_skips_decided_documents(self):
+        guard, fan_out_checks, _, _ = build_guard_nodes(
+            chat_model=MagicMock(),
+            relevance_check_model=MagicMock(),
+            auto_accept_max_distance=0.2,
+            auto_reject_min_distance=0.8,
+        )
+        state = _state([_doc("close", 0.1), _doc("middle", 0.5), _doc("far", 0.9)])
+
+        update = await guard(state, {})
+        state.tracked_documents = _merge_tracked_documents(state.tracked_documents, update["tracked_documents"])
+        state.user_query = update["user_query"]
+        sends = fan_out_checks(state)
+
+        assert [s.node for s in sends] == [NODE_CHECK_DOCUMENT]
+        assert sends[0].arg["doc"]["id"] == "middle"
+
+    async def test_fan_out_goes_to_collect_results_when_everything_is_decided(self):
+        _, fan_out_checks, _, _ = build_guard_nodes(chat_model=MagicMock(), relevance_check_model=MagicMock())
+        state = _state([TrackedDocument(id="a", is_checked=True, is_relevant=True)])
+
+        sends = fan_out_checks(state)
+
+        assert [s.node for s in sends] == [NODE_COLLECT_RESULTS]
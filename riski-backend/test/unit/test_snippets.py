@@ -0,0 +1,47 @@
+"""Unit tests for query-focused snippet selection."""
+
+from app.agent.snippets import GAP_MARKER, estimate_tokens, select_snippet, split_passages
+
+
+def _filler(topic: str, n: int = 20) -> str:
+    return " ".join([f"Allgemeine Ausführungen zu {topic} ohne weiteren Bezug."] * n)
+
+
+class TestSplitPassages:
+    def test_long_paragraphs_are_cut_at_whitespace(self):
+        passages = split_passages("kurz\n\n" + "wort " * 600, max_chars=1_200)
+
+        assert passages[0] == "kurz"
+        assert all(len(p) <= 1_200 for p in passages)
+        assert all(not p.endswith("wor") for p in passages)
+
+
+class TestSelectSnippet:
+    def test_short_text_is_returned_unchanged(self):
+        assert select_snippet("Ein kurzer Text.", "Radverkehr", max_tokens=100) == "Ein kurzer Text."
+
+    def test_relevant_passage_deep_in_text_is_selected(self):
+        text = "\n\n".join(
+            [
+                "Antrag Nr. 20-26 / A 01234",
+                _filler("Haushalt"),
+                _filler("Schulen"),
+                "Der Ausbau der Radverkehrsachse in Pasing wird beschlossen.",
+            ]
+        )
+
+        snippet = select_snippet(text, "Was wurde zum Radverkehr in Pasing beschlossen?", max_tokens=60)
+
+        assert snippet.startswith("Antrag Nr. 20-26 / A 01234")
+        assert "Radverkehrsachse in Pasing" in snippet
+        assert "Schulen" not in snippet
+        assert GAP_MARKER in snippet
+        assert estimate_tokens(snippet) <= 60 + 10
+
+    def test_text_without_match_falls_back_to_prefix(self):
+        text = "\n\n".join(["Titel", _filler("Haushalt"), _filler("Schulen")])
+
+        snippet = select_snippet(text, "Radverkehr", max_tokens=300)
+
+        assert "Haushalt" in snippet
+        assert "Schulen" not in snippet
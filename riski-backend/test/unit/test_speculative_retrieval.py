@@ -0,0 +1,106 @@
+"""Unit tests for speculative retrieval in parallel with the first model pass."""
+
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from app.agent.speculative_retrieval import (
+    SpeculativeRetrieval,
+    cosine_similarity,
+    get_speculative_retrieval,
+    with_speculative_retrieval,
+)
+from app.core.metrics import metrics
+from langchain_core.documents import Document
+
+EMBEDDINGS = {
+    "Radwege in Schwabing": [1.0, 0.0, 0.0],
+    "Radwege Schwabing": [0.99, 0.1, 0.0],
+    "Kita-Ausbau": [0.0, 1.0, 0.0],
+}
+SPECULATIVE_DOCS = [(Document(id="doc-1", page_content="Radweg"), 0.2)]
+FRESH_DOCS = [(Document(id="doc-2", page_content="Kita"), 0.3)]
+
+
+def _vectorstore() -> MagicMock:
+    vectorstore = MagicMock()
+    vectorstore.embeddings.aembed_query = AsyncMock(side_effect=lambda query: EMBEDDINGS[query])
+    vectorstore.asimilarity_search_with_score_by_vector = AsyncMock(
+        side_effect=lambda embedding, k: SPECULATIVE_DOCS if embedding == EMBEDDINGS["Radwege in Schwabing"] else FRESH_DOCS
+    )
+    vectorstore.asimilarity_search_with_score = AsyncMock(return_value=FRESH_DOCS)
+    return vectorstore
+
+
+class TestSpeculativeRetrieval:
+    async def test_identical_query_reuses_result(self):
+        vectorstore = _vectorstore()
+        speculation = SpeculativeRetrieval(min_similarity=0.9)
+        speculation.start("Radwege in Schwabing", vectorstore, k=5)
+
+        result = await speculation.search("  radwege IN schwabing? ", vectorstore, k=5)
+
+        assert result == SPECULATIVE_DOCS
+        vectorstore.asimilarity_search_with_score.assert_not_awaited()
+        assert vectorstore.embeddings.aembed_query.await_count == 1
+        assert metrics.counter("speculative_retrieval_reused_total") == 1
+
+    async def test_similar_query_reuses_result(self):
+        vectorstore = _vectorstore()
+        speculation = SpeculativeRetrieval(min_similarity=0.9)
+        speculation.start("Radwege in Schwabing", vectorstore, k=5)
+
+        assert await speculation.search("Radwege Schwabing", vectorstore, k=5) == SPECULATIVE_DOCS
+        assert metrics.counter("speculative_retrieval_reused_total") == 1
+
+    async def test_different_query_searches_with_its_embedding(self):
+        vectorstore = _vectorstore()
+        speculation = SpeculativeRetrieval(min_similarity=0.9)
+        speculation.start("Radwege in Schwabing", vectorstore, k=5)
+
+        result = await speculation.search("Kita-Ausbau", vectorstore, k=5)
+
+        assert result == FRESH_DOCS
+        vectorstore.asimilarity_search_with_score_by_vector.assert_awaited_with(EMBEDDINGS["Kita-Ausbau"], k=5)
+        vectorstore.asimilarity_search_with_score.assert_not_awaited()
+        assert metrics.counter("speculative_retrieval_discarded_total") == 1
+
+    async def test_failed_speculation_falls_back_to_regular_search(self):
+        vectorstore = _vectorstore()
+        vectorstore.asimilarity_search_with_score_by_vector = AsyncMock(side_effect=RuntimeError("DB weg"))
+        speculation = SpeculativeRetrieval()
+        speculation.start("Radwege in Schwabing", vectorstore, k=5)
+
+        assert await speculation.search("Radwege in Schwabing", vectorstore, k=5) == FRESH_DOCS
+        vectorstore.asimilarity_search_with_score.assert_awaited_once_with("Radwege in Schwabing", k=5)
+
+    async def test_without_speculation_searches_directly(self):
+        vectorstore = _vectorstore()
+
+        assert await SpeculativeRetrieval().search("Kita-Ausbau", vectorstore, k=5) == FRESH_DOCS
+        vectorstore.asimilarity_search_with_score.assert_awaited_once()
+
+    async def test_discard_cancels_pending_search(self):
+        vectorstore = _vectorstore()
+        speculation = SpeculativeRetrieval()
+        speculation.start("Radwege in Schwabing", vectorstore, k=5)
+
+        speculation.discard()
+
+        assert metrics.counter("speculative_retrieval_discarded_total") == 1
+        assert await speculation.search("Radwege in Schwabing", vectorstore, k=5) == FRESH_DOCS
+
+
+def test_cosine_similarity():
+    assert cosine_similarity([1.0, 0.0], [1.0, 0.0]) == pytest.approx(1.0)
+    assert cosine_similarity([1.0, 0.0], [0.0, 1.0]) == pytest.approx(0.0)
+    assert cosine_similarity([0.0, 0.0], [1.0, 0.0]) == 0.0
+
+
+def test_config_helpers():
+    assert get_speculative_retrieval(with_speculative_retrieval({"configurable": {}})) is None
+
+    config = with_speculative_retrieval({"configurable": {"speculative_retrieval_min_similarity": 0.8}})
+    speculation = get_speculative_retrieval(config)
+
+    assert isinstance(speculation, SpeculativeRetrieval)
+    assert speculation.min_similarity == 0.8
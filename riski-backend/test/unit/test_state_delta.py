@@ -0,0 +1,73 @@
+import jsonpatch
+from ag_ui.core import BaseEvent, EventType, StateSnapshotEvent
+from app.api.routers.ag_ui import StateDeltaEmitter
+
+
+def _snapshot(state: dict) -> StateSnapshotEvent:
+    return StateSnapshotEvent(type=EventType.STATE_SNAPSHOT, snapshot=state)
+
+
+def _convert(emitter: StateDeltaEmitter, state: dict) -> BaseEvent:
+    event = emitter.convert(_snapshot(state))
+    assert event is not None
+    return event
+
+
+def test_first_event_is_full_snapshot_then_deltas() -> None:
+    emitter = StateDeltaEmitter(snapshot_interval=10)
+    first = {"messages": [], "tracked_documents": [], "user_query": "Radwege"}
+    second = {"messages": [{"id": "1", "content": "Hallo"}], "tracked_documents": [], "user_query": "Radwege"}
+
+    assert _convert(emitter, first).type == EventType.STATE_SNAPSHOT
+    delta = _convert(emitter, second)
+
+    assert delta.type == EventType.STATE_DELTA
+    assert jsonpatch.apply_patch(first, delta.model_dump(mode="json", exclude_none=True)["delta"]) == second
+
+
+def test_unchanged_state_is_dropped() -> None:
+    emitter = StateDeltaEmitter(snapshot_interval=10)
+    state = {"messages": [], "user_query": "Radwege"}
+
+    emitter.convert(_snapshot(state))
+
+    assert emitter.convert(_snapshot(dict(state))) is None
+
+
+def test_full_snapshot_every_interval() -> None:
+    emitter = StateDeltaEmitter(snapshot_interval=2)
+    types = [_convert(emitter, {"step": step}).type for step in range(6)]
+
+    assert types == [
+        EventType.STATE_SNAPSHOT,
+        EventType.STATE_DELTA,
+        EventType.STATE_DELTA,
+        EventType.STATE_SNAPSHOT,
+        EventType.STATE_DELTA,
+        EventType.STATE_DELTA,
+    ]
+
+
+def test_interval_zero_sends_snapshots_only() -> None:
+    emitter = StateDeltaEmitter(snapshot_interval=0)
+
+    assert all(_convert(emitter, {"step": step}).type == EventType.STATE_SNAPSHOT for step in range(3))
+
+
+def test_delta_only_touches_changed_values() -> None:
+    emitter = StateDeltaEmitter(snapshot_interval=10)
+    docs = [{"id": "a", "is_checked": False}, {"id": "b", "is_checked": False}]
+    first = {"messages": [{"id": "1"}], "tracked_documents": docs, "error_info": None, "user_query": "Radwege"}
+    second = {
+        "messages": [{"id": "1"}, {"id": "2"}],
+        "tracked_documents": [docs[0], {"id": "b", "is_checked": True}],
+        "user_query": "Radwege",
+    }
+
+    _convert(emitter, first)
+    delta = _convert(emitter, second).model_dump(mode="json", exclude_none=True)["delta"]
+
+    assert {"op": "replace", "path": "/tracked_documents/1/is_checked", "value": True} in delta
+    assert {"op": "remove", "path": "/error_info"} in delta
+    assert not any(op["path"].startswith("/user_query") or op["path"].startswith("/tracked_documents/0") for op in delta)
+    assert jsonpatch.apply_patch(first, delta) == second
@@ -0,0 +1,64 @@
+"""Unit tests for streaming structured output of the generation pass."""
+
+import json
+from unittest.mock import MagicMock
+
+import pytest
+from app.agent.structured_stream import astream_structured_output, parse_partial_answer
+from app.agent.types import StructuredAgentResponse
+from app.core.metrics import metrics
+from langchain_core.messages import AIMessageChunk, HumanMessage
+from pydantic import ValidationError
+
+ANSWER = {"response": "Der Stadtrat hat den Radweg beschlossen.", "documents": [], "proposals": []}
+
+
+def _streaming_model(chunks: list[AIMessageChunk]) -> MagicMock:
+    async def astream(messages):
+        for chunk in chunks:
+            yield chunk
+
+    bound = MagicMock()
+    bound.astream = astream
+    model = MagicMock()
+    model.bind = MagicMock(return_value=bound)
+    return model
+
+
+def _split(text: str, size: int = 7) -> list[AIMessageChunk]:
+    return [AIMessageChunk(content=text[i : i + size]) for i in range(0, len(text), size)]
+
+
+class TestParsePartialAnswer:
+    def test_incomplete_json_yields_answer_prefix(self):
+        assert parse_partial_answer('{"response": "Der Stadt') == "Der Stadt"
+
+    def test_no_answer_yet(self):
+        assert parse_partial_answer('{"resp') == ""
+        assert parse_partial_answer("") == ""
+
+
+class TestAstreamStructuredOutput:
+    async def test_streamed_json_is_validated(self):
+        model = _streaming_model(_split(json.dumps(ANSWER)))
+
+        response = await astream_structured_output(model, StructuredAgentResponse, [HumanMessage(content="Radweg?")])
+
+        assert response == StructuredAgentResponse.model_validate(ANSWER)
+        model.bind.assert_called_once_with(response_format=StructuredAgentResponse)
+        assert metrics.gauge("generation_first_token_seconds") is not None
+        assert metrics.gauge("generation_seconds") is not None
+
+    async def test_parsed_object_of_final_chunk_is_used(self):
+        parsed = StructuredAgentResponse.model_validate(ANSWER)
+        chunks = [*_split(json.dumps(ANSWER)), AIMessageChunk(content="", additional_kwargs={"parsed": parsed})]
+
+        response = await astream_structured_output(_streaming_model(chunks), StructuredAgentResponse, [])
+
+        assert response is parsed
+
+    async def test_invalid_answer_raises(self):
+        model = _streaming_model(_split('{"response": "abgeschnitten'))
+
+        with pytest.raises(ValidationError):
+            await astream_structured_output(model, StructuredAgentResponse, [])
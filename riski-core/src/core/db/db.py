@@ -1,6 +1,7 @@
 from urllib.parse import urlsplit
 
 from pydantic import PostgresDsn
+from sqlalchemy import text
 from sqlalchemy.orm import sessionmaker
 from sqlmodel import Session, SQLModel, create_engine
 
@@ -10,6 +11,26 @@ _engine = None
 _SessionLocal = None
 logger = getLogger()
 
+FILE_RETRIEVAL_VIEW = "file_retrieval"
+"""View searched by the backend's vector store: ``file`` columns plus the ``file_card`` fields."""
+
+FILE_RETRIEVAL_VIEW_DDL = f"""
+CREATE OR REPLACE VIEW {FILE_RETRIEVAL_VIEW} AS
+SELECT f.db_id, f.id, f.name, f.size, f.text, f.embed, c.papers, c.meetings,
+       c.date, c.paper_types, c.originators, c.keywords
+FROM file f
+LEFT JOIN file_card c ON c.file_id = f.db_id
+"""
+
+# Trigram indexes for the substring filters (LIKE/ILIKE '%...%') of the retrieval
+FILE_CARD_INDEX_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    *(
+        f"CREATE INDEX IF NOT EXISTS ix_file_card_{column}_trgm ON file_card USING gin ({column} gin_trgm_ops)"
+        for column in ("paper_types", "originators", "keywords")
+    ),
+]
+
 
 ###########################################################
 #############  Create Database Schema #####################
@@ -52,6 +73,11 @@ def get_session() -> Session:
 
 def create_db_and_tables() -> None:
     """
-    Create DB tables.
+    Create DB tables, the retrieval view and its filter indexes.
     """
-    SQLModel.metadata.create_all(get_engine())
+    engine = get_engine()
+    SQLModel.metadata.create_all(engine)
+    with engine.begin() as conn:
+        for statement in FILE_CARD_INDEX_DDL:
+            conn.execute(text(statement))
+        conn.execute(text(FILE_RETRIEVAL_VIEW_DDL))
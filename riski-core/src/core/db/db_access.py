@@ -1,9 +1,10 @@
 import time
+import uuid
 from contextlib import contextmanager
 from functools import wraps
 from typing import List, TypeVar, overload
 
-from sqlalchemy import inspect
+from sqlalchemy import inspect, text
 from sqlalchemy.orm import RelationshipProperty
 from sqlmodel import Session, select
 
@@ -320,3 +321,122 @@ def request_batch(model: type[T], offset: int, limit: int) -> List[T]:
     statement = select(model).order_by(model.db_id).offset(offset).limit(limit)
     with _get_session_ctx() as sess:
         return list(sess.exec(statement).all())
+
+
+# Card fields per file: linked papers and meetings as JSON arrays, plus the columns the
+# retrieval filters run on (date, paper types, originator organizations, keywords such as
+# the Stadtbezirk). A card is only rewritten when its content changed, so a full refresh
+# after each run is cheap.
+_REFRESH_FILE_CARDS_SQL = """
+WITH papers AS (
+    SELECT pf.file_id,
+           jsonb_agg(
+               jsonb_build_object(
+                   'identifier', p.reference,
+                   'name', p.name,
+                   'subject', p.subject,
+                   'date', to_char(p.date, 'YYYY-MM-DD"T"HH24:MI:SS'),
+                   'risUrl', p.id,
+                   'paper_type', p.paper_type
+               )
+               ORDER BY p.reference, p.id
+           ) AS papers,
+           min(p.date) AS paper_date,
+           '|' || string_agg(DISTINCT p.paper_type, '|') || '|' AS paper_types
+    FROM paper_file pf
+    JOIN paper p ON p.db_id = pf.paper_id
+    {pf_filter}
+    GROUP BY pf.file_id
+), meetings AS (
+    SELECT fm.file_id,
+           jsonb_agg(
+               jsonb_build_object(
+                   'name', m.name,
+                   'start', to_char(m.start, 'YYYY-MM-DD"T"HH24:MI:SS'),
+                   'risUrl', m.id
+               )
+               ORDER BY m.start, m.id
+           ) AS meetings,
+           min(m.start) AS meeting_date
+    FROM file_meeting fm
+    JOIN meeting m ON m.db_id = fm.meeting_id
+    {fm_filter}
+    GROUP BY fm.file_id
+), originators AS (
+    SELECT pf.file_id, string_agg(DISTINCT concat_ws(' ', o.name, o."shortName"), ' | ') AS originators
+    FROM paper_file pf
+    JOIN paper_originator_organization po ON po.paper_id = pf.paper_id
+    JOIN organization o ON o.db_id = po.organization_id
+    {pf_filter}
+    GROUP BY pf.file_id
+), keywords AS (
+    SELECT file_id, string_agg(DISTINCT name, ' | ') AS keywords
+    FROM (
+        SELECT pf.file_id, k.name
+        FROM paper_file pf
+        JOIN paper_keyword pk ON pk.paper_id = pf.paper_id
+        JOIN keyword k ON k.db_id = pk.keyword
+        {pf_filter}
+        UNION
+        SELECT fk.file_id, k.name
+        FROM file_keyword fk
+        JOIN keyword k ON k.db_id = fk.keyword_id
+        {fk_filter}
+    ) linked_keywords
+    GROUP BY file_id
+)
+INSERT INTO file_card (file_id, papers, meetings, date, paper_types, originators, keywords, refreshed)
+SELECT f.db_id,
+       coalesce(p.papers, '[]'::jsonb),
+       coalesce(m.meetings, '[]'::jsonb),
+       coalesce(f.date, p.paper_date, m.meeting_date),
+       p.paper_types,
+       o.originators,
+       k.keywords,
+       now()
+FROM file f
+LEFT JOIN papers p ON p.file_id = f.db_id
+LEFT JOIN meetings m ON m.file_id = f.db_id
+LEFT JOIN originators o ON o.file_id = f.db_id
+LEFT JOIN keywords k ON k.file_id = f.db_id
+{f_filter}
+ON CONFLICT (file_id) DO UPDATE
+SET papers = EXCLUDED.papers,
+    meetings = EXCLUDED.meetings,
+    date = EXCLUDED.date,
+    paper_types = EXCLUDED.paper_types,
+    originators = EXCLUDED.originators,
+    keywords = EXCLUDED.keywords,
+    refreshed = EXCLUDED.refreshed
+WHERE (file_card.papers, file_card.meetings, file_card.date, file_card.paper_types, file_card.originators, file_card.keywords)
+    IS DISTINCT FROM (EXCLUDED.papers, EXCLUDED.meetings, EXCLUDED.date, EXCLUDED.paper_types, EXCLUDED.originators, EXCLUDED.keywords)
+"""
+
+
+@log_execution_time
+def refresh_file_cards(file_ids: List[uuid.UUID] | None = None, session: Session | None = None) -> int:
+    """
+    Rebuild the denormalized ``file_card`` rows read by the ``file_retrieval`` view.
+
+    Args:
+        file_ids (List[uuid.UUID] | None): Files to refresh; ``None`` refreshes all files.
+        session (Session | None): Session to use; a new one is opened and committed otherwise.
+
+    Returns:
+        int: Number of cards that were inserted or changed.
+    """
+    if file_ids is not None and not file_ids:
+        return 0
+    filters = {
+        f"{alias}_filter": f"WHERE {alias}.{column} = ANY(:file_ids)" if file_ids is not None else ""
+        for alias, column in (("pf", "file_id"), ("fm", "file_id"), ("fk", "file_id"), ("f", "db_id"))
+    }
+    statement = text(_REFRESH_FILE_CARDS_SQL.format(**filters))
+    params = {"file_ids": list(file_ids)} if file_ids is not None else {}
+    with optional_session(session) as sess:
+        result = sess.execute(statement, params)
+        if session is None:
+            sess.commit()
+    changed = result.rowcount
+    logger.info(f"Refreshed {changed} file cards")
+    return changed
@@ -1,3 +1,3 @@
-from .helper import create_embedding_model
+from .helper import KNOWN_EMBEDDING_DIMENSIONS, create_embedding_model
 
-__all__ = ["create_embedding_model"]
+__all__ = ["KNOWN_EMBEDDING_DIMENSIONS", "create_embedding_model"]
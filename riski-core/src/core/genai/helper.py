@@ -1,13 +1,31 @@
+import httpx
 from langchain_openai import OpenAIEmbeddings
 
 from core.model.data_models import VECTOR_DIM
 from core.settings.base import AppBaseSettings
 
+# Output dimensions of known embedding models; lets callers validate the configuration without a network call.
+KNOWN_EMBEDDING_DIMENSIONS: dict[str, int] = {
+    "text-embedding-3-large": 3072,
+    "text-embedding-3-small": 1536,
+    "text-embedding-ada-002": 1536,
+}
 
-def create_embedding_model(settings: AppBaseSettings) -> OpenAIEmbeddings:
+
+def create_embedding_model(settings: AppBaseSettings, http_async_client: httpx.AsyncClient | None = None) -> OpenAIEmbeddings:
+    """Create the embedding model and validate that its dimension matches the ``embed`` column.
+
+    For models in ``KNOWN_EMBEDDING_DIMENSIONS`` the check needs no network;
+    other models are checked with a live test embedding.
+    """
+    model = settings.core.genai.embedding_model
     embedding_model = OpenAIEmbeddings(
-        model=settings.core.genai.embedding_model,
+        model=model,
+        http_async_client=http_async_client,
     )
-    test_embedding = embedding_model.embed_query("test")
-    assert len(test_embedding) == VECTOR_DIM
+    dimension = KNOWN_EMBEDDING_DIMENSIONS.get(model)
+    if dimension is None:
+        dimension = len(embedding_model.embed_query("test"))
+    if dimension != VECTOR_DIM:
+        raise ValueError(f"Embedding model {model} returns {dimension}-dimensional vectors, but the embed column has {VECTOR_DIM}.")
     return embedding_model
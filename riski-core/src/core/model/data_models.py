@@ -6,6 +6,7 @@ from typing import Union
 from pgvector.sqlalchemy import Vector
 from pydantic import BaseModel
 from sqlalchemy import JSON, String  # , Computed
+from sqlalchemy.dialects.postgresql import JSONB
 
 # from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlmodel import Column, Field, Relationship, SQLModel
@@ -751,6 +752,38 @@ class Consultation(RIS_PARSED_DB_OBJECT, table=True):
     keywords: list["Keyword"] = Relationship(back_populates="consultations", link_model=ConsultationKeywordLink)
 
 
+##############################################
+################ Retrieval ###################
+##############################################
+
+
+class FileCard(SQLModel, table=True):
+    """Denormalized card fields of a file, maintained by ``core.db.db_access.refresh_file_cards``.
+
+    The ``file_retrieval`` view joins this table to ``file`` so the vector
+    search returns the papers and meetings of each hit in the same statement.
+    """
+
+    __tablename__ = "file_card"
+    file_id: uuid.UUID = Field(foreign_key="file.db_id", primary_key=True, ondelete="CASCADE")
+    papers: list[dict] = Field(
+        sa_column=Column(JSONB, nullable=False),
+        default_factory=list,
+        description="Linked papers as {identifier, name, subject, date, risUrl, paper_type}, ordered by reference.",
+    )
+    meetings: list[dict] = Field(
+        sa_column=Column(JSONB, nullable=False),
+        default_factory=list,
+        description="Linked meetings as {name, start, risUrl}, ordered by start.",
+    )
+    # Filter columns of the retrieval (see FILE_CARD_INDEX_DDL in core.db.db for their trigram indexes)
+    date: datetime | None = Field(None, index=True, description="File date, else the earliest paper date or meeting start.")
+    paper_types: str | None = Field(None, description="Types of the linked papers as '|Stadtratsantrag|Sitzungsvorlage|'.")
+    originators: str | None = Field(None, description="Names and short names of the originator organizations of the linked papers.")
+    keywords: str | None = Field(None, description="Keywords (e.g. Stadtbezirk) of the file and its linked papers.")
+    refreshed: datetime = Field(default_factory=lambda: datetime.now(), description="Time of the last change of the card.")
+
+
 ##############################################
 ################ Collection types ############
 ##############################################
@@ -4,6 +4,7 @@ from logging import Logger
 
 from config.config import Config, get_config
 from core.db.db import create_db_and_tables, init_db
+from core.db.db_access import refresh_file_cards
 from src.extractor.city_council_faction_extractor import CityCouncilFactionExtractor
 from src.extractor.city_council_meeting_extractor import CityCouncilMeetingExtractor
 from src.extractor.city_council_meeting_template_extractor import CityCouncilMeetingTemplateExtractor
@@ -69,6 +70,9 @@ async def main():
     confidential_file_deleter = ConfidentialFileDeleter()
     confidential_file_deleter.delete_confidential_files()
 
+    logger.info("Refreshing file cards for retrieval")
+    refresh_file_cards()
+
     logger.info("Extraction process finished")
 
     logger.info("RIS Indexer completed successfully")
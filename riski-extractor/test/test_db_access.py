@@ -1,5 +1,7 @@
-from core.db.db_access import request_object_by_risid
-from core.model.data_models import Person
+from datetime import datetime
+
+from core.db.db_access import refresh_file_cards, request_object_by_risid
+from core.model.data_models import FileCard, Person
 
 
 # ----------------------
@@ -13,3 +15,41 @@ def test_request_person_by_risid(session, person):
     assert db_person.title == person.title
     assert db_person.created == person.created
     assert db_person.modified == person.modified
+
+
+# ----------------------
+# Test File cards
+# ----------------------
+def test_refresh_file_cards(session, file, paper, meeting, keyword):
+    paper.reference = "20-26 / A 00001"
+    paper.date = datetime(2024, 5, 1)
+    paper.keywords = [keyword]
+    paper.auxiliary_files = [file]
+    meeting.auxiliary_files = [file]
+    session.commit()
+
+    assert refresh_file_cards(session=session) == 1
+    card = session.get(FileCard, file.db_id)
+    assert card.papers == [
+        {
+            "identifier": "20-26 / A 00001",
+            "name": paper.name,
+            "subject": None,
+            "date": "2024-05-01T00:00:00",
+            "risUrl": paper.id,
+            "paper_type": paper.paper_type,
+        }
+    ]
+    assert card.meetings == [{"name": meeting.name, "start": meeting.start.strftime("%Y-%m-%dT%H:%M:%S"), "risUrl": meeting.id}]
+    assert card.date == datetime(2024, 5, 1)
+    assert card.paper_types == f"|{paper.paper_type.value}|"
+    assert card.keywords == keyword.name
+
+    # Unchanged cards are not rewritten
+    assert refresh_file_cards([file.db_id], session=session) == 0
+
+    paper.auxiliary_files = []
+    session.commit()
+    assert refresh_file_cards([file.db_id], session=session) == 1
+    session.refresh(card)
+    assert card.papers == []
@@ -7,9 +7,15 @@ import type {
   ToolCallResult,
 } from "@/types/RiskiAnswer";
 import type { AgentSubscriber } from "@ag-ui/client";
-import type { Message, StateSnapshotEvent } from "@ag-ui/core";
+import type {
+  Message,
+  StateDeltaEvent,
+  StateSnapshotEvent,
+} from "@ag-ui/core";
+import type { Operation } from "fast-json-patch";
 
 import { HttpAgent } from "@ag-ui/client";
+import { applyPatch } from "fast-json-patch";
 
 import { getAPIBaseURL, RISKI_AGENT_ENDPOINT } from "@/util/constants";
 
@@ -313,6 +319,143 @@ export default class AgUiAgentClient {
     /** Track toolCallId → synthetic step name so onToolCallEndEvent can find it. */
     const toolCallStepMap = new Map<string, string>();
 
+    // -- Derive tool calls & document checks from state diffs ----------------
+    let currentState: AgentStateSnapshot | undefined;
+
+    const handleState = (snap: AgentStateSnapshot) => {
+      const docs: TrackedDocumentSnapshot[] = snap.tracked_documents ?? [];
+      const proposals: TrackedProposalSnapshot[] =
+        snap.tracked_proposals ?? [];
+      const userQuery = snap.user_query ?? "";
+
+      const step = currentStep();
+      let changed = false;
+
+      // -- user_query changed -----------------------------------------------
+      if (userQuery && userQuery !== prevUserQuery) {
+        prevUserQuery = userQuery;
+        changed = true;
+      }
+
+      // -- Detect newly appeared documents (tool result) --------------------
+      const prevDocIds = new Set(prevDocs.map((d) => d.id));
+      const newDocs = docs.filter((d) => d.id && !prevDocIds.has(d.id));
+
+      if (newDocs.length > 0) {
+        const result: ToolCallResult = {
+          documents: newDocs.map((d) =>
+            mapDocument(d as unknown as Record<string, unknown>)
+          ),
+          proposals: proposals.map((p) =>
+            mapProposal(p as unknown as Record<string, unknown>)
+          ),
+        };
+
+        // Attach to the running tool step (synthetic), not the model step
+        const toolStep = currentToolStep();
+        if (toolStep) {
+          if (!toolStep.toolCalls) toolStep.toolCalls = [];
+          const runningTc = toolStep.toolCalls.find(
+            (tc) => tc.status === "running"
+          );
+          if (runningTc) {
+            runningTc.result = result;
+          } else {
+            toolStep.toolCalls.push({
+              id: generateId(),
+              name: "retrieve_documents",
+              status: "running",
+              result,
+            });
+          }
+        }
+        latestStatus = "Dokumente gefunden.";
+        changed = true;
+      }
+
+      // -- Detect relevance changes (is_checked / is_relevant flipped) ------
+      for (const doc of docs) {
+        const prev = prevDocs.find((p) => p.id === doc.id);
+
+        const prevChecked = prev?.is_checked ?? false;
+        const prevRelevant = prev?.is_relevant ?? false;
+
+        const relevanceChanged =
+          (doc.is_checked && !prevChecked) ||
+          (doc.is_relevant !== prevRelevant && prev !== undefined);
+
+        if (!relevanceChanged) continue;
+
+        // Attach document checks to the retrieve_documents step (may already be completed)
+        const checkTargetStep = lastRetrieveStep() ?? step;
+        if (checkTargetStep) {
+          if (!checkTargetStep.documentChecks)
+            checkTargetStep.documentChecks = [];
+
+          const docName =
+            pickString(
+              (doc.metadata as Record<string, unknown>)?.name,
+              (doc.metadata as Record<string, unknown>)?.title,
+              doc.id
+            ) || "Dokument";
+
+          const docUrl = pickString(
+            (doc.metadata as Record<string, unknown>)?.id,
+            (doc.metadata as Record<string, unknown>)?.risUrl,
+            (doc.metadata as Record<string, unknown>)?.source
+          );
+
+          const existing = checkTargetStep.documentChecks.find(
+            (c) => c.name === docName
+          );
+          if (existing) {
+            existing.relevant = doc.is_relevant;
+            existing.reason = doc.relevance_reason || "";
+            if (docUrl) existing.url = docUrl;
+          } else {
+            checkTargetStep.documentChecks.push({
+              name: docName,
+              relevant: doc.is_relevant,
+              reason: doc.relevance_reason || "",
+              url: docUrl || undefined,
+            });
+          }
+          latestStatus = `Prüfe: ${docName}…`;
+        }
+        changed = true;
+      }
+
+      // -- Detect newly appeared proposals (without new docs) ---------------
+      if (
+        !changed &&
+        proposals.length > 0 &&
+        proposals.length !== prevProposals.length
+      ) {
+        changed = true;
+      }
+
+      // -- Detect error_info from the backend state -------------------------
+      if (snap.error_info && !latestErrorInfo) {
+        const ei = snap.error_info;
+        latestErrorInfo = {
+          errorType: ei.error_type,
+          message: ei.message,
+          suggestions: Array.isArray(ei.suggestions)
+            ? ei.suggestions
+            : undefined,
+          details: ei.details,
+        };
+        latestStatus = ei.message;
+        changed = true;
+      }
+
+      // Update previous snapshot for next diff
+      prevDocs = docs;
+      prevProposals = proposals;
+
+      if (changed) emitProgress();
+    };
+
     // -- AG-UI subscriber -----------------------------------------------------
 
     const subscriber: AgentSubscriber = {
@@ -321,6 +464,7 @@ export default class AgUiAgentClient {
         prevDocs = [];
         prevProposals = [];
         prevUserQuery = "";
+        currentState = undefined;
         latestErrorInfo = undefined;
         toolCallStepMap.clear();
         emitProgress();
@@ -359,142 +503,30 @@ export default class AgUiAgentClient {
         emitProgress();
       },
 
-      // -- Derive tool calls & document checks from state snapshot diffs ------
+      // -- Track agent state: full snapshots plus JSON-Patch deltas ----------
       onStateSnapshotEvent: ({ event }: { event: StateSnapshotEvent }) => {
         const snap = event.snapshot as AgentStateSnapshot | undefined;
         if (!snap) return;
+        currentState = snap;
+        handleState(snap);
+      },
 
-        const docs: TrackedDocumentSnapshot[] = snap.tracked_documents ?? [];
-        const proposals: TrackedProposalSnapshot[] =
-          snap.tracked_proposals ?? [];
-        const userQuery = snap.user_query ?? "";
-
-        const step = currentStep();
-        let changed = false;
-
-        // -- user_query changed -----------------------------------------------
-        if (userQuery && userQuery !== prevUserQuery) {
-          prevUserQuery = userQuery;
-          changed = true;
-        }
-
-        // -- Detect newly appeared documents (tool result) --------------------
-        const prevDocIds = new Set(prevDocs.map((d) => d.id));
-        const newDocs = docs.filter((d) => d.id && !prevDocIds.has(d.id));
-
-        if (newDocs.length > 0) {
-          const result: ToolCallResult = {
-            documents: newDocs.map((d) =>
-              mapDocument(d as unknown as Record<string, unknown>)
-            ),
-            proposals: proposals.map((p) =>
-              mapProposal(p as unknown as Record<string, unknown>)
-            ),
-          };
-
-          // Attach to the running tool step (synthetic), not the model step
-          const toolStep = currentToolStep();
-          if (toolStep) {
-            if (!toolStep.toolCalls) toolStep.toolCalls = [];
-            const runningTc = toolStep.toolCalls.find(
-              (tc) => tc.status === "running"
-            );
-            if (runningTc) {
-              runningTc.result = result;
-            } else {
-              toolStep.toolCalls.push({
-                id: generateId(),
-                name: "retrieve_documents",
-                status: "running",
-                result,
-              });
-            }
-          }
-          latestStatus = "Dokumente gefunden.";
-          changed = true;
-        }
-
-        // -- Detect relevance changes (is_checked / is_relevant flipped) ------
-        for (const doc of docs) {
-          const prev = prevDocs.find((p) => p.id === doc.id);
-
-          const prevChecked = prev?.is_checked ?? false;
-          const prevRelevant = prev?.is_relevant ?? false;
-
-          const relevanceChanged =
-            (doc.is_checked && !prevChecked) ||
-            (doc.is_relevant !== prevRelevant && prev !== undefined);
-
-          if (!relevanceChanged) continue;
-
-          // Attach document checks to the retrieve_documents step (may already be completed)
-          const checkTargetStep = lastRetrieveStep() ?? step;
-          if (checkTargetStep) {
-            if (!checkTargetStep.documentChecks)
-              checkTargetStep.documentChecks = [];
-
-            const docName =
-              pickString(
-                (doc.metadata as Record<string, unknown>)?.name,
-                (doc.metadata as Record<string, unknown>)?.title,
-                doc.id
-              ) || "Dokument";
-
-            const docUrl = pickString(
-              (doc.metadata as Record<string, unknown>)?.id,
-              (doc.metadata as Record<string, unknown>)?.risUrl,
-              (doc.metadata as Record<string, unknown>)?.source
-            );
-
-            const existing = checkTargetStep.documentChecks.find(
-              (c) => c.name === docName
-            );
-            if (existing) {
-              existing.relevant = doc.is_relevant;
-              existing.reason = doc.relevance_reason || "";
-              if (docUrl) existing.url = docUrl;
-            } else {
-              checkTargetStep.documentChecks.push({
-                name: docName,
-                relevant: doc.is_relevant,
-                reason: doc.relevance_reason || "",
-                url: docUrl || undefined,
-              });
-            }
-            latestStatus = `Prüfe: ${docName}…`;
-          }
-          changed = true;
-        }
-
-        // -- Detect newly appeared proposals (without new docs) ---------------
-        if (
-          !changed &&
-          proposals.length > 0 &&
-          proposals.length !== prevProposals.length
-        ) {
-          changed = true;
-        }
-
-        // -- Detect error_info from the backend state -------------------------
-        if (snap.error_info && !latestErrorInfo) {
-          const ei = snap.error_info;
-          latestErrorInfo = {
-            errorType: ei.error_type,
-            message: ei.message,
-            suggestions: Array.isArray(ei.suggestions)
-              ? ei.suggestions
-              : undefined,
-            details: ei.details,
-          };
-          latestStatus = ei.message;
-          changed = true;
+      onStateDeltaEvent: ({ event }: { event: StateDeltaEvent }) => {
+        if (!currentState) return; // wait for the next full snapshot
+        try {
+          currentState = applyPatch(
+            currentState,
+            event.delta as Operation[],
+            false,
+            false
+          ).newDocument;
+        } catch (error) {
+          // Out of sync – drop the state until the next full snapshot arrives
+          console.warn("Could not apply state delta", error);
+          currentState = undefined;
+          return;
         }
-
-        // Update previous snapshot for next diff
-        prevDocs = docs;
-        prevProposals = proposals;
-
-        if (changed) emitProgress();
+        handleState(currentState);
       },
 
       onRunFinishedEvent: () => {
@@ -526,7 +558,6 @@ export default class AgUiAgentClient {
       },
 
       // Unused AG-UI lifecycle hooks
-      onStateDeltaEvent: () => {},
       onToolCallStartEvent: ({ event }) => {
         // Push a synthetic top-level step for the tool so it appears separately
         const toolStepName = event.toolCallName;